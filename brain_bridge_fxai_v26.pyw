@@ -5,11 +5,10 @@ import socket
 import statistics
 from datetime import datetime, timezone, timedelta
 import math
-from threading import Lock, Thread
+from threading import Lock, Thread, local
 from typing import Optional, Dict, Any, List
 
 import zmq
-import MetaTrader5 as mt5
 from flask import Flask, request, Response
 from openai import OpenAI
 from dotenv import load_dotenv
@@ -41,6 +40,11 @@ try:
 except Exception:
     from tradingView.fxai_ai_client import call_openai_json_with_retry as _call_openai_json_with_retry
 
+try:
+    import fxai_ai_client as _fxai_ai_client
+except Exception:
+    from tradingView import fxai_ai_client as _fxai_ai_client
+
 try:
     from fxai_zmq_bridge import send_json_with_hooks as _zmq_send_json_with_hooks
 except Exception:
@@ -58,6 +62,16 @@ except Exception:
     from tradingView import fxai_signal_cache as _fxai_signal_cache
     from tradingView.fxai_signal_cache import is_zone_presence_signal
 
+try:
+    import fxai_signal_store as _fxai_signal_store
+except Exception:
+    from tradingView import fxai_signal_store as _fxai_signal_store
+
+try:
+    import fxai_signal_record as _fxai_signal_record
+except Exception:
+    from tradingView import fxai_signal_record as _fxai_signal_record
+
 try:
     import fxai_persistence as _fxai_persist
 except Exception:
@@ -73,6 +87,46 @@ try:
 except Exception:
     from tradingView import fxai_qtrend as _fxai_qtrend
 
+try:
+    import fxai_qtrend_stream as _fxai_qtrend_stream
+except Exception:
+    from tradingView import fxai_qtrend_stream as _fxai_qtrend_stream
+
+try:
+    import fxai_zone_index as _fxai_zone_index
+except Exception:
+    from tradingView import fxai_zone_index as _fxai_zone_index
+
+try:
+    import fxai_bar_cache as _fxai_bar_cache
+except Exception:
+    from tradingView import fxai_bar_cache as _fxai_bar_cache
+
+try:
+    import fxai_indicators as _fxai_indicators
+except Exception:
+    from tradingView import fxai_indicators as _fxai_indicators
+
+try:
+    import fxai_indicator_stream as _fxai_indicator_stream
+except Exception:
+    from tradingView import fxai_indicator_stream as _fxai_indicator_stream
+
+try:
+    import fxai_spread_stats as _fxai_spread_stats
+except Exception:
+    from tradingView import fxai_spread_stats as _fxai_spread_stats
+
+try:
+    import fxai_market_poller as _fxai_market_poller
+except Exception:
+    from tradingView import fxai_market_poller as _fxai_market_poller
+
+try:
+    import fxai_positions_cache as _fxai_positions_cache
+except Exception:
+    from tradingView import fxai_positions_cache as _fxai_positions_cache
+
 try:
     import fxai_window_signals as _fxai_window_signals
 except Exception:
@@ -98,6 +152,31 @@ try:
 except Exception:
     from tradingView import fxai_prompts_text as _fxai_prompts_text
 
+try:
+    import fxai_decision_cache as _fxai_decision_cache
+except Exception:
+    from tradingView import fxai_decision_cache as _fxai_decision_cache
+
+try:
+    import fxai_prefilter as _fxai_prefilter
+except Exception:
+    from tradingView import fxai_prefilter as _fxai_prefilter
+
+try:
+    import fxai_ai_governor as _fxai_ai_governor
+except Exception:
+    from tradingView import fxai_ai_governor as _fxai_ai_governor
+
+try:
+    import fxai_scheduler as _fxai_scheduler
+except Exception:
+    from tradingView import fxai_scheduler as _fxai_scheduler
+
+try:
+    import fxai_mt5_adapter as _fxai_mt5_adapter
+except Exception:
+    from tradingView import fxai_mt5_adapter as _fxai_mt5_adapter
+
 try:
     from werkzeug.exceptions import RequestEntityTooLarge
 except Exception:
@@ -108,6 +187,12 @@ app = Flask(__name__)
 # Load .env early
 load_dotenv()
 
+# --- MT5 adapter ---
+# real: MetaTrader5 パッケージ（Windows端末）。sim: fxai_mt5_adapter.SimTerminal が
+# MT5_SIM_* の記録データを再生し、EA役として ORDER/CLOSE を約定させる（Linuxでの再現ベンチ用）。
+MT5_ADAPTER = str(os.getenv("MT5_ADAPTER", "real") or "real").strip().lower()
+mt5 = _fxai_mt5_adapter.create_adapter(MT5_ADAPTER)
+
 
 # --- Core config ---
 WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "80"))
@@ -134,6 +219,9 @@ METRICS_RATE_LIMIT_RPM = _env_int("METRICS_RATE_LIMIT_RPM", "0")
 PROMPT_COMPACT_ENABLED = _env_bool("PROMPT_COMPACT_ENABLED", "0")
 PROMPT_MAX_LIST_ITEMS = int(os.getenv("PROMPT_MAX_LIST_ITEMS", "20"))
 PROMPT_MAX_STR_LEN = int(os.getenv("PROMPT_MAX_STR_LEN", "600"))
+# Prompt prefix caching: fxai_prompts_text の静的ブロックを独立メッセージ（毎回同一バイト列）として先頭に置き、
+# AttemptContext と ContextJSON（キー順固定）を最後のメッセージに回す。API 側の自動プレフィックスキャッシュが効く。
+PROMPT_PREFIX_CACHE_ENABLED = _env_bool("PROMPT_PREFIX_CACHE_ENABLED", "0")
 
 SYMBOL = (os.getenv("SYMBOL", "GOLD") or "GOLD").strip().upper()
 
@@ -197,6 +285,11 @@ CACHE_ASYNC_FLUSH_ENABLED = _env_bool("CACHE_ASYNC_FLUSH_ENABLED", "1")  # [Phas
 CACHE_FLUSH_INTERVAL_SEC = float(os.getenv("CACHE_FLUSH_INTERVAL_SEC", "5.0"))
 # Force flush even if signals keep arriving frequently
 CACHE_FLUSH_FORCE_SEC = float(os.getenv("CACHE_FLUSH_FORCE_SEC", "10.0"))
+# Append-only journal (JSON lines) next to the CACHE_FILE snapshot.
+# Flushes append only the delta; compaction rewrites the snapshot and truncates the journal.
+CACHE_JOURNAL_FILE = str(os.getenv("CACHE_JOURNAL_FILE", f"{CACHE_FILE}.journal") or f"{CACHE_FILE}.journal").strip()
+CACHE_COMPACT_ENTRIES = int(os.getenv("CACHE_COMPACT_ENTRIES", "500"))
+CACHE_COMPACT_INTERVAL_SEC = float(os.getenv("CACHE_COMPACT_INTERVAL_SEC", "600"))
 
 CONFLUENCE_LOOKBACK_SEC = int(os.getenv("CONFLUENCE_LOOKBACK_SEC", "600"))
 Q_TREND_MAX_AGE_SEC = int(os.getenv("Q_TREND_MAX_AGE_SEC", "300"))
@@ -204,10 +297,8 @@ Q_TREND_TF_FALLBACK_ENABLED = _env_bool("Q_TREND_TF_FALLBACK_ENABLED", "0")
 
 ZONE_LOOKBACK_SEC = int(os.getenv("ZONE_LOOKBACK_SEC", "1200"))
 ZONE_TOUCH_LOOKBACK_SEC = int(os.getenv("ZONE_TOUCH_LOOKBACK_SEC", "1200"))
-
-# Signal cache indexing (OFF by default to avoid any behavior risk)
-SIGNAL_INDEX_ENABLED = _env_bool("SIGNAL_INDEX_ENABLED", "0")
-SIGNAL_INDEX_BUCKET_SEC = int(os.getenv("SIGNAL_INDEX_BUCKET_SEC", "60"))
+# zones_context: k for "zones within k ATR" of the current price (ATR = M5 ATR from market data).
+ZONES_NEAR_ATR_MULT = float(os.getenv("ZONES_NEAR_ATR_MULT", "1.0"))
 
 # Position time extraction debug (temporarily ON for diagnostics)
 DEBUG_POSITION_TIME = _env_bool("DEBUG_POSITION_TIME", "0")
@@ -216,6 +307,40 @@ DEBUG_POSITION_TIME = _env_bool("DEBUG_POSITION_TIME", "0")
 SPREAD_HISTORY_WINDOW_SEC = int(os.getenv("SPREAD_HISTORY_WINDOW_SEC", "86400"))
 SPREAD_HISTORY_MAX = int(os.getenv("SPREAD_HISTORY_MAX", "2000"))
 
+# --- MT5 bar cache (get_mt5_market_data) ---
+# 1: serve M15/M5 rates from a per-symbol/timeframe cache; only bars since the last
+#    cached bar are fetched once it closes (the indicators never read the forming bar).
+BAR_CACHE_ENABLED = _env_bool("BAR_CACHE_ENABLED", "1")
+# Force a full re-fetch of each cached series at least this often (0 = never).
+BAR_CACHE_FULL_REFRESH_SEC = float(os.getenv("BAR_CACHE_FULL_REFRESH_SEC", "3600"))
+# atr_avg_5h baseline window in M5 bars (60 = previous approximation, 288 = full window).
+ATR_AVG_BARS = max(14, int(os.getenv("ATR_AVG_BARS", "60")))
+# 1: keep M15/M5/H1/D1 indicators as running state updated once per closed bar
+#    (Wilder ATR, SMA20 + slope, monotonic swing high/low) and serve them from a
+#    per-symbol snapshot. Values follow the standard definitions on the latest
+#    closed bars, so they differ from the legacy window; also adds atr_h1/atr_d1.
+INDICATOR_STREAM_ENABLED = _env_bool("INDICATOR_STREAM_ENABLED", "0")
+# H1/D1 history fetched for the indicator stream (warm-up for Wilder ATR).
+INDICATOR_STREAM_H1_BARS = int(os.getenv("INDICATOR_STREAM_H1_BARS", "100"))
+INDICATOR_STREAM_D1_BARS = int(os.getenv("INDICATOR_STREAM_D1_BARS", "30"))
+
+# --- MT5 background poller ---
+# 1: one thread polls tick/symbol info/bars/positions every MT5_POLL_INTERVAL_SEC and
+#    publishes per-symbol snapshots; entry/management paths read those instead of
+#    calling MT5 inline. Snapshots older than MT5_SNAPSHOT_MAX_AGE_SEC are rejected
+#    (synchronous read instead).
+MT5_POLLER_ENABLED = _env_bool("MT5_POLLER_ENABLED", "0")
+MT5_POLL_INTERVAL_SEC = float(os.getenv("MT5_POLL_INTERVAL_SEC", "0.5"))
+MT5_SNAPSHOT_MAX_AGE_SEC = float(os.getenv("MT5_SNAPSHOT_MAX_AGE_SEC", "2.0"))
+
+# --- Positions summary cache (event driven) ---
+# 1: cache get_mt5_positions_summary per symbol; the EA's POSITIONS_CHANGED events
+#    (heartbeat PUSH socket) and our own ORDER/CLOSE sends invalidate it. Requires
+#    the EA build that sends those events. Entries are refetched after
+#    POSITIONS_CACHE_RECONCILE_SEC regardless (safety net for a lost event).
+POSITIONS_CACHE_ENABLED = _env_bool("POSITIONS_CACHE_ENABLED", "0")
+POSITIONS_CACHE_RECONCILE_SEC = float(os.getenv("POSITIONS_CACHE_RECONCILE_SEC", "5.0"))
+
 
 # --- Metrics / log aggregation (for fast tuning) ---
 ENTRY_METRICS_ENABLED = _env_bool("ENTRY_METRICS_ENABLED", "1")
@@ -261,6 +386,65 @@ API_TIMEOUT_SEC = float(os.getenv("API_TIMEOUT_SEC", "20"))
 API_RETRY_COUNT = int(os.getenv("API_RETRY_COUNT", "3"))
 API_RETRY_WAIT_SEC = float(os.getenv("API_RETRY_WAIT_SEC", "1.5"))
 
+# --- AI client: pooled HTTP + overall deadline + hedged request ---
+# AI_CONCURRENT_ENABLED=1: 共有 keep-alive HTTP クライアント（SDK 内部リトライ無し）で、
+# AI_DEADLINE_SEC の予算内に収まるようリトライし、kind 毎の p90 レイテンシを超えたら
+# 同一リクエストをもう1本投げて先着を採用する。0 なら従来の逐次リトライ。
+AI_CONCURRENT_ENABLED = _env_bool("AI_CONCURRENT_ENABLED", "0")
+AI_DEADLINE_SEC = float(os.getenv("AI_DEADLINE_SEC", "12"))  # 0 = no overall budget
+AI_HEDGE_ENABLED = _env_bool("AI_HEDGE_ENABLED", "1")
+AI_HEDGE_QUANTILE = float(os.getenv("AI_HEDGE_QUANTILE", "0.9"))
+AI_HEDGE_MIN_SAMPLES = int(os.getenv("AI_HEDGE_MIN_SAMPLES", "20"))
+AI_HEDGE_DEFAULT_SEC = float(os.getenv("AI_HEDGE_DEFAULT_SEC", "3.0"))  # until MIN_SAMPLES latencies exist
+AI_HTTP_MAX_CONNECTIONS = int(os.getenv("AI_HTTP_MAX_CONNECTIONS", "8"))
+# AI_STREAM_ENABLED=1: entry_score をストリーミングで受け、confluence_score / lot_multiplier が揃って
+# 検証を通った時点で判断を進める（reason の残りはバックグラウンドで受信してログ出力）。
+AI_STREAM_ENABLED = _env_bool("AI_STREAM_ENABLED", "0")
+# Token cost accounting (USD per 1M tokens; defaults = gpt-4o-mini list price).
+AI_PRICE_INPUT_PER_MTOK = float(os.getenv("AI_PRICE_INPUT_PER_MTOK", "0.15"))
+AI_PRICE_CACHED_INPUT_PER_MTOK = float(os.getenv("AI_PRICE_CACHED_INPUT_PER_MTOK", "0.075"))
+AI_PRICE_OUTPUT_PER_MTOK = float(os.getenv("AI_PRICE_OUTPUT_PER_MTOK", "0.60"))
+
+# --- AI adaptive timeouts + circuit breaker ---
+# AI_ADAPTIVE_TIMEOUT_ENABLED=1: 1リクエストの timeout を kind 毎の直近レイテンシ
+# (AI_TIMEOUT_QUANTILE × AI_TIMEOUT_MULTIPLIER, AI_TIMEOUT_MIN_SEC..API_TIMEOUT_SEC) から決め、
+# リトライ全体は鮮度予算の残りで打ち切る（entry: トリガー受信から AI_ENTRY_BUDGET_SEC、
+# 遅延エントリー再評価は試行開始から / close: 判断開始から AI_CLOSE_BUDGET_SEC）。
+AI_ADAPTIVE_TIMEOUT_ENABLED = _env_bool("AI_ADAPTIVE_TIMEOUT_ENABLED", "0")
+AI_TIMEOUT_QUANTILE = float(os.getenv("AI_TIMEOUT_QUANTILE", "0.99"))
+AI_TIMEOUT_MULTIPLIER = float(os.getenv("AI_TIMEOUT_MULTIPLIER", "1.5"))
+AI_TIMEOUT_MIN_SEC = float(os.getenv("AI_TIMEOUT_MIN_SEC", "2.0"))
+AI_TIMEOUT_MIN_SAMPLES = int(os.getenv("AI_TIMEOUT_MIN_SAMPLES", "20"))  # static API_TIMEOUT_SEC until then
+AI_ENTRY_BUDGET_SEC = float(os.getenv("AI_ENTRY_BUDGET_SEC", "30"))  # 0 = no freshness cap
+AI_CLOSE_BUDGET_SEC = float(os.getenv("AI_CLOSE_BUDGET_SEC", "30"))
+# AI_BREAKER_ENABLED=1: kind 毎に直近 AI_BREAKER_WINDOW_SEC の失敗率が AI_BREAKER_FAILURE_RATE 以上
+# (AI_BREAKER_MIN_CALLS 件以上) で open。open 中は AI を呼ばず即フォールバック
+# （entry はブロック、close は AI_CLOSE_FALLBACK）。AI_BREAKER_OPEN_SEC 後に half-open の試行が成功すれば close。
+AI_BREAKER_ENABLED = _env_bool("AI_BREAKER_ENABLED", "0")
+AI_BREAKER_FAILURE_RATE = float(os.getenv("AI_BREAKER_FAILURE_RATE", "0.5"))
+AI_BREAKER_MIN_CALLS = int(os.getenv("AI_BREAKER_MIN_CALLS", "6"))
+AI_BREAKER_WINDOW_SEC = float(os.getenv("AI_BREAKER_WINDOW_SEC", "60"))
+AI_BREAKER_OPEN_SEC = float(os.getenv("AI_BREAKER_OPEN_SEC", "30"))
+AI_BREAKER_HALF_OPEN_PROBES = int(os.getenv("AI_BREAKER_HALF_OPEN_PROBES", "1"))
+# --- AI call governor ---
+# AI_GOVERNOR_ENABLED=1: 全 AI 呼び出しを優先度付きキュー経由にする（kind 毎の token bucket + 同時実行上限）。
+# 優先度: entry(新規トリガー) > close(反転シグナルの決済判断) > reeval(遅延エントリー再評価)
+#        > pyramid / hold(定常の CLOSE/HOLD 更新) > speculative。
+# 混雑時は AI_GOV_SHED_FROM 以下の優先度を待たせずに捨てる（entry はブロック、close/hold は AI_CLOSE_FALLBACK）。
+AI_GOVERNOR_ENABLED = _env_bool("AI_GOVERNOR_ENABLED", "0")
+AI_GOV_MAX_CONCURRENCY = int(os.getenv("AI_GOV_MAX_CONCURRENCY", "4"))
+AI_GOV_QUEUE_LIMIT = int(os.getenv("AI_GOV_QUEUE_LIMIT", "8"))
+AI_GOV_SHED_FROM = (os.getenv("AI_GOV_SHED_FROM", "reeval") or "reeval").strip().lower()
+if AI_GOV_SHED_FROM not in _fxai_ai_governor.PRIORITIES:
+    AI_GOV_SHED_FROM = "reeval"
+AI_GOV_MAX_WAIT_SEC = float(os.getenv("AI_GOV_MAX_WAIT_SEC", "10"))
+AI_GOV_ENTRY_RATE_PER_MIN = float(os.getenv("AI_GOV_ENTRY_RATE_PER_MIN", "60"))  # 0 = no rate limit
+AI_GOV_ENTRY_BURST = int(os.getenv("AI_GOV_ENTRY_BURST", "10"))
+AI_GOV_ENTRY_CONCURRENCY = int(os.getenv("AI_GOV_ENTRY_CONCURRENCY", "3"))
+AI_GOV_CLOSE_RATE_PER_MIN = float(os.getenv("AI_GOV_CLOSE_RATE_PER_MIN", "30"))
+AI_GOV_CLOSE_BURST = int(os.getenv("AI_GOV_CLOSE_BURST", "5"))
+AI_GOV_CLOSE_CONCURRENCY = int(os.getenv("AI_GOV_CLOSE_CONCURRENCY", "2"))
+
 AI_ENTRY_DEFAULT_SCORE = int(os.getenv("AI_ENTRY_DEFAULT_SCORE", "50"))
 AI_ENTRY_DEFAULT_LOT_MULTIPLIER = float(os.getenv("AI_ENTRY_DEFAULT_LOT_MULTIPLIER", "1.0"))
 AI_ENTRY_MIN_SCORE = int(os.getenv("AI_ENTRY_MIN_SCORE", "75"))
@@ -268,7 +452,18 @@ AI_ENTRY_MIN_SCORE = int(os.getenv("AI_ENTRY_MIN_SCORE", "75"))
 # Default keeps behavior unchanged.
 AI_ENTRY_MIN_SCORE_STRONG_ALIGNED = int(os.getenv("AI_ENTRY_MIN_SCORE_STRONG_ALIGNED", str(AI_ENTRY_MIN_SCORE)))
 AI_ENTRY_THROTTLE_SEC = float(os.getenv("AI_ENTRY_THROTTLE_SEC", "15"))
+# Entry AI decision cache: 量子化した entry payload の指紋が一致し TTL 内なら前回スコアを再利用。
+ENTRY_AI_CACHE_ENABLED = _env_bool("ENTRY_AI_CACHE_ENABLED", "0")
+ENTRY_AI_CACHE_TTL_SEC = float(os.getenv("ENTRY_AI_CACHE_TTL_SEC", "20"))
+ENTRY_AI_CACHE_MAX = int(os.getenv("ENTRY_AI_CACHE_MAX", "256"))
 ADDON_MIN_AI_SCORE = int(os.getenv("ADDON_MIN_AI_SCORE", str(AI_ENTRY_MIN_SCORE)))
+# Local entry pre-filter (fxai_prefilter.py; train: python fxai_prefilter.py train entry_metrics.json).
+# off / shadow (予測と AI 判定の一致率を記録するだけ) / enforce (確信度の高い reject は AI を呼ばずにブロック)。
+AI_PREFILTER_MODE = (os.getenv("AI_PREFILTER_MODE", "off") or "off").strip().lower()
+if AI_PREFILTER_MODE not in {"off", "shadow", "enforce"}:
+    AI_PREFILTER_MODE = "off"
+AI_PREFILTER_MODEL_FILE = str(os.getenv("AI_PREFILTER_MODEL_FILE", "prefilter_model.json") or "prefilter_model.json").strip()
+AI_PREFILTER_SKIP_PROB = float(os.getenv("AI_PREFILTER_SKIP_PROB", "0") or 0.0)  # 0 = use the model's trained cut
 
 # /status observability: keep last N entry outcomes (ring buffer)
 ENTRY_STATUS_HISTORY_MAX = int(os.getenv("ENTRY_STATUS_HISTORY_MAX", "30"))
@@ -285,6 +480,13 @@ CONFLUENCE_WINDOW_SEC = int(os.getenv("CONFLUENCE_WINDOW_SEC", "600"))
 CONFLUENCE_DEBUG = _env_bool("CONFLUENCE_DEBUG", "0")
 CONFLUENCE_DEBUG_MAX_LINES = int(os.getenv("CONFLUENCE_DEBUG_MAX_LINES", "80"))
 
+# --- Q-Trend anchor stats (streaming aggregator) ---
+# 1: get_qtrend_anchor_stats reads the incremental per-symbol aggregator (O(1)) instead of rescanning.
+# CONFLUENCE_DEBUG forces the full scan (it prints per-signal rows).
+QTREND_STREAM_ENABLED = _env_bool("QTREND_STREAM_ENABLED", "1")
+# 1: also run the full scan on every read and log any mismatch (parity check; costs the full scan).
+QTREND_STREAM_PARITY = _env_bool("QTREND_STREAM_PARITY", "0")
+
 # --- Post-trigger settle window (simple) ---
 # After receiving a Lorentzian entry_trigger, wait a short time to let near-immediate
 # context signals (e.g., Q-Trend on bar close) arrive and be included in ContextJSON.
@@ -297,6 +499,10 @@ POST_TRIGGER_WAIT_SEC = float(os.getenv("POST_TRIGGER_WAIT_SEC", "0"))
 # This reduces "early entry" risk when TradingView alerts arrive slightly delayed.
 ENTRY_POST_SIGNAL_WAIT_SEC = float(os.getenv("ENTRY_POST_SIGNAL_WAIT_SEC", "3"))
 ENTRY_POST_SIGNAL_MAX_WAIT_SEC = float(os.getenv("ENTRY_POST_SIGNAL_MAX_WAIT_SEC", str(ENTRY_POST_SIGNAL_WAIT_SEC)))
+# Speculative scoring: 集約ウィンドウ開始（と窓内の新しい文脈シグナル）の時点でガード評価と
+# AI 呼び出しを先行実行し、窓クローズ時に entry payload の指紋が一致すればその結果を使う。
+ENTRY_SPECULATIVE_ENABLED = _env_bool("ENTRY_SPECULATIVE_ENABLED", "0")
+ENTRY_SPECULATIVE_MAX_AGE_SEC = float(os.getenv("ENTRY_SPECULATIVE_MAX_AGE_SEC", "30"))
 
 # --- Delayed entry re-evaluation (minutes-level) ---
 # If a Lorentzian trigger is blocked by AI due to missing/weak evidence,
@@ -351,10 +557,15 @@ SPREAD_VS_ATR_SOFT_MIN = float(os.getenv("SPREAD_VS_ATR_SOFT_MIN", "10.0"))
 #   LRR_VOL_PANIC_RATIO : ATR_now / ATR_24h がこの値以上はパニック相場 → 即拒絶。
 #                         0 で無効化。
 #   LRR_SPREAD_MED_LR   : Robbins-Monro スプレッド中央値の学習率。
+#   LRR_SPREAD_MED_MODE : spike 判定に使う中央値。rm (Robbins-Monro, 既定) /
+#                         exact (SPREAD_HISTORY 窓内の厳密な中央値) / p2 (P² 推定)。
 LRR_EV_HARD_MIN      = float(os.getenv("LRR_EV_HARD_MIN",      "10.0"))
 LRR_DIST_HARD_REJECT = float(os.getenv("LRR_DIST_HARD_REJECT", "5.0"))
 LRR_VOL_PANIC_RATIO  = float(os.getenv("LRR_VOL_PANIC_RATIO",  "2.0"))
 LRR_SPREAD_MED_LR    = float(os.getenv("LRR_SPREAD_MED_LR",    "0.03"))
+LRR_SPREAD_MED_MODE  = (os.getenv("LRR_SPREAD_MED_MODE", "rm") or "rm").strip().lower()
+if LRR_SPREAD_MED_MODE not in {"rm", "exact", "p2"}:
+    LRR_SPREAD_MED_MODE = "rm"
 
 # Dynamic drift guard (ATR-relative). Set <= 0 to disable.
 DRIFT_LIMIT_ATR_MULT = float(os.getenv("DRIFT_LIMIT_ATR_MULT", "0.15"))
@@ -436,9 +647,51 @@ WEEKEND_CLOSE_MINUTE = int(os.getenv("WEEKEND_CLOSE_MINUTE", "55"))
 WEEKEND_CLOSE_WINDOW_MIN = int(os.getenv("WEEKEND_CLOSE_WINDOW_MIN", "5"))
 WEEKEND_CLOSE_POLL_SEC = float(os.getenv("WEEKEND_CLOSE_POLL_SEC", "30"))
 
+# --- Deadline scheduler ---
+# SCHEDULER_ENABLED=1: エントリー集約ウィンドウ / 管理 settle window / 遅延エントリー期限 / 週末クローズ /
+# キャッシュ・メトリクス flush を 1 本のタイマースレッド (heap) で管理し、期限到来した処理を
+# SCHEDULER_WORKERS 本のワーカーで実行する（シンボル毎の 0.2s ポーリングスレッドと各ループを置き換え）。
+# flush と週末クローズは専用ワーカー（各 1 本）で実行し、AI 呼び出し待ちのタスクに詰まらされない。
+# 週末クローズはウィンドウ開始時刻ちょうどに実行（heartbeat 待ちの間だけ WEEKEND_CLOSE_POLL_SEC で再試行）。
+SCHEDULER_ENABLED = _env_bool("SCHEDULER_ENABLED", "0")
+SCHEDULER_WORKERS = int(os.getenv("SCHEDULER_WORKERS", "4"))
+
 
 # --- Init external clients ---
 client = None
+# Full-completion latency per kind (drives hedge delay and adaptive timeouts).
+_ai_latency = _fxai_ai_client.LatencyHistograms()
+_ai_hedged: Optional[Any] = None  # HedgedAIClient when AI_CONCURRENT_ENABLED
+# Streaming: "<kind>.first_usable" (decision could proceed) vs "<kind>.full" (completion finished).
+_ai_stream_latency = _fxai_ai_client.LatencyHistograms()
+_ai_breakers = _fxai_ai_client.CircuitBreakers(
+    failure_rate=AI_BREAKER_FAILURE_RATE,
+    min_calls=AI_BREAKER_MIN_CALLS,
+    window_sec=AI_BREAKER_WINDOW_SEC,
+    open_sec=AI_BREAKER_OPEN_SEC,
+    half_open_probes=AI_BREAKER_HALF_OPEN_PROBES,
+)
+_ai_governor: Optional[Any] = (
+    _fxai_ai_governor.AICallGovernor(
+        max_concurrency=AI_GOV_MAX_CONCURRENCY,
+        limits={
+            "entry_score": _fxai_ai_governor.KindLimit(AI_GOV_ENTRY_RATE_PER_MIN, AI_GOV_ENTRY_BURST, AI_GOV_ENTRY_CONCURRENCY),
+            "close_hold": _fxai_ai_governor.KindLimit(AI_GOV_CLOSE_RATE_PER_MIN, AI_GOV_CLOSE_BURST, AI_GOV_CLOSE_CONCURRENCY),
+        },
+        queue_limit=AI_GOV_QUEUE_LIMIT,
+        shed_from=AI_GOV_SHED_FROM,
+        max_wait_sec=AI_GOV_MAX_WAIT_SEC,
+    )
+    if AI_GOVERNOR_ENABLED
+    else None
+)
+_ai_usage = _fxai_ai_client.TokenUsage(
+    input_price=AI_PRICE_INPUT_PER_MTOK,
+    cached_input_price=AI_PRICE_CACHED_INPUT_PER_MTOK,
+    output_price=AI_PRICE_OUTPUT_PER_MTOK,
+)
+_entry_ai_cache = _fxai_decision_cache.DecisionCache(ttl_sec=ENTRY_AI_CACHE_TTL_SEC, max_entries=ENTRY_AI_CACHE_MAX)
+_entry_prefilter: Optional[Any] = None  # EntryPrefilter when AI_PREFILTER_MODE != off and the model loads
 context = None
 zmq_socket = None
 _mt5_ready = False
@@ -448,24 +701,76 @@ _runtime_initialized = False
 _runtime_init_error: Optional[str] = None
 
 signals_lock = Lock()
-signals_cache: List[Dict[str, Any]] = []
 
-# Optional indexes to reduce O(n) scans of signals_cache.
-# Built/used only when SIGNAL_INDEX_ENABLED is True.
-_signals_by_symbol: Dict[str, List[Dict[str, Any]]] = {}
-_signals_buckets_by_symbol: Dict[str, Dict[int, List[Dict[str, Any]]]] = {}
+
+def _signal_retention_sec(rec: Any) -> float:
+    return _fxai_signal_cache.retention_limit_sec(
+        rec.retention_class,
+        zone_lookback_sec=ZONE_LOOKBACK_SEC,
+        zone_touch_lookback_sec=ZONE_TOUCH_LOOKBACK_SEC,
+        fvg_lookback_sec=FVG_LOOKBACK_SEC,
+        signal_lookback_sec=SIGNAL_LOOKBACK_SEC,
+    )
+
+
+# The signal cache: immutable SignalRecords in a per-symbol, time-ordered store
+# (zone presence / zone touch / FVG / other) with incremental expiry. Writers hold signals_lock;
+# readers query the published copy-on-write per-symbol views lock-free.
+_signal_store = _fxai_signal_store.SignalStore(retention_sec=_signal_retention_sec)
+
+# Dedupe key -> last appended signal (O(1) duplicate check; guarded by signals_lock).
+_signal_dedupe_index = _fxai_signal_cache.SignalDedupeIndex()
+
+# Streaming Q-Trend anchor stats, fed by the signal cache writers (has its own lock).
+_qtrend_stream = _fxai_qtrend_stream.QTrendStream(
+    confluence_window_sec=CONFLUENCE_WINDOW_SEC,
+    signal_max_age_sec=SIGNAL_MAX_AGE_SEC,
+    zone_lookback_sec=ZONE_LOOKBACK_SEC,
+    zone_touch_lookback_sec=ZONE_TOUCH_LOOKBACK_SEC,
+    fvg_lookback_sec=FVG_LOOKBACK_SEC,
+    weight_confirmed=lambda c: _weight_confirmed(c),
+)
+_qtrend_stream_parity_checks = 0
+_qtrend_stream_parity_mismatches = 0
+
+# Active zone levels per symbol/tf for zones_context (has its own lock; fed by the cache writers).
+_zone_index = _fxai_zone_index.ZoneLevelIndex(zone_lookback_sec=ZONE_LOOKBACK_SEC)
 
 _cache_dirty = False
 _cache_last_save_at = 0.0
 _cache_last_dirty_at = 0.0
 _cache_flush_thread_started = False
-
+_scheduler: Optional[Any] = (
+    _fxai_scheduler.Scheduler(max_workers=SCHEDULER_WORKERS, dedicated_types=("flush", "weekend_close"))
+    if SCHEDULER_ENABLED
+    else None
+)
+
+# Journal ops not yet written to disk: ("add"|"expire", SignalRecord). Guarded by signals_lock.
+_cache_journal_pending: List[tuple] = []
+# Disk writers (journal append / compaction) are serialized by this lock; never held with I/O under signals_lock.
+# Lock order: _cache_io_lock -> signals_lock.
+_cache_io_lock = Lock()
+_cache_journal_entries = 0
+_cache_last_compact_at = 0.0
+_cache_compact_requested = False
+
+# Per-symbol rolling spread stats (24h mean, exact/P² quantiles, Robbins-Monro median
+# from fxai_lrr_brain). One structure serves spread_avg_24h, the spike guard and /metrics.
 _spread_history_lock = Lock()
-_spread_history_by_symbol: Dict[str, List[tuple]] = {}
+_spread_stats_by_symbol: Dict[str, "_fxai_spread_stats.RollingSpread"] = {}
 
-# Robbins-Monro O(1) rolling spread median (from fxai_lrr_brain)
-_spread_med_lock = Lock()
-_spread_med_by_symbol: Dict[str, float] = {}
+
+def _spread_stats_locked(sym: str) -> "_fxai_spread_stats.RollingSpread":
+    st = _spread_stats_by_symbol.get(sym)
+    if st is None:
+        st = _fxai_spread_stats.RollingSpread(
+            window_sec=SPREAD_HISTORY_WINDOW_SEC,
+            max_n=SPREAD_HISTORY_MAX,
+            p2_quantiles=(0.5, float(AUTO_TUNE_PCTL or 0.9)),
+        )
+        _spread_stats_by_symbol[sym] = st
+    return st
 
 _auto_tune_lock = Lock()
 _auto_tune_last_ts = 0.0
@@ -485,6 +790,24 @@ _qtrend_state_by_symbol_tf: Dict[str, Dict[str, Dict[str, Any]]] = {}
 
 _last_atr_by_symbol: Dict[str, float] = {}
 
+# get_mt5_market_data calls / copy_rates_from_pos calls made for them (bar cache metrics).
+_market_data_calls = 0
+_market_data_rates_ipc = 0
+
+
+def _market_data_copy_rates(symbol: str, timeframe: int, start: int, count: int):
+    """mt5.copy_rates_from_pos for get_mt5_market_data; counts every actual IPC call."""
+    global _market_data_rates_ipc
+    _market_data_rates_ipc += 1
+    return mt5.copy_rates_from_pos(symbol, timeframe, start, count)
+
+
+_bar_cache = _fxai_bar_cache.BarCache(
+    copy_rates_from_pos=_market_data_copy_rates,
+    full_refresh_sec=BAR_CACHE_FULL_REFRESH_SEC,
+)
+_indicator_stream = _fxai_indicator_stream.IndicatorStream(tr_avg_bars=ATR_AVG_BARS)
+
 _addon_lock = Lock()
 _addon_state_by_symbol: Dict[str, Dict[str, Any]] = {}
 
@@ -513,6 +836,15 @@ _entry_agg_lock = Lock()
 _entry_agg_by_symbol: Dict[str, Dict[str, Any]] = {}
 _entry_agg_worker_running_by_symbol: Dict[str, bool] = {}
 
+# Speculative entry scoring (one slot per symbol) + thread-local "speculative" flag that
+# keeps the speculative attempt out of /status.
+_entry_spec_slots = _fxai_decision_cache.SpeculativeSlots()
+_speculative_tls = local()
+# At most one speculative attempt in flight per symbol; signals arriving meanwhile only mark
+# a rerun (one trailing attempt with the newest context). Guarded by _entry_agg_lock.
+_entry_spec_running_by_symbol: Dict[str, bool] = {}
+_entry_spec_rerun_by_symbol: Dict[str, bool] = {}
+
 # --- LiquiditySweep TTL cache ---
 # Tracks the most recent Sweep event per (symbol, side) so ZonesTouch can gate on it.
 # Structure: { symbol: { "buy": {"ts": float}, "sell": {"ts": float} } }
@@ -548,6 +880,98 @@ def _entry_agg_trigger_compact(trigger: dict) -> Dict[str, Any]:
     }
 
 
+def _speculative_entry_worker(symbol: str, trigger: dict, attempt_ctx: str) -> None:
+    _speculative_tls.active = True
+    try:
+        _attempt_entry_from_lorentzian(
+            symbol,
+            trigger,
+            float(time.time()),
+            pos_summary=_positions_for_decision(symbol),
+            bypass_ai_throttle=True,
+            attempt_context=attempt_ctx,
+            speculative=True,
+        )
+    except Exception as e:
+        print(f"[FXAI][SPEC] Speculative entry error for {symbol}: {e}")
+    finally:
+        _speculative_tls.active = False
+        with _entry_agg_lock:
+            _entry_spec_running_by_symbol.pop(symbol, None)
+            rerun = bool(_entry_spec_rerun_by_symbol.pop(symbol, False))
+        if rerun:
+            _start_speculative_entry(symbol)
+
+
+def _start_speculative_entry(symbol: str) -> bool:
+    """Start a speculative entry scoring for the pending aggregation window of symbol.
+
+    Coalesced per symbol before any guard/MT5 work: while one speculation runs,
+    further calls only request a single trailing rerun.
+    """
+    if not ENTRY_SPECULATIVE_ENABLED:
+        return False
+    with _entry_agg_lock:
+        st = _entry_agg_by_symbol.get(symbol)
+        if not isinstance(st, dict):
+            return False
+        if _entry_spec_running_by_symbol.get(symbol):
+            _entry_spec_rerun_by_symbol[symbol] = True
+            return False
+        _entry_spec_running_by_symbol[symbol] = True
+        trigger = dict(st.get("trigger") or {})
+        created_at = float(st.get("created_at") or 0.0)
+        attempt_ctx = f"AGG:{int(st.get('trigger_count') or 1)}:{int(created_at) if created_at > 0 else 0}"
+    Thread(target=_speculative_entry_worker, args=(symbol, trigger, attempt_ctx), daemon=True).start()
+    return True
+
+
+def _run_entry_agg_window(symbol: str, st2: Dict[str, Any]) -> None:
+    """Run one entry evaluation for a closed aggregation window (state already popped)."""
+    trigger2 = st2.get("trigger") if isinstance(st2.get("trigger"), dict) else {}
+    created_at = float(st2.get("created_at") or 0.0)
+    trig_count = int(st2.get("trigger_count") or 1)
+
+    # Reserve the initial pending-entry attempt right before running the actual entry attempt.
+    try:
+        if DELAYED_ENTRY_ENABLED:
+            _reserve_pending_entry_attempt(symbol, float(time.time()), retry_signal=trigger2)
+    except Exception:
+        pass
+
+    with _entry_lock:
+        last_sent_before = float(_last_order_sent_at_by_symbol.get(symbol, 0.0) or 0.0)
+
+    attempt_ctx = f"AGG:{trig_count}:{int(created_at) if created_at > 0 else 0}"
+    resp = _attempt_entry_from_lorentzian(
+        symbol,
+        trigger2,
+        float(time.time()),
+        pos_summary=_positions_for_decision(symbol),
+        bypass_ai_throttle=False,
+        attempt_context=attempt_ctx,
+    )
+
+    with _entry_lock:
+        last_sent_after = float(_last_order_sent_at_by_symbol.get(symbol, 0.0) or 0.0)
+    if DELAYED_ENTRY_ENABLED and (last_sent_after > last_sent_before):
+        _clear_pending_entry(symbol, reason="order_sent")
+
+
+def _entry_agg_window_due(symbol: str) -> None:
+    """Scheduler task: the aggregation window of symbol reached its due_at."""
+    with _entry_agg_lock:
+        st = _entry_agg_by_symbol.get(symbol)
+        if not isinstance(st, dict):
+            return
+        # due_at only moves together with a reschedule, so a later due_at means a newer task is pending.
+        if float(st.get("due_at") or 0.0) > time.time():
+            return
+        st2 = _entry_agg_by_symbol.pop(symbol, None)
+    if isinstance(st2, dict):
+        _run_entry_agg_window(symbol, st2)
+
+
 def _entry_agg_deferred_worker(symbol: str) -> None:
     """Wait for the entry aggregation window, then run one entry evaluation."""
     try:
@@ -568,36 +992,8 @@ def _entry_agg_deferred_worker(symbol: str) -> None:
                 st2 = _entry_agg_by_symbol.pop(symbol, None)
                 _entry_agg_worker_running_by_symbol[symbol] = False
 
-            if not isinstance(st2, dict):
-                return
-            trigger2 = st2.get("trigger") if isinstance(st2.get("trigger"), dict) else {}
-            created_at = float(st2.get("created_at") or 0.0)
-            trig_count = int(st2.get("trigger_count") or 1)
-
-            # Reserve the initial pending-entry attempt right before running the actual entry attempt.
-            try:
-                if DELAYED_ENTRY_ENABLED:
-                    _reserve_pending_entry_attempt(symbol, float(time.time()), retry_signal=trigger2)
-            except Exception:
-                pass
-
-            with _entry_lock:
-                last_sent_before = float(_last_order_sent_at_by_symbol.get(symbol, 0.0) or 0.0)
-
-            attempt_ctx = f"AGG:{trig_count}:{int(created_at) if created_at > 0 else 0}"
-            resp = _attempt_entry_from_lorentzian(
-                symbol,
-                trigger2,
-                float(time.time()),
-                pos_summary=get_mt5_positions_summary(symbol),
-                bypass_ai_throttle=False,
-                attempt_context=attempt_ctx,
-            )
-
-            with _entry_lock:
-                last_sent_after = float(_last_order_sent_at_by_symbol.get(symbol, 0.0) or 0.0)
-            if DELAYED_ENTRY_ENABLED and (last_sent_after > last_sent_before):
-                _clear_pending_entry(symbol, reason="order_sent")
+            if isinstance(st2, dict):
+                _run_entry_agg_window(symbol, st2)
             return
     except Exception as e:
         try:
@@ -648,11 +1044,16 @@ def _schedule_deferred_entry(symbol: str, normalized_trigger: dict, now: float)
             st["trigger_count"] = int(st.get("trigger_count") or 0) + 1
             _entry_agg_by_symbol[symbol] = st
 
-        running = bool(_entry_agg_worker_running_by_symbol.get(symbol))
-        if not running:
+        if _scheduler is not None:
+            _scheduler.schedule(
+                f"entry_agg:{symbol}", float(st["due_at"]), lambda _s=symbol: _entry_agg_window_due(_s), task_type="entry_agg"
+            )
+        elif not bool(_entry_agg_worker_running_by_symbol.get(symbol)):
             _entry_agg_worker_running_by_symbol[symbol] = True
             Thread(target=_entry_agg_deferred_worker, args=(symbol,), daemon=True).start()
 
+    _start_speculative_entry(symbol)
+
     _set_status(
         last_result="Entry deferred",
         last_result_at=time.time(),
@@ -1038,6 +1439,7 @@ def init_runtime() -> bool:
     It is safe to call multiple times.
     """
     global client, context, zmq_socket, _mt5_ready, _runtime_initialized, _runtime_init_error, _cache_flush_thread_started
+    global _ai_hedged, _entry_prefilter
 
     with _runtime_lock:
         if _runtime_initialized:
@@ -1049,11 +1451,41 @@ def init_runtime() -> bool:
 
         # OpenAI
         try:
-            client = OpenAI(api_key=OPENAI_API_KEY) if OPENAI_API_KEY else None
+            if OPENAI_API_KEY and AI_CONCURRENT_ENABLED:
+                # Retries/hedging are ours (deadline-aware); the SDK must not retry on its own.
+                http_client = _fxai_ai_client.pooled_http_client(max_connections=AI_HTTP_MAX_CONNECTIONS)
+                if http_client is not None:
+                    client = OpenAI(api_key=OPENAI_API_KEY, http_client=http_client, max_retries=0)
+                else:
+                    client = OpenAI(api_key=OPENAI_API_KEY, max_retries=0)
+                _ai_hedged = _fxai_ai_client.HedgedAIClient(
+                    client=client,
+                    model=OPENAI_MODEL,
+                    max_workers=max(2, AI_HTTP_MAX_CONNECTIONS),
+                    hedge_enabled=AI_HEDGE_ENABLED,
+                    hedge_quantile=AI_HEDGE_QUANTILE,
+                    hedge_min_samples=AI_HEDGE_MIN_SAMPLES,
+                    hedge_default_sec=AI_HEDGE_DEFAULT_SEC,
+                    latency=_ai_latency,
+                )
+            else:
+                client = OpenAI(api_key=OPENAI_API_KEY) if OPENAI_API_KEY else None
         except Exception as e:
             client = None
             print(f"[FXAI][WARN] OpenAI init failed: {e}")
 
+        if AI_PREFILTER_MODE != "off":
+            try:
+                _entry_prefilter = _fxai_prefilter.EntryPrefilter.from_file(
+                    AI_PREFILTER_MODEL_FILE,
+                    mode=AI_PREFILTER_MODE,
+                    skip_prob=(AI_PREFILTER_SKIP_PROB if AI_PREFILTER_SKIP_PROB > 0 else None),
+                )
+                print(f"[FXAI][PREFILTER] {AI_PREFILTER_MODE} model={AI_PREFILTER_MODEL_FILE} skip_prob={_entry_prefilter.skip_prob}")
+            except Exception as e:
+                _entry_prefilter = None
+                print(f"[FXAI][WARN] Prefilter model load failed ({AI_PREFILTER_MODEL_FILE}): {e}")
+
         # ZMQ
         try:
             context = zmq.Context()
@@ -1078,6 +1510,14 @@ def init_runtime() -> bool:
             print(f"[FXAI][FATAL] {_runtime_init_error}")
             return False
 
+        # Sim terminal: EA side connects to our PUSH / heartbeat PULL like the real EA.
+        if MT5_ADAPTER == "sim":
+            try:
+                mt5.start_ea(order_bind=ZMQ_BIND, heartbeat_bind=(ZMQ_HEARTBEAT_BIND if ZMQ_HEARTBEAT_ENABLED else ""))
+                print("[FXAI][SIM] MT5 sim terminal + EA loop started")
+            except Exception as e:
+                print(f"[FXAI][WARN] MT5 sim EA start failed: {e}")
+
         # Restore cache
         try:
             _load_cache()
@@ -1099,10 +1539,23 @@ def init_runtime() -> bool:
         if ZMQ_HEARTBEAT_ENABLED:
             Thread(target=_heartbeat_receiver_loop, daemon=True).start()
         if WEEKEND_CLOSE_ENABLED:
-            Thread(target=_weekend_close_loop, daemon=True).start()
+            if _scheduler is not None:
+                _scheduler.schedule_in("weekend_close", 0.0, _weekend_close_task, task_type="weekend_close")
+            else:
+                Thread(target=_weekend_close_loop, daemon=True).start()
         if CACHE_ASYNC_FLUSH_ENABLED and (not _cache_flush_thread_started):
-            Thread(target=_cache_flush_loop, daemon=True).start()
+            if _scheduler is not None:
+                _scheduler.every(
+                    "cache_flush",
+                    _fxai_flush.compute_sleep_sec(float(CACHE_FLUSH_INTERVAL_SEC or 2.0)),
+                    _cache_flush_task,
+                    task_type="flush",
+                )
+            else:
+                Thread(target=_cache_flush_loop, daemon=True).start()
             _cache_flush_thread_started = True
+        if MT5_POLLER_ENABLED:
+            _mt5_poller.start()
 
         _runtime_initialized = True
         _runtime_init_error = None
@@ -1208,6 +1661,8 @@ _last_status: Dict[str, Any] = {
 
 
 def _set_status(**kwargs) -> None:
+    if getattr(_speculative_tls, "active", False):
+        return
     with _status_lock:
         _last_status.update(kwargs)
 
@@ -1261,8 +1716,15 @@ def _get_status_snapshot() -> Dict[str, Any]:
     if isinstance(snap.get("recent_mgmt_events"), list):
         snap["recent_mgmt_events"] = list(snap.get("recent_mgmt_events") or [])
     # add lightweight cache stats without holding status lock
-    with signals_lock:
-        snap["signals_cache_len"] = len(signals_cache)
+    snap["signals_cache_len"] = len(_signal_store)
+    if ENTRY_AI_CACHE_ENABLED:
+        snap["entry_ai_cache"] = _entry_ai_cache.stats()
+    if _entry_prefilter is not None:
+        snap["entry_prefilter"] = _entry_prefilter.stats()
+    if AI_BREAKER_ENABLED:
+        snap["ai_breakers"] = _ai_breakers.stats()
+    if _ai_governor is not None:
+        snap["ai_governor"] = _ai_governor.stats()
 
     if bool(snap.get("heartbeat_enabled")):
         last_hb = snap.get("last_heartbeat_at")
@@ -1353,12 +1815,12 @@ def _run_position_management_once(
         _set_status(last_result="Frozen by heartbeat", last_result_at=time.time())
         return "Frozen by heartbeat", 200
 
-    pos_summary = get_mt5_positions_summary(symbol)
+    pos_summary = _positions_for_decision(symbol)
     if int(pos_summary.get("positions_open") or 0) <= 0:
         return None
 
     net_side = (pos_summary.get("net_side") or "flat").lower()
-    market = get_mt5_market_data(symbol)
+    market = _market_for_decision(symbol)
     stats = get_qtrend_anchor_stats(symbol)
 
     if not AI_CLOSE_ENABLED:
@@ -1417,7 +1879,15 @@ def _run_position_management_once(
     if not used_signals:
         used_signals = [normalized_signal] if isinstance(normalized_signal, dict) else []
 
-    ai_decision = _ai_close_hold_decision(symbol, market, stats, pos_summary, normalized_signal, recent_signals=used_signals)
+    ai_decision = _ai_close_hold_decision(
+        symbol,
+        market,
+        stats,
+        pos_summary,
+        normalized_signal,
+        recent_signals=used_signals,
+        priority=("close" if is_reversal_like else "hold"),
+    )
     if (not ai_decision) or ai_decision["confidence"] < AI_CLOSE_MIN_CONFIDENCE:
         if (not ai_decision) and AI_CLOSE_FALLBACK == "default_close":
             ai_decision = {
@@ -1535,6 +2005,39 @@ def _run_position_management_once(
     return "HOLD", 200
 
 
+def _run_mgmt_settled(symbol: str, st2: Dict[str, Any]) -> None:
+    """Run one management decision for a closed settle window (state already popped)."""
+    last_signal2 = st2.get("last_signal") or {}
+    last_signals2 = st2.get("last_signals")
+
+    used_signals = None
+    if isinstance(last_signals2, list) and last_signals2:
+        used_signals = [s for s in last_signals2 if isinstance(s, dict)]
+    if not used_signals:
+        used_signals = [dict(last_signal2)] if isinstance(last_signal2, dict) else []
+
+    with _mgmt_lock:
+        _run_position_management_once(
+            symbol,
+            dict(last_signal2) if isinstance(last_signal2, dict) else {},
+            time.time(),
+            recent_signals=used_signals,
+        )
+
+
+def _mgmt_window_due(symbol: str) -> None:
+    """Scheduler task: the settle window of symbol reached its due_at."""
+    with _mgmt_pending_lock:
+        st = _mgmt_pending_by_symbol.get(symbol)
+        if not isinstance(st, dict):
+            return
+        if float(st.get("due_at") or 0.0) > time.time():
+            return
+        st2 = _mgmt_pending_by_symbol.pop(symbol, None)
+    if isinstance(st2, dict):
+        _run_mgmt_settled(symbol, st2)
+
+
 def _mgmt_deferred_worker(symbol: str) -> None:
     """Wait for settle window, then run one management decision."""
     try:
@@ -1556,24 +2059,8 @@ def _mgmt_deferred_worker(symbol: str) -> None:
             with _mgmt_pending_lock:
                 st2 = _mgmt_pending_by_symbol.pop(symbol, None)
                 _mgmt_worker_running_by_symbol[symbol] = False
-            if not isinstance(st2, dict):
-                return
-            last_signal2 = st2.get("last_signal") or {}
-            last_signals2 = st2.get("last_signals")
-
-            used_signals = None
-            if isinstance(last_signals2, list) and last_signals2:
-                used_signals = [s for s in last_signals2 if isinstance(s, dict)]
-            if not used_signals:
-                used_signals = [dict(last_signal2)] if isinstance(last_signal2, dict) else []
-
-            with _mgmt_lock:
-                _run_position_management_once(
-                    symbol,
-                    dict(last_signal2) if isinstance(last_signal2, dict) else {},
-                    time.time(),
-                    recent_signals=used_signals,
-                )
+            if isinstance(st2, dict):
+                _run_mgmt_settled(symbol, st2)
             return
     except Exception as e:
         try:
@@ -1610,7 +2097,7 @@ def _try_schedule_pyramid_entry(
     
     # Gate 2: Profit gate (must have unrealized profit)
     try:
-        market = get_mt5_market_data(symbol)
+        market = _market_for_decision(symbol)
         cur = _current_price_from_market(market)
         point = float((market or {}).get("point") or 0.0)
         
@@ -1737,8 +2224,11 @@ def _schedule_deferred_mgmt(symbol: str, normalized_signal: dict, now: float) ->
                 st["last_signals"] = list(st["last_signals"])[-keep_n:]
             _mgmt_pending_by_symbol[symbol] = st
 
-        running = bool(_mgmt_worker_running_by_symbol.get(symbol))
-        if not running:
+        if _scheduler is not None:
+            _scheduler.schedule(
+                f"mgmt:{symbol}", float(st["due_at"]), lambda _s=symbol: _mgmt_window_due(_s), task_type="mgmt_settle"
+            )
+        elif not bool(_mgmt_worker_running_by_symbol.get(symbol)):
             _mgmt_worker_running_by_symbol[symbol] = True
             Thread(target=_mgmt_deferred_worker, args=(symbol,), daemon=True).start()
 
@@ -1803,15 +2293,34 @@ def _upsert_pending_entry(symbol: str, trigger: dict, now: float) -> None:
             "last_attempt_at": 0.0,
             "last_retry_signal": None,
         }
+    if _scheduler is not None:
+        _scheduler.schedule(
+            f"pending_entry:{symbol}",
+            min(float(expires_at), float(now) + float(DELAYED_ENTRY_HARD_TTL_SEC)),
+            lambda _s=symbol: _pending_entry_expiry_due(_s),
+            task_type="pending_entry_expiry",
+        )
 
 
 def _clear_pending_entry(symbol: str, *, reason: str) -> None:
     with _pending_entry_lock:
         st = _pending_entry_by_symbol.pop(symbol, None)
+    if _scheduler is not None:
+        _scheduler.cancel(f"pending_entry:{symbol}")
     if st is not None:
         print(f"[FXAI][DELAYED_ENTRY] Cleared pending for {symbol}: {reason}")
 
 
+def _pending_entry_expiry_due(symbol: str) -> None:
+    """Scheduler task: drop the pending entry of symbol once it expired (instead of on the next signal)."""
+    with _pending_entry_lock:
+        had = symbol in _pending_entry_by_symbol
+        _prune_pending_entries_locked(time.time())
+        expired = had and (symbol not in _pending_entry_by_symbol)
+    if expired:
+        print(f"[FXAI][DELAYED_ENTRY] Expired pending for {symbol}")
+
+
 def _reserve_pending_entry_attempt(
     symbol: str,
     now: float,
@@ -1964,7 +2473,7 @@ def _maybe_attempt_delayed_entry(symbol: str, incoming_signal: dict, now: float)
         return None
 
     # Only attempt delayed entries when flat (do not create add-ons minutes later).
-    pos_summary = get_mt5_positions_summary(symbol)
+    pos_summary = _positions_for_decision(symbol)
     # PYRAMID-DEFER: allow pyramiding deferred entries to continue even if positions are open.
     entry_mode = str((trigger or {}).get("entry_mode") or "").strip().upper()
     if int(pos_summary.get("positions_open") or 0) > 0:
@@ -2169,6 +2678,43 @@ def _is_within_weekend_close_window(dt: datetime) -> bool:
     return start_dt <= dt <= close_dt
 
 
+def _weekend_close_once() -> bool:
+    """One weekend-close check. Returns True while this week's close is still pending inside the window."""
+    dt = _now_for_weekend_close()
+    if not _is_within_weekend_close_window(dt):
+        return False
+
+    wk = _week_key(dt)
+    sym = (SYMBOL or "").strip().upper() or "GOLD"
+    last = _weekend_close_last_sent_week_by_symbol.get(sym)
+    if last == wk:
+        return False
+
+    # Need fresh heartbeat so EA can actually receive CLOSE.
+    if not _heartbeat_is_fresh(now_ts=time.time()):
+        _set_status(last_result="Weekend close pending (heartbeat stale)", last_result_at=time.time())
+        return True
+
+    pos_summary = _positions_for_decision(sym)
+    if int((pos_summary or {}).get("positions_open") or 0) <= 0:
+        _weekend_close_last_sent_week_by_symbol[sym] = wk
+        _set_status(last_result="Weekend close skipped (no positions)", last_result_at=time.time())
+        return False
+
+    _zmq_send_json_with_metrics({"type": "CLOSE", "reason": "weekend_discretionary_close"}, symbol=sym, kind="weekend_close")
+    _weekend_close_last_sent_week_by_symbol[sym] = wk
+    _set_status(
+        last_result="Weekend CLOSE sent",
+        last_result_at=time.time(),
+        last_mgmt_action="CLOSE",
+        last_mgmt_confidence=None,
+        last_mgmt_reason="weekend_discretionary_close",
+        last_mgmt_at=time.time(),
+        last_mgmt_throttled=None,
+    )
+    return False
+
+
 def _weekend_close_loop() -> None:
     """Optionally closes positions shortly before weekend (best-effort)."""
     if not WEEKEND_CLOSE_ENABLED:
@@ -2176,46 +2722,37 @@ def _weekend_close_loop() -> None:
 
     while True:
         try:
-            dt = _now_for_weekend_close()
-            if not _is_within_weekend_close_window(dt):
-                time.sleep(max(1.0, float(WEEKEND_CLOSE_POLL_SEC)))
-                continue
+            _weekend_close_once()
+        except Exception as e:
+            _set_status(last_result=f"Weekend close loop error: {e}", last_result_at=time.time())
+        time.sleep(max(1.0, float(WEEKEND_CLOSE_POLL_SEC)))
 
-            wk = _week_key(dt)
-            sym = (SYMBOL or "").strip().upper() or "GOLD"
-            last = _weekend_close_last_sent_week_by_symbol.get(sym)
-            if last == wk:
-                time.sleep(max(1.0, float(WEEKEND_CLOSE_POLL_SEC)))
-                continue
 
-            # Need fresh heartbeat so EA can actually receive CLOSE.
-            if not _heartbeat_is_fresh(now_ts=time.time()):
-                _set_status(last_result="Weekend close pending (heartbeat stale)", last_result_at=time.time())
-                time.sleep(max(1.0, float(WEEKEND_CLOSE_POLL_SEC)))
-                continue
+def _next_weekend_close_window_start(dt: datetime) -> datetime:
+    """Start of the first weekend close window strictly after dt (same clock as dt)."""
+    close_dt = dt.replace(hour=int(WEEKEND_CLOSE_HOUR), minute=int(WEEKEND_CLOSE_MINUTE), second=0, microsecond=0)
+    close_dt += timedelta(days=(int(WEEKEND_CLOSE_WEEKDAY) - int(dt.weekday())) % 7)
+    start = close_dt - timedelta(minutes=max(0, int(WEEKEND_CLOSE_WINDOW_MIN)))
+    while start <= dt:
+        start += timedelta(days=7)
+    return start
 
-            pos_summary = get_mt5_positions_summary(sym)
-            if int((pos_summary or {}).get("positions_open") or 0) <= 0:
-                _weekend_close_last_sent_week_by_symbol[sym] = wk
-                _set_status(last_result="Weekend close skipped (no positions)", last_result_at=time.time())
-                time.sleep(max(1.0, float(WEEKEND_CLOSE_POLL_SEC)))
-                continue
 
-            _zmq_send_json_with_metrics({"type": "CLOSE", "reason": "weekend_discretionary_close"}, symbol=sym, kind="weekend_close")
-            _weekend_close_last_sent_week_by_symbol[sym] = wk
-            _set_status(
-                last_result="Weekend CLOSE sent",
-                last_result_at=time.time(),
-                last_mgmt_action="CLOSE",
-                last_mgmt_confidence=None,
-                last_mgmt_reason="weekend_discretionary_close",
-                last_mgmt_at=time.time(),
-                last_mgmt_throttled=None,
-            )
-            time.sleep(max(1.0, float(WEEKEND_CLOSE_POLL_SEC)))
-        except Exception as e:
-            _set_status(last_result=f"Weekend close loop error: {e}", last_result_at=time.time())
-            time.sleep(max(1.0, float(WEEKEND_CLOSE_POLL_SEC)))
+def _weekend_close_task() -> None:
+    """Scheduler task: run at the window start; re-arm for the retry or for next week's window."""
+    pending = False
+    try:
+        pending = _weekend_close_once()
+    except Exception as e:
+        pending = True
+        _set_status(last_result=f"Weekend close loop error: {e}", last_result_at=time.time())
+    if pending:
+        delay = max(1.0, float(WEEKEND_CLOSE_POLL_SEC))
+    else:
+        # Delay on the weekend-close clock (broker time is not a real epoch); re-checked when it fires.
+        dt = _now_for_weekend_close()
+        delay = max(0.001, (_next_weekend_close_window_start(dt) - dt).total_seconds())
+    _scheduler.schedule_in("weekend_close", delay, _weekend_close_task, task_type="weekend_close")
 
 
 def _heartbeat_receiver_loop() -> None:
@@ -2241,6 +2778,15 @@ def _heartbeat_receiver_loop() -> None:
         except Exception:
             payload = {"raw": msg}
 
+        # Position change events share the socket but are not heartbeats.
+        # All symbols are dropped: the EA's _Symbol may differ from the webhook symbol name.
+        if isinstance(payload, dict) and str(payload.get("type") or "").upper() == "POSITIONS_CHANGED":
+            _positions_cache.invalidate(
+                None,
+                event={k: payload.get(k) for k in ("symbol", "deal", "position", "entry", "positions")},
+            )
+            continue
+
         _set_status(
             last_heartbeat_at=time.time(),
             last_heartbeat_payload=_summarize_heartbeat_payload(payload),
@@ -2618,11 +3164,17 @@ def _build_volatility_context(market: Dict[str, Any]) -> Dict[str, Any]:
     cur_atr = float((market or {}).get("atr") or 0.0)
     avg_atr = float((market or {}).get("atr_avg_5h") or 0.0)
     ratio = (cur_atr / avg_atr) if (avg_atr > 0) else None
-    return {
+    out: Dict[str, Any] = {
         "current_atr": float(cur_atr),
         "average_atr_5h": float(avg_atr) if avg_atr > 0 else None,
         "volatility_ratio": float(ratio) if ratio is not None else None,
     }
+    # Longer-horizon ATRs (INDICATOR_STREAM_ENABLED only).
+    for key in ("atr_h1", "atr_d1"):
+        v = (market or {}).get(key)
+        if v is not None:
+            out[key] = float(v)
+    return out
 
 
 def _build_spread_context(market: Dict[str, Any]) -> Dict[str, Any]:
@@ -2670,61 +3222,30 @@ def _compute_session_context(now_ts: Optional[float] = None) -> Dict[str, Any]:
 
 
 def _extract_zone_level(signal: Dict[str, Any]) -> Optional[float]:
-    def _num(v: Any) -> Optional[float]:
-        try:
-            fv = float(v)
-            return fv if fv > 0 else None
-        except Exception:
-            return None
-
-    low = _num(signal.get("zone_low") or signal.get("low") or signal.get("bottom") or signal.get("lower"))
-    high = _num(signal.get("zone_high") or signal.get("high") or signal.get("top") or signal.get("upper"))
-    if low is not None and high is not None:
-        return (low + high) / 2.0
+    return _fxai_signal_record.extract_zone_level(signal)
 
-    for k in ("zone_price", "zone_mid", "mid", "price", "close", "c"):
-        v = _num(signal.get(k))
-        if v is not None:
-            return v
-    return None
 
-
-def _build_zones_context(symbol: str, now: float, current_price: float) -> Dict[str, Any]:
+def _build_zones_context(symbol: str, now: float, current_price: float, atr: float = 0.0) -> Dict[str, Any]:
     """Build zones_context: counts of zones above/below current price.
     
     IMPORTANT: Includes zones from multiple timeframes (m5, m15, h1) to capture
     all structural levels from TradingView alerts. 24h cache retention ensures
     strong zones remain visible for context.
+
+    Served from the per-symbol zone level index (bisect), which also provides
+    nearest support/resistance distance and the zone count within
+    ZONES_NEAR_ATR_MULT x ATR when atr > 0.
     """
     if current_price <= 0:
         return {"total": 0, "support_count": 0, "resistance_count": 0}
 
-    normalized = _filter_fresh_signals(symbol, float(now))
-    support = 0
-    resistance = 0
-
-    for s in normalized:
-        if not is_zone_presence_signal(s):
-            continue
-        # Accept zones from multiple timeframes (m5, m15, h1) for structural context
-        tf = (s.get("tf") or "").strip().lower()
-        if tf and tf not in ["m5", "m15", "h1"]:
-            continue  # Skip zones from other timeframes (e.g., m1, h4)
-        level = _extract_zone_level(s)
-        if level is None:
-            continue
-        # Zones at current price are counted as support (conservative for entry)
-        if level <= current_price:
-            support += 1
-        else:
-            resistance += 1
-
-    total = support + resistance
-    return {
-        "total": int(total),
-        "support_count": int(support),
-        "resistance_count": int(resistance),
-    }
+    return _zone_index.context(
+        symbol,
+        now=float(now),
+        price=float(current_price),
+        atr=float(atr or 0.0),
+        near_atr_mult=float(ZONES_NEAR_ATR_MULT),
+    )
 
 
 def _stable_round_time(t: Optional[float], resolution_sec: float = 1.0) -> Optional[float]:
@@ -2735,50 +3256,24 @@ def _signal_dedupe_key(s: Dict[str, Any]) -> str:
     return _fxai_signal_cache.signal_dedupe_key(s)
 
 
-def _signal_ts_for_index(s: Dict[str, Any]) -> float:
-    return _fxai_signal_cache.signal_ts_for_index(s)
-
-
-def _rebuild_signal_indexes_locked() -> None:
-    """Rebuild optional signal cache indexes (must be called with signals_lock held)."""
-    global _signals_by_symbol, _signals_buckets_by_symbol
-    by_symbol, buckets_by_symbol = _fxai_signal_cache.rebuild_signal_indexes(
-        signals_cache=signals_cache,
-        bucket_sec=int(SIGNAL_INDEX_BUCKET_SEC or 60),
-    )
-    _signals_by_symbol = by_symbol
-    _signals_buckets_by_symbol = buckets_by_symbol
-
-
-def _ensure_signal_indexes_locked() -> None:
-    global _signals_by_symbol, _signals_buckets_by_symbol
-    rebuilt = _fxai_signal_cache.ensure_signal_indexes(
-        signal_index_enabled=bool(SIGNAL_INDEX_ENABLED),
-        signals_cache=signals_cache,
-        signals_by_symbol=_signals_by_symbol,
-        bucket_sec=int(SIGNAL_INDEX_BUCKET_SEC or 60),
-    )
-    if rebuilt is None:
-        return
-    by_symbol, buckets_by_symbol = rebuilt
-    _signals_by_symbol = by_symbol
-    _signals_buckets_by_symbol = buckets_by_symbol
-
-
-def _append_signal_dedup_locked(signal: Dict[str, Any], dedupe_window_sec: float = 120.0) -> bool:
-    """Append a signal into cache with de-duplication.
+def _append_signal_dedup_locked(record: Any, dedupe_window_sec: float = 120.0, journal: bool = True) -> bool:
+    """Append a SignalRecord into cache with de-duplication.
 
     Returns True if appended, False if treated as a duplicate.
     """
-    return _fxai_signal_cache.append_signal_dedup(
-        signals_cache=signals_cache,
-        signal=signal,
+    appended = _fxai_signal_cache.append_signal_dedup(
+        signal=record,
         dedupe_window_sec=float(dedupe_window_sec or 0.0),
-        signal_index_enabled=bool(SIGNAL_INDEX_ENABLED),
-        bucket_sec=int(SIGNAL_INDEX_BUCKET_SEC or 60),
-        signals_by_symbol=_signals_by_symbol,
-        signals_buckets_by_symbol=_signals_buckets_by_symbol,
+        dedupe_index=_signal_dedupe_index,
+        signal_store=_signal_store,
     )
+    if appended and journal:
+        _cache_journal_pending.append(("add", record))
+    if appended and QTREND_STREAM_ENABLED:
+        _qtrend_stream.add(record, time.time())
+    if appended and record.is_zone_presence:
+        _zone_index.add(record)
+    return appended
 
 
 def _parse_signal_time_to_epoch(value):
@@ -2955,31 +3450,8 @@ def _normalize_tf(tf_value: Any) -> Optional[str]:
 
 
 def _is_qtrend_source(source: str) -> bool:
-    src = (source or "").strip().lower().replace("_", "")
-    if not src:
-        return False
     # Accept both new spec strings and older internal ones.
-    return src in {
-        "q-trend",
-        "qtrend",
-        "q-trendstrong",
-        "qtrendstrong",
-        "q-trend-normal",
-        "qtrend-normal",
-        "q-trend-strong",
-        "qtrend-strong",
-        "q-trendnormal",
-        "qtrendnormal",
-        "qtrendnormalbuy",
-        "qtrendnormalsell",
-        "qtrendstrongbuy",
-        "qtrendstrongsell",
-        "q-trendstrongbuy",
-        "q-trendstrongsell",
-        # canonical outputs from _normalize_signal_fields
-        "q-trendstrong".replace("-", ""),
-        "qtrendstrong".replace("-", ""),
-    } or ("qtrend" in src) or ("q-trend" in src)
+    return _fxai_signal_record.is_qtrend_source(source)
 
 
 def _update_qtrend_context_from_signal(normalized: Dict[str, Any]) -> None:
@@ -3126,24 +3598,8 @@ def _collect_window_signals_around_trigger(
 
     trig_side = (trigger_side or "").strip().lower()
 
-    with signals_lock:
-        if SIGNAL_INDEX_ENABLED:
-            _ensure_signal_indexes_locked()
-            bucket_sec = int(SIGNAL_INDEX_BUCKET_SEC or 60)
-            if bucket_sec <= 0:
-                bucket_sec = 60
-
-            start_b = int((center - w) // float(bucket_sec))
-            end_b = int((center + w) // float(bucket_sec))
-
-            sym_buckets = _signals_buckets_by_symbol.get(sym, {})
-            candidates = []
-            for b in range(start_b, end_b + 1):
-                candidates.extend(sym_buckets.get(b, []))
-
-            snapshot = [dict(s) for s in candidates if isinstance(s, dict)]
-        else:
-            snapshot = [dict(s) for s in signals_cache if isinstance(s, dict)]
+    # Lock-free: the store publishes immutable per-symbol views (copy-on-write).
+    snapshot = _signal_store.window(sym, center - w, center + w)
 
     return _fxai_window_signals.build_window_signals_payload(
         snapshot=snapshot,
@@ -3151,7 +3607,6 @@ def _collect_window_signals_around_trigger(
         center_ts=float(center),
         trigger_side=trig_side,
         window_sec=float(w),
-        is_qtrend_source=_is_qtrend_source,
     )
 
 
@@ -3206,6 +3661,7 @@ def _record_openai_call_metrics(
     attempts: int,
     timeout_attempts: int,
     err_counts: Optional[Dict[str, int]] = None,
+    usage: Optional[Dict[str, Any]] = None,
 ) -> None:
     if not ENTRY_METRICS_ENABLED:
         return
@@ -3247,11 +3703,59 @@ def _record_openai_call_metrics(
                 except Exception:
                     continue
 
+        if isinstance(usage, dict):
+            _metrics_add_openai_usage_locked(b, kind, usage)
+
         _metrics_mark_dirty_locked()
 
 
-def _record_ai_validation_failure(*, symbol: str, kind: str) -> None:
-    if not ENTRY_METRICS_ENABLED:
+def _metrics_add_openai_usage_locked(b: Dict[str, Any], kind: str, usage: Dict[str, Any]) -> None:
+    for field in ("prompt_chars", "prompt_tokens", "cached_tokens", "completion_tokens"):
+        m = b.get(f"openai_{field}_by_kind")
+        if not isinstance(m, dict):
+            m = {}
+            b[f"openai_{field}_by_kind"] = m
+        _metrics_inc_map_locked(m, str(kind or "unknown"), int(usage.get(field) or 0))
+    cost_map = b.get("openai_cost_micro_usd_by_kind")
+    if not isinstance(cost_map, dict):
+        cost_map = {}
+        b["openai_cost_micro_usd_by_kind"] = cost_map
+    _metrics_inc_map_locked(cost_map, str(kind or "unknown"), int(round(_ai_usage.cost_usd(usage) * 1_000_000.0)))
+
+
+def _record_openai_usage_metrics(*, symbol: str, kind: str, usage: Dict[str, Any]) -> None:
+    """Token usage that arrives after the call was recorded (streamed completion)."""
+    if not ENTRY_METRICS_ENABLED:
+        return
+    now = time.time()
+    with _metrics_lock:
+        b = _metrics_get_bucket_locked(_utc_day_key(now), symbol or (SYMBOL or "GOLD"))
+        _metrics_add_openai_usage_locked(b, kind, usage)
+        _metrics_mark_dirty_locked()
+
+
+def _record_ai_skip_metrics(*, symbol: str, kind: str, reason: str) -> None:
+    """AI call not attempted (circuit open / freshness budget exhausted)."""
+    if not ENTRY_METRICS_ENABLED:
+        return
+    if not symbol:
+        symbol = (SYMBOL or "GOLD")
+
+    now = time.time()
+    day_key = _utc_day_key(now)
+    with _metrics_lock:
+        _metrics_prune_locked(now)
+        b = _metrics_get_bucket_locked(day_key, symbol)
+        skipped = b.get("openai_skipped")
+        if not isinstance(skipped, dict):
+            skipped = {}
+            b["openai_skipped"] = skipped
+        _metrics_inc_map_locked(skipped, f"{kind or 'unknown'}:{reason}", 1)
+        _metrics_mark_dirty_locked()
+
+
+def _record_ai_validation_failure(*, symbol: str, kind: str) -> None:
+    if not ENTRY_METRICS_ENABLED:
         return
     if not symbol:
         symbol = (SYMBOL or "GOLD")
@@ -3308,6 +3812,9 @@ def _zmq_send_json_with_metrics(payload: Dict[str, Any], *, symbol: str, kind: s
         _record_zmq_send_metrics(symbol=symbol, kind=kind, ok=False, err_type=type(e).__name__)
 
     _zmq_send_json_with_hooks(zmq_socket, payload, on_ok=_ok, on_error=_err)
+    # ORDER/CLOSE change positions; do not serve the pre-send summary until the EA reports.
+    if str((payload or {}).get("type") or "").upper() in {"ORDER", "CLOSE"}:
+        _positions_cache.invalidate(symbol)
 
 
 def _metrics_inc_locked(b: Dict[str, Any], key: str, n: int = 1) -> None:
@@ -3433,7 +3940,12 @@ def _maybe_autotune_from_metrics(*, symbol: Optional[str] = None) -> None:
     with _auto_tune_lock:
         _auto_tune_last_ts = now
 
-    print(f"[FXAI] Auto-tuned settings applied: {settings}")
+    # Raw spread percentile over the same rolling window, for context in the log.
+    sym = (symbol or SYMBOL or "GOLD").strip().upper()
+    with _spread_history_lock:
+        st = _spread_stats_by_symbol.get(sym)
+        spread_pctl = st.percentile(float(AUTO_TUNE_PCTL or 0.9)) if st is not None else None
+    print(f"[FXAI] Auto-tuned settings applied: {settings} (spread p{int(round(float(AUTO_TUNE_PCTL or 0.9) * 100))}={spread_pctl})")
 
 
 def _record_webhook_metric(symbol: str, sig_type: str, appended: bool) -> None:
@@ -3454,32 +3966,12 @@ def _record_webhook_metric(symbol: str, sig_type: str, appended: bool) -> None:
         _metrics_mark_dirty_locked()
 
 
-def _record_entry_outcome(
-    *,
-    symbol: str,
-    outcome: str,
-    http_status: int,
-    action: Optional[str] = None,
-    is_addon: Optional[bool] = None,
-    trigger: Optional[Dict[str, Any]] = None,
-    qtrend: Optional[Dict[str, Any]] = None,
-    market: Optional[Dict[str, Any]] = None,
-    window_signals: Optional[Dict[str, Any]] = None,
-    zones_confirmed_recent: Optional[int] = None,
-    ai_score: Optional[int] = None,
-    min_required: Optional[int] = None,
-    ai_reason: Optional[str] = None,
-    openai_response_id: Optional[str] = None,
-    ai_latency_ms: Optional[int] = None,
-    attempt_context: Optional[str] = None,
-    bypass_ai_throttle: Optional[bool] = None,
-) -> None:
-    if not ENTRY_METRICS_ENABLED:
-        return
-
-    now = time.time()
-    day_key = _utc_day_key(now)
-
+def _entry_market_features(
+    market: Optional[Dict[str, Any]],
+    trigger: Optional[Dict[str, Any]],
+    action: Optional[str],
+) -> tuple[Optional[float], Optional[float], Optional[float], Optional[float]]:
+    """(spread_points, atr_to_spread, atr_points, drift_points) as stored in entry metrics examples."""
     spread_points = None
     atr_to_spread = None
     drift_points = None
@@ -3510,6 +4002,39 @@ def _record_entry_outcome(
                 print(f"[FXAI][DEBUG] Drift snapshot failed: {e}")
                 drift_points = None
 
+    return spread_points, atr_to_spread, atr_points, drift_points
+
+
+def _record_entry_outcome(
+    *,
+    symbol: str,
+    outcome: str,
+    http_status: int,
+    action: Optional[str] = None,
+    is_addon: Optional[bool] = None,
+    trigger: Optional[Dict[str, Any]] = None,
+    qtrend: Optional[Dict[str, Any]] = None,
+    market: Optional[Dict[str, Any]] = None,
+    window_signals: Optional[Dict[str, Any]] = None,
+    zones_confirmed_recent: Optional[int] = None,
+    ai_score: Optional[int] = None,
+    min_required: Optional[int] = None,
+    ai_reason: Optional[str] = None,
+    openai_response_id: Optional[str] = None,
+    ai_latency_ms: Optional[int] = None,
+    attempt_context: Optional[str] = None,
+    bypass_ai_throttle: Optional[bool] = None,
+    ai_cached: Optional[bool] = None,
+    prefilter_p: Optional[float] = None,
+) -> None:
+    if not ENTRY_METRICS_ENABLED:
+        return
+
+    now = time.time()
+    day_key = _utc_day_key(now)
+
+    spread_points, atr_to_spread, atr_points, drift_points = _entry_market_features(market, trigger, action)
+
     q_side = (qtrend or {}).get("side") if isinstance(qtrend, dict) else None
     q_strength = (qtrend or {}).get("strength") if isinstance(qtrend, dict) else None
     w_counts = (window_signals or {}).get("counts") if isinstance(window_signals, dict) else None
@@ -3524,6 +4049,10 @@ def _record_entry_outcome(
             _metrics_inc_locked(b, "delayed_entry_attempts", 1)
         if bool(bypass_ai_throttle):
             _metrics_inc_locked(b, "ai_throttle_bypassed", 1)
+        if bool(ai_cached):
+            _metrics_inc_locked(b, "ai_cache_hits", 1)
+        if str(outcome) == "blocked_prefilter":
+            _metrics_inc_locked(b, "prefilter_calls_avoided", 1)
 
         guard_stats = b.get("guard_stats")
         if not isinstance(guard_stats, dict):
@@ -3569,6 +4098,8 @@ def _record_entry_outcome(
             "ai_reason": (str(ai_reason)[:220] if ai_reason else None),
             "openai_response_id": (str(openai_response_id)[:120] if openai_response_id else None),
             "ai_latency_ms": int(ai_latency_ms) if ai_latency_ms is not None else None,
+            "ai_cached": bool(ai_cached) if ai_cached is not None else None,
+            "prefilter_p": round(float(prefilter_p), 4) if prefilter_p is not None else None,
             "spread_points": spread_points,
             "atr_to_spread": atr_to_spread,
             "atr_points": atr_points,
@@ -3771,38 +4302,60 @@ def _save_metrics_locked() -> None:
 
 
 def _load_cache():
-    """起動時にファイルからシグナル履歴を復元する"""
+    """起動時にファイルからシグナル履歴を復元する
+
+    Snapshot (CACHE_FILE) first, then the journal is replayed on top of it.
+    File I/O happens before signals_lock is taken.
+    """
+    global _cache_journal_entries, _cache_compact_requested, _cache_last_compact_at
     try:
         data = _fxai_persist.read_json_if_exists(CACHE_FILE, default=None)
-        if isinstance(data, list):
-            recovered = 0
-            with signals_lock:
-                for raw in data:
-                    if not isinstance(raw, dict):
-                        continue
-                    # Ensure minimal fields
-                    if not raw.get("receive_time"):
-                        raw = dict(raw)
-                        raw["receive_time"] = time.time()
-                    if raw.get("symbol"):
-                        raw = dict(raw)
-                        raw["symbol"] = str(raw.get("symbol") or "").strip().upper()
-                    normalized = _normalize_signal_fields(raw)
-                    if _append_signal_dedup_locked(normalized):
-                        recovered += 1
-
-                # prune immediately on boot to avoid stale context
-                _prune_signals_cache_locked(time.time())
-
-            print(f"[FXAI] Cache loaded: {recovered} signals recovered.")
+        journal = _fxai_persist.read_jsonl_if_exists(CACHE_JOURNAL_FILE)
+
+        raws: List[Dict[str, Any]] = [raw for raw in (data if isinstance(data, list) else []) if isinstance(raw, dict)]
+        expired_ids = set()
+        for op in journal:
+            if not isinstance(op, dict):
+                continue
+            if op.get("op") == "add" and isinstance(op.get("signal"), dict):
+                raws.append(op.get("signal"))
+            elif op.get("op") == "expire":
+                expired_ids.add((op.get("key"), op.get("receive_time")))
+
+        recovered = 0
+        with signals_lock:
+            for raw in raws:
+                # Ensure minimal fields
+                if not raw.get("receive_time"):
+                    raw = dict(raw)
+                    raw["receive_time"] = time.time()
+                if raw.get("symbol"):
+                    raw = dict(raw)
+                    raw["symbol"] = str(raw.get("symbol") or "").strip().upper()
+                normalized = _normalize_signal_fields(raw)
+                record = _fxai_signal_record.SignalRecord.from_normalized(normalized)
+                if expired_ids and (record.dedupe_key, record.receive_time) in expired_ids:
+                    continue
+                if _append_signal_dedup_locked(record, journal=False):
+                    recovered += 1
+
+            # prune immediately on boot to avoid stale context
+            _prune_signals_cache_locked(time.time())
+
+        _cache_journal_entries = len(journal)
+        _cache_last_compact_at = time.time()
+        if journal:
+            # Fold the replayed journal into a fresh snapshot on the first flush.
+            _cache_compact_requested = True
+        print(f"[FXAI] Cache loaded: {recovered} signals recovered ({len(journal)} journal ops replayed).")
     except Exception as e:
         print(f"[FXAI][WARN] Failed to load cache: {e}")
 
     # After loading, treat cache as clean.
     global _cache_dirty, _cache_last_save_at, _cache_last_dirty_at
-    _cache_dirty = False
+    _cache_dirty = bool(_cache_compact_requested)
     _cache_last_save_at = time.time()
-    _cache_last_dirty_at = 0.0
+    _cache_last_dirty_at = _cache_last_save_at if _cache_dirty else 0.0
 
 
 def _mark_cache_dirty_locked(now: Optional[float] = None) -> None:
@@ -3814,74 +4367,129 @@ def _mark_cache_dirty_locked(now: Optional[float] = None) -> None:
     _cache_last_dirty_at = float(now)
 
 
+def _flush_cache_if_due() -> None:
+    now = time.time()
+    with signals_lock:
+        if not _cache_dirty:
+            return
+
+        last_save = float(_cache_last_save_at or 0.0)
+        last_dirty = float(_cache_last_dirty_at or 0.0)
+
+        if not _fxai_flush.should_flush(
+            now=float(now),
+            last_save=float(last_save),
+            last_dirty=float(last_dirty),
+            interval_sec=float(CACHE_FLUSH_INTERVAL_SEC or 2.0),
+            force_sec=float(CACHE_FLUSH_FORCE_SEC or 10.0),
+        ):
+            return
+
+    _flush_cache_journal(now)
+
+
+def _flush_metrics_if_due() -> None:
+    global _metrics_last_save_at, _metrics_dirty
+    if not ENTRY_METRICS_ENABLED:
+        return
+    now = time.time()
+    with _metrics_lock:
+        if not _metrics_dirty:
+            return
+        # Reuse cache flush cadence; metrics volume is tiny.
+        if (now - float(_metrics_last_save_at or 0.0)) < float(CACHE_FLUSH_INTERVAL_SEC or 2.0):
+            return
+        _save_metrics_locked()
+        _metrics_last_save_at = now
+        _metrics_dirty = False
+
+
+def _flush_warn(msg: str) -> None:
+    print(f"[FXAI][WARN] {msg}")
+
+
+def _cache_flush_task() -> None:
+    """Scheduler task: one cache/metrics flush pass (re-armed by Scheduler.every)."""
+    if not CACHE_ASYNC_FLUSH_ENABLED:
+        return
+    _fxai_flush.run_flush_once(flush_cache_once=_flush_cache_if_due, flush_metrics_once=_flush_metrics_if_due, warn=_flush_warn)
+
+
 def _cache_flush_loop() -> None:
     """Background loop to flush cache/metrics to disk at a controlled interval."""
-    global _cache_last_save_at, _cache_dirty, _metrics_last_save_at, _metrics_dirty
-
     sleep_sec = _fxai_flush.compute_sleep_sec(float(CACHE_FLUSH_INTERVAL_SEC or 2.0))
 
     def _enabled() -> bool:
         return bool(CACHE_ASYNC_FLUSH_ENABLED)
 
-    def _warn(msg: str) -> None:
-        print(f"[FXAI][WARN] {msg}")
+    _fxai_flush.run_flush_loop(
+        sleep_sec=float(sleep_sec),
+        is_enabled=_enabled,
+        flush_cache_once=_flush_cache_if_due,
+        flush_metrics_once=_flush_metrics_if_due,
+        warn=_flush_warn,
+    )
 
-    def _flush_cache_once() -> None:
-        global _cache_last_save_at, _cache_dirty
-        now = time.time()
-        with signals_lock:
-            if not _cache_dirty:
-                return
-
-            last_save = float(_cache_last_save_at or 0.0)
-            last_dirty = float(_cache_last_dirty_at or 0.0)
-
-            if not _fxai_flush.should_flush(
-                now=float(now),
-                last_save=float(last_save),
-                last_dirty=float(last_dirty),
-                interval_sec=float(CACHE_FLUSH_INTERVAL_SEC or 2.0),
-                force_sec=float(CACHE_FLUSH_FORCE_SEC or 10.0),
-            ):
-                return
+def _journal_row(op: str, rec: Any) -> Dict[str, Any]:
+    if op == "add":
+        return {"op": "add", "signal": rec.to_dict()}
+    return {"op": "expire", "key": rec.dedupe_key, "receive_time": rec.receive_time}
 
-            _save_cache_locked()
-            _cache_last_save_at = now
-            _cache_dirty = False
 
-    def _flush_metrics_once() -> None:
-        global _metrics_last_save_at, _metrics_dirty
-        if not ENTRY_METRICS_ENABLED:
-            return
+def _flush_cache_journal(now: Optional[float] = None, force_compact: bool = False) -> None:
+    """Persist pending cache changes (call WITHOUT signals_lock held).
+
+    Normally appends the pending ops to CACHE_JOURNAL_FILE. Every
+    CACHE_COMPACT_ENTRIES ops / CACHE_COMPACT_INTERVAL_SEC the current store is
+    written as the CACHE_FILE snapshot and the journal is truncated.
+    signals_lock is only held to swap the pending buffer / grab the record list.
+    """
+    global _cache_journal_pending, _cache_journal_entries, _cache_last_compact_at
+    global _cache_compact_requested, _cache_dirty, _cache_last_save_at
+    if now is None:
         now = time.time()
-        with _metrics_lock:
-            if not _metrics_dirty:
-                return
-            # Reuse cache flush cadence; metrics volume is tiny.
-            if (now - float(_metrics_last_save_at or 0.0)) < float(CACHE_FLUSH_INTERVAL_SEC or 2.0):
-                return
-            _save_metrics_locked()
-            _metrics_last_save_at = now
-            _metrics_dirty = False
+    with _cache_io_lock:
+        with signals_lock:
+            pending = _cache_journal_pending
+            _cache_journal_pending = []
+            compact = bool(force_compact or _cache_compact_requested)
+            if (not compact) and (_cache_journal_entries + len(pending)) >= max(1, int(CACHE_COMPACT_ENTRIES or 500)):
+                compact = True
+            if (not compact) and pending and (now - float(_cache_last_compact_at or 0.0)) >= float(CACHE_COMPACT_INTERVAL_SEC or 600.0):
+                compact = True
+            # Records are immutable, so a shallow list is a consistent snapshot.
+            snapshot = _signal_store.all_signals() if compact else None
+            _cache_compact_requested = False
+            _cache_dirty = False
+            _cache_last_save_at = float(now)
 
-    _fxai_flush.run_flush_loop(
-        sleep_sec=float(sleep_sec),
-        is_enabled=_enabled,
-        flush_cache_once=_flush_cache_once,
-        flush_metrics_once=_flush_metrics_once,
-        warn=_warn,
-    )
+        try:
+            if snapshot is not None:
+                err = _fxai_persist.atomic_write_json(CACHE_FILE, [rec.to_dict() for rec in snapshot], ensure_ascii=False)
+                if err:
+                    raise RuntimeError(err)
+                # Everything journaled so far (and `pending`) is covered by the snapshot.
+                err = _fxai_persist.truncate_file(CACHE_JOURNAL_FILE)
+                if err:
+                    raise RuntimeError(err)
+                _cache_journal_entries = 0
+                _cache_last_compact_at = float(now)
+            elif pending:
+                err = _fxai_persist.append_jsonl(CACHE_JOURNAL_FILE, [_journal_row(op, rec) for op, rec in pending], ensure_ascii=False)
+                if err:
+                    raise RuntimeError(err)
+                _cache_journal_entries += len(pending)
+        except Exception as e:
+            print(f"[FXAI][WARN] Failed to save cache: {e}")
+            with signals_lock:
+                # Retry on the next flush: put ops back in front, or redo the compaction.
+                _cache_journal_pending = list(pending) + _cache_journal_pending
+                if snapshot is not None:
+                    _cache_compact_requested = True
+                _cache_dirty = True
 
-def _save_cache_locked():
-    """シグナルキャッシュをファイルに保存する (Lock保持中に呼ぶこと)"""
-    try:
-        err = _fxai_persist.atomic_write_json(CACHE_FILE, signals_cache, ensure_ascii=False)
-        if err:
-            raise RuntimeError(err)
-    except Exception as e:
-        print(f"[FXAI][WARN] Failed to save cache: {e}")
 
-def _prune_signals_cache_locked(now: float) -> None:
+def _prune_signals_cache_locked(now: float) -> int:
     """期限切れシグナルを削除。
 
     Zone情報は、
@@ -3889,21 +4497,19 @@ def _prune_signals_cache_locked(now: float) -> None:
     - 「接触/touch（例: zone_retrace_touch）」は短く保持（デフォルト20m）
     - FVG は 15分足対応のため保持を延長（デフォルト20m）
     に分離し、古いtouchを合流として誤認するバグを防ぐ。
-    """
-    keep_list, changed = _fxai_signal_cache.prune_signals_cache(
-        signals_cache=signals_cache,
-        now=now,
-        zone_lookback_sec=ZONE_LOOKBACK_SEC,
-        zone_touch_lookback_sec=ZONE_TOUCH_LOOKBACK_SEC,
-        fvg_lookback_sec=FVG_LOOKBACK_SEC,
-        signal_lookback_sec=SIGNAL_LOOKBACK_SEC,
-    )
-
-    if changed:
-        signals_cache[:] = keep_list
 
-    if SIGNAL_INDEX_ENABLED and (changed or (not _signals_by_symbol and signals_cache)):
-        _rebuild_signal_indexes_locked()
+    Incremental: only signals whose deadline has passed are touched.
+    Returns the number of expired signals.
+    """
+    expired = _signal_store.expire(now)
+    for s in expired:
+        _signal_dedupe_index.forget(s)
+        _cache_journal_pending.append(("expire", s))
+        if QTREND_STREAM_ENABLED:
+            _qtrend_stream.remove(s)
+        if s.is_zone_presence:
+            _zone_index.remove(s)
+    return len(expired)
 
 
 def _is_zone_presence_signal(s: dict) -> bool:
@@ -3945,13 +4551,13 @@ def _is_fvg_signal(s: dict) -> bool:
 def _filter_fresh_signals(symbol: str, now: float) -> list:
     """v2.6の SignalMaxAgeSec 相当：signal_time が古すぎるものを落とす。"""
     sym = (symbol or "").strip().upper()
-    with signals_lock:
-        if SIGNAL_INDEX_ENABLED:
-            _ensure_signal_indexes_locked()
-            base = _signals_by_symbol.get(sym, [])
-            normalized = [_normalize_signal_fields(s) for s in base if isinstance(s, dict)]
-        else:
-            normalized = [_normalize_signal_fields(s) for s in signals_cache if s.get("symbol") == symbol]
+    # Records were normalized once on ingest; the per-symbol view is immutable, so no lock.
+    normalized = _signal_store.fresh_candidates(
+        sym,
+        now=now,
+        signal_max_age_sec=float(SIGNAL_MAX_AGE_SEC),
+        fvg_lookback_sec=float(FVG_LOOKBACK_SEC or _fxai_signal_cache.DEFAULT_FVG_LOOKBACK_SEC),
+    )
 
     return _fxai_signal_cache.filter_fresh_signals_from_normalized(
         normalized=normalized,
@@ -3966,6 +4572,16 @@ def _filter_fresh_signals(symbol: str, now: float) -> list:
 def get_qtrend_anchor_stats(target_symbol: str):
     """fxChartAI v2.6 の『Q-Trend起点で合流を集計』を Python 側で再現。"""
     now = time.time()
+    if QTREND_STREAM_ENABLED and not CONFLUENCE_DEBUG:
+        now, stats = _qtrend_stream.stats(target_symbol, now)
+        if QTREND_STREAM_PARITY:
+            _check_qtrend_stream_parity(target_symbol, now, stats)
+        return stats
+
+    return _compute_qtrend_anchor_stats_full(target_symbol, now)
+
+
+def _compute_qtrend_anchor_stats_full(target_symbol: str, now: float):
     normalized = _filter_fresh_signals(target_symbol, now)
     if not normalized:
         return None
@@ -3984,121 +4600,85 @@ def get_qtrend_anchor_stats(target_symbol: str):
     )
 
 
-def get_mt5_market_data(symbol: str):
-    """MT5のティック/レートが取れないケースでも落ちないように安全に取得する。"""
+def _check_qtrend_stream_parity(target_symbol: str, now: float, stats: Optional[Dict[str, Any]]) -> None:
+    """Compare the streaming stats with a full scan at the same clock; log mismatches."""
+    global _qtrend_stream_parity_checks, _qtrend_stream_parity_mismatches
+    try:
+        want = _compute_qtrend_anchor_stats_full(target_symbol, now)
+        diff = _fxai_qtrend_stream.stats_mismatch(want, stats)
+        _qtrend_stream_parity_checks += 1
+        if diff:
+            _qtrend_stream_parity_mismatches += 1
+            print(f"[FXAI][QTREND][PARITY] mismatch symbol={target_symbol} now={now:.3f}: {diff}")
+    except Exception as e:
+        print(f"[FXAI][QTREND][PARITY] check failed: {e}")
+
+
+def _spread_avg_with_sample(symbol: str, spread: float, *, record: bool = True) -> float:
+    """spread_avg_24h, optionally recording `spread` as a new sample first."""
+    # Average spread: compute from actual tick spreads (points) history.
+    # This avoids mixing price ranges into spread statistics.
+    spread_avg_24h = 0.0
+    if spread > 0:
+        sym = (symbol or "").strip().upper()
+        with _spread_history_lock:
+            # Evicts by time window, then by SPREAD_HISTORY_MAX; mean from the running sum.
+            st = _spread_stats_locked(sym)
+            if record:
+                st.add(time.time(), float(spread))
+            spread_avg_24h = st.mean()
+
+    # Fallback: if bars unavailable or median failed, clamp to reasonable range around current.
+    # Avoid setting avg=current when current is anomalous (e.g., spread spike).
+    if spread_avg_24h <= 0:
+        # Use a conservative default based on typical GOLD spread range (40-80 pts).
+        spread_avg_24h = max(40.0, min(80.0, spread)) if spread > 0 else 50.0
+    return spread_avg_24h
+
+
+def get_mt5_market_data(symbol: str, *, record_spread: bool = True):
+    """MT5のティック/レートが取れないケースでも落ちないように安全に取得する。
+
+    record_spread=False (background poller) reads spread_avg_24h without adding
+    a sample, so the 24h window keeps one sample per decision.
+    """
+    global _market_data_calls
     tick = mt5.symbol_info_tick(symbol)
+    try:
+        server_now = float(getattr(tick, "time", 0) or 0) or None
+    except Exception:
+        server_now = None
 
-    def _rate_field(rate_row, key: str, default: float = 0.0) -> float:
-        """MT5のrate行はdictの場合もnumpy.voidの場合もあるので両対応で取り出す。"""
-        if rate_row is None:
-            return default
-        # dict-like
-        if isinstance(rate_row, dict):
-            try:
-                return float(rate_row.get(key, default) or default)
-            except Exception:
-                return default
-        # numpy.void / structured array row
-        try:
-            return float(rate_row[key])
-        except Exception:
-            pass
-        # attribute fallback
-        try:
-            return float(getattr(rate_row, key, default) or default)
-        except Exception:
-            return default
-
-    rates_m15 = mt5.copy_rates_from_pos(symbol, mt5.TIMEFRAME_M15, 0, 30)
-    ma15 = 0.0
-    m15_slope = "FLAT"
-    if rates_m15 is not None and len(rates_m15) > 0:
-        # CRITICAL: MT5 returns bars in [newest, ..., oldest] order.
-        # Index 0 is the current FORMING bar; skip it to avoid false slope signals.
-        closes = [_rate_field(r, "close", 0.0) for r in rates_m15]
-        if len(closes) >= 20:
-            ma15 = sum(closes[:20]) / 20.0
-        else:
-            ma15 = sum(closes) / max(1, len(closes))
-
-        if len(closes) >= 23:
-            # Use CLOSED bars only (skip the current forming bar at index 0).
-            sma1 = sum(closes[1:21]) / 20.0  # SMA(20) as of last closed bar
-            sma3 = sum(closes[3:23]) / 20.0  # SMA(20) from 2 closed bars earlier
-            delta = sma1 - sma3
-            # Threshold: 0.01% of price or minimum $0.01 (for XAUUSD ~$2600, thresh ≈ $0.026)
-            thresh = max(abs(sma1) * 1e-4, 0.01)
-            if delta > thresh:
-                m15_slope = "UP"
-            elif delta < -thresh:
-                m15_slope = "DOWN"
-            else:
-                m15_slope = "FLAT"
-        elif len(closes) >= 22:
-            # Fallback: still skip current bar, compare last closed vs 1 bar earlier.
-            sma1 = sum(closes[1:21]) / 20.0
-            sma2 = sum(closes[2:22]) / 20.0
-            delta = sma1 - sma2
-            # Threshold: 0.01% of price or minimum $0.01 (for XAUUSD ~$2600, thresh ≈ $0.026)
-            thresh = max(abs(sma1) * 1e-4, 0.01)
-            if delta > thresh:
-                m15_slope = "UP"
-            elif delta < -thresh:
-                m15_slope = "DOWN"
-            else:
-                m15_slope = "FLAT"
+    def _copy_rates(timeframe: int, count: int, tf_sec: float):
+        if not BAR_CACHE_ENABLED:
+            return _market_data_copy_rates(symbol, timeframe, 0, count)
+        return _bar_cache.rates(symbol, timeframe, count, tf_sec=tf_sec, server_now=server_now)
 
+    rates_m15 = _copy_rates(mt5.TIMEFRAME_M15, 30, 900.0)
     # ATR: 旧EA(iATR)に寄せて True Range で近似
-    rates_m5 = mt5.copy_rates_from_pos(symbol, mt5.TIMEFRAME_M5, 0, 60)
-    atr = 0.0
-    swing_low_20m5  = 0.0   # [LRR COMPAT] recent 20-bar swing low  (→ BUY sweep_extreme)
-    swing_high_20m5 = 0.0   # [LRR COMPAT] recent 20-bar swing high (→ SELL sweep_extreme)
-    if rates_m5 is not None and len(rates_m5) >= 2:
-        period = 14
-        highs = [_rate_field(r, "high", 0.0) for r in rates_m5]
-        lows = [_rate_field(r, "low", 0.0) for r in rates_m5]
-        closes = [_rate_field(r, "close", 0.0) for r in rates_m5]
-
-        trs = []
-        for i in range(1, len(rates_m5)):
-            h = highs[i]
-            l = lows[i]
-            pc = closes[i - 1]
-            tr = max(abs(h - l), abs(h - pc), abs(l - pc))
-            if tr > 0:
-                trs.append(tr)
-        if trs:
-            atr = sum(trs[:period]) / max(1, min(period, len(trs)))
-        # [LRR COMPAT] Swing extreme: last 20 CLOSED M5 bars (skip bar[0] = still forming)
-        # BUY → liquidity swept below → swing LOW acts as structure SL anchor
-        # SELL → liquidity swept above → swing HIGH acts as structure SL anchor
-        if len(rates_m5) >= 22:
-            _lows20f  = [v for v in [_rate_field(r, "low",  0.0) for r in rates_m5[1:21]] if v > 0.0]
-            _highs20f = [v for v in [_rate_field(r, "high", 0.0) for r in rates_m5[1:21]] if v > 0.0]
-            if _lows20f:
-                swing_low_20m5  = min(_lows20f)
-            if _highs20f:
-                swing_high_20m5 = max(_highs20f)
-
-    # 5h average ATR: using 60-bar M5 window (60 bars × 5 min = 300 min ≈ 5 hours)
-    # Full 288-bar rolling ATR is too expensive; use a 60-bar approximation
-    atr_avg_5h = 0.0
-    rates_m5_60 = mt5.copy_rates_from_pos(symbol, mt5.TIMEFRAME_M5, 0, 62)
-    if rates_m5_60 is not None and len(rates_m5_60) >= 15:
-        highs_60 = [_rate_field(r, "high", 0.0) for r in rates_m5_60]
-        lows_60 = [_rate_field(r, "low", 0.0) for r in rates_m5_60]
-        closes_60 = [_rate_field(r, "close", 0.0) for r in rates_m5_60]
-        trs_60 = []
-        for i in range(1, len(rates_m5_60)):
-            h = highs_60[i]
-            l = lows_60[i]
-            pc = closes_60[i - 1]
-            tr = max(abs(h - l), abs(h - pc), abs(l - pc))
-            if tr > 0:
-                trs_60.append(tr)
-        if len(trs_60) >= 14:
-            # Simple average of TR over 14-period windows
-            atr_avg_5h = sum(trs_60[:min(60, len(trs_60))]) / max(1, min(60, len(trs_60)))
+    # One M5 fetch serves every window: ATR/swing use its last 60 bars
+    # (== copy_rates_from_pos(..., 0, 60)), atr_avg_5h uses ATR_AVG_BARS + 2 bars.
+    rates_m5_avg = _copy_rates(mt5.TIMEFRAME_M5, max(62, ATR_AVG_BARS + 2), 300.0)
+    rates_m5 = rates_m5_avg[-60:] if rates_m5_avg is not None else None
+    if rates_m5_avg is not None and len(rates_m5_avg) > ATR_AVG_BARS + 2:
+        rates_m5_avg = rates_m5_avg[-(ATR_AVG_BARS + 2):]
+    ind: Dict[str, Any] = {}
+    if INDICATOR_STREAM_ENABLED:
+        _indicator_stream.feed(symbol, "m15", rates_m15)
+        _indicator_stream.feed(symbol, "m5", rates_m5_avg)
+        _indicator_stream.feed(symbol, "h1", _copy_rates(mt5.TIMEFRAME_H1, INDICATOR_STREAM_H1_BARS, 3600.0))
+        _indicator_stream.feed(symbol, "d1", _copy_rates(mt5.TIMEFRAME_D1, INDICATOR_STREAM_D1_BARS, 86400.0))
+        ind = dict(_indicator_stream.snapshot(symbol) or {})
+    if not all(k in ind for k in _fxai_indicators.MARKET_INDICATOR_KEYS):
+        # Stream disabled or still warming up: structured MT5 arrays take the
+        # vectorized NumPy path (fxai_indicators); stream values win where present.
+        ind = {**_fxai_indicators.market_indicators(rates_m15, rates_m5, rates_m5_avg, atr_avg_bars=ATR_AVG_BARS), **ind}
+    ma15 = ind["m15_ma"]
+    m15_slope = ind["m15_sma20_slope"]
+    atr = ind["atr"]
+    atr_avg_5h = ind["atr_avg_5h"]
+    swing_low_20m5 = ind["swing_low_20m5"]    # [LRR COMPAT] recent 20-bar swing low  (→ BUY sweep_extreme)
+    swing_high_20m5 = ind["swing_high_20m5"]  # [LRR COMPAT] recent 20-bar swing high (→ SELL sweep_extreme)
 
     # If market data isn't available, reuse last known ATR for this symbol.
     if atr <= 0:
@@ -4111,46 +4691,15 @@ def get_mt5_market_data(symbol: str):
     ask = float(getattr(tick, "ask", 0.0) or 0.0)
     spread = ((ask - bid) / point) if point > 0 else 0.0
 
-    # Average spread: compute from actual tick spreads (points) history.
-    # This avoids mixing price ranges into spread statistics.
-    spread_avg_24h = 0.0
-    now_ts = time.time()
-    if spread > 0:
-        sym = (symbol or "").strip().upper()
-        with _spread_history_lock:
-            hist = _spread_history_by_symbol.get(sym)
-            if hist is None:
-                hist = []
-                _spread_history_by_symbol[sym] = hist
-            
-            hist.append((now_ts, float(spread)))
-            
-            # Prune by time window first (most effective for memory)
-            win = float(SPREAD_HISTORY_WINDOW_SEC or 0)
-            if win > 0:
-                cutoff = now_ts - win
-                hist[:] = [x for x in hist if float(x[0]) >= cutoff]
-            
-            # Then prune by max size (safety cap)
-            max_n = int(SPREAD_HISTORY_MAX or 0)
-            if max_n > 0 and len(hist) > max_n:
-                hist[:] = hist[-max_n:]
-            
-            # Compute average from remaining samples
-            if hist:
-                spread_avg_24h = float(sum(v for _, v in hist) / len(hist))
-
-    # Fallback: if bars unavailable or median failed, clamp to reasonable range around current.
-    # Avoid setting avg=current when current is anomalous (e.g., spread spike).
-    if spread_avg_24h <= 0:
-        # Use a conservative default based on typical GOLD spread range (40-80 pts).
-        spread_avg_24h = max(40.0, min(80.0, spread)) if spread > 0 else 50.0
+    spread_avg_24h = _spread_avg_with_sample(symbol, spread, record=record_spread)
 
     atr_points = (atr / point) if point > 0 else 0.0
     atr_to_spread = (atr_points / spread) if spread > 0 else None
 
+    _market_data_calls += 1
+
     drift_point = _drift_point_size(symbol, point)
-    return {
+    out = {
         "bid": bid,
         "ask": ask,
         "m15_ma": ma15,
@@ -4166,22 +4715,36 @@ def get_mt5_market_data(symbol: str):
         "swing_low_20m5":  swing_low_20m5,
         "swing_high_20m5": swing_high_20m5,
     }
+    if INDICATOR_STREAM_ENABLED:
+        out["atr_h1"] = ind.get("atr_h1")
+        out["atr_d1"] = ind.get("atr_d1")
+    return out
 
 
-def _update_spread_med(symbol: str, spread: float) -> float:
+def _update_spread_med(symbol: str, spread: float, *, update: bool = True) -> float:
     """Robbins-Monro O(1) rolling median update.  更新式: med += lr * sign(x - med)
     スパイク耐性があり O(n) ソート不要。lrr_brain §7 から移植。
-    Returns: new median estimate (points)
+    LRR_SPREAD_MED_MODE=exact/p2 returns the windowed exact median / P² estimate
+    of the same rolling spread stats instead (Robbins-Monro is still updated).
+    update=False reads the current estimate without a Robbins-Monro step (speculative attempts).
+    Returns: median estimate (points)
     """
     if spread <= 0:
         return 0.0
     sym = (symbol or "").strip().upper()
-    with _spread_med_lock:
-        med = _spread_med_by_symbol.get(sym, spread)
-        diff = spread - med
-        med += LRR_SPREAD_MED_LR * (1.0 if diff > 0 else (-1.0 if diff < 0 else 0.0))
-        _spread_med_by_symbol[sym] = med
-    return med
+    with _spread_history_lock:
+        st = _spread_stats_locked(sym)
+        if update or st.rm_median is None:
+            med = st.rm_update(float(spread), LRR_SPREAD_MED_LR)
+        else:
+            med = float(st.rm_median)
+        if LRR_SPREAD_MED_MODE == "exact":
+            alt = st.median()
+        elif LRR_SPREAD_MED_MODE == "p2":
+            alt = st.p2_value(0.5)
+        else:
+            alt = None
+    return float(alt) if alt is not None and alt > 0 else med
 
 
 def get_mt5_position_state(symbol: str):
@@ -4273,7 +4836,7 @@ def get_current_broker_time(symbol: Optional[str] = None) -> Optional[float]:
     return None
 
 
-def get_mt5_positions_summary(symbol: str) -> Dict[str, Any]:
+def get_mt5_positions_summary(symbol: str, *, log: bool = True) -> Dict[str, Any]:
     """MT5の保有ポジション概要（AI決済判断に必要な最小情報）を安全に返す。"""
     try:
         positions = mt5.positions_get(symbol=symbol)
@@ -4291,7 +4854,8 @@ def get_mt5_positions_summary(symbol: str) -> Dict[str, Any]:
         }
 
     now_ts_for_holding = get_current_broker_time(symbol)
-    print(f"[DEBUG] get_mt5_positions_summary: symbol={symbol}, now={now_ts_for_holding}, positions_count={len(positions)}")
+    if log:
+        print(f"[DEBUG] get_mt5_positions_summary: symbol={symbol}, now={now_ts_for_holding}, positions_count={len(positions)}")
     net_volume = 0.0
     total_profit = 0.0
     oldest_open_time = float("inf")
@@ -4413,6 +4977,54 @@ def get_mt5_positions_summary(symbol: str) -> Dict[str, Any]:
     }
 
 
+_mt5_poller = _fxai_market_poller.MarketPoller(
+    fetch_market=lambda sym: get_mt5_market_data(sym, record_spread=False),
+    fetch_positions=lambda sym: get_mt5_positions_summary(sym, log=False),
+    interval_sec=MT5_POLL_INTERVAL_SEC,
+    symbols=[SYMBOL],
+)
+
+
+_positions_cache = _fxai_positions_cache.PositionsCache(
+    fetch=get_mt5_positions_summary,
+    reconcile_sec=POSITIONS_CACHE_RECONCILE_SEC,
+)
+
+
+def _market_for_decision(symbol: str, *, record_spread: bool = True) -> Dict[str, Any]:
+    """get_mt5_market_data for the decision path: poller snapshot when fresh, else MT5 inline.
+
+    record_spread=False (speculative attempts) reads spread_avg_24h without adding a sample.
+    """
+    if MT5_POLLER_ENABLED:
+        _mt5_poller.track(symbol)
+        snap = _mt5_poller.get(symbol, max_age_sec=MT5_SNAPSHOT_MAX_AGE_SEC)
+        if snap is not None:
+            market = dict(snap.market)
+            # One spread sample per decision, as with the inline read.
+            market["spread_avg_24h"] = _spread_avg_with_sample(
+                symbol, float(market.get("spread") or 0.0), record=record_spread
+            )
+            return market
+    return get_mt5_market_data(symbol, record_spread=record_spread)
+
+
+def _positions_for_decision(symbol: str) -> Dict[str, Any]:
+    """get_mt5_positions_summary for the decision path (event-invalidated cache or poller snapshot)."""
+    if POSITIONS_CACHE_ENABLED:
+        return _positions_cache.get(symbol)
+    if MT5_POLLER_ENABLED:
+        _mt5_poller.track(symbol)
+        snap = _mt5_poller.get(symbol, max_age_sec=MT5_SNAPSHOT_MAX_AGE_SEC)
+        if snap is not None:
+            pos = dict(snap.positions)
+            # Holding time advances while the snapshot ages.
+            if int(pos.get("max_holding_sec") or 0) > 0:
+                pos["max_holding_sec"] = int(pos["max_holding_sec"] + snap.age())
+            return pos
+    return get_mt5_positions_summary(symbol)
+
+
 def check_trading_hours(symbol: str) -> bool:
     """Return True if trading is allowed based on broker server time.
 
@@ -4468,20 +5080,167 @@ def _safe_float(v, default: float) -> float:
         return default
 
 
-def _call_openai_with_retry(prompt: str, *, symbol: Optional[str] = None, kind: str = "unknown") -> Optional[Dict[str, Any]]:
+def _ai_adaptive_timeout_sec(kind: str) -> float:
+    return _fxai_ai_client.adaptive_timeout_sec(
+        _ai_latency,
+        kind,
+        quantile=AI_TIMEOUT_QUANTILE,
+        multiplier=AI_TIMEOUT_MULTIPLIER,
+        min_samples=AI_TIMEOUT_MIN_SAMPLES,
+        floor_sec=AI_TIMEOUT_MIN_SEC,
+        ceiling_sec=API_TIMEOUT_SEC,
+    )
+
+
+def _on_ai_stream_full(fut: Any, *, kind: str, symbol: str) -> None:
+    """Background completion of a stream whose decision already proceeded on its early fields."""
+    try:
+        full = fut.result()
+    except Exception as e:
+        print(f"[FXAI][AI] {kind} stream did not complete: {e}")
+        return
+    if full.get("_ai_latency_ms") is not None:
+        _ai_stream_latency.record(f"{kind}.full", float(full["_ai_latency_ms"]))
+    usage = full.get("_ai_usage")
+    if usage:
+        _ai_usage.record(kind, usage)
+        try:
+            _record_openai_usage_metrics(symbol=symbol, kind=kind, usage=usage)
+        except Exception:
+            pass
+    reason = str(full.get("reason") or "").strip()
+    print(f"[FXAI][AI] {kind} full reason ({full.get('_ai_latency_ms')}ms id={full.get('_openai_response_id')}): {reason[:300]}")
+
+
+def _call_openai_with_retry(
+    prompt: Any,
+    *,
+    symbol: Optional[str] = None,
+    kind: str = "unknown",
+    deadline_at: Optional[float] = None,
+    early: Optional[Any] = None,
+    priority: Optional[str] = None,
+    skip_sink: Optional[Dict[str, Any]] = None,
+) -> Optional[Dict[str, Any]]:
+    """deadline_at: epoch time after which the answer is stale (AI_ADAPTIVE_TIMEOUT_ENABLED only).
+
+    early: streaming readiness predicate over the fields parsed so far (AI_STREAM_ENABLED);
+    the returned dict then may be partial (_ai_partial=True).
+    priority: governor class (fxai_ai_governor.PRIORITIES); default entry / hold by kind.
+    skip_sink: when None is returned, skip_sink["reason"] says why
+    (circuit_open / budget_exhausted / governor_<reason> / failed).
+    """
     if not client:
         return None
+    if _ai_governor is None:
+        return _call_openai_admitted(prompt, symbol=symbol, kind=kind, deadline_at=deadline_at, early=early, skip_sink=skip_sink)
+
+    cls = priority or ("entry" if kind == "entry_score" else "hold")
+    wait_budget = (float(deadline_at) - time.time()) if deadline_at is not None else None
+    ticket, reason = _ai_governor.acquire(kind, cls, timeout_sec=wait_budget)
+    if ticket is None:
+        print(f"[FXAI][AI] {kind} ({cls}): governor {reason}, not calling")
+        _record_ai_skip_metrics(symbol=(symbol or (SYMBOL or "GOLD")), kind=kind, reason=f"governor_{reason}")
+        if skip_sink is not None:
+            skip_sink["reason"] = f"governor_{reason}"
+        return None
+    released = False
+    try:
+        data = _call_openai_admitted(
+            prompt, symbol=symbol, kind=kind, deadline_at=deadline_at, early=early, ticket=ticket, skip_sink=skip_sink
+        )
+        # A partial streamed result keeps its slot until the background completion finishes.
+        released = bool(isinstance(data, dict) and data.get("_ai_partial"))
+        return data
+    finally:
+        if not released:
+            _ai_governor.release(ticket)
 
-    data, err_counts, timeout_attempts, attempts, last_err = _call_openai_json_with_retry(
-        client=client,
-        model=OPENAI_MODEL,
-        prompt=prompt,
-        timeout_sec=API_TIMEOUT_SEC,
-        retry_count=API_RETRY_COUNT,
-        retry_wait_sec=API_RETRY_WAIT_SEC,
-    )
+
+def _call_openai_admitted(
+    prompt: Any,
+    *,
+    symbol: Optional[str],
+    kind: str,
+    deadline_at: Optional[float],
+    early: Optional[Any],
+    ticket: Optional[Any] = None,
+    skip_sink: Optional[Dict[str, Any]] = None,
+) -> Optional[Dict[str, Any]]:
+    """One admitted AI call: freshness budget / circuit breaker / adaptive timeout checks happen here."""
+    timeout_sec = float(API_TIMEOUT_SEC)
+    deadline_sec = float(AI_DEADLINE_SEC) if _ai_hedged is not None else 0.0
+    if AI_ADAPTIVE_TIMEOUT_ENABLED and deadline_at is not None:
+        remaining = float(deadline_at) - time.time()
+        if remaining <= 0.05:
+            print(f"[FXAI][AI] {kind}: freshness budget exhausted, not calling")
+            _record_ai_skip_metrics(symbol=(symbol or (SYMBOL or "GOLD")), kind=kind, reason="budget_exhausted")
+            if skip_sink is not None:
+                skip_sink["reason"] = "budget_exhausted"
+            return None
+        deadline_sec = min(deadline_sec, remaining) if deadline_sec > 0 else remaining
+
+    probe = False
+    if AI_BREAKER_ENABLED:
+        allowed, probe = _ai_breakers.allow(kind)
+        if not allowed:
+            print(f"[FXAI][AI] {kind}: circuit open, failing fast")
+            _record_ai_skip_metrics(symbol=(symbol or (SYMBOL or "GOLD")), kind=kind, reason="circuit_open")
+            if skip_sink is not None:
+                skip_sink["reason"] = "circuit_open"
+            return None
+    # Half-open probes keep the static timeout so a slower-but-healthy provider can re-learn its latency.
+    if AI_ADAPTIVE_TIMEOUT_ENABLED and not probe:
+        timeout_sec = _ai_adaptive_timeout_sec(kind)
+
+    if _ai_hedged is not None:
+        data, err_counts, timeout_attempts, attempts, last_err = _ai_hedged.call_json(
+            prompt,
+            kind=kind,
+            deadline_sec=deadline_sec,
+            timeout_sec=timeout_sec,
+            retry_count=API_RETRY_COUNT,
+            retry_wait_sec=API_RETRY_WAIT_SEC,
+            early=early,
+        )
+    else:
+        data, err_counts, timeout_attempts, attempts, last_err = _call_openai_json_with_retry(
+            client=client,
+            model=OPENAI_MODEL,
+            prompt=prompt,
+            timeout_sec=timeout_sec,
+            retry_count=API_RETRY_COUNT,
+            retry_wait_sec=API_RETRY_WAIT_SEC,
+            deadline_sec=deadline_sec,
+            early=early,
+        )
+        # Hedged client records every request itself; here only the winning attempt is known.
+        # Streamed results are recorded at full completion (early-decision time goes to _ai_stream_latency).
+        if isinstance(data, dict):
+            _ai_latency.record_result(kind, data)
+        elif last_err is not None:
+            _ai_latency.record_failure(kind)
 
     ok = bool(isinstance(data, dict))
+    if AI_BREAKER_ENABLED:
+        _ai_breakers.record(kind, ok, probe=probe)
+    if not ok and skip_sink is not None:
+        skip_sink["reason"] = "failed"
+    if ok and early is not None:
+        full_fut = data.pop("_ai_stream_full", None)
+        if data.get("_ai_first_field_ms") is not None:
+            _ai_stream_latency.record(f"{kind}.first_usable", float(data["_ai_first_field_ms"]))
+        if full_fut is not None:
+            full_fut.add_done_callback(
+                lambda f, _k=kind, _s=(symbol or (SYMBOL or "GOLD")): _on_ai_stream_full(f, kind=_k, symbol=_s)
+            )
+            if ticket is not None and _ai_governor is not None:
+                full_fut.add_done_callback(lambda _f, _t=ticket: _ai_governor.release(_t))
+        elif data.get("_ai_latency_ms") is not None:
+            _ai_stream_latency.record(f"{kind}.full", float(data["_ai_latency_ms"]))
+    usage = data.get("_ai_usage") if ok else None
+    if usage:
+        _ai_usage.record(kind, usage)
     try:
         _record_openai_call_metrics(
             symbol=(symbol or (SYMBOL or "GOLD")),
@@ -4490,6 +5249,7 @@ def _call_openai_with_retry(prompt: str, *, symbol: Optional[str] = None, kind:
             attempts=max(1, int(attempts or 1)),
             timeout_attempts=int(timeout_attempts),
             err_counts=(err_counts or None),
+            usage=usage,
         )
     except Exception:
         pass
@@ -4542,6 +5302,23 @@ def _validate_ai_entry_score(decision: Dict[str, Any]) -> Optional[Dict[str, Any
     return out
 
 
+def _split_prompt(static: str, payload: Dict[str, Any], *, attempt_context: Optional[str] = None) -> Any:
+    """Static instruction block + dynamic context (AttemptContext line, then sorted-key ContextJSON)."""
+    head = f"AttemptContext: {str(attempt_context)[:160]}\n" if attempt_context else ""
+    return _fxai_ai_client.PromptParts(static, head + json.dumps(payload, ensure_ascii=False, sort_keys=True))
+
+
+def _entry_score_fields_ready(fields: Dict[str, Any]) -> bool:
+    """Streaming: score + lot multiplier are complete numbers and pass _validate_ai_entry_score."""
+    score = next((fields[k] for k in ("confluence_score", "score", "confidence") if k in fields), None)
+    lot = next((fields[k] for k in ("lot_multiplier", "multiplier") if k in fields), None)
+    if isinstance(score, bool) or isinstance(lot, bool):
+        return False
+    if not isinstance(score, (int, float)) or not isinstance(lot, (int, float)):
+        return False
+    return _validate_ai_entry_score(fields) is not None
+
+
 def _build_entry_logic_prompt(
     symbol: str,
     market: dict,
@@ -4550,9 +5327,13 @@ def _build_entry_logic_prompt(
     normalized_trigger: Optional[Dict[str, Any]] = None,
     qtrend_context: Optional[Dict[str, Any]] = None,
     attempt_context: Optional[str] = None,
-) -> str:
+    payload_sink: Optional[Dict[str, Any]] = None,
+) -> Any:
     """Entry context prompt (new spec).
 
+    Returns a plain string, or PromptParts (static prefix + dynamic context)
+    when PROMPT_PREFIX_CACHE_ENABLED.
+
     - Entry is triggered by Lorentzian (entry_trigger).
     - Q-Trend is environment context only (direction + strength).
     - Zones/FVG are additional evidence context.
@@ -4575,7 +5356,7 @@ def _build_entry_logic_prompt(
                 "price": (normalized_trigger or {}).get("price"),
             },
             "qtrend_context": qtrend_context,
-            "zones_context": _build_zones_context(symbol, now, current_price),
+            "zones_context": _build_zones_context(symbol, now, current_price, float(market.get("atr") or 0.0)),
             "sma_context": _build_sma_context(market),
             "volatility_context": _build_volatility_context(market),
             "spread_context": _build_spread_context(market),
@@ -4601,6 +5382,12 @@ def _build_entry_logic_prompt(
                 )
             except Exception:
                 pass
+        if PROMPT_PREFIX_CACHE_ENABLED:
+            return _split_prompt(
+                _fxai_prompts_text.ENTRY_LOGIC_MINIMAL_PREFIX + _fxai_prompts_text.ENTRY_LOGIC_MINIMAL_SUFFIX,
+                minimal_payload,
+                attempt_context=attempt_context,
+            )
         return (
             _fxai_prompts_text.ENTRY_LOGIC_MINIMAL_PREFIX
             + (f"AttemptContext: {str(attempt_context)[:160]}\n" if attempt_context else "")
@@ -4608,7 +5395,17 @@ def _build_entry_logic_prompt(
             + json.dumps(minimal_payload, ensure_ascii=False)
         )
 
-    base = _build_entry_filter_prompt(symbol, market, stats, action, normalized_trigger=normalized_trigger, qtrend_context=qtrend_context)
+    base = _build_entry_filter_prompt(
+        symbol, market, stats, action,
+        normalized_trigger=normalized_trigger, qtrend_context=qtrend_context, payload_sink=payload_sink,
+    )
+    if isinstance(base, _fxai_ai_client.PromptParts):
+        return _fxai_ai_client.PromptParts(
+            _fxai_prompts_text.ENTRY_LOGIC_FULL_PREFIX
+            + _fxai_prompts_text.ENTRY_LOGIC_FULL_SUFFIX_BEFORE_BASE
+            + base.static,
+            (f"AttemptContext: {str(attempt_context)[:160]}\n" if attempt_context else "") + base.dynamic,
+        )
     return (
         _fxai_prompts_text.ENTRY_LOGIC_FULL_PREFIX
         + (f"AttemptContext: {str(attempt_context)[:160]}\n" if attempt_context else "")
@@ -4624,7 +5421,8 @@ def _build_entry_filter_prompt(
     action: str,
     normalized_trigger: Optional[Dict[str, Any]] = None,
     qtrend_context: Optional[Dict[str, Any]] = None,
-) -> str:
+    payload_sink: Optional[Dict[str, Any]] = None,
+) -> Any:
     """ENTRY最終判断のためのコンテキストを構築。
 
     - BUY/SELL自体はローカルで確定済み（action）。
@@ -4689,7 +5487,7 @@ def _build_entry_filter_prompt(
     
     # Compute additional market contexts with fallback handling
     try:
-        zones_context = _build_zones_context(symbol, now, current_price)
+        zones_context = _build_zones_context(symbol, now, current_price, float((market or {}).get("atr") or 0.0))
     except Exception as e:
         print(f"[FXAI][WARN] Failed to build zones_context for entry: {e}")
         zones_context = {"total": 0, "support_count": 0, "resistance_count": 0}
@@ -4803,6 +5601,10 @@ def _build_entry_filter_prompt(
         entry_freshness_sec=float(ENTRY_FRESHNESS_SEC or 30.0),
     )
 
+    if payload_sink is not None:
+        # Full (pre-compaction) payload for the decision-cache fingerprint.
+        payload_sink["payload"] = payload
+
     if PROMPT_COMPACT_ENABLED:
         try:
             payload = _compact_for_prompt(
@@ -4813,6 +5615,8 @@ def _build_entry_filter_prompt(
         except Exception:
             pass
 
+    if PROMPT_PREFIX_CACHE_ENABLED:
+        return _split_prompt(_fxai_prompts_text.ENTRY_FILTER_PROMPT_PREFIX, payload)
     return _fxai_prompts_text.ENTRY_FILTER_PROMPT_PREFIX + json.dumps(payload, ensure_ascii=False)
 
 
@@ -4870,7 +5674,7 @@ def _build_close_logic_prompt(
     pos_summary: dict,
     latest_signal: dict,
     recent_signals: Optional[List[dict]] = None,
-) -> str:
+) -> Any:
     """保有中のCLOSE/HOLD判断用プロンプト（Day Trading・損小利大）。"""
     now = time.time()
     stats = stats or {}
@@ -4958,7 +5762,7 @@ def _build_close_logic_prompt(
     current_price = _current_price_from_market(market)
     
     try:
-        zones_context = _build_zones_context(symbol, now, current_price)
+        zones_context = _build_zones_context(symbol, now, current_price, float((market or {}).get("atr") or 0.0))
     except Exception as e:
         print(f"[FXAI][WARN] Failed to build zones_context: {e}")
         zones_context = {"total": 0, "support_count": 0, "resistance_count": 0}
@@ -5029,6 +5833,8 @@ def _build_close_logic_prompt(
         except Exception:
             pass
 
+    if PROMPT_PREFIX_CACHE_ENABLED:
+        return _split_prompt(_fxai_prompts_text.CLOSE_LOGIC_PROMPT_PREFIX, payload)
     return _fxai_prompts_text.CLOSE_LOGIC_PROMPT_PREFIX + json.dumps(payload, ensure_ascii=False)
 
 
@@ -5039,11 +5845,13 @@ def _ai_close_hold_decision(
     pos_summary: dict,
     latest_signal: dict,
     recent_signals: Optional[List[dict]] = None,
+    priority: str = "hold",
 ) -> Optional[Dict[str, Any]]:
     if not client:
         return None
+    deadline_at = (time.time() + AI_CLOSE_BUDGET_SEC) if AI_CLOSE_BUDGET_SEC > 0 else None
     prompt = _build_close_logic_prompt(symbol, market, stats, pos_summary, latest_signal, recent_signals=recent_signals)
-    decision = _call_openai_with_retry(prompt, symbol=symbol, kind="close_hold")
+    decision = _call_openai_with_retry(prompt, symbol=symbol, kind="close_hold", deadline_at=deadline_at, priority=priority)
     if not decision:
         print("[FXAI][AI] No response from AI (close/hold). Using fallback.")
         return None
@@ -5058,6 +5866,17 @@ def _ai_close_hold_decision(
     return validated
 
 
+def _ai_entry_priority(normalized_trigger: Optional[Dict[str, Any]], attempt_context: Optional[str], speculative: bool) -> str:
+    """Governor class of an entry scoring call (fresh primary trigger first)."""
+    if speculative:
+        return "speculative"
+    if str((normalized_trigger or {}).get("entry_mode") or "").upper() == "PYRAMID":
+        return "pyramid"
+    if str(attempt_context or "").startswith("DE:"):
+        return "reeval"
+    return "entry"
+
+
 def _ai_entry_score(
     symbol: str,
     market: dict,
@@ -5066,10 +5885,22 @@ def _ai_entry_score(
     normalized_trigger: Optional[Dict[str, Any]] = None,
     qtrend_context: Optional[Dict[str, Any]] = None,
     attempt_context: Optional[str] = None,
+    speculative: bool = False,
+    deadline_at: Optional[float] = None,
+    skip_sink: Optional[Dict[str, Any]] = None,
 ) -> Optional[Dict[str, Any]]:
-    """AIに Confluence Score(1-100) と Lot Multiplier を出させる。"""
+    """AIに Confluence Score(1-100) と Lot Multiplier を出させる。
+
+    skip_sink: AI を呼ばずに None を返した理由を受け取る（_call_openai_with_retry 参照）。
+    ENTRY_AI_CACHE_ENABLED: 同じ指紋の検証済み判断が TTL 内にあれば AI を呼ばずに返す
+    （_ai_cached=True, _ai_cache_key, _ai_cache_age_sec 付き）。
+    ENTRY_SPECULATIVE_ENABLED: speculative=True は結果を指紋付きスロットに置くだけ。
+    通常呼び出しは指紋が一致するスロットの結果を待って使う（_ai_speculative=True）。
+    """
     if not client:
         return None
+    use_fp = bool(ENTRY_AI_CACHE_ENABLED or ENTRY_SPECULATIVE_ENABLED)
+    sink: Optional[Dict[str, Any]] = {} if use_fp else None
     prompt = _build_entry_logic_prompt(
         symbol,
         market,
@@ -5078,22 +5909,85 @@ def _ai_entry_score(
         normalized_trigger=normalized_trigger,
         qtrend_context=qtrend_context,
         attempt_context=attempt_context,
+        payload_sink=sink,
     )
-    decision = _call_openai_with_retry(prompt, symbol=symbol, kind="entry_score")
-    if not decision:
-        print("[FXAI][AI] No response from AI (entry score).")
-        return None
-
-    validated = _validate_ai_entry_score(decision)
-    if not validated:
-        print("[FXAI][AI] Invalid AI response (entry score).")
+    fingerprint: Optional[str] = None
+    if sink and isinstance(sink.get("payload"), dict):
         try:
-            _record_ai_validation_failure(symbol=symbol, kind="entry_score")
-        except Exception:
-            pass
-        return None
+            fingerprint = _fxai_decision_cache.entry_fingerprint(sink["payload"])
+        except Exception as e:
+            print(f"[FXAI][AI] entry fingerprint failed: {e}")
+            fingerprint = None
+    cache_key = fingerprint if ENTRY_AI_CACHE_ENABLED else None
+    # The window-close attempt takes its speculation slot before the cache lookup: the speculation
+    # also fills the cache, and a cache hit must not leave the slot (and its hit/miss) unresolved.
+    if ENTRY_SPECULATIVE_ENABLED and fingerprint and not speculative:
+        fut = _entry_spec_slots.take(symbol, fingerprint, max_age_sec=ENTRY_SPECULATIVE_MAX_AGE_SEC)
+        if fut is not None:
+            wait_sec = max(1.0, float(API_TIMEOUT_SEC) * max(1, int(API_RETRY_COUNT)))
+            if deadline_at is not None:
+                # Never hold the real entry past its freshness budget waiting for a slow speculation.
+                wait_sec = min(wait_sec, float(deadline_at) - time.time())
+            try:
+                spec = fut.result(timeout=max(0.0, wait_sec))
+            except Exception:
+                spec = None
+            if isinstance(spec, dict):
+                print(f"[FXAI][SPEC] speculative hit {symbol} fp={fingerprint} score={spec.get('confluence_score')}")
+                return {**spec, "_ai_speculative": True}
+            _entry_spec_slots.record_failure()
+
+    if cache_key:
+        hit = _entry_ai_cache.get(cache_key)
+        if hit is not None:
+            cached, age = hit
+            cached["_ai_cached"] = True
+            cached["_ai_cache_key"] = cache_key
+            cached["_ai_cache_age_sec"] = round(age, 1)
+            cached["_ai_latency_ms"] = None  # no AI call made; the original latency counts as saved_ms
+            print(f"[FXAI][AI] entry score cache hit key={cache_key} age={age:.1f}s score={cached.get('confluence_score')}")
+            return cached
+
+    spec_future = None
+    if speculative:
+        if not (ENTRY_SPECULATIVE_ENABLED and fingerprint):
+            return None
+        spec_future = _entry_spec_slots.begin(symbol, fingerprint)
+        if spec_future is None:
+            return None  # same fingerprint already scored / in flight
+        print(f"[FXAI][SPEC] speculative entry scoring {symbol} fp={fingerprint}")
 
-    return validated
+    validated: Optional[Dict[str, Any]] = None
+    try:
+        decision = _call_openai_with_retry(
+            prompt,
+            symbol=symbol,
+            kind="entry_score",
+            deadline_at=deadline_at,
+            early=(_entry_score_fields_ready if AI_STREAM_ENABLED else None),
+            priority=_ai_entry_priority(normalized_trigger, attempt_context, speculative),
+            skip_sink=skip_sink,
+        )
+        if not decision:
+            print("[FXAI][AI] No response from AI (entry score).")
+            return None
+
+        validated = _validate_ai_entry_score(decision)
+        if not validated:
+            print("[FXAI][AI] Invalid AI response (entry score).")
+            try:
+                _record_ai_validation_failure(symbol=symbol, kind="entry_score")
+            except Exception:
+                pass
+            return None
+
+        if cache_key:
+            _entry_ai_cache.put(cache_key, validated)
+            validated = {**validated, "_ai_cached": False, "_ai_cache_key": cache_key}
+        return validated
+    finally:
+        if spec_future is not None:
+            spec_future.set_result(validated)
 
 
 def _attempt_entry_from_lorentzian(
@@ -5103,6 +5997,7 @@ def _attempt_entry_from_lorentzian(
     pos_summary: Optional[dict] = None,
     bypass_ai_throttle: bool = False,
     attempt_context: Optional[str] = None,
+    speculative: bool = False,
 ) -> tuple[str, int]:
     """New spec entry flow.
 
@@ -5110,6 +6005,8 @@ def _attempt_entry_from_lorentzian(
     - SECONDARY trigger: ZonesTouch gated by recent Sweep in TTL cache
     - Q-Trend / Lorentzian / FVG: context-only, read from in-memory cache.
     - setup_grade (A+/A/REJECT) injected into ORDER payload for downstream EA use.
+    - speculative=True: guards + AI scoring only (result parked for the window-close attempt);
+      no status/metrics, no AI throttle, no orders/CLOSE.
     """
     trig_side = (normalized_trigger.get("side") or "").strip().lower()
     action = "BUY" if trig_side == "buy" else "SELL" if trig_side == "sell" else ""
@@ -5133,6 +6030,11 @@ def _attempt_entry_from_lorentzian(
         last_entry_bypass_ai_throttle=bool(bypass_ai_throttle),
     )
 
+    # Set once the AI decision is known; read by _finish for audit (cached vs fresh).
+    ai_cache_meta: Optional[Dict[str, Any]] = None
+    # Set when the local pre-filter scored this attempt; _finish logs agreement with the AI.
+    prefilter_meta: Optional[Dict[str, Any]] = None
+
     def _finish(
         message: str,
         http_status: int,
@@ -5148,6 +6050,16 @@ def _attempt_entry_from_lorentzian(
         window_signals: Optional[Dict[str, Any]] = None,
         zones_confirmed_recent: Optional[int] = None,
     ) -> tuple[str, int]:
+        if speculative:
+            return message, int(http_status)
+        if prefilter_meta and _entry_prefilter is not None and ai_score is not None and min_required is not None:
+            try:
+                _entry_prefilter.record_outcome(
+                    predicted_reject=bool(prefilter_meta.get("reject")),
+                    ai_rejected=int(ai_score) < int(min_required),
+                )
+            except Exception:
+                pass
         try:
             _record_entry_outcome(
                 symbol=symbol,
@@ -5167,6 +6079,8 @@ def _attempt_entry_from_lorentzian(
                 ai_latency_ms=ai_latency_ms,
                 attempt_context=(attempt_context if attempt_context else None),
                 bypass_ai_throttle=(bool(bypass_ai_throttle) if bypass_ai_throttle is not None else None),
+                ai_cached=((ai_cache_meta or {}).get("cached") if ai_cache_meta else None),
+                prefilter_p=((prefilter_meta or {}).get("p_reject") if prefilter_meta else None),
             )
         except Exception:
             pass
@@ -5186,6 +6100,8 @@ def _attempt_entry_from_lorentzian(
                     "ai_latency_ms": int(ai_latency_ms) if ai_latency_ms is not None else None,
                     "openai_response_id": (str(openai_response_id)[:80] if openai_response_id else None),
                     "ai_reason": (str(ai_reason)[:160] if ai_reason else None),
+                    "ai_cache": (dict(ai_cache_meta) if ai_cache_meta else None),
+                    "prefilter": (dict(prefilter_meta) if prefilter_meta else None),
                     "trigger": {
                         "source": (normalized_trigger or {}).get("source"),
                         "event": (normalized_trigger or {}).get("event"),
@@ -5212,7 +6128,7 @@ def _attempt_entry_from_lorentzian(
     # Market guard: block new entries during close/open hours based on broker time.
     if not check_trading_hours(symbol):
         # If positions are open, send CLOSE signal to EA.
-        if pos_summary and int((pos_summary or {}).get("positions_open") or 0) > 0:
+        if (not speculative) and pos_summary and int((pos_summary or {}).get("positions_open") or 0) > 0:
             try:
                 _zmq_send_json_with_metrics(
                     {"type": "CLOSE", "reason": "market_guard_close"},
@@ -5273,7 +6189,8 @@ def _attempt_entry_from_lorentzian(
                 return _finish("Skip (add-on limit)", 200, "skip_addon_limit")
             _addon_state_by_symbol[symbol] = st
 
-    market = get_mt5_market_data(symbol)
+    # Speculation reads the 24h spread average without adding a sample (the window-close attempt records it).
+    market = _market_for_decision(symbol, record_spread=(not speculative))
     try:
         if float(market.get("atr") or 0.0) > 0:
             _last_atr_by_symbol[symbol] = float(market.get("atr") or 0.0)
@@ -5353,7 +6270,7 @@ def _attempt_entry_from_lorentzian(
     # -------------------------------------------------------------------------
 
     # SpreadMed を更新し、spike 倍率チェックにも使う
-    spread_med = _update_spread_med(symbol, spread_points)
+    spread_med = _update_spread_med(symbol, spread_points, update=(not speculative))
 
     # [LRR-1] EV Hard Reject: ATR/spread が LRR_EV_HARD_MIN 未満 → コスト対効果ゼロ
     if LRR_EV_HARD_MIN > 0 and atr_to_spread_v is not None and atr_to_spread_v < LRR_EV_HARD_MIN:
@@ -5539,7 +6456,9 @@ def _attempt_entry_from_lorentzian(
     now_mono = time.time()
     _should_throttle = False
     with _ai_throttle_lock:  # [Phase1-Fix] Race condition防止: check-then-set をアトミックに
-        if (not bypass_ai_throttle) and _last_ai_attempt_key == attempt_key \
+        if speculative:
+            pass  # speculative scoring neither checks nor consumes the throttle
+        elif (not bypass_ai_throttle) and _last_ai_attempt_key == attempt_key \
                 and (now_mono - float(_last_ai_attempt_at or 0.0)) < AI_ENTRY_THROTTLE_SEC:
             _should_throttle = True
         else:
@@ -5549,6 +6468,49 @@ def _attempt_entry_from_lorentzian(
         _set_status(last_result="AI throttled", last_result_at=time.time())
         return _finish("AI throttled", 200, "ai_throttled", market=market, qtrend_ctx=qtrend_ctx, window_signals=window_signals, zones_confirmed_recent=int(stats.get("zones_confirmed_recent") or 0))
 
+    if _entry_prefilter is not None:
+        try:
+            pf_spread, pf_a2s, pf_atr_pts, pf_drift = _entry_market_features(market, normalized_trigger, action)
+            pf_p, pf_reject = _entry_prefilter.check(
+                {
+                    "ts": now,
+                    "action": action,
+                    "addon": is_addon,
+                    "attempt_context": attempt_context,
+                    "spread_points": pf_spread,
+                    "atr_to_spread": pf_a2s,
+                    "atr_points": pf_atr_pts,
+                    "drift_points": pf_drift,
+                    "qtrend": {"side": (qtrend_ctx or {}).get("side"), "strength": (qtrend_ctx or {}).get("strength")},
+                    "window_counts": (window_signals or {}).get("counts"),
+                    "zones_confirmed_recent": int(stats.get("zones_confirmed_recent") or 0),
+                    "trigger": normalized_trigger,
+                },
+                record=(not speculative),
+            )
+            prefilter_meta = {"p_reject": round(pf_p, 4), "reject": bool(pf_reject), "mode": _entry_prefilter.mode}
+        except Exception as e:
+            print(f"[FXAI][PREFILTER] predict failed: {e}")
+            prefilter_meta = None
+        if prefilter_meta and _entry_prefilter.enforces(prefilter_meta["reject"]):
+            if speculative:
+                return _finish("Speculative skipped (prefilter)", 200, "speculative")
+            _entry_prefilter.record_avoided()
+            _set_status(
+                last_result="Blocked by prefilter",
+                last_result_at=time.time(),
+                last_entry_guard={"prefilter": dict(prefilter_meta), "skip_prob": _entry_prefilter.skip_prob},
+            )
+            print(f"[FXAI][PREFILTER] Blocked {symbol} {action}: p_reject={prefilter_meta['p_reject']} >= {_entry_prefilter.skip_prob}")
+            return _finish("Blocked by prefilter", 403, "blocked_prefilter", market=market, qtrend_ctx=qtrend_ctx, window_signals=window_signals, zones_confirmed_recent=int(stats.get("zones_confirmed_recent") or 0))
+
+    # Freshness budget: the trigger is stale AI_ENTRY_BUDGET_SEC after receipt (delayed re-evaluations: after this attempt starts).
+    ai_deadline_at: Optional[float] = None
+    if AI_ENTRY_BUDGET_SEC > 0:
+        fresh_from = now if str(attempt_context or "").startswith("DE:") else float(normalized_trigger.get("receive_time") or now)
+        ai_deadline_at = fresh_from + float(AI_ENTRY_BUDGET_SEC)
+
+    ai_skip: Dict[str, Any] = {}
     ai_decision = _ai_entry_score(
         symbol,
         market,
@@ -5557,7 +6519,15 @@ def _attempt_entry_from_lorentzian(
         normalized_trigger=normalized_trigger,
         qtrend_context=qtrend_ctx,
         attempt_context=attempt_context,
+        speculative=speculative,
+        deadline_at=ai_deadline_at,
+        skip_sink=ai_skip,
     )
+    if speculative:
+        return _finish("Speculative AI scored", 200, "speculative")
+    if not ai_decision and ai_skip.get("reason") == "circuit_open":
+        _set_status(last_result="Blocked by AI (circuit open)", last_result_at=time.time())
+        return _finish("Blocked by AI (circuit open)", 503, "blocked_ai_circuit_open", market=market, qtrend_ctx=qtrend_ctx, window_signals=window_signals, zones_confirmed_recent=int(stats.get("zones_confirmed_recent") or 0))
     if not ai_decision:
         _set_status(last_result="Blocked by AI (no score)", last_result_at=time.time())
         return _finish("Blocked by AI", 503, "blocked_ai_no_score", market=market, qtrend_ctx=qtrend_ctx, window_signals=window_signals, zones_confirmed_recent=int(stats.get("zones_confirmed_recent") or 0))
@@ -5567,6 +6537,13 @@ def _attempt_entry_from_lorentzian(
     lot_mult = float(ai_decision.get("lot_multiplier") or 1.0)
     openai_response_id = ai_decision.get("_openai_response_id")
     ai_latency_ms = ai_decision.get("_ai_latency_ms")
+    if ai_decision.get("_ai_cache_key") or ai_decision.get("_ai_speculative"):
+        ai_cache_meta = {
+            "cached": bool(ai_decision.get("_ai_cached")),
+            "key": ai_decision.get("_ai_cache_key"),
+            "age_sec": ai_decision.get("_ai_cache_age_sec"),
+            "speculative": bool(ai_decision.get("_ai_speculative")),
+        }
 
     if is_addon:
         min_addon_score = int(ADDON_MIN_AI_SCORE or AI_ENTRY_MIN_SCORE)
@@ -5688,6 +6665,7 @@ def _attempt_entry_from_lorentzian(
         "ai_reason": ai_reason,
         "setup_grade": _setup_grade,
         "pyramid": bool(_is_pyramid),  # [Phase4] ピラミッティング識別フラグ
+        "ai_cached": bool((ai_cache_meta or {}).get("cached")),  # audit: score reused from the entry AI cache
     }
 
     # Acquire processing lock right before order placement to prevent duplicate orders.
@@ -5745,6 +6723,7 @@ def _attempt_entry_from_lorentzian(
                 "multiplier": final_multiplier,
                 "ai_confidence": ai_score,
                 "ai_reason": ai_reason,
+                "ai_cache": (dict(ai_cache_meta) if ai_cache_meta else None),
                 "trigger": {
                     "source": normalized_trigger.get("source"),
                     "event": normalized_trigger.get("event"),
@@ -5882,22 +6861,24 @@ def webhook():
     }
 
     normalized = _normalize_signal_fields(signal)
+    record = _fxai_signal_record.SignalRecord.from_normalized(normalized)
 
     with signals_lock:
-        cache_before = len(signals_cache)
-        appended = _append_signal_dedup_locked(normalized)
-        cache_after = len(signals_cache)
+        cache_before = len(_signal_store)
+        appended = _append_signal_dedup_locked(record)
+        cache_after = len(_signal_store)
         _prune_signals_cache_locked(now)
-        cache_after_prune = len(signals_cache)
+        cache_after_prune = len(_signal_store)
         _mark_cache_dirty_locked(now)
-        if not CACHE_ASYNC_FLUSH_ENABLED:
-            _save_cache_locked()
-        
+
         if appended:
             print(f"[DEBUG] Cache: before={cache_before}, after_append={cache_after}, after_prune={cache_after_prune}, dirty={_cache_dirty}")
         elif cache_before == 0:
             print(f"[WARN] Failed to append signal to empty cache!")
 
+    if not CACHE_ASYNC_FLUSH_ENABLED:
+        _flush_cache_journal(now)
+
     # Record webhook-level metrics (even if duplicate)
     try:
         _record_webhook_metric(symbol, (normalized.get("signal_type") or ""), bool(appended))
@@ -6023,7 +7004,7 @@ def webhook():
     # --- POSITION MANAGEMENT MODE (CLOSE/HOLD) ---
     # When positions are open, defer the management AI by a short settle window so that
     # near-simultaneous context alerts can be included and we avoid conflicting decisions.
-    pos_summary = get_mt5_positions_summary(symbol)
+    pos_summary = _positions_for_decision(symbol)
     if int(pos_summary.get("positions_open") or 0) > 0:
         if AI_CLOSE_ENABLED and _schedule_deferred_mgmt(symbol, normalized, float(now)):
             # PYRAMID-DEFER: allow same-direction deferred entry while management is deferred.
@@ -6079,6 +7060,10 @@ def webhook():
             _clear_pending_entry(symbol, reason="order_sent")
         return resp
 
+    # New context inside an open aggregation window: re-speculate (no-op when the fingerprint is unchanged).
+    if ENTRY_SPECULATIVE_ENABLED and _is_entry_agg_pending(symbol):
+        _start_speculative_entry(symbol)
+
     # --- DELAYED_ENTRY (re-evaluate on later supportive context) ---
     if DELAYED_ENTRY_ENABLED:
         delayed_resp = _maybe_attempt_delayed_entry(symbol, normalized, float(now))
@@ -6146,6 +7131,8 @@ def metrics():
         "AI_ENTRY_MIN_SCORE_STRONG_ALIGNED": int(AI_ENTRY_MIN_SCORE_STRONG_ALIGNED),
         "ADDON_MIN_AI_SCORE": int(ADDON_MIN_AI_SCORE),
         "CONFLUENCE_WINDOW_SEC": int(CONFLUENCE_WINDOW_SEC),
+        "QTREND_STREAM_ENABLED": bool(QTREND_STREAM_ENABLED),
+        "QTREND_STREAM_PARITY": bool(QTREND_STREAM_PARITY),
         "POST_TRIGGER_WAIT_SEC": float(POST_TRIGGER_WAIT_SEC or 0.0),
         "ENTRY_POST_SIGNAL_WAIT_SEC": float(ENTRY_POST_SIGNAL_WAIT_SEC or 0.0),
         "ENTRY_POST_SIGNAL_MAX_WAIT_SEC": float(ENTRY_POST_SIGNAL_MAX_WAIT_SEC or 0.0),
@@ -6179,8 +7166,37 @@ def metrics():
         "SIGNAL_LOOKBACK_SEC": int(SIGNAL_LOOKBACK_SEC),
         "ZONE_LOOKBACK_SEC": int(ZONE_LOOKBACK_SEC),
         "ZONE_TOUCH_LOOKBACK_SEC": int(ZONE_TOUCH_LOOKBACK_SEC),
-        "SIGNAL_INDEX_ENABLED": bool(SIGNAL_INDEX_ENABLED),
-        "SIGNAL_INDEX_BUCKET_SEC": int(SIGNAL_INDEX_BUCKET_SEC),
+        "ZONES_NEAR_ATR_MULT": float(ZONES_NEAR_ATR_MULT),
+        "BAR_CACHE_ENABLED": bool(BAR_CACHE_ENABLED),
+        "BAR_CACHE_FULL_REFRESH_SEC": float(BAR_CACHE_FULL_REFRESH_SEC or 0.0),
+        "ATR_AVG_BARS": int(ATR_AVG_BARS),
+        "INDICATOR_STREAM_ENABLED": bool(INDICATOR_STREAM_ENABLED),
+        "LRR_SPREAD_MED_MODE": str(LRR_SPREAD_MED_MODE),
+        "MT5_ADAPTER": str(MT5_ADAPTER),
+        "AI_CONCURRENT_ENABLED": bool(AI_CONCURRENT_ENABLED),
+        "AI_DEADLINE_SEC": float(AI_DEADLINE_SEC),
+        "AI_HEDGE_ENABLED": bool(AI_HEDGE_ENABLED),
+        "AI_HEDGE_QUANTILE": float(AI_HEDGE_QUANTILE),
+        "AI_STREAM_ENABLED": bool(AI_STREAM_ENABLED),
+        "AI_ADAPTIVE_TIMEOUT_ENABLED": bool(AI_ADAPTIVE_TIMEOUT_ENABLED),
+        "AI_ENTRY_BUDGET_SEC": float(AI_ENTRY_BUDGET_SEC),
+        "AI_CLOSE_BUDGET_SEC": float(AI_CLOSE_BUDGET_SEC),
+        "AI_BREAKER_ENABLED": bool(AI_BREAKER_ENABLED),
+        "AI_GOVERNOR_ENABLED": bool(AI_GOVERNOR_ENABLED),
+        "AI_GOV_MAX_CONCURRENCY": int(AI_GOV_MAX_CONCURRENCY),
+        "AI_GOV_SHED_FROM": str(AI_GOV_SHED_FROM),
+        "SCHEDULER_ENABLED": bool(SCHEDULER_ENABLED),
+        "SCHEDULER_WORKERS": int(SCHEDULER_WORKERS),
+        "ENTRY_AI_CACHE_ENABLED": bool(ENTRY_AI_CACHE_ENABLED),
+        "ENTRY_AI_CACHE_TTL_SEC": float(ENTRY_AI_CACHE_TTL_SEC),
+        "ENTRY_SPECULATIVE_ENABLED": bool(ENTRY_SPECULATIVE_ENABLED),
+        "AI_PREFILTER_MODE": str(AI_PREFILTER_MODE),
+        "AI_PREFILTER_ACTIVE": bool(_entry_prefilter is not None),
+        "MT5_POLLER_ENABLED": bool(MT5_POLLER_ENABLED),
+        "MT5_POLL_INTERVAL_SEC": float(MT5_POLL_INTERVAL_SEC),
+        "MT5_SNAPSHOT_MAX_AGE_SEC": float(MT5_SNAPSHOT_MAX_AGE_SEC),
+        "POSITIONS_CACHE_ENABLED": bool(POSITIONS_CACHE_ENABLED),
+        "POSITIONS_CACHE_RECONCILE_SEC": float(POSITIONS_CACHE_RECONCILE_SEC),
         "REQUIRE_HTTPS": bool(REQUIRE_HTTPS),
         "WEBHOOK_RATE_LIMIT_RPM": int(WEBHOOK_RATE_LIMIT_RPM),
         "STATUS_RATE_LIMIT_RPM": int(STATUS_RATE_LIMIT_RPM),
@@ -6190,7 +7206,66 @@ def metrics():
         "PROMPT_COMPACT_ENABLED": bool(PROMPT_COMPACT_ENABLED),
         "PROMPT_MAX_LIST_ITEMS": int(PROMPT_MAX_LIST_ITEMS),
         "PROMPT_MAX_STR_LEN": int(PROMPT_MAX_STR_LEN),
+        "PROMPT_PREFIX_CACHE_ENABLED": bool(PROMPT_PREFIX_CACHE_ENABLED),
     }
+    if BAR_CACHE_ENABLED:
+        bar_stats = _bar_cache.stats()
+        calls = int(_market_data_calls)
+        bar_stats["market_data_calls"] = calls
+        # Uncached get_mt5_market_data made 3 copy_rates_from_pos calls (M15x30, M5x60, M5x62).
+        bar_stats["rates_ipc_per_call"] = round(_market_data_rates_ipc / calls, 3) if calls else None
+        bar_stats["rates_ipc_per_call_uncached"] = 3
+        snap["bar_cache"] = bar_stats
+    if INDICATOR_STREAM_ENABLED:
+        snap["indicator_stream"] = _indicator_stream.stats()
+    if MT5_ADAPTER == "sim":
+        snap["mt5_sim"] = mt5.stats()
+    snap["ai_latency"] = _ai_latency.stats()
+    snap["ai_usage"] = _ai_usage.stats()
+    if ENTRY_AI_CACHE_ENABLED:
+        snap["entry_ai_cache"] = _entry_ai_cache.stats()
+    if ENTRY_SPECULATIVE_ENABLED:
+        snap["entry_speculation"] = _entry_spec_slots.stats()
+    if _entry_prefilter is not None:
+        pf = _entry_prefilter.stats()
+        # Avoided calls x recent median entry AI latency.
+        p50 = _ai_latency.quantile("entry_score", 0.5)
+        pf["saved_ms_est"] = int(pf["calls_avoided"] * p50) if p50 is not None else None
+        snap["entry_prefilter"] = pf
+    if _ai_hedged is not None:
+        snap["ai_client"] = _ai_hedged.stats()
+    if AI_STREAM_ENABLED:
+        st_lat = _ai_stream_latency.stats()
+        first = st_lat.get("entry_score.first_usable") or {}
+        full = st_lat.get("entry_score.full") or {}
+        p50_gap = (
+            round(full["recent_p50_ms"] - first["recent_p50_ms"], 1)
+            if full.get("recent_p50_ms") is not None and first.get("recent_p50_ms") is not None
+            else None
+        )
+        snap["ai_streaming"] = {"latency": st_lat, "entry_score_p50_saved_ms": p50_gap}
+    if AI_ADAPTIVE_TIMEOUT_ENABLED:
+        snap["ai_timeouts_sec"] = {k: round(_ai_adaptive_timeout_sec(k), 3) for k in snap["ai_latency"]}
+    if AI_BREAKER_ENABLED:
+        snap["ai_breakers"] = _ai_breakers.stats()
+    if _ai_governor is not None:
+        snap["ai_governor"] = _ai_governor.stats()
+    if _scheduler is not None:
+        snap["scheduler"] = _scheduler.stats()
+    if MT5_POLLER_ENABLED:
+        snap["mt5_poller"] = _mt5_poller.stats()
+    if POSITIONS_CACHE_ENABLED:
+        snap["positions_cache"] = _positions_cache.stats()
+    with _spread_history_lock:
+        snap["spread_stats"] = {
+            sym: st.summary((0.5, 0.9, float(AUTO_TUNE_PCTL or 0.9)))
+            for sym, st in _spread_stats_by_symbol.items()
+        }
+    if QTREND_STREAM_PARITY:
+        snap["qtrend_stream_parity"] = {
+            "checks": int(_qtrend_stream_parity_checks),
+            "mismatches": int(_qtrend_stream_parity_mismatches),
+        }
 
     return Response(json.dumps(snap, ensure_ascii=False), mimetype="application/json"), 200
 
@@ -1,16 +1,343 @@
 import json
 import time
-from typing import Any, Dict, Optional, Tuple
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from threading import Event, Lock, Thread
+from typing import Any, Callable, Deque, Dict, Iterable, List, NamedTuple, Optional, Tuple, Union
+
+try:
+    import httpx
+except Exception:  # OpenAI SDK then builds its own default client
+    httpx = None  # type: ignore
+
+# Histogram bucket upper bounds (ms); the last bucket is open-ended.
+LATENCY_BUCKETS_MS = (100, 250, 500, 1000, 2000, 3000, 5000, 8000, 12000, 20000)
+
+SYSTEM_MESSAGE = "You are a strict trading engine. Output ONLY JSON."
+
+# Rough chars-per-token ratio, used only when the API reports no usage.
+_CHARS_PER_TOKEN = 4.0
+
+
+class PromptParts(NamedTuple):
+    """Prompt split into a byte-stable instruction block and the per-call context.
+
+    static is sent as its own message right after the system message so the
+    provider's automatic prompt cache can reuse it across calls; dynamic
+    (attempt context + JSON payload) always comes last.
+    """
+
+    static: str
+    dynamic: str
+
+
+Prompt = Union[str, PromptParts]
+
+
+def prompt_text(prompt: Prompt) -> str:
+    if isinstance(prompt, PromptParts):
+        return prompt.static + prompt.dynamic
+    return str(prompt or "")
+
+
+def _messages(prompt: Prompt) -> List[Dict[str, str]]:
+    msgs = [{"role": "system", "content": SYSTEM_MESSAGE}]
+    if isinstance(prompt, PromptParts):
+        msgs.append({"role": "user", "content": prompt.static})
+        msgs.append({"role": "user", "content": prompt.dynamic})
+    else:
+        msgs.append({"role": "user", "content": prompt})
+    return msgs
+
+
+def _usage_fields(res: Any, prompt: Prompt) -> Dict[str, Any]:
+    """Token usage of one response (API-reported when present) plus prompt sizes."""
+    text = prompt_text(prompt)
+    out: Dict[str, Any] = {
+        "prompt_chars": len(text),
+        "static_chars": len(prompt.static) if isinstance(prompt, PromptParts) else 0,
+        "prompt_tokens": None,
+        "cached_tokens": 0,
+        "completion_tokens": None,
+        "estimated": False,
+    }
+    usage = getattr(res, "usage", None)
+    if usage is not None:
+        out["prompt_tokens"] = getattr(usage, "prompt_tokens", None)
+        out["completion_tokens"] = getattr(usage, "completion_tokens", None)
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached = getattr(details, "cached_tokens", None) if details is not None else None
+        out["cached_tokens"] = int(cached or 0)
+    if out["prompt_tokens"] is None:
+        out["prompt_tokens"] = int(round(len(text) / _CHARS_PER_TOKEN))
+        out["estimated"] = True
+    return out
+
+
+def pooled_http_client(*, max_connections: int = 8, keepalive_sec: float = 60.0) -> Any:
+    """Shared keep-alive HTTP client for the OpenAI SDK (None when httpx is unavailable)."""
+    if httpx is None:
+        return None
+    limits = httpx.Limits(
+        max_connections=max(1, int(max_connections)),
+        max_keepalive_connections=max(1, int(max_connections)),
+        keepalive_expiry=max(1.0, float(keepalive_sec)),
+    )
+    return httpx.Client(limits=limits)
+
+
+class JSONFieldScanner:
+    """Incremental scanner for a streamed top-level JSON object.
+
+    feed() text chunks as they arrive; fields holds every top-level key whose
+    scalar value (string/number/bool/null) is complete. Nested values are
+    skipped; text before the opening brace (e.g. a ```json fence) is ignored.
+    """
+
+    __slots__ = ("fields", "_buf", "_i", "_depth", "_in_str", "_esc", "_str_start", "_scalar_start", "_expect", "_key")
+
+    def __init__(self) -> None:
+        self.fields: Dict[str, Any] = {}
+        self._buf = ""
+        self._i = 0
+        self._depth = 0
+        self._in_str = False
+        self._esc = False
+        self._str_start = 0
+        self._scalar_start: Optional[int] = None
+        self._expect = "key"  # key | colon | value | nested | comma
+        self._key: Optional[str] = None
+
+    def _set_scalar(self, end: int) -> None:
+        tok = self._buf[self._scalar_start:end]
+        self._scalar_start = None
+        self._expect = "comma"
+        try:
+            self.fields[str(self._key)] = json.loads(tok)
+        except ValueError:
+            pass
+
+    def feed(self, text: str) -> None:
+        self._buf += text
+        buf = self._buf
+        i = self._i
+        n = len(buf)
+        while i < n:
+            c = buf[i]
+            if self._in_str:
+                if self._esc:
+                    self._esc = False
+                elif c == "\\":
+                    self._esc = True
+                elif c == '"':
+                    self._in_str = False
+                    if self._depth == 1:
+                        try:
+                            v = json.loads(buf[self._str_start:i + 1])
+                        except ValueError:
+                            v = None
+                        if self._expect == "key":
+                            self._key = v
+                            self._expect = "colon"
+                        elif self._expect == "value":
+                            self.fields[str(self._key)] = v
+                            self._expect = "comma"
+                i += 1
+                continue
+            if self._scalar_start is not None:
+                if c not in ",}] \t\r\n":
+                    i += 1
+                    continue
+                self._set_scalar(i)
+            if c == '"':
+                self._in_str = True
+                self._str_start = i
+            elif c in "{[":
+                self._depth += 1
+                if self._depth == 1:
+                    self._expect = "key"
+                elif self._depth == 2 and self._expect == "value":
+                    self._expect = "nested"
+            elif c in "}]":
+                self._depth -= 1
+                if self._depth == 1 and self._expect == "nested":
+                    self._expect = "comma"
+            elif self._depth == 1:
+                if c == ":" and self._expect == "colon":
+                    self._expect = "value"
+                elif c == ",":
+                    self._expect = "key"
+                elif self._expect == "value" and c not in " \t\r\n":
+                    self._scalar_start = i
+            i += 1
+        self._i = i
+
+
+def _parse_json_content(raw: str) -> Any:
+    raw_content = (raw or "").strip()
+    if raw_content.startswith("```"):
+        raw_content = raw_content.replace("```json", "").replace("```", "").strip()
+    return json.loads(raw_content)
+
+
+def _stream_json(
+    *,
+    client: Any,
+    model: str,
+    prompt: Prompt,
+    timeout_sec: float,
+    early: Callable[[Dict[str, Any]], bool],
+    cancel: Optional[Event] = None,
+) -> Optional[Dict[str, Any]]:
+    """Streamed request that returns as soon as early(fields) accepts the fields seen so far.
+
+    The stream keeps being read on a daemon thread; the complete parsed
+    response (with _ai_latency_ms / _ai_usage of the full completion) is the
+    result of the Future in data["_ai_stream_full"]. An early return carries
+    _ai_partial=True and only the fields complete at that point. If the
+    stream ends before early() accepts, the full response is returned.
+    Raises TimeoutError when nothing usable arrives within timeout_sec.
+    Setting `cancel` closes the stream at its next chunk (a losing hedge).
+    """
+    t0 = time.time()
+    ready = Event()
+    full: Future = Future()
+    box: Dict[str, Any] = {}
+
+    def _reader() -> None:
+        scanner = JSONFieldScanner()
+        parts: List[str] = []
+        usage_chunk = None
+        rid = None
+        try:
+            stream = client.chat.completions.create(
+                model=model,
+                response_format={"type": "json_object"},
+                messages=_messages(prompt),
+                temperature=0.0,
+                timeout=timeout_sec,
+                store=True,
+                stream=True,
+                stream_options={"include_usage": True},
+            )
+            for chunk in stream:
+                if box.get("abandoned") or (cancel is not None and cancel.is_set()):
+                    try:
+                        stream.close()
+                    except Exception:
+                        pass
+                    raise TimeoutError("AI stream abandoned")
+                rid = rid or getattr(chunk, "id", None)
+                if getattr(chunk, "usage", None) is not None:
+                    usage_chunk = chunk
+                choices = getattr(chunk, "choices", None) or []
+                delta = (getattr(choices[0].delta, "content", None) or "") if choices else ""
+                if not delta:
+                    continue
+                parts.append(delta)
+                scanner.feed(delta)
+                if "early" not in box and early(scanner.fields):
+                    box["early"] = dict(scanner.fields)
+                    box["early_ms"] = int(round((time.time() - t0) * 1000.0))
+                    box["rid"] = rid
+                    ready.set()
+            data = _parse_json_content("".join(parts))
+            if not isinstance(data, dict):
+                raise ValueError("AI stream: response is not a JSON object")
+            data["_openai_response_id"] = rid
+            data["_ai_latency_ms"] = int(round((time.time() - t0) * 1000.0))
+            try:
+                data["_ai_usage"] = _usage_fields(usage_chunk, prompt)
+            except Exception:
+                data["_ai_usage"] = None
+            full.set_result(data)
+        except Exception as e:
+            full.set_exception(e)
+        finally:
+            ready.set()
+
+    Thread(target=_reader, daemon=True, name="ai-stream").start()
+    if not ready.wait(max(0.05, float(timeout_sec))):
+        box["abandoned"] = True
+        raise TimeoutError("AI stream: no usable fields before timeout")
+    if "early" in box:
+        data = dict(box["early"])
+        data["_openai_response_id"] = box.get("rid")
+        data["_ai_latency_ms"] = box["early_ms"]
+        data["_ai_first_field_ms"] = box["early_ms"]
+        data["_ai_partial"] = True
+        data["_ai_stream_full"] = full
+        return data
+    data = dict(full.result(timeout=0))  # raises the reader's error
+    data["_ai_first_field_ms"] = data.get("_ai_latency_ms")
+    return data
+
+
+def _request_json(
+    *,
+    client: Any,
+    model: str,
+    prompt: Prompt,
+    timeout_sec: float,
+    early: Optional[Callable[[Dict[str, Any]], bool]] = None,
+    cancel: Optional[Event] = None,
+) -> Optional[Dict[str, Any]]:
+    """One chat.completions request parsed as JSON (raises on transport/parse errors).
+
+    early: streaming mode, see _stream_json (cancel only applies there; a
+    non-streamed request cannot be interrupted and runs to its timeout).
+    """
+    if early is not None:
+        return _stream_json(client=client, model=model, prompt=prompt, timeout_sec=timeout_sec, early=early, cancel=cancel)
+    t0 = time.time()
+    res = client.chat.completions.create(
+        model=model,
+        response_format={"type": "json_object"},
+        messages=_messages(prompt),
+        temperature=0.0,
+        timeout=timeout_sec,
+        store=True,
+    )
+    data = _parse_json_content(res.choices[0].message.content or "")
+    if isinstance(data, dict):
+        try:
+            data["_openai_response_id"] = getattr(res, "id", None)
+        except Exception:
+            data["_openai_response_id"] = None
+        try:
+            data["_ai_latency_ms"] = int(round((time.time() - t0) * 1000.0))
+        except Exception:
+            data["_ai_latency_ms"] = None
+        try:
+            data["_ai_usage"] = _usage_fields(res, prompt)
+        except Exception:
+            data["_ai_usage"] = None
+    return data if isinstance(data, dict) else None
+
+
+def _count_error(e: Exception, err_counts: Dict[str, int]) -> bool:
+    """Add e to err_counts; returns True for timeouts."""
+    try:
+        name = type(e).__name__
+        err_counts[name] = int(err_counts.get(name) or 0) + 1
+    except Exception:
+        pass
+    try:
+        return "timeout" in type(e).__name__.lower() or isinstance(e, TimeoutError)
+    except Exception:
+        return False
 
 
 def call_openai_json_with_retry(
     *,
     client: Any,
     model: str,
-    prompt: str,
+    prompt: Prompt,
     timeout_sec: float,
     retry_count: int,
     retry_wait_sec: float,
+    deadline_sec: float = 0.0,
+    early: Optional[Callable[[Dict[str, Any]], bool]] = None,
 ) -> Tuple[Optional[Dict[str, Any]], Dict[str, int], int, int, Optional[Exception]]:
     """Call OpenAI chat.completions and parse JSON response.
 
@@ -18,7 +345,12 @@ def call_openai_json_with_retry(
 
     Notes:
     - Strips ```json fences if present.
-    - Adds _openai_response_id and _ai_latency_ms when possible.
+    - Adds _openai_response_id, _ai_latency_ms and _ai_usage when possible.
+    - prompt may be a PromptParts (static prefix + dynamic context).
+    - deadline_sec > 0 caps each request timeout by the remaining budget and
+      stops retrying once it is spent.
+    - early: stream the response and return once early(fields) accepts
+      (see _stream_json).
     - Does NOT log; caller decides logging/metrics.
     """
 
@@ -30,53 +362,516 @@ def call_openai_json_with_retry(
     if client is None:
         return None, err_counts, timeout_attempts, attempts, None
 
+    deadline = time.monotonic() + float(deadline_sec) if float(deadline_sec or 0.0) > 0 else float("inf")
     for i in range(max(1, int(retry_count))):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0.05:
+            last_err = last_err or TimeoutError("AI deadline exceeded")
+            break
         attempts += 1
         try:
-            t0 = time.time()
-            res = client.chat.completions.create(
-                model=model,
-                response_format={"type": "json_object"},
-                messages=[
-                    {"role": "system", "content": "You are a strict trading engine. Output ONLY JSON."},
-                    {"role": "user", "content": prompt},
-                ],
-                temperature=0.0,
-                timeout=timeout_sec,
-                store=True,
+            data = _request_json(
+                client=client, model=model, prompt=prompt, timeout_sec=min(float(timeout_sec), remaining), early=early
             )
-            raw_content = (res.choices[0].message.content or "").strip()
-            if raw_content.startswith("```"):
-                raw_content = raw_content.replace("```json", "").replace("```", "").strip()
-
-            data = json.loads(raw_content)
-            if isinstance(data, dict):
-                try:
-                    data["_openai_response_id"] = getattr(res, "id", None)
-                except Exception:
-                    data["_openai_response_id"] = None
-                try:
-                    data["_ai_latency_ms"] = int(round((time.time() - t0) * 1000.0))
-                except Exception:
-                    data["_ai_latency_ms"] = None
-            return data if isinstance(data, dict) else None, err_counts, timeout_attempts, attempts, None
+            return data, err_counts, timeout_attempts, attempts, None
         except Exception as e:
             last_err = e
-            try:
-                name = type(e).__name__
-                err_counts[name] = int(err_counts.get(name) or 0) + 1
-            except Exception:
-                pass
-
-            try:
-                if "timeout" in type(e).__name__.lower():
-                    timeout_attempts += 1
-                elif isinstance(e, TimeoutError):
-                    timeout_attempts += 1
-            except Exception:
-                pass
+            if _count_error(e, err_counts):
+                timeout_attempts += 1
 
             if i < (max(1, int(retry_count)) - 1):
-                time.sleep(max(0.0, float(retry_wait_sec)))
+                time.sleep(max(0.0, min(float(retry_wait_sec), deadline - time.monotonic())))
 
     return None, err_counts, timeout_attempts, attempts, last_err
+
+
+class LatencyHistograms:
+    """Per-kind AI latency: fixed-bucket histogram + recent samples for quantiles."""
+
+    def __init__(self, *, recent: int = 256) -> None:
+        self._lock = Lock()
+        self._recent_n = max(16, int(recent))
+        self._hist: Dict[str, List[int]] = {}
+        self._recent: Dict[str, Deque[float]] = {}
+        self._failures: Dict[str, int] = {}
+
+    def record(self, kind: str, latency_ms: float) -> None:
+        k = str(kind or "unknown")
+        ms = max(0.0, float(latency_ms))
+        idx = len(LATENCY_BUCKETS_MS)
+        for i, ub in enumerate(LATENCY_BUCKETS_MS):
+            if ms <= ub:
+                idx = i
+                break
+        with self._lock:
+            h = self._hist.get(k)
+            if h is None:
+                h = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+                self._hist[k] = h
+                self._recent[k] = deque(maxlen=self._recent_n)
+            h[idx] += 1
+            self._recent[k].append(ms)
+
+    def record_result(self, kind: str, data: Optional[Dict[str, Any]], latency_ms: Optional[float] = None) -> None:
+        """Record the full-completion latency of a successful call result.
+
+        A partial streamed result (_ai_partial) is recorded only when its
+        background completion (_ai_stream_full) finishes, so quantiles used for
+        timeouts and hedging never see time-to-first-usable.
+        """
+        if not isinstance(data, dict):
+            return
+        fut = data.get("_ai_stream_full")
+        if fut is not None and data.get("_ai_partial"):
+            def _on_full(f: Future) -> None:
+                try:
+                    full = f.result()
+                except Exception:
+                    self.record_failure(kind)
+                    return
+                if full.get("_ai_latency_ms") is not None:
+                    self.record(kind, float(full["_ai_latency_ms"]))
+
+            fut.add_done_callback(_on_full)
+            return
+        ms = latency_ms if latency_ms is not None else data.get("_ai_latency_ms")
+        if ms is not None:
+            self.record(kind, float(ms))
+
+    def record_failure(self, kind: str) -> None:
+        k = str(kind or "unknown")
+        with self._lock:
+            self._failures[k] = int(self._failures.get(k) or 0) + 1
+
+    def quantile(self, kind: str, q: float, *, min_samples: int = 1) -> Optional[float]:
+        """Quantile (ms) of the recent successful latencies of kind, None below min_samples."""
+        with self._lock:
+            vals = sorted(self._recent.get(str(kind or "unknown")) or ())
+        if not vals or len(vals) < max(1, int(min_samples)):
+            return None
+        return vals[min(len(vals) - 1, int(max(0.0, min(1.0, q)) * (len(vals) - 1)))]
+
+    def stats(self) -> Dict[str, Any]:
+        labels = [f"le_{ub}" for ub in LATENCY_BUCKETS_MS] + ["inf"]
+        out: Dict[str, Any] = {}
+        with self._lock:
+            kinds = sorted(set(self._hist) | set(self._failures))
+            snap = {k: (list(self._hist.get(k) or []), sorted(self._recent.get(k) or ()), self._failures.get(k, 0)) for k in kinds}
+        for k, (h, vals, fails) in snap.items():
+            def _q(q: float) -> Optional[float]:
+                return round(vals[min(len(vals) - 1, int(q * (len(vals) - 1)))], 1) if vals else None
+
+            out[k] = {
+                "count": int(sum(h)),
+                "failures": int(fails),
+                "buckets_ms": dict(zip(labels, h)) if h else {},
+                "recent_p50_ms": _q(0.50),
+                "recent_p90_ms": _q(0.90),
+                "recent_p99_ms": _q(0.99),
+            }
+        return out
+
+
+def adaptive_timeout_sec(
+    latency: "LatencyHistograms",
+    kind: str,
+    *,
+    quantile: float = 0.99,
+    multiplier: float = 1.5,
+    min_samples: int = 20,
+    floor_sec: float = 2.0,
+    ceiling_sec: float = 20.0,
+) -> float:
+    """Per-request timeout from the kind's recent latency: q-quantile x multiplier, clamped.
+
+    ceiling_sec (the static API timeout) is used until min_samples successes exist.
+    """
+    q = latency.quantile(kind, quantile, min_samples=min_samples)
+    if q is None:
+        return float(ceiling_sec)
+    return max(float(floor_sec), min(float(ceiling_sec), (q / 1000.0) * float(multiplier)))
+
+
+class CircuitBreakers:
+    """Per-kind circuit breaker over AI call outcomes.
+
+    closed: calls pass; the breaker opens when the failure rate over the last
+    window_sec reaches failure_rate with at least min_calls outcomes.
+    open: allow() is False (callers fail fast to their fallback) for open_sec.
+    half_open: up to half_open_probes concurrent probe calls pass; a probe
+    success closes the breaker, a probe failure re-opens it.
+    """
+
+    def __init__(
+        self,
+        *,
+        failure_rate: float = 0.5,
+        min_calls: int = 6,
+        window_sec: float = 60.0,
+        open_sec: float = 30.0,
+        half_open_probes: int = 1,
+    ) -> None:
+        self._lock = Lock()
+        self._failure_rate = max(0.0, min(1.0, float(failure_rate)))
+        self._min_calls = max(1, int(min_calls))
+        self._window = max(1.0, float(window_sec))
+        self._open_sec = max(0.0, float(open_sec))
+        self._probes = max(1, int(half_open_probes))
+        self._kinds: Dict[str, Dict[str, Any]] = {}
+
+    def _get_locked(self, kind: str) -> Dict[str, Any]:
+        k = str(kind or "unknown")
+        st = self._kinds.get(k)
+        if st is None:
+            st = {
+                "state": "closed",
+                "outcomes": deque(),  # (monotonic_ts, ok)
+                "opened_at": 0.0,
+                "probes_in_flight": 0,
+                "opens": 0,
+                "rejected": 0,
+                "last_change_at": time.time(),
+            }
+            self._kinds[k] = st
+        return st
+
+    def _set_state_locked(self, st: Dict[str, Any], state: str) -> None:
+        st["state"] = state
+        st["last_change_at"] = time.time()
+        if state == "open":
+            st["opened_at"] = time.monotonic()
+            st["opens"] += 1
+            st["probes_in_flight"] = 0
+        elif state == "closed":
+            st["outcomes"].clear()
+            st["probes_in_flight"] = 0
+
+    def allow(self, kind: str) -> Tuple[bool, bool]:
+        """(allowed, is_probe). A probe must be followed by record()."""
+        now = time.monotonic()
+        with self._lock:
+            st = self._get_locked(kind)
+            if st["state"] == "open":
+                if now - st["opened_at"] < self._open_sec:
+                    st["rejected"] += 1
+                    return False, False
+                self._set_state_locked(st, "half_open")
+            if st["state"] == "half_open":
+                if st["probes_in_flight"] >= self._probes:
+                    st["rejected"] += 1
+                    return False, False
+                st["probes_in_flight"] += 1
+                return True, True
+            return True, False
+
+    def record(self, kind: str, ok: bool, *, probe: bool = False) -> None:
+        now = time.monotonic()
+        with self._lock:
+            st = self._get_locked(kind)
+            if probe:
+                st["probes_in_flight"] = max(0, st["probes_in_flight"] - 1)
+            if st["state"] == "half_open":
+                # Only probes decide; late outcomes of calls started before opening are ignored.
+                if probe:
+                    self._set_state_locked(st, "closed" if ok else "open")
+                return
+            if st["state"] != "closed":
+                return
+            out = st["outcomes"]
+            out.append((now, bool(ok)))
+            while out and now - out[0][0] > self._window:
+                out.popleft()
+            fails = sum(1 for _, o in out if not o)
+            if len(out) >= self._min_calls and fails / float(len(out)) >= self._failure_rate:
+                self._set_state_locked(st, "open")
+
+    def state(self, kind: str) -> str:
+        with self._lock:
+            st = self._kinds.get(str(kind or "unknown"))
+            if st is None:
+                return "closed"
+            if st["state"] == "open" and time.monotonic() - st["opened_at"] >= self._open_sec:
+                return "half_open"  # next allow() admits a probe
+            return str(st["state"])
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        out: Dict[str, Any] = {}
+        with self._lock:
+            for k, st in sorted(self._kinds.items()):
+                recent = [o for t, o in st["outcomes"] if now - t <= self._window]
+                fails = sum(1 for o in recent if not o)
+                out[k] = {
+                    "state": st["state"],
+                    "opens": st["opens"],
+                    "rejected": st["rejected"],
+                    "window_calls": len(recent),
+                    "window_failure_rate": round(fails / len(recent), 4) if recent else None,
+                    "open_remaining_sec": (
+                        round(max(0.0, self._open_sec - (now - st["opened_at"])), 1) if st["state"] == "open" else None
+                    ),
+                    "last_change_at": st["last_change_at"],
+                }
+        return out
+
+
+class TokenUsage:
+    """Per-kind prompt size, token and cost totals of successful AI calls.
+
+    Prices are USD per 1M tokens; cached input tokens are billed at
+    cached_input_price instead of input_price. Only the winning request of
+    a hedged call is seen here (a losing duplicate is billed but unreported).
+    """
+
+    def __init__(
+        self,
+        *,
+        input_price: float = 0.0,
+        cached_input_price: float = 0.0,
+        output_price: float = 0.0,
+    ) -> None:
+        self._lock = Lock()
+        self._prices = (max(0.0, float(input_price)), max(0.0, float(cached_input_price)), max(0.0, float(output_price)))
+        self._kinds: Dict[str, Dict[str, Any]] = {}
+
+    def cost_usd(self, usage: Dict[str, Any]) -> float:
+        p_in, p_cached, p_out = self._prices
+        prompt_tokens = int(usage.get("prompt_tokens") or 0)
+        cached = min(prompt_tokens, int(usage.get("cached_tokens") or 0))
+        completion = int(usage.get("completion_tokens") or 0)
+        return ((prompt_tokens - cached) * p_in + cached * p_cached + completion * p_out) / 1_000_000.0
+
+    def record(self, kind: str, usage: Optional[Dict[str, Any]]) -> None:
+        if not isinstance(usage, dict):
+            return
+        k = str(kind or "unknown")
+        cost = self.cost_usd(usage)
+        with self._lock:
+            st = self._kinds.get(k)
+            if st is None:
+                st = {
+                    "calls": 0,
+                    "estimated_calls": 0,
+                    "prompt_chars": 0,
+                    "static_chars": 0,
+                    "prompt_tokens": 0,
+                    "cached_tokens": 0,
+                    "completion_tokens": 0,
+                    "cost_usd": 0.0,
+                }
+                self._kinds[k] = st
+            st["calls"] += 1
+            st["estimated_calls"] += int(bool(usage.get("estimated")))
+            for key in ("prompt_chars", "static_chars", "prompt_tokens", "cached_tokens", "completion_tokens"):
+                st[key] += int(usage.get(key) or 0)
+            st["cost_usd"] += cost
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            snap = {k: dict(v) for k, v in self._kinds.items()}
+        p_in, p_cached, p_out = self._prices
+        out: Dict[str, Any] = {"prices_per_mtok": {"input": p_in, "cached_input": p_cached, "output": p_out}}
+        for k, st in sorted(snap.items()):
+            n = max(1, int(st["calls"]))
+            st["cost_usd"] = round(float(st["cost_usd"]), 6)
+            st["avg_prompt_chars"] = int(st["prompt_chars"] / n)
+            st["avg_prompt_tokens"] = int(st["prompt_tokens"] / n)
+            st["cached_token_ratio"] = round(st["cached_tokens"] / st["prompt_tokens"], 4) if st["prompt_tokens"] else None
+            st["avg_cost_usd"] = round(float(st["cost_usd"]) / n, 6)
+            out[k] = st
+        return out
+
+
+class HedgedAIClient:
+    """OpenAI JSON calls with an overall deadline and a hedged second request.
+
+    Attempts run on a small shared thread pool (the OpenAI client and its
+    pooled HTTP connections are shared). When the first request of an
+    attempt is still pending after the kind's observed p-quantile latency
+    (hedge_quantile, default p90; hedge_default_sec until hedge_min_samples
+    successes exist), one duplicate request is sent and whichever answers
+    first wins. Each request timeout is capped by the remaining deadline;
+    retries only happen while budget remains. A request still running at
+    the deadline, or losing to its hedge, is abandoned: streamed requests
+    are cancelled at their next chunk, non-streamed ones keep a pool worker
+    and an HTTP connection until they finish or hit timeout_sec. The pool
+    has max_workers + max_abandoned threads, and no hedge is sent while
+    max_abandoned abandoned requests are still running, so losers cannot
+    starve live calls of workers.
+
+    call_json() returns the same tuple as call_openai_json_with_retry.
+    """
+
+    def __init__(
+        self,
+        *,
+        client: Any,
+        model: str,
+        max_workers: int = 8,
+        max_abandoned: Optional[int] = None,
+        hedge_enabled: bool = True,
+        hedge_quantile: float = 0.9,
+        hedge_min_samples: int = 20,
+        hedge_default_sec: float = 3.0,
+        hedge_min_sec: float = 0.2,
+        latency: Optional[LatencyHistograms] = None,
+    ) -> None:
+        self.client = client
+        self.model = model
+        self.latency = latency if latency is not None else LatencyHistograms()
+        workers = max(2, int(max_workers))
+        self._max_abandoned = max(1, int(max_abandoned if max_abandoned is not None else workers // 2))
+        self._pool = ThreadPoolExecutor(max_workers=workers + self._max_abandoned, thread_name_prefix="ai-call")
+        self._hedge_enabled = bool(hedge_enabled)
+        self._hedge_q = float(hedge_quantile)
+        self._hedge_min_samples = int(hedge_min_samples)
+        self._hedge_default = float(hedge_default_sec)
+        self._hedge_min = float(hedge_min_sec)
+        self._lock = Lock()
+        self._stats = {
+            "calls": 0,
+            "requests": 0,
+            "hedges": 0,
+            "hedge_wins": 0,
+            "deadline_exceeded": 0,
+            "abandoned": 0,
+            "abandoned_inflight": 0,
+            "hedges_skipped_abandoned": 0,
+        }
+
+    def _inc(self, key: str, n: int = 1) -> None:
+        with self._lock:
+            self._stats[key] += n
+
+    def _abandon(self, futures: Iterable[Future], cancels: Dict[Future, Event]) -> None:
+        """Stop waiting for futures: cancel their streams and track them until they finish."""
+        for f in futures:
+            cancels[f].set()
+            with self._lock:
+                self._stats["abandoned"] += 1
+                self._stats["abandoned_inflight"] += 1
+            f.add_done_callback(lambda _f: self._inc("abandoned_inflight", -1))
+
+    def _can_hedge_now(self) -> bool:
+        with self._lock:
+            if self._stats["abandoned_inflight"] < self._max_abandoned:
+                return True
+            self._stats["hedges_skipped_abandoned"] += 1
+            return False
+
+    def hedge_delay_sec(self, kind: str) -> float:
+        q = self.latency.quantile(kind, self._hedge_q, min_samples=self._hedge_min_samples)
+        sec = (q / 1000.0) if q is not None else self._hedge_default
+        return max(self._hedge_min, sec)
+
+    def _attempt(
+        self,
+        prompt: Prompt,
+        timeout_sec: float,
+        kind: str,
+        early: Optional[Callable[[Dict[str, Any]], bool]] = None,
+        cancel: Optional[Event] = None,
+    ) -> Optional[Dict[str, Any]]:
+        t0 = time.perf_counter()
+        try:
+            data = _request_json(
+                client=self.client, model=self.model, prompt=prompt, timeout_sec=timeout_sec, early=early, cancel=cancel
+            )
+        except Exception:
+            if cancel is None or not cancel.is_set():  # a cancelled losing hedge is not a failure
+                self.latency.record_failure(kind)
+            raise
+        self.latency.record_result(kind, data, (time.perf_counter() - t0) * 1000.0)
+        return data
+
+    def call_json(
+        self,
+        prompt: Prompt,
+        *,
+        kind: str,
+        deadline_sec: float,
+        timeout_sec: float,
+        retry_count: int,
+        retry_wait_sec: float,
+        early: Optional[Callable[[Dict[str, Any]], bool]] = None,
+    ) -> Tuple[Optional[Dict[str, Any]], Dict[str, int], int, int, Optional[Exception]]:
+        attempts = 0
+        timeout_attempts = 0
+        err_counts: Dict[str, int] = {}
+        last_err: Optional[Exception] = None
+        if self.client is None:
+            return None, err_counts, timeout_attempts, attempts, None
+
+        self._inc("calls")
+        start = time.monotonic()
+        deadline = start + float(deadline_sec) if float(deadline_sec or 0.0) > 0 else float("inf")
+        tries = max(1, int(retry_count))
+        for i in range(tries):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0.05:
+                self._inc("deadline_exceeded")
+                break
+            req_timeout = max(0.05, min(float(timeout_sec), remaining))
+            attempt_start = time.monotonic()
+            cancels: Dict[Future, Event] = {}
+            first_cancel = Event()
+            first = self._pool.submit(self._attempt, prompt, req_timeout, kind, early, first_cancel)
+            cancels[first] = first_cancel
+            pending = {first}
+            attempts += 1
+            self._inc("requests")
+            hedge_future: Optional[Future] = None
+            hedge_at = attempt_start + self.hedge_delay_sec(kind)
+            can_hedge = self._hedge_enabled and hedge_at < min(deadline, attempt_start + req_timeout) - 0.05
+
+            while pending:
+                now = time.monotonic()
+                wake = deadline
+                if can_hedge and hedge_future is None:
+                    wake = min(wake, hedge_at)
+                done, pending = wait(pending, timeout=(None if wake == float("inf") else max(0.0, wake - now)), return_when=FIRST_COMPLETED)
+                for f in done:
+                    e = f.exception()
+                    if e is None:
+                        data = f.result()
+                        if f is hedge_future:
+                            self._inc("hedge_wins")
+                        self._abandon(pending, cancels)
+                        return data, err_counts, timeout_attempts, attempts, None
+                    last_err = e  # type: ignore[assignment]
+                    if _count_error(e, err_counts):  # type: ignore[arg-type]
+                        timeout_attempts += 1
+                if done:
+                    continue
+                if can_hedge and hedge_future is None and time.monotonic() >= hedge_at:
+                    if not self._can_hedge_now():
+                        can_hedge = False
+                        continue
+                    left = deadline - time.monotonic()
+                    hedge_cancel = Event()
+                    hedge_future = self._pool.submit(
+                        self._attempt, prompt, max(0.05, min(float(timeout_sec), left)), kind, early, hedge_cancel
+                    )
+                    cancels[hedge_future] = hedge_cancel
+                    pending.add(hedge_future)
+                    attempts += 1
+                    self._inc("requests")
+                    self._inc("hedges")
+                    continue
+                if time.monotonic() >= deadline:
+                    self._inc("deadline_exceeded")
+                    timeout_attempts += len(pending)
+                    self._abandon(pending, cancels)
+                    return None, err_counts, timeout_attempts, attempts, (last_err or TimeoutError("AI deadline exceeded"))
+
+            if i < tries - 1:
+                time.sleep(max(0.0, min(float(retry_wait_sec), deadline - time.monotonic())))
+
+        return None, err_counts, timeout_attempts, attempts, last_err
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            out: Dict[str, Any] = dict(self._stats)
+        out["max_abandoned"] = self._max_abandoned
+        out["hedge_delay_sec"] = {k: round(self.hedge_delay_sec(k), 3) for k in self.latency.stats()}
+        return out
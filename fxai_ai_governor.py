@@ -0,0 +1,256 @@
+"""Priority-aware admission control in front of the AI client.
+
+Every AI call asks the governor for a slot with its kind (entry_score /
+close_hold) and a priority class. Admission needs a free global slot, a
+free slot under the kind's concurrency cap and a token from the kind's
+token bucket. Waiters are served in (priority, arrival) order; a waiter
+blocked only by its own kind's budget does not hold back other kinds.
+Under saturation, classes at or below shed_from are shed instead of queued.
+"""
+from __future__ import annotations
+
+import time
+from collections import deque
+from threading import Condition
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+# Lower value = served first.
+PRIORITIES: Dict[str, int] = {
+    "entry": 0,  # fresh primary entry trigger
+    "close": 1,  # reversal-like management decision
+    "reeval": 2,  # delayed-entry re-evaluation
+    "pyramid": 3,
+    "hold": 3,  # routine CLOSE/HOLD refresh
+    "speculative": 4,  # aggregation-window speculation
+}
+
+_WAIT_SAMPLES = 200
+
+
+class KindLimit(NamedTuple):
+    rate_per_min: float  # token refill rate; 0 = unlimited
+    burst: int  # bucket capacity
+    max_concurrency: int  # 0 = only the global cap applies
+
+
+class Ticket:
+    __slots__ = ("kind", "cls", "prio", "seq", "enqueued_at", "state")
+
+    def __init__(self, kind: str, cls: str, prio: int, seq: int, enqueued_at: float) -> None:
+        self.kind = kind
+        self.cls = cls
+        self.prio = prio
+        self.seq = seq
+        self.enqueued_at = enqueued_at  # time.monotonic()
+        self.state = "waiting"  # waiting / granted / shed / timeout / released
+
+
+class AICallGovernor:
+    """Token bucket + concurrency limits per kind, strict priority across classes.
+
+    acquire() returns (ticket, "ok") or (None, "shed" | "timeout"); every
+    granted ticket must be release()d. Thread-safe.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_concurrency: int,
+        limits: Dict[str, KindLimit],
+        queue_limit: int = 8,
+        shed_from: str = "reeval",
+        max_wait_sec: float = 10.0,
+    ) -> None:
+        self._cond = Condition()
+        self._max = max(1, int(max_concurrency))
+        self._limits = {str(k): v for k, v in (limits or {}).items()}
+        self._queue_limit = max(0, int(queue_limit))
+        self._shed_prio = PRIORITIES.get(str(shed_from or "").strip().lower(), PRIORITIES["reeval"])
+        self._max_wait = max(0.0, float(max_wait_sec))
+        self._seq = 0
+        self._in_flight = 0
+        self._waiters: List[Ticket] = []
+        self._max_depth = 0
+        self._kinds: Dict[str, Dict[str, Any]] = {}
+        self._classes: Dict[str, Dict[str, Any]] = {}
+
+    def _kind_locked(self, kind: str) -> Dict[str, Any]:
+        st = self._kinds.get(kind)
+        if st is None:
+            lim = self._limits.get(kind)
+            st = {
+                "tokens": float(lim.burst) if lim else 0.0,
+                "refilled_at": time.monotonic(),
+                "in_flight": 0,
+                "admitted": 0,
+                "shed": 0,
+                "timeouts": 0,
+            }
+            self._kinds[kind] = st
+        return st
+
+    def _class_locked(self, cls: str) -> Dict[str, Any]:
+        st = self._classes.get(cls)
+        if st is None:
+            st = {"admitted": 0, "shed": 0, "timeouts": 0, "queued": 0, "wait_ms_max": 0, "waits_ms": deque(maxlen=_WAIT_SAMPLES)}
+            self._classes[cls] = st
+        return st
+
+    def _refill_locked(self, kind: str, now: float) -> None:
+        lim = self._limits.get(kind)
+        st = self._kind_locked(kind)
+        if lim and lim.rate_per_min > 0:
+            st["tokens"] = min(float(max(1, lim.burst)), st["tokens"] + (now - st["refilled_at"]) * lim.rate_per_min / 60.0)
+        st["refilled_at"] = now
+
+    def _admissible_locked(self, kind: str, now: float) -> bool:
+        if self._in_flight >= self._max:
+            return False
+        lim = self._limits.get(kind)
+        if lim is None:
+            return True
+        st = self._kind_locked(kind)
+        if lim.max_concurrency > 0 and st["in_flight"] >= lim.max_concurrency:
+            return False
+        if lim.rate_per_min > 0:
+            self._refill_locked(kind, now)
+            return st["tokens"] >= 1.0
+        return True
+
+    def _token_eta_locked(self, kind: str) -> Optional[float]:
+        lim = self._limits.get(kind)
+        if not lim or lim.rate_per_min <= 0:
+            return None
+        st = self._kind_locked(kind)
+        return max(0.01, (1.0 - st["tokens"]) * 60.0 / lim.rate_per_min)
+
+    def _grant_locked(self, t: Ticket, now: float) -> None:
+        lim = self._limits.get(t.kind)
+        kst = self._kind_locked(t.kind)
+        if lim and lim.rate_per_min > 0:
+            kst["tokens"] -= 1.0
+        kst["in_flight"] += 1
+        kst["admitted"] += 1
+        self._in_flight += 1
+        t.state = "granted"
+        cst = self._class_locked(t.cls)
+        cst["admitted"] += 1
+        wait_ms = int((now - t.enqueued_at) * 1000.0)
+        cst["waits_ms"].append(wait_ms)
+        cst["wait_ms_max"] = max(cst["wait_ms_max"], wait_ms)
+
+    def _dispatch_locked(self, now: float) -> None:
+        granted = False
+        for t in sorted(self._waiters, key=lambda w: (w.prio, w.seq)):
+            if self._in_flight >= self._max:
+                break
+            if self._admissible_locked(t.kind, now):
+                self._waiters.remove(t)
+                self._grant_locked(t, now)
+                granted = True
+        if granted:
+            self._cond.notify_all()
+
+    def _drop_locked(self, t: Ticket, state: str) -> None:
+        if t in self._waiters:
+            self._waiters.remove(t)
+        t.state = state
+        key = "shed" if state == "shed" else "timeouts"
+        self._kind_locked(t.kind)[key] += 1
+        self._class_locked(t.cls)[key] += 1
+
+    def _shed_on_arrival_locked(self, t: Ticket) -> None:
+        # Low-priority work never queues behind more important waiters.
+        if t.prio >= self._shed_prio and any(w.prio < self._shed_prio for w in self._waiters if w is not t):
+            self._drop_locked(t, "shed")
+            return
+        if len(self._waiters) <= self._queue_limit:
+            return
+        victims = [w for w in self._waiters if w.prio >= self._shed_prio]
+        if victims:
+            victim = max(victims, key=lambda w: (w.prio, w.seq))
+            self._drop_locked(victim, "shed")
+            self._cond.notify_all()
+
+    def acquire(self, kind: str, cls: str, *, timeout_sec: Optional[float] = None) -> Tuple[Optional[Ticket], str]:
+        """timeout_sec: caller's remaining budget; capped by max_wait_sec."""
+        k = str(kind or "unknown")
+        c = str(cls or "entry")
+        limit = self._max_wait if timeout_sec is None else max(0.0, min(self._max_wait, float(timeout_sec)))
+        with self._cond:
+            now = time.monotonic()
+            self._seq += 1
+            t = Ticket(k, c, PRIORITIES.get(c, max(PRIORITIES.values())), self._seq, now)
+            self._waiters.append(t)
+            self._dispatch_locked(now)
+            if t.state == "waiting":
+                self._class_locked(c)["queued"] += 1
+                self._shed_on_arrival_locked(t)
+            self._max_depth = max(self._max_depth, len(self._waiters))
+            deadline = now + limit
+            while t.state == "waiting":
+                now = time.monotonic()
+                if now >= deadline:
+                    self._drop_locked(t, "timeout")
+                    break
+                wake = deadline - now
+                eta = self._token_eta_locked(k)
+                if eta is not None:
+                    wake = min(wake, eta)
+                self._cond.wait(wake)
+                if t.state == "waiting":
+                    self._dispatch_locked(time.monotonic())
+        if t.state == "granted":
+            return t, "ok"
+        return None, t.state
+
+    def release(self, ticket: Optional[Ticket]) -> None:
+        if ticket is None:
+            return
+        with self._cond:
+            if ticket.state != "granted":
+                return
+            ticket.state = "released"
+            self._in_flight = max(0, self._in_flight - 1)
+            kst = self._kind_locked(ticket.kind)
+            kst["in_flight"] = max(0, kst["in_flight"] - 1)
+            self._dispatch_locked(time.monotonic())
+            self._cond.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            now = time.monotonic()
+            for k in list(self._kinds):
+                self._refill_locked(k, now)
+            kinds = {k: {kk: (round(v, 2) if kk == "tokens" else v) for kk, v in st.items() if kk != "refilled_at"} for k, st in self._kinds.items()}
+            classes: Dict[str, Any] = {}
+            for c, st in self._classes.items():
+                waits = sorted(st["waits_ms"])
+                classes[c] = {
+                    "priority": PRIORITIES.get(c),
+                    "admitted": st["admitted"],
+                    "queued": st["queued"],
+                    "shed": st["shed"],
+                    "timeouts": st["timeouts"],
+                    "wait_ms_p50": waits[len(waits) // 2] if waits else None,
+                    "wait_ms_p90": waits[min(len(waits) - 1, int(0.9 * (len(waits) - 1) + 0.5))] if waits else None,
+                    "wait_ms_max": st["wait_ms_max"],
+                }
+            depth_by_class: Dict[str, int] = {}
+            for w in self._waiters:
+                depth_by_class[w.cls] = depth_by_class.get(w.cls, 0) + 1
+            for k, st in kinds.items():
+                lim = self._limits.get(k)
+                if lim:
+                    st["limit"] = lim._asdict()
+            return {
+                "in_flight": self._in_flight,
+                "max_concurrency": self._max,
+                "queue_depth": len(self._waiters),
+                "queue_depth_by_class": depth_by_class,
+                "max_queue_depth": self._max_depth,
+                "queue_limit": self._queue_limit,
+                "shed_from_priority": self._shed_prio,
+                "kinds": kinds,
+                "classes": classes,
+            }
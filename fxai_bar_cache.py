@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import time
+from threading import Lock
+from typing import Any, Callable, Dict, Optional, Tuple
+
+try:
+    import numpy as np
+except Exception:  # MT5 returns numpy structured arrays; plain lists are handled too.
+    np = None  # type: ignore
+
+
+def _bar_time(row: Any) -> float:
+    if isinstance(row, dict):
+        try:
+            return float(row.get("time") or 0.0)
+        except Exception:
+            return 0.0
+    try:
+        return float(row["time"])
+    except Exception:
+        pass
+    try:
+        return float(getattr(row, "time", 0.0) or 0.0)
+    except Exception:
+        return 0.0
+
+
+def _merge(cached: Any, fresh: Any, capacity: int) -> Any:
+    """Cached bars older than the first fetched bar + fetched bars, trimmed to capacity."""
+    first = _bar_time(fresh[0])
+    if np is not None and isinstance(cached, np.ndarray) and isinstance(fresh, np.ndarray):
+        merged = np.concatenate([cached[cached["time"] < first], fresh])
+    else:
+        merged = [r for r in cached if _bar_time(r) < first] + list(fresh)
+    return merged[-capacity:]
+
+
+class _Series:
+    __slots__ = ("bars", "capacity", "last_time", "full_at")
+
+    def __init__(self, bars: Any, capacity: int, full_at: float) -> None:
+        self.bars = bars
+        self.capacity = capacity
+        self.last_time = _bar_time(bars[-1])
+        self.full_at = full_at
+
+
+class BarCache:
+    """Per-(symbol, timeframe) cache of copy_rates_from_pos(symbol, tf, 0, count).
+
+    Bars are in MT5 order (oldest first; the last bar is still forming).
+    A request is served from the cache while the server time (tick.time) is
+    still inside the cached forming bar. Once that bar has closed, only the
+    bars since it are fetched (the closed bar is re-read with its final
+    values) and merged by bar time. Smaller counts for the same series are
+    tail slices, so overlapping requests (e.g. M5 x 60 and M5 x 62) share one
+    fetch. A full fetch is forced every full_refresh_sec, on a gap, or when
+    no server time is available.
+
+    Callers that use the forming bar's intrabar values must not use this
+    cache: within a bar they are as of the last fetch.
+    """
+
+    def __init__(
+        self,
+        *,
+        copy_rates_from_pos: Callable[[str, int, int, int], Any],
+        full_refresh_sec: float = 3600.0,
+    ) -> None:
+        self._fetch = copy_rates_from_pos
+        self._full_refresh_sec = float(full_refresh_sec or 0.0)
+        self._lock = Lock()
+        self._series: Dict[Tuple[str, int], _Series] = {}
+        self._stats = {"requests": 0, "hits": 0, "incremental": 0, "full": 0, "ipc_calls": 0, "fetched_bars": 0}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            out: Dict[str, Any] = dict(self._stats)
+            out["series"] = len(self._series)
+        req = int(out.get("requests") or 0)
+        out["hit_rate"] = round(out["hits"] / req, 4) if req else None
+        out["misses"] = int(out["incremental"]) + int(out["full"])
+        return out
+
+    def _ipc_locked(self, symbol: str, timeframe: int, count: int) -> Any:
+        self._stats["ipc_calls"] += 1
+        bars = self._fetch(symbol, timeframe, 0, count)
+        if bars is not None:
+            self._stats["fetched_bars"] += len(bars)
+        return bars
+
+    def rates(
+        self,
+        symbol: str,
+        timeframe: int,
+        count: int,
+        *,
+        tf_sec: float,
+        server_now: Optional[float],
+    ) -> Any:
+        key = ((symbol or "").strip().upper(), int(timeframe))
+        count = int(count)
+        mono = time.monotonic()
+        with self._lock:
+            self._stats["requests"] += 1
+            ent = self._series.get(key)
+            usable = (
+                ent is not None
+                and ent.capacity >= count
+                and server_now is not None
+                and server_now > 0
+                and (self._full_refresh_sec <= 0 or (mono - ent.full_at) < self._full_refresh_sec)
+            )
+            if usable and server_now < ent.last_time + tf_sec:
+                self._stats["hits"] += 1
+                return ent.bars[-count:]
+
+            if usable:
+                # Bars since the cached forming bar (inclusive); a time-based count never undercounts.
+                k = int((server_now - ent.last_time) // tf_sec) + 1
+                if k < ent.capacity:
+                    fresh = self._ipc_locked(symbol, timeframe, k)
+                    if fresh is not None and len(fresh) > 0 and _bar_time(fresh[0]) <= ent.last_time:
+                        ent.bars = _merge(ent.bars, fresh, ent.capacity)
+                        ent.last_time = _bar_time(ent.bars[-1])
+                        self._stats["incremental"] += 1
+                        return ent.bars[-count:]
+
+            capacity = max(count, ent.capacity if ent is not None else 0)
+            bars = self._ipc_locked(symbol, timeframe, capacity)
+            self._stats["full"] += 1
+            if bars is None or len(bars) == 0:
+                self._series.pop(key, None)
+                return bars
+            self._series[key] = _Series(bars, capacity, mono)
+            return bars[-count:]
@@ -0,0 +1,572 @@
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except Exception:  # numpy comes with the MetaTrader5 package; only this batch mode needs it.
+    np = None  # type: ignore
+
+try:
+    import fxai_qtrend as _fxai_qtrend
+    import fxai_signal_cache as _fxai_signal_cache
+    import fxai_window_signals as _fxai_window_signals
+except Exception:
+    from tradingView import fxai_qtrend as _fxai_qtrend
+    from tradingView import fxai_signal_cache as _fxai_signal_cache
+    from tradingView import fxai_window_signals as _fxai_window_signals
+
+
+# Must stay in sync with fxai_qtrend.compute_qtrend_anchor_stats.
+_Q_SOURCES = {"Q-Trend Strong", "Q-Trend", "Q-Trend-Strong", "Q-Trend-Normal"}
+_Q_STRONG_SOURCES = {"Q-Trend Strong", "Q-Trend-Strong"}
+_ALLOWED_EVIDENCE_SOURCES = ("Zones", "FVG", "OSGFC", "ZonesDetector", "LuxAlgo_FVG")
+_TOUCH_EVENTS = {"fvg_touch", "zone_retrace_touch", "zone_touch"}
+
+# Must stay in sync with fxai_window_signals.build_window_signals_payload.
+_WINDOW_ALLOWED_SOURCES = {"Q-Trend", "Q-Trend Strong", "Zones", "FVG"}
+_WINDOW_ALLOWED_EVENTS: Dict[str, Optional[set]] = {
+    "Q-Trend": None,
+    "Q-Trend Strong": None,
+    "Zones": {"zone_retrace_touch", "zone_touch", "new_zone_confirmed", "zone_confirmed"},
+    "FVG": {"fvg_touch"},
+}
+
+# Cap on gathered (anchors x window) cells per chunk.
+_MAX_CHUNK_CELLS = 4_000_000
+# Slack for searchsorted bounds; the exact float predicates are applied as masks.
+_SLACK_SEC = 1.0
+
+_POPCOUNT = None
+
+
+def _require_numpy() -> None:
+    if np is None:
+        raise RuntimeError("numpy is required for fxai_confluence_batch")
+
+
+def _factorize(values: Iterable[Any]) -> Tuple[Any, Tuple[Any, ...]]:
+    vocab: Dict[Any, int] = {}
+    codes = [vocab.setdefault(v, len(vocab)) for v in values]
+    return np.asarray(codes, dtype=np.int32), tuple(vocab)
+
+
+def _lut(vocab: Sequence[Any], fn: Callable[[Any], Any], dtype: Any = bool) -> Any:
+    return np.asarray([fn(v) for v in vocab], dtype=dtype)
+
+
+class SignalColumns:
+    """Columnar view of one symbol's SignalRecords for batch evaluation.
+
+    Rows are ordered by (signal_ts, input order), i.e. the iteration order the
+    scalar functions see. String fields are stored as integer codes into
+    `vocab`; `records` keeps the originals for building output dicts.
+    """
+
+    __slots__ = (
+        "symbol",
+        "records",
+        "vocab",
+        "signal_ts",
+        "signal_time",
+        "receive_time",
+        "source",
+        "side",
+        "event",
+        "signal_type",
+        "confirmed",
+        "strength",
+        "zone_presence",
+        "zone_touch",
+        "fvg",
+        "window_key",
+        "window_keys",
+    )
+
+    @classmethod
+    def from_records(cls, records: Iterable[Any], symbol: str) -> "SignalColumns":
+        _require_numpy()
+        sym = (symbol or "").strip().upper()
+        rows = [s for s in records if (s.symbol or "").strip().upper() == sym]
+        order = sorted(range(len(rows)), key=lambda i: (rows[i].signal_ts, i))
+        rows = [rows[i] for i in order]
+
+        self = cls()
+        self.symbol = sym
+        self.records = rows
+        self.vocab = {}
+
+        def _f(v: Any) -> float:
+            try:
+                return float(v or 0.0)
+            except Exception:
+                return 0.0
+
+        self.signal_ts = np.asarray([s.signal_ts for s in rows], dtype=np.float64)
+        self.signal_time = np.asarray([_f(s.signal_time) for s in rows], dtype=np.float64)
+        self.receive_time = np.asarray([s.receive_ts() for s in rows], dtype=np.float64)
+        for name in ("source", "side", "event", "signal_type", "confirmed", "strength"):
+            codes, vocab = _factorize(getattr(s, name) for s in rows)
+            setattr(self, name, codes)
+            self.vocab[name] = vocab
+        self.zone_presence = np.asarray([bool(s.is_zone_presence) for s in rows], dtype=bool)
+        self.zone_touch = np.asarray([bool(s.is_zone_touch) for s in rows], dtype=bool)
+        self.fvg = np.asarray([bool(s.is_fvg) for s in rows], dtype=bool)
+
+        # ±window payload: dedupe key (normalized source, event, side) or -1 when filtered out.
+        keys: Dict[Tuple[Any, Any, Any], int] = {}
+        window_key = []
+        for s in rows:
+            k = _window_compact_key(s)
+            window_key.append(-1 if k is None else keys.setdefault(k, len(keys)))
+        self.window_key = np.asarray(window_key, dtype=np.int32)
+        self.window_keys = tuple(keys)
+        return self
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def col(self, name: str, fn: Callable[[Any], Any], dtype: Any = bool) -> Any:
+        """Per-row value of fn(raw value) for a coded column."""
+        return _lut(self.vocab[name], fn, dtype)[getattr(self, name)]
+
+
+def _window_compact_key(s: Any) -> Optional[Tuple[Any, Any, Any]]:
+    src = (s.source or "")
+    if not src:
+        return None
+    if s.is_qtrend:
+        src = "Q-Trend Strong" if (str(s.strength or "").lower() == "strong" or "strong" in str(src).lower()) else "Q-Trend"
+    if src not in _WINDOW_ALLOWED_SOURCES:
+        return None
+    allowed_events = _WINDOW_ALLOWED_EVENTS.get(src)
+    evt = (s.event or "")
+    if isinstance(allowed_events, set) and evt.strip().lower() not in allowed_events:
+        return None
+    side = (s.side or "").strip().lower()
+    return (src, evt, side or None)
+
+
+def _chunks(n: int, width: int) -> Iterable[slice]:
+    step = max(1, _MAX_CHUNK_CELLS // max(1, width))
+    for i in range(0, n, step):
+        yield slice(i, min(n, i + step))
+
+
+def _gather(lo: Any, hi: Any) -> Tuple[Any, Any]:
+    """Index matrix for per-row slices [lo, hi) plus a validity mask."""
+    k = int(max(1, (hi - lo).max(initial=1)))
+    idx = lo[:, None] + np.arange(k)[None, :]
+    valid = idx < hi[:, None]
+    return np.where(valid, idx, 0), valid
+
+
+def _last_true(mask: Any) -> Tuple[Any, Any]:
+    k = mask.shape[1]
+    return mask.any(axis=1), (k - 1) - np.argmax(mask[:, ::-1], axis=1)
+
+
+def _popcount(bits: Any) -> Any:
+    global _POPCOUNT
+    if _POPCOUNT is None:
+        _POPCOUNT = np.asarray([bin(i).count("1") for i in range(1 << len(_ALLOWED_EVIDENCE_SOURCES))], dtype=np.int64)
+    return _POPCOUNT[bits]
+
+
+class _Freshness:
+    """filter_fresh_signals_from_normalized as a vectorized mask (plus "received by t")."""
+
+    def __init__(
+        self,
+        cols: SignalColumns,
+        *,
+        signal_max_age_sec: Any,
+        zone_lookback_sec: Any,
+        zone_touch_lookback_sec: Any,
+        fvg_lookback_sec: Any,
+    ) -> None:
+        self.cols = cols
+        self.zone_lb = float(zone_lookback_sec)
+        self.touch_lb = float(zone_touch_lookback_sec)
+        fvg_lb = float(fvg_lookback_sec or _fxai_signal_cache.DEFAULT_FVG_LOOKBACK_SEC)
+        self.age_lb = np.where(cols.fvg, fvg_lb, float(signal_max_age_sec))
+
+    def mask(self, idx: Any, t: Any) -> Any:
+        c = self.cols
+        rt = c.receive_time[idx]
+        sigt = c.signal_time[idx]
+        fresh_zp = (rt > 0) & ((t - rt) <= self.zone_lb)
+        fresh_zt = (rt > 0) & ((t - rt) <= self.touch_lb)
+        fresh_other = (sigt > 0) & ~(np.abs(t - sigt) > self.age_lb[idx])
+        fresh = np.where(c.zone_presence[idx], fresh_zp, np.where(c.zone_touch[idx], fresh_zt, fresh_other))
+        return fresh & (rt <= t)
+
+
+def qtrend_anchor_stats_batch(
+    cols: SignalColumns,
+    nows: Sequence[float],
+    *,
+    confluence_window_sec: Any,
+    signal_max_age_sec: Any,
+    zone_lookback_sec: Any,
+    zone_touch_lookback_sec: Any,
+    fvg_lookback_sec: Any,
+    weight_confirmed: Callable[[Any], float],
+) -> List[Optional[Dict[str, Any]]]:
+    """compute_qtrend_anchor_stats for many evaluation times at once.
+
+    For each t in `nows` the signal set is the symbol's records received at
+    or before t, freshness-filtered exactly like filter_fresh_signals_from_normalized
+    (see scalar_qtrend_anchor_stats). Returns one stats dict (or None) per t.
+    """
+    _require_numpy()
+    times = np.asarray(nows, dtype=np.float64)
+    out: List[Optional[Dict[str, Any]]] = [None] * len(times)
+    if not len(cols) or not len(times):
+        return out
+
+    fresh = _Freshness(
+        cols,
+        signal_max_age_sec=signal_max_age_sec,
+        zone_lookback_sec=zone_lookback_sec,
+        zone_touch_lookback_sec=zone_touch_lookback_sec,
+        fvg_lookback_sec=fvg_lookback_sec,
+    )
+    window = max(0, int(confluence_window_sec or 300))
+    st = cols.signal_ts
+    side = _lut(cols.vocab["side"], lambda v: 1 if v == "buy" else (-1 if v == "sell" else 0), np.int8)[cols.side]
+
+    src_vocab = cols.vocab["source"]
+    is_q_src = cols.col("source", lambda v: v in _Q_SOURCES)
+    is_q_strong_src = cols.col("source", lambda v: v in _Q_STRONG_SOURCES)
+    strong_raw = cols.col("strength", lambda v: v == "strong")
+    allowed = cols.col("source", lambda v: v in _ALLOWED_EVIDENCE_SOURCES)
+    src_bit = _lut(
+        src_vocab,
+        lambda v: (1 << _ALLOWED_EVIDENCE_SOURCES.index(v)) if v in _ALLOWED_EVIDENCE_SOURCES else 0,
+        np.int64,
+    )[cols.source]
+    src_osgfc = cols.col("source", lambda v: v == "OSGFC")
+    src_zones = cols.col("source", lambda v: v == "Zones")
+    src_fvg = cols.col("source", lambda v: v == "FVG")
+    src_zones_or_fvg = src_zones | src_fvg
+    evt_touch = cols.col("event", lambda v: v in _TOUCH_EVENTS)
+    evt_fvg_touch = cols.col("event", lambda v: v == "fvg_touch")
+    evt_retrace = cols.col("event", lambda v: v == "zone_retrace_touch")
+    evt_new_zone = cols.col("event", lambda v: v == "new_zone_confirmed")
+    type_structure = cols.col("signal_type", lambda v: v == "structure")
+    type_cancel = cols.col("signal_type", lambda v: v in {"entry_trigger", "structure"})
+    type_trend_filter = cols.col("signal_type", lambda v: v == "trend_filter")
+    conf_bar_close = cols.col("confirmed", lambda v: (v or "").lower() == "bar_close")
+    conf_intrabar = cols.col("confirmed", lambda v: (v or "").lower() == "intrabar")
+    strength_strong_l = cols.col("strength", lambda v: (v or "").lower() == "strong")
+
+    def _w(v: Any) -> float:
+        try:
+            return float(weight_confirmed(v))
+        except Exception:
+            return 0.0
+
+    weight = cols.col("confirmed", _w, np.float64) * np.where(evt_touch, 0.7, 1.0)
+    zone_confirm = src_zones & type_structure & evt_new_zone
+    intrabar_ok = conf_intrabar & (strength_strong_l | (src_zones_or_fvg & evt_touch))
+    counted = (conf_bar_close | intrabar_ok) & ~(type_trend_filter & ~src_osgfc)
+
+    # Q-Trend anchor candidates, ordered by (signal_ts, strong, input order) like the scalar sort.
+    q_rows = np.flatnonzero(is_q_src & (side != 0))
+    q_strong = (is_q_strong_src | strong_raw)[q_rows]
+    q_rows = q_rows[np.lexsort((q_rows, q_strong, st[q_rows]))]
+    q_st = st[q_rows]
+
+    # zones_confirmed_recent: Zones new_zone_confirmed rows by receive_time.
+    zc_rows = np.flatnonzero(zone_confirm)
+    zc_rows = zc_rows[np.argsort(cols.receive_time[zc_rows], kind="stable")]
+    zc_rt = cols.receive_time[zc_rows]
+
+    for part in _chunks(len(times), 64):
+        t = times[part]
+        tc = t[:, None]
+
+        # Latest fresh Q-Trend per t.
+        anchor = np.full(len(t), -1, dtype=np.int64)
+        if len(q_rows):
+            age_lb = float(fresh.age_lb.max(initial=0.0))
+            lo = np.searchsorted(q_st, t - age_lb - _SLACK_SEC, side="left")
+            hi = np.searchsorted(q_st, t + age_lb + _SLACK_SEC, side="right")
+            qidx, qvalid = _gather(lo, hi)
+            rows = q_rows[qidx]
+            ok = qvalid & fresh.mask(rows, tc)
+            has, pos = _last_true(ok)
+            anchor = np.where(has, rows[np.arange(len(t)), pos], -1)
+
+        # zones_confirmed_recent over all fresh rows.
+        zones_recent = np.zeros(len(t), dtype=np.int64)
+        if len(zc_rows):
+            lo = np.searchsorted(zc_rt, t - fresh.zone_lb - _SLACK_SEC, side="left")
+            hi = np.searchsorted(zc_rt, t + _SLACK_SEC, side="right")
+            zidx, zvalid = _gather(lo, hi)
+            zrows = zc_rows[zidx]
+            rt = cols.receive_time[zrows]
+            zones_recent = (zvalid & fresh.mask(zrows, tc) & (rt > 0) & ((tc - rt) <= fresh.zone_lb)).sum(axis=1)
+
+        sel = np.flatnonzero(anchor >= 0)
+        if not len(sel):
+            continue
+        a = anchor[sel]
+        ta = t[sel][:, None]
+        q_time = cols.signal_time[a]
+        q_side = side[a][:, None]
+
+        lo = np.searchsorted(st, q_time - window - _SLACK_SEC, side="left")
+        hi = np.searchsorted(st, q_time + window + _SLACK_SEC, side="right")
+        for sub in _chunks(len(sel), int(max(1, (hi - lo).max(initial=1)))):
+            idx, valid = _gather(lo[sub], hi[sub])
+            qt = q_time[sub][:, None]
+            tt = ta[sub]
+            qs = q_side[sub]
+            sti = st[idx]
+            m = valid & ~(sti < (qt - window)) & ~(sti > (qt + window)) & fresh.mask(idx, tt)
+
+            q_strong_hits = (m & is_q_strong_src[idx]).any(axis=1)
+            A = m & allowed[idx]
+            sd = side[idx]
+            bs = sd != 0
+            same = sd == qs
+            opp = bs & ~same
+
+            cancel = A & (sti >= qt) & conf_bar_close[idx] & bs & ~same & type_cancel[idx]
+            has_cancel = cancel.any(axis=1)
+            cancel_pos = np.argmax(cancel, axis=1)
+            has_osgfc, osgfc_pos = _last_true(A & src_osgfc[idx] & bs)
+
+            zones_after = (A & zone_confirm[idx]).sum(axis=1)
+            fvg_t = A & src_fvg[idx] & evt_fvg_touch[idx] & bs
+            zt_t = A & src_zones[idx] & evt_retrace[idx] & bs
+            fvg_same = (fvg_t & same).sum(axis=1)
+            fvg_opp = (fvg_t & ~same).sum(axis=1)
+            zt_same = (zt_t & same).sum(axis=1)
+            zt_opp = (zt_t & ~same).sum(axis=1)
+
+            cnt = A & counted[idx]
+            confirm = cnt & same
+            oppose = cnt & opp
+            confirm_n = confirm.sum(axis=1)
+            oppose_n = oppose.sum(axis=1)
+            bits = src_bit[idx]
+            confirm_src = _popcount(np.bitwise_or.reduce(np.where(confirm, bits, 0), axis=1))
+            oppose_src = _popcount(np.bitwise_or.reduce(np.where(oppose, bits, 0), axis=1))
+            # cumsum adds in row order, matching the scalar loop's float accumulation.
+            wv = weight[idx]
+            w_confirm = np.cumsum(np.where(A & same, wv, 0.0), axis=1)[:, -1]
+            w_oppose = np.cumsum(np.where(A & opp, wv, 0.0), axis=1)[:, -1]
+            strong_same = (A & same & strong_raw[idx]).any(axis=1)
+
+            rows_idx = np.arange(idx.shape[0])
+            for j, i in enumerate(sel[sub]):
+                latest_q = cols.records[int(a[sub][j])]
+                q_source = (latest_q.source or "")
+                q_is_strong = (q_source in _Q_STRONG_SOURCES) or (latest_q.strength == "strong")
+                momentum = bool(q_is_strong or q_strong_hits[j])
+                cancel_detail = None
+                if has_cancel[j]:
+                    c = cols.records[int(idx[rows_idx[j], cancel_pos[j]])]
+                    cancel_detail = {
+                        "source": c.source,
+                        "side": c.side,
+                        "signal_type": c.signal_type,
+                        "event": c.event,
+                        "signal_time": c.signal_ts,
+                    }
+                osgfc_side = ""
+                osgfc_time = None
+                if has_osgfc[j]:
+                    o = cols.records[int(idx[rows_idx[j], osgfc_pos[j]])]
+                    osgfc_side = o.side
+                    osgfc_time = o.signal_ts
+                out[part.start + int(i)] = {
+                    "q_time": float(latest_q.signal_time or latest_q.receive_time or t[i]),
+                    "q_side": (latest_q.side or "").lower(),
+                    "q_source": q_source,
+                    "q_is_strong": q_is_strong,
+                    "q_trigger_type": "Strong" if momentum else "Normal",
+                    "momentum_factor": 1.5 if momentum else 1.0,
+                    "is_strong_momentum": momentum,
+                    "confirm_unique_sources": int(confirm_src[j]),
+                    "confirm_signals": int(confirm_n[j]),
+                    "opp_unique_sources": int(oppose_src[j]),
+                    "opp_signals": int(oppose_n[j]),
+                    "cancel_due_to_opposite_bar_close": bool(has_cancel[j]),
+                    "cancel_detail": cancel_detail,
+                    "strong_after_q": bool(q_is_strong or q_strong_hits[j] or strong_same[j]),
+                    "osgfc_latest_side": osgfc_side,
+                    "osgfc_latest_time": osgfc_time,
+                    "fvg_touch_same": int(fvg_same[j]),
+                    "fvg_touch_opp": int(fvg_opp[j]),
+                    "zones_touch_same": int(zt_same[j]),
+                    "zones_touch_opp": int(zt_opp[j]),
+                    "zones_confirmed_after_q": int(zones_after[j]),
+                    "zones_confirmed_recent": int(zones_recent[i]),
+                    "weighted_confirm_score": round(float(w_confirm[j]), 3),
+                    "weighted_oppose_score": round(float(w_oppose[j]), 3),
+                }
+    return out
+
+
+def window_signals_batch(
+    cols: SignalColumns,
+    centers: Sequence[float],
+    trigger_sides: Sequence[str],
+    *,
+    window_sec: float,
+) -> List[Dict[str, Any]]:
+    """build_window_signals_payload for many (center, trigger_side) pairs at once.
+
+    The snapshot for every center is the whole column set (all of the symbol's records).
+    """
+    _require_numpy()
+    try:
+        w = float(window_sec)
+    except Exception:
+        w = 300.0
+    if w <= 0:
+        w = 300.0
+
+    c_all = np.asarray(centers, dtype=np.float64)
+    sides = [(s or "").strip().lower() for s in trigger_sides]
+    out: List[Dict[str, Any]] = []
+    if not cols.symbol:
+        return [
+            {"center_ts": float(c or 0.0), "window_sec": float(window_sec or 0.0), "aligned": [], "opposed": [], "neutral": []}
+            for c in centers
+        ]
+
+    st = cols.signal_ts
+    keyed = cols.window_key
+    n_keys = len(cols.window_keys)
+    lo_all = np.searchsorted(st, c_all - w - _SLACK_SEC, side="left")
+    hi_all = np.searchsorted(st, c_all + w + _SLACK_SEC, side="right")
+    width = int(max(1, (hi_all - lo_all).max(initial=1))) if len(c_all) else 1
+
+    for part in _chunks(len(c_all), width * max(1, n_keys)):
+        cc = c_all[part][:, None]
+        idx, valid = _gather(lo_all[part], hi_all[part])
+        sti = st[idx]
+        kk = keyed[idx]
+        m = valid & (sti > 0) & ~(np.abs(sti - cc) > w) & (kk >= 0)
+
+        # Per dedupe key: last row (kept value) and first row (dict insertion order).
+        last_pos = np.full((idx.shape[0], n_keys), -1, dtype=np.int64)
+        first_pos = np.zeros((idx.shape[0], n_keys), dtype=np.int64)
+        for k in range(n_keys):
+            eq = m & (kk == k)
+            has, pos = _last_true(eq)
+            last_pos[:, k] = np.where(has, pos, -1)
+            first_pos[:, k] = np.argmax(eq, axis=1)
+
+        for j in range(idx.shape[0]):
+            i = part.start + j
+            trig_side = sides[i]
+            picks = []
+            for k in np.flatnonzero(last_pos[j] >= 0):
+                r = int(idx[j, last_pos[j, k]])
+                picks.append((float(st[r]), int(first_pos[j, k]), r, int(k)))
+            picks.sort(key=lambda p: (p[0], p[1]))
+
+            aligned: List[Dict[str, Any]] = []
+            opposed: List[Dict[str, Any]] = []
+            neutral: List[Dict[str, Any]] = []
+            for sig_time, _, r, k in picks:
+                s = cols.records[r]
+                src, evt, side = cols.window_keys[k]
+                compact = {
+                    "source": src,
+                    "event": evt,
+                    "side": side,
+                    "signal_type": s.signal_type,
+                    "strength": s.strength,
+                    "confirmed": s.confirmed,
+                    "signal_time": s.signal_ts,
+                }
+                side_s = side or ""
+                if side_s in {"buy", "sell"} and trig_side in {"buy", "sell"}:
+                    (aligned if side_s == trig_side else opposed).append(compact)
+                else:
+                    neutral.append(compact)
+
+            aligned = aligned[-30:]
+            opposed = opposed[-30:]
+            neutral = neutral[-20:]
+            out.append(
+                {
+                    "center_ts": float(c_all[i]),
+                    "window_sec": float(w),
+                    "trigger_side": trig_side,
+                    "aligned": aligned,
+                    "opposed": opposed,
+                    "neutral": neutral,
+                    "counts": {"aligned": len(aligned), "opposed": len(opposed), "neutral": len(neutral)},
+                }
+            )
+    return out
+
+
+# --- scalar references (the parity definition of the batch functions) ---
+
+
+def scalar_qtrend_anchor_stats(
+    records: List[Any],
+    now: float,
+    *,
+    symbol: str,
+    confluence_window_sec: Any,
+    signal_max_age_sec: Any,
+    zone_lookback_sec: Any,
+    zone_touch_lookback_sec: Any,
+    fvg_lookback_sec: Any,
+    weight_confirmed: Callable[[Any], float],
+) -> Optional[Dict[str, Any]]:
+    """What the bridge computes at `now` if the cache held exactly the records received by then."""
+    sym = (symbol or "").strip().upper()
+    arrived = sorted(
+        (s for s in records if s.symbol == sym and s.receive_ts() <= now),
+        key=lambda s: s.signal_ts,
+    )
+    normalized = _fxai_signal_cache.filter_fresh_signals_from_normalized(
+        normalized=arrived,
+        now=now,
+        signal_max_age_sec=signal_max_age_sec,
+        zone_lookback_sec=zone_lookback_sec,
+        zone_touch_lookback_sec=zone_touch_lookback_sec,
+        fvg_lookback_sec=fvg_lookback_sec,
+    )
+    if not normalized:
+        return None
+    return _fxai_qtrend.compute_qtrend_anchor_stats(
+        target_symbol=sym,
+        normalized=normalized,
+        now=now,
+        confluence_window_sec=confluence_window_sec,
+        min_other_signals_for_entry=0,
+        zone_lookback_sec=zone_lookback_sec,
+        zone_touch_lookback_sec=zone_touch_lookback_sec,
+        confluence_debug=False,
+        confluence_debug_max_lines=0,
+        weight_confirmed=weight_confirmed,
+    )
+
+
+def scalar_window_signals(
+    records: List[Any],
+    center: float,
+    trigger_side: str,
+    *,
+    symbol: str,
+    window_sec: float,
+) -> Dict[str, Any]:
+    return _fxai_window_signals.build_window_signals_payload(
+        snapshot=sorted(records, key=lambda s: s.signal_ts),
+        symbol=symbol,
+        center_ts=center,
+        trigger_side=trigger_side,
+        window_sec=window_sec,
+    )
@@ -0,0 +1,242 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import math
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from threading import Lock
+from typing import Any, Dict, Optional, Tuple
+
+# Log-scale bucket ratios: neighbouring values within ~20-25% share a bucket.
+_ATR_SPREAD_STEP = 1.25
+_POINTS_STEP = 1.2
+# Price drift is bucketed in tenths of the ATR (points); raw-points fallback is log-scaled.
+_DRIFT_ATR_STEP = 0.1
+
+
+def _log_bucket(v: Any, step: float) -> Optional[int]:
+    try:
+        x = float(v)
+    except (TypeError, ValueError):
+        return None
+    if not math.isfinite(x) or x <= 0:
+        return None
+    return int(math.floor(math.log(x) / math.log(step)))
+
+
+def _drift_bucket(price_drift: Any, atr_points: Any) -> Optional[int]:
+    if not isinstance(price_drift, dict):
+        return None
+    try:
+        d = float(price_drift.get("drift_points"))
+    except (TypeError, ValueError):
+        return None
+    try:
+        atr = float(atr_points)
+    except (TypeError, ValueError):
+        atr = 0.0
+    if atr > 0:
+        return int(round(d / atr / _DRIFT_ATR_STEP))
+    b = _log_bucket(abs(d) + 1.0, 1.5) or 0
+    return b if d >= 0 else -b
+
+
+def entry_features(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Quantized view of a build_entry_filter_payload() dict used as the cache identity."""
+    p = payload or {}
+    trig = p.get("trigger") or {}
+    conf = p.get("confluence") or {}
+    qt = p.get("qtrend_context") or {}
+    mkt = p.get("market") or {}
+    pos = p.get("mt5_positions_summary") or {}
+    sess = p.get("session_context") or {}
+    win = p.get("signals_window") or {}
+    counts = win.get("counts") if isinstance(win, dict) else None
+    return {
+        "symbol": p.get("symbol"),
+        "action": p.get("proposed_action"),
+        "trigger": [trig.get("source"), trig.get("signal_type")],
+        "grade": [conf.get("setup_grade"), conf.get("setup_path")],
+        "confluence": [
+            conf.get("confirm_unique_sources"), conf.get("oppose_unique_sources"),
+            conf.get("confirm_signals"), conf.get("oppose_signals"),
+            conf.get("fvg_touch_same"), conf.get("fvg_touch_opp"),
+            conf.get("zones_touch_same"), conf.get("zones_touch_opp"),
+            conf.get("local_points"), conf.get("opposition_score"),
+        ],
+        "window_counts": dict(sorted(counts.items())) if isinstance(counts, dict) else None,
+        "qtrend": [qt.get("side"), qt.get("strength"), qt.get("alignment_vs_trigger")],
+        "trend": [mkt.get("m15_trend"), mkt.get("trend_alignment"), mkt.get("spread_flag")],
+        "atr_to_spread_b": _log_bucket(mkt.get("atr_to_spread_approx"), _ATR_SPREAD_STEP),
+        "atr_points_b": _log_bucket(mkt.get("atr_points_approx"), _POINTS_STEP),
+        "spread_points_b": _log_bucket(mkt.get("spread_points"), _POINTS_STEP),
+        "drift_b": _drift_bucket(p.get("price_drift"), mkt.get("atr_points_approx")),
+        "positions": [pos.get("positions_open"), pos.get("net_side")] if isinstance(pos, dict) else None,
+        "session": sess.get("current_session") if isinstance(sess, dict) else None,
+    }
+
+
+def entry_fingerprint(payload: Dict[str, Any]) -> str:
+    """Canonical (sorted-key JSON) hash of entry_features(payload)."""
+    canon = json.dumps(entry_features(payload), sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha1(canon.encode("utf-8")).hexdigest()[:16]
+
+
+class DecisionCache:
+    """TTL + LRU map of fingerprint -> validated AI decision.
+
+    get() returns (decision_copy, age_sec) on a fresh hit; expired entries
+    are dropped on read. Saved calls = hits; saved_ms sums the original AI
+    latency of each reused decision. Thread-safe.
+    """
+
+    def __init__(self, *, ttl_sec: float, max_entries: int = 256) -> None:
+        self._ttl = max(0.0, float(ttl_sec or 0.0))
+        self._max = max(1, int(max_entries or 1))
+        self._lock = Lock()
+        self._items: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._stats = {"hits": 0, "misses": 0, "expired": 0, "evictions": 0, "puts": 0, "saved_ms": 0}
+
+    def get(self, key: str, *, now: Optional[float] = None) -> Optional[Tuple[Dict[str, Any], float]]:
+        t = time.time() if now is None else float(now)
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                self._stats["misses"] += 1
+                return None
+            stored_at, decision = item
+            age = t - stored_at
+            if age > self._ttl:
+                del self._items[key]
+                self._stats["expired"] += 1
+                self._stats["misses"] += 1
+                return None
+            self._items.move_to_end(key)
+            self._stats["hits"] += 1
+            try:
+                self._stats["saved_ms"] += int(decision.get("_ai_latency_ms") or 0)
+            except (TypeError, ValueError):
+                pass
+            return dict(decision), max(0.0, age)
+
+    def put(self, key: str, decision: Dict[str, Any], *, now: Optional[float] = None) -> None:
+        t = time.time() if now is None else float(now)
+        with self._lock:
+            self._items[key] = (t, dict(decision))
+            self._items.move_to_end(key)
+            self._stats["puts"] += 1
+            while len(self._items) > self._max:
+                self._items.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            out: Dict[str, Any] = dict(self._stats)
+            out["size"] = len(self._items)
+        reads = int(out["hits"]) + int(out["misses"])
+        out["hit_rate"] = round(out["hits"] / reads, 4) if reads else None
+        out["saved_calls"] = int(out["hits"])
+        out["ttl_sec"] = self._ttl
+        out["max_entries"] = self._max
+        return out
+
+
+class _Slot:
+    __slots__ = ("fingerprint", "future", "started_at", "done_at")
+
+    def __init__(self, fingerprint: str, future: Future, started_at: float) -> None:
+        self.fingerprint = fingerprint
+        self.future = future
+        self.started_at = started_at  # time.monotonic()
+        self.done_at: Optional[float] = None
+
+
+class SpeculativeSlots:
+    """One speculative AI decision per symbol, keyed by its payload fingerprint.
+
+    begin() is called by the speculative attempt once its payload is known;
+    it returns a Future to fulfil, or None when a speculation with the same
+    fingerprint is already in flight (no duplicate call). A different
+    fingerprint replaces the slot (the old result is discarded; the HTTP
+    call itself cannot be cancelled). take() is called by the real attempt at
+    window close: it pops the slot and returns the Future only when the
+    fingerprint matches and the slot is younger than max_age_sec.
+    saved_ms is the part of the AI latency that overlapped the window.
+    """
+
+    def __init__(self) -> None:
+        self._lock = Lock()
+        self._slots: Dict[str, _Slot] = {}
+        self._stats = {
+            "started": 0,
+            "deduped": 0,
+            "replaced": 0,
+            "hits": 0,
+            "misses": 0,
+            "stale": 0,
+            "no_slot": 0,
+            "failed": 0,
+            "saved_ms": 0,
+        }
+
+    def begin(self, symbol: str, fingerprint: str) -> Optional[Future]:
+        sym = (symbol or "").strip().upper()
+        with self._lock:
+            cur = self._slots.get(sym)
+            if cur is not None and cur.fingerprint == fingerprint:
+                self._stats["deduped"] += 1
+                return None
+            if cur is not None:
+                self._stats["replaced"] += 1
+            fut: Future = Future()
+            slot = _Slot(fingerprint, fut, time.monotonic())
+            self._slots[sym] = slot
+            self._stats["started"] += 1
+
+        def _mark_done(_f: Future, _slot: _Slot = slot) -> None:
+            _slot.done_at = time.monotonic()
+
+        fut.add_done_callback(_mark_done)
+        return fut
+
+    def take(self, symbol: str, fingerprint: str, *, max_age_sec: float) -> Optional[Future]:
+        sym = (symbol or "").strip().upper()
+        now = time.monotonic()
+        with self._lock:
+            slot = self._slots.pop(sym, None)
+            if slot is None:
+                self._stats["no_slot"] += 1
+                return None
+            if max_age_sec > 0 and (now - slot.started_at) > max_age_sec:
+                self._stats["stale"] += 1
+                return None
+            if slot.fingerprint != fingerprint:
+                self._stats["misses"] += 1
+                return None
+            self._stats["hits"] += 1
+            overlap = (min(slot.done_at, now) if slot.done_at is not None else now) - slot.started_at
+            self._stats["saved_ms"] += int(max(0.0, overlap) * 1000.0)
+        return slot.future
+
+    def record_failure(self) -> None:
+        """A matched speculation produced no usable decision (caller falls back to a fresh call)."""
+        with self._lock:
+            self._stats["failed"] += 1
+
+    def discard(self, symbol: str) -> None:
+        with self._lock:
+            self._slots.pop((symbol or "").strip().upper(), None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            out: Dict[str, Any] = dict(self._stats)
+            out["pending"] = sorted(self._slots)
+        decided = int(out["hits"]) + int(out["misses"]) + int(out["stale"]) + int(out["no_slot"])
+        out["hit_rate"] = round(out["hits"] / decided, 4) if decided else None
+        return out
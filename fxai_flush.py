@@ -45,18 +45,28 @@ def run_flush_loop(
         except Exception:
             continue
 
+        run_flush_once(flush_cache_once=flush_cache_once, flush_metrics_once=flush_metrics_once, warn=warn)
+
+
+def run_flush_once(
+    *,
+    flush_cache_once: Callable[[], None],
+    flush_metrics_once: Callable[[], None],
+    warn: Callable[[str], None],
+) -> None:
+    """One flush pass (also used as a scheduled task); exceptions are forwarded to warn()."""
+    try:
+        flush_cache_once()
+    except Exception as e:
         try:
-            flush_cache_once()
-        except Exception as e:
-            try:
-                warn(f"Cache flush loop error: {e}")
-            except Exception:
-                pass
+            warn(f"Cache flush loop error: {e}")
+        except Exception:
+            pass
 
+    try:
+        flush_metrics_once()
+    except Exception as e:
         try:
-            flush_metrics_once()
-        except Exception as e:
-            try:
-                warn(f"Metrics flush loop error: {e}")
-            except Exception:
-                pass
+            warn(f"Metrics flush loop error: {e}")
+        except Exception:
+            pass
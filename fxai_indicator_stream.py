@@ -0,0 +1,220 @@
+from __future__ import annotations
+
+from collections import deque
+from threading import Lock
+from typing import Any, Deque, Dict, Optional, Tuple
+
+try:
+    import fxai_indicators as _ind
+except Exception:
+    from tradingView import fxai_indicators as _ind
+
+# Periods (closed bars)
+ATR_PERIOD = 14
+SMA_PERIOD = 20
+SWING_BARS = 20
+SLOPE_LAG = 2  # slope = SMA20(last closed) - SMA20(2 closed bars earlier)
+
+# Running sums are re-summed from their windows this often (float drift guard).
+_RESUM_EVERY = 1024
+
+
+def _bar_fields(row: Any) -> Tuple[float, float, float, float]:
+    return (
+        _ind.rate_field(row, "time", 0.0),
+        _ind.rate_field(row, "high", 0.0),
+        _ind.rate_field(row, "low", 0.0),
+        _ind.rate_field(row, "close", 0.0),
+    )
+
+
+class _RunningMean:
+    """Mean of the last `size` values: deque + running sum, O(1) per push."""
+
+    __slots__ = ("size", "values", "total", "pushes")
+
+    def __init__(self, size: int) -> None:
+        self.size = max(1, int(size))
+        self.values: Deque[float] = deque()
+        self.total = 0.0
+        self.pushes = 0
+
+    def push(self, v: float) -> None:
+        self.values.append(v)
+        self.total += v
+        if len(self.values) > self.size:
+            self.total -= self.values.popleft()
+        self.pushes += 1
+        if self.pushes % _RESUM_EVERY == 0:
+            self.total = float(sum(self.values))
+
+    def full(self) -> bool:
+        return len(self.values) >= self.size
+
+    def mean(self) -> float:
+        return self.total / len(self.values) if self.values else 0.0
+
+
+class _MonotonicExtreme:
+    """Rolling min (or max) of the positive values among the last `size` pushes."""
+
+    __slots__ = ("size", "is_min", "items", "idx")
+
+    def __init__(self, size: int, *, is_min: bool) -> None:
+        self.size = max(1, int(size))
+        self.is_min = is_min
+        self.items: Deque[Tuple[int, float]] = deque()
+        self.idx = 0
+
+    def push(self, v: float) -> None:
+        i = self.idx
+        self.idx += 1
+        if v > 0.0:
+            items = self.items
+            if self.is_min:
+                while items and items[-1][1] >= v:
+                    items.pop()
+            else:
+                while items and items[-1][1] <= v:
+                    items.pop()
+            items.append((i, v))
+        while self.items and self.items[0][0] <= i - self.size:
+            self.items.popleft()
+
+    def value(self) -> float:
+        return float(self.items[0][1]) if self.items else 0.0
+
+
+class _TfState:
+    """Indicator state of one (symbol, timeframe), advanced one closed bar at a time."""
+
+    __slots__ = (
+        "last_time", "prev_close", "bars", "atr", "atr_seed",
+        "tr_mean", "sma", "sma_hist", "swing_low", "swing_high",
+    )
+
+    def __init__(self, *, tr_avg_bars: int) -> None:
+        self.last_time = 0.0
+        self.prev_close: Optional[float] = None
+        self.bars = 0
+        self.atr = 0.0  # Wilder ATR (0 until seeded)
+        self.atr_seed = _RunningMean(ATR_PERIOD)
+        self.tr_mean = _RunningMean(tr_avg_bars)
+        self.sma = _RunningMean(SMA_PERIOD)
+        self.sma_hist: Deque[float] = deque(maxlen=SLOPE_LAG + 1)
+        self.swing_low = _MonotonicExtreme(SWING_BARS, is_min=True)
+        self.swing_high = _MonotonicExtreme(SWING_BARS, is_min=False)
+
+    def apply(self, t: float, high: float, low: float, close: float) -> None:
+        pc = self.prev_close
+        if pc is not None:
+            tr = max(abs(high - low), abs(high - pc), abs(low - pc))
+            if tr > 0:
+                if self.atr > 0:
+                    self.atr = (self.atr * (ATR_PERIOD - 1) + tr) / ATR_PERIOD
+                else:
+                    self.atr_seed.push(tr)
+                    if self.atr_seed.full():
+                        self.atr = self.atr_seed.mean()
+                self.tr_mean.push(tr)
+        self.prev_close = close
+        self.sma.push(close)
+        if self.sma.full():
+            self.sma_hist.append(self.sma.mean())
+        self.swing_low.push(low)
+        self.swing_high.push(high)
+        self.last_time = t
+        self.bars += 1
+
+
+class IndicatorStream:
+    """Per-symbol/timeframe streaming indicators over CLOSED bars.
+
+    feed() takes the rate array already fetched for a timeframe (MT5 order,
+    oldest first, last bar forming) and applies only closed bars newer than
+    the last one seen, so a decision inside an unchanged bar costs one time
+    comparison. Per closed bar: Wilder ATR(14), mean TR over tr_avg_bars,
+    SMA(20) with a short slope history, and 20-bar swing low/high via
+    monotonic deques, all O(1).
+
+    snapshot(symbol) returns an immutable-by-convention dict rebuilt on each
+    change, so all readers of one decision see one consistent set of values.
+    Thread-safe via an internal lock.
+    """
+
+    def __init__(self, *, tr_avg_bars: int = 60) -> None:
+        self._lock = Lock()
+        self._tr_avg_bars = max(ATR_PERIOD, int(tr_avg_bars))
+        self._states: Dict[Tuple[str, str], _TfState] = {}
+        self._snapshots: Dict[str, Dict[str, Any]] = {}
+        self._stats = {"feeds": 0, "bars_applied": 0, "snapshots_built": 0}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._states.clear()
+            self._snapshots.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            out: Dict[str, Any] = dict(self._stats)
+            out["series"] = len(self._states)
+        return out
+
+    def feed(self, symbol: str, tf: str, rates: Any) -> int:
+        """Apply closed bars of `rates` not seen yet; returns the number applied."""
+        sym = (symbol or "").strip().upper()
+        if rates is None or len(rates) < 2 or not sym:
+            return 0
+        key = (sym, tf)
+        with self._lock:
+            self._stats["feeds"] += 1
+            st = self._states.get(key)
+            if st is None:
+                st = _TfState(tr_avg_bars=self._tr_avg_bars)
+                self._states[key] = st
+            # Fast path: newest closed bar already applied.
+            if _bar_fields(rates[-2])[0] <= st.last_time:
+                return 0
+            # Walk back to the first unseen closed bar.
+            i = len(rates) - 2
+            while i > 0 and _bar_fields(rates[i - 1])[0] > st.last_time:
+                i -= 1
+            applied = 0
+            for row in rates[i:-1]:
+                t, h, l, c = _bar_fields(row)
+                if t > st.last_time:
+                    st.apply(t, h, l, c)
+                    applied += 1
+            self._stats["bars_applied"] += applied
+            if applied:
+                self._snapshots[sym] = self._build_snapshot_locked(sym)
+                self._stats["snapshots_built"] += 1
+            return applied
+
+    def snapshot(self, symbol: str) -> Optional[Dict[str, Any]]:
+        return self._snapshots.get((symbol or "").strip().upper())
+
+    def _build_snapshot_locked(self, sym: str) -> Dict[str, Any]:
+        snap: Dict[str, Any] = {}
+        m15 = self._states.get((sym, "m15"))
+        if m15 is not None and m15.sma_hist:
+            sma1 = m15.sma_hist[-1]
+            snap["m15_ma"] = float(sma1)
+            if len(m15.sma_hist) > SLOPE_LAG:
+                snap["m15_sma20_slope"] = _ind.slope_label(sma1 - m15.sma_hist[0], sma1)
+        m5 = self._states.get((sym, "m5"))
+        if m5 is not None and m5.atr > 0:
+            snap["atr"] = float(m5.atr)
+            if len(m5.tr_mean.values) >= _ind.ATR_AVG_MIN_TRS:
+                snap["atr_avg_5h"] = float(m5.tr_mean.mean())
+        if m5 is not None and m5.bars >= SWING_BARS:
+            snap["swing_low_20m5"] = m5.swing_low.value()
+            snap["swing_high_20m5"] = m5.swing_high.value()
+        h1 = self._states.get((sym, "h1"))
+        if h1 is not None and h1.atr > 0:
+            snap["atr_h1"] = float(h1.atr)
+        d1 = self._states.get((sym, "d1"))
+        if d1 is not None and d1.atr > 0:
+            snap["atr_d1"] = float(d1.atr)
+        snap["bar_time"] = {tf: st.last_time for (s, tf), st in self._states.items() if s == sym}
+        return snap
@@ -0,0 +1,222 @@
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import numpy as np
+except Exception:  # MetaTrader5 ships numpy; the list path below covers its absence.
+    np = None  # type: ignore
+
+# Bar-index conventions follow the original get_mt5_market_data code exactly
+# (same slices, same "TR > 0" / "value > 0" filters) so both paths and the
+# previous implementation produce the same numbers.
+
+ATR_PERIOD = 14
+SMA_PERIOD = 20
+SWING_BARS = 20
+ATR_AVG_MIN_TRS = 14
+
+# Keys returned by market_indicators().
+MARKET_INDICATOR_KEYS = ("m15_ma", "m15_sma20_slope", "atr", "atr_avg_5h", "swing_low_20m5", "swing_high_20m5")
+
+
+def rate_field(rate_row: Any, key: str, default: float = 0.0) -> float:
+    """MT5のrate行はdictの場合もnumpy.voidの場合もあるので両対応で取り出す。"""
+    if rate_row is None:
+        return default
+    # dict-like
+    if isinstance(rate_row, dict):
+        try:
+            return float(rate_row.get(key, default) or default)
+        except Exception:
+            return default
+    # numpy.void / structured array row
+    try:
+        return float(rate_row[key])
+    except Exception:
+        pass
+    # attribute fallback
+    try:
+        return float(getattr(rate_row, key, default) or default)
+    except Exception:
+        return default
+
+
+def _columns(rates: Any, keys: Tuple[str, ...]) -> Optional[Tuple[Any, ...]]:
+    """float64 columns of an MT5 structured rate array, or None for any other input."""
+    if np is None or not isinstance(rates, np.ndarray):
+        return None
+    names = rates.dtype.names or ()
+    if not all(k in names for k in keys):
+        return None
+    try:
+        return tuple(np.asarray(rates[k], dtype=np.float64) for k in keys)
+    except Exception:
+        return None
+
+
+# ---------------------------------------------------------------------------
+# Vectorized primitives (1-D float arrays)
+# ---------------------------------------------------------------------------
+def true_range(high: Any, low: Any, close: Any) -> Any:
+    """TR for bars 1..n-1 (previous close from bar i-1)."""
+    pc = close[:-1]
+    h = high[1:]
+    l = low[1:]
+    return np.maximum(np.abs(h - l), np.maximum(np.abs(h - pc), np.abs(l - pc)))
+
+
+def rolling_mean(values: Any, window: int) -> Any:
+    """Mean of each length-`window` slice; element i covers values[i:i+window]."""
+    if window <= 0 or len(values) < window:
+        return np.empty(0, dtype=np.float64)
+    c = np.cumsum(values, dtype=np.float64)
+    out = c[window - 1:].copy()
+    out[1:] -= c[:-window]
+    return out / float(window)
+
+
+def _rolling_reduce(values: Any, window: int, fill: float, reduce: Any) -> Any:
+    if window <= 0 or len(values) < window:
+        return np.empty(0, dtype=np.float64)
+    v = np.where(values > 0.0, values, fill)
+    if len(v) == window:
+        # Single window: skip the strided view (its setup dominates at MT5 sizes).
+        out = np.array([reduce(v)], dtype=np.float64)
+    else:
+        out = reduce(np.lib.stride_tricks.sliding_window_view(v, window), axis=1)
+    return np.where(np.isfinite(out), out, 0.0)
+
+
+def rolling_min_positive(values: Any, window: int) -> Any:
+    """Min of the positive values in each window (0.0 when a window has none)."""
+    return _rolling_reduce(values, window, np.inf, np.min)
+
+
+def rolling_max_positive(values: Any, window: int) -> Any:
+    """Max of the positive values in each window (0.0 when a window has none)."""
+    return _rolling_reduce(values, window, -np.inf, np.max)
+
+
+def slope_label(delta: float, sma1: float) -> str:
+    # Threshold: 0.01% of price or minimum $0.01 (for XAUUSD ~$2600, thresh ≈ $0.026)
+    thresh = max(abs(sma1) * 1e-4, 0.01)
+    if delta > thresh:
+        return "UP"
+    if delta < -thresh:
+        return "DOWN"
+    return "FLAT"
+
+
+# ---------------------------------------------------------------------------
+# get_mt5_market_data indicators
+# ---------------------------------------------------------------------------
+def m15_sma(rates_m15: Any) -> Tuple[float, str]:
+    """(m15_ma, m15_sma20_slope) from M15 rates."""
+    if rates_m15 is None or len(rates_m15) == 0:
+        return 0.0, "FLAT"
+    cols = _columns(rates_m15, ("close",))
+    if cols is not None:
+        closes = cols[0]
+        n = len(closes)
+        ma15 = float(closes[:SMA_PERIOD].mean()) if n >= SMA_PERIOD else float(closes.mean())
+        if n >= 22:
+            sma = rolling_mean(closes, SMA_PERIOD)
+            # Closed bars only: SMA(20) at offset 1 vs offset 3 (or 2 when only 22 bars).
+            ref = 3 if n >= 23 else 2
+            sma1 = float(sma[1])
+            return ma15, slope_label(sma1 - float(sma[ref]), sma1)
+        return ma15, "FLAT"
+
+    closes_l = [rate_field(r, "close", 0.0) for r in rates_m15]
+    if len(closes_l) >= SMA_PERIOD:
+        ma15 = sum(closes_l[:SMA_PERIOD]) / float(SMA_PERIOD)
+    else:
+        ma15 = sum(closes_l) / max(1, len(closes_l))
+    if len(closes_l) >= 22:
+        ref = 3 if len(closes_l) >= 23 else 2
+        sma1 = sum(closes_l[1:21]) / 20.0
+        smar = sum(closes_l[ref:ref + 20]) / 20.0
+        return ma15, slope_label(sma1 - smar, sma1)
+    return ma15, "FLAT"
+
+
+def _positive_trs(rates: Any) -> Any:
+    """Positive true ranges (ndarray on the structured path, list otherwise)."""
+    cols = _columns(rates, ("high", "low", "close"))
+    if cols is not None:
+        tr = true_range(*cols)
+        return tr[tr > 0.0]
+    highs = [rate_field(r, "high", 0.0) for r in rates]
+    lows = [rate_field(r, "low", 0.0) for r in rates]
+    closes = [rate_field(r, "close", 0.0) for r in rates]
+    trs: List[float] = []
+    for i in range(1, len(rates)):
+        h = highs[i]
+        l = lows[i]
+        pc = closes[i - 1]
+        tr = max(abs(h - l), abs(h - pc), abs(l - pc))
+        if tr > 0:
+            trs.append(tr)
+    return trs
+
+
+def _head_mean(trs: Any, n: int) -> float:
+    m = min(int(n), len(trs))
+    if m <= 0:
+        return 0.0
+    if np is not None and isinstance(trs, np.ndarray):
+        return float(trs[:m].mean())
+    return sum(trs[:m]) / max(1, m)
+
+
+def m5_atr_swing(rates_m5: Any) -> Tuple[float, float, float]:
+    """(atr, swing_low_20m5, swing_high_20m5) from M5 rates."""
+    if rates_m5 is None or len(rates_m5) < 2:
+        return 0.0, 0.0, 0.0
+    atr = _head_mean(_positive_trs(rates_m5), ATR_PERIOD)
+    swing_low = swing_high = 0.0
+    # Swing extreme over bars [1:21] (the original "skip bar[0]" window).
+    if len(rates_m5) >= 22:
+        cols = _columns(rates_m5, ("high", "low"))
+        if cols is not None:
+            highs, lows = cols
+            swing_low = float(rolling_min_positive(lows[1:1 + SWING_BARS], SWING_BARS)[0])
+            swing_high = float(rolling_max_positive(highs[1:1 + SWING_BARS], SWING_BARS)[0])
+        else:
+            lows_l = [v for v in (rate_field(r, "low", 0.0) for r in rates_m5[1:21]) if v > 0.0]
+            highs_l = [v for v in (rate_field(r, "high", 0.0) for r in rates_m5[1:21]) if v > 0.0]
+            if lows_l:
+                swing_low = min(lows_l)
+            if highs_l:
+                swing_high = max(highs_l)
+    return atr, swing_low, swing_high
+
+
+def m5_atr_avg(rates: Any, *, bars: int) -> float:
+    """Mean of the first `bars` positive TRs (needs >= 14), i.e. the atr_avg_5h baseline."""
+    if rates is None or len(rates) < ATR_AVG_MIN_TRS + 1:
+        return 0.0
+    trs = _positive_trs(rates)
+    if len(trs) < ATR_AVG_MIN_TRS:
+        return 0.0
+    return _head_mean(trs, bars)
+
+
+def market_indicators(rates_m15: Any, rates_m5: Any, rates_m5_avg: Any, *, atr_avg_bars: int = 60) -> Dict[str, Any]:
+    """All bar-derived fields of get_mt5_market_data.
+
+    rates_m5 is the 60-bar M5 window (ATR, swing extremes); rates_m5_avg is the
+    atr_avg_bars + 2 bar window for atr_avg_5h. Structured arrays take the
+    vectorized path; dict/row lists use the per-row path.
+    """
+    ma15, slope = m15_sma(rates_m15)
+    atr, swing_low, swing_high = m5_atr_swing(rates_m5)
+    return {
+        "m15_ma": ma15,
+        "m15_sma20_slope": slope,
+        "atr": atr,
+        "atr_avg_5h": m5_atr_avg(rates_m5_avg, bars=atr_avg_bars),
+        "swing_low_20m5": swing_low,
+        "swing_high_20m5": swing_high,
+    }
@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import time
+from collections import deque
+from threading import Event, Lock, Thread
+from typing import Any, Callable, Deque, Dict, List, NamedTuple, Optional, Set
+
+
+class MarketSnapshot(NamedTuple):
+    """One poll of one symbol. Immutable; readers take copies of the dicts they edit."""
+
+    symbol: str
+    taken_at: float  # local time.time() when the poll finished
+    seq: int
+    market: Dict[str, Any]
+    positions: Dict[str, Any]
+
+    def age(self, now: Optional[float] = None) -> float:
+        return max(0.0, float(time.time() if now is None else now) - self.taken_at)
+
+
+def _pctl(sorted_vals: List[float], q: float) -> Optional[float]:
+    if not sorted_vals:
+        return None
+    return sorted_vals[min(len(sorted_vals) - 1, int(q * (len(sorted_vals) - 1)))]
+
+
+class MarketPoller:
+    """Single background thread that owns the MT5 reads of the decision path.
+
+    Every interval_sec it calls fetch_market(symbol) and fetch_positions(symbol)
+    for each tracked symbol and publishes a MarketSnapshot (reference swap, no
+    lock on read). get() refuses snapshots older than max_age_sec so callers
+    fall back to a synchronous read; served and rejected ages are kept for
+    metrics.
+    """
+
+    def __init__(
+        self,
+        *,
+        fetch_market: Callable[[str], Dict[str, Any]],
+        fetch_positions: Callable[[str], Dict[str, Any]],
+        interval_sec: float = 0.5,
+        symbols: Optional[List[str]] = None,
+        age_samples: int = 512,
+    ) -> None:
+        self._fetch_market = fetch_market
+        self._fetch_positions = fetch_positions
+        self._interval = max(0.05, float(interval_sec or 0.5))
+        self._symbols: Set[str] = {s.strip().upper() for s in (symbols or []) if s and s.strip()}
+        self._snapshots: Dict[str, MarketSnapshot] = {}
+        self._lock = Lock()
+        self._stop = Event()
+        self._wake = Event()
+        self._thread: Optional[Thread] = None
+        self._seq = 0
+        self._ages: Deque[float] = deque(maxlen=max(16, int(age_samples)))
+        self._stats = {
+            "polls": 0,
+            "poll_errors": 0,
+            "served": 0,
+            "stale_rejects": 0,
+            "misses": 0,
+            "last_poll_ms": None,
+            "max_poll_ms": 0.0,
+        }
+
+    # --- lifecycle ---
+    def start(self) -> bool:
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return False
+            self._stop.clear()
+            self._thread = Thread(target=self._loop, name="mt5-poller", daemon=True)
+            self._thread.start()
+        return True
+
+    def stop(self, timeout: float = 2.0) -> None:
+        self._stop.set()
+        self._wake.set()
+        t = self._thread
+        if t is not None:
+            t.join(timeout)
+
+    def track(self, symbol: str) -> None:
+        sym = (symbol or "").strip().upper()
+        if not sym:
+            return
+        with self._lock:
+            if sym in self._symbols:
+                return
+            self._symbols.add(sym)
+        self._wake.set()
+
+    # --- polling ---
+    def poll_once(self) -> int:
+        with self._lock:
+            symbols = sorted(self._symbols)
+        published = 0
+        for sym in symbols:
+            t0 = time.perf_counter()
+            try:
+                market = self._fetch_market(sym)
+                positions = self._fetch_positions(sym)
+            except Exception as e:
+                with self._lock:
+                    self._stats["poll_errors"] += 1
+                print(f"[FXAI][POLLER] poll failed for {sym}: {e}")
+                continue
+            ms = (time.perf_counter() - t0) * 1000.0
+            with self._lock:
+                self._seq += 1
+                self._snapshots[sym] = MarketSnapshot(sym, time.time(), self._seq, market, positions)
+                self._stats["polls"] += 1
+                self._stats["last_poll_ms"] = round(ms, 3)
+                self._stats["max_poll_ms"] = round(max(float(self._stats["max_poll_ms"]), ms), 3)
+            published += 1
+        return published
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            started = time.monotonic()
+            self._wake.clear()
+            self.poll_once()
+            self._wake.wait(max(0.0, self._interval - (time.monotonic() - started)))
+
+    # --- readers ---
+    def latest(self, symbol: str) -> Optional[MarketSnapshot]:
+        return self._snapshots.get((symbol or "").strip().upper())
+
+    def get(self, symbol: str, *, max_age_sec: float, now: Optional[float] = None) -> Optional[MarketSnapshot]:
+        """Fresh snapshot for symbol, or None (not polled yet / older than max_age_sec)."""
+        snap = self.latest(symbol)
+        with self._lock:
+            if snap is None:
+                self._stats["misses"] += 1
+                return None
+            age = snap.age(now)
+            if max_age_sec > 0 and age > max_age_sec:
+                self._stats["stale_rejects"] += 1
+                return None
+            self._stats["served"] += 1
+            self._ages.append(age)
+        return snap
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.time()
+        with self._lock:
+            out: Dict[str, Any] = dict(self._stats)
+            ages = sorted(self._ages)
+            out["symbols"] = sorted(self._symbols)
+            out["snapshot_age_ms"] = {
+                sym: round(s.age(now) * 1000.0, 1) for sym, s in self._snapshots.items()
+            }
+        out["running"] = bool(self._thread is not None and self._thread.is_alive())
+        out["interval_sec"] = self._interval
+        out["served_age_ms"] = {
+            "p50": round(_pctl(ages, 0.50) * 1000.0, 1) if ages else None,
+            "p95": round(_pctl(ages, 0.95) * 1000.0, 1) if ages else None,
+            "max": round(ages[-1] * 1000.0, 1) if ages else None,
+        }
+        return out
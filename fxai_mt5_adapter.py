@@ -0,0 +1,485 @@
+from __future__ import annotations
+
+import csv
+import json
+import os
+import random
+import time
+from bisect import bisect_right
+from threading import Lock, Thread
+from types import SimpleNamespace
+from typing import Any, Dict, List, Mapping, Optional, Protocol, Tuple
+
+try:
+    import numpy as np
+except Exception:  # rates fall back to lists of dicts
+    np = None  # type: ignore
+
+try:
+    import zmq
+except Exception:  # sim EA loop needs pyzmq; the terminal API itself does not
+    zmq = None  # type: ignore
+
+# MetaTrader5 constant values (the sim exposes the same numbers).
+TIMEFRAME_M1 = 1
+TIMEFRAME_M5 = 5
+TIMEFRAME_M15 = 15
+TIMEFRAME_M30 = 30
+TIMEFRAME_H1 = 16385
+TIMEFRAME_H4 = 16388
+TIMEFRAME_D1 = 16408
+POSITION_TYPE_BUY = 0
+POSITION_TYPE_SELL = 1
+
+TIMEFRAME_SEC: Dict[int, int] = {
+    TIMEFRAME_M1: 60,
+    TIMEFRAME_M5: 300,
+    TIMEFRAME_M15: 900,
+    TIMEFRAME_M30: 1800,
+    TIMEFRAME_H1: 3600,
+    TIMEFRAME_H4: 14400,
+    TIMEFRAME_D1: 86400,
+}
+_TF_BY_NAME = {"M1": TIMEFRAME_M1, "M5": TIMEFRAME_M5, "M15": TIMEFRAME_M15, "M30": TIMEFRAME_M30,
+               "H1": TIMEFRAME_H1, "H4": TIMEFRAME_H4, "D1": TIMEFRAME_D1}
+
+RATE_DTYPE = [
+    ("time", "<i8"), ("open", "<f8"), ("high", "<f8"), ("low", "<f8"), ("close", "<f8"),
+    ("tick_volume", "<u8"), ("spread", "<i4"), ("real_volume", "<u8"),
+]
+
+_Bar = Tuple[int, float, float, float, float, int, int, int]
+
+
+class MT5Adapter(Protocol):
+    """The MetaTrader5 surface the bridge uses (module-style API + constants)."""
+
+    TIMEFRAME_M5: int
+    TIMEFRAME_M15: int
+    TIMEFRAME_H1: int
+    TIMEFRAME_D1: int
+    POSITION_TYPE_BUY: int
+    POSITION_TYPE_SELL: int
+
+    def initialize(self, *args: Any, **kwargs: Any) -> bool: ...
+    def symbol_select(self, symbol: str, enable: bool = True) -> bool: ...
+    def symbol_info(self, symbol: str) -> Any: ...
+    def symbol_info_tick(self, symbol: str) -> Any: ...
+    def copy_rates_from_pos(self, symbol: str, timeframe: int, start: int, count: int) -> Any: ...
+    def positions_get(self, *, symbol: Optional[str] = None) -> Any: ...
+
+
+def create_adapter(name: str, *, env: Optional[Mapping[str, str]] = None) -> Any:
+    """"real" -> the MetaTrader5 package itself; "sim" -> SimTerminal from MT5_SIM_* settings."""
+    kind = (name or "real").strip().lower()
+    if kind == "sim":
+        return SimTerminal.from_env(env if env is not None else os.environ)
+    import MetaTrader5 as mt5
+
+    return mt5
+
+
+# ---------------------------------------------------------------------------
+# Data loading
+# ---------------------------------------------------------------------------
+def _read_rows(path: str) -> List[Dict[str, str]]:
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        return [dict(r) for r in csv.DictReader(f)]
+
+
+def load_bars_csv(path: str) -> List[_Bar]:
+    """CSV with header time,open,high,low,close[,tick_volume,spread,real_volume] (time = unix sec)."""
+    out: List[_Bar] = []
+    for r in _read_rows(path):
+        try:
+            out.append((
+                int(float(r["time"])), float(r["open"]), float(r["high"]), float(r["low"]), float(r["close"]),
+                int(float(r.get("tick_volume") or 0)), int(float(r.get("spread") or 0)), int(float(r.get("real_volume") or 0)),
+            ))
+        except (KeyError, TypeError, ValueError):
+            continue
+    out.sort(key=lambda b: b[0])
+    return out
+
+
+def load_ticks_csv(path: str) -> List[Tuple[float, float, float]]:
+    """CSV with header time,bid,ask (time = unix sec, fractional allowed)."""
+    out: List[Tuple[float, float, float]] = []
+    for r in _read_rows(path):
+        try:
+            out.append((float(r["time"]), float(r["bid"]), float(r["ask"])))
+        except (KeyError, TypeError, ValueError):
+            continue
+    out.sort(key=lambda t: t[0])
+    return out
+
+
+def synthetic_bars(*, start: int, count: int, tf_sec: int = 60, price: float = 2000.0, seed: int = 7) -> List[_Bar]:
+    """Random-walk bars for runs without recorded data."""
+    rng = random.Random(seed)
+    out: List[_Bar] = []
+    p = price
+    for i in range(count):
+        o = p
+        c = max(0.01, p + rng.gauss(0.0, 0.35))
+        h = max(o, c) + abs(rng.gauss(0.0, 0.15))
+        lo = min(o, c) - abs(rng.gauss(0.0, 0.15))
+        out.append((start + i * tf_sec, o, h, lo, c, rng.randint(20, 200), 0, 0))
+        p = c
+    return out
+
+
+def _aggregate(bars: List[_Bar], tf_sec: int) -> List[_Bar]:
+    out: List[_Bar] = []
+    cur: Optional[List[Any]] = None
+    for t, o, h, lo, c, tv, sp, rv in bars:
+        bt = (t // tf_sec) * tf_sec
+        if cur is None or cur[0] != bt:
+            if cur is not None:
+                out.append(tuple(cur))  # type: ignore[arg-type]
+            cur = [bt, o, h, lo, c, tv, sp, rv]
+        else:
+            cur[2] = max(cur[2], h)
+            cur[3] = min(cur[3], lo)
+            cur[4] = c
+            cur[5] += tv
+            cur[6] = max(cur[6], sp)
+            cur[7] += rv
+    if cur is not None:
+        out.append(tuple(cur))  # type: ignore[arg-type]
+    return out
+
+
+def _connect_url(bind: str) -> str:
+    return (bind or "").replace("*", "127.0.0.1").replace("0.0.0.0", "127.0.0.1")
+
+
+# ---------------------------------------------------------------------------
+# Simulated terminal
+# ---------------------------------------------------------------------------
+class SimTerminal:
+    """In-process stand-in for the MT5 terminal + EA, driven by recorded data.
+
+    Market data: bars of one base timeframe (higher timeframes are aggregated
+    from it; the forming bar is built from the base bars up to the sim clock)
+    and optional ticks (bid/ask). Without ticks the price is the last base
+    close and the spread is spread_points. All data serves every symbol name.
+
+    Clock: recorded time advances at `speed` x wall time from the first bar
+    after warmup_bars; with align_now the data is shifted so the sim clock
+    equals time.time() (the bridge mixes broker and local time).
+    set_time() pins the clock for deterministic runs.
+
+    Trading: start_ea() connects to the bridge's ZMQ PUSH like the EA does,
+    fills ORDER at ask/bid (volume = base_lot x multiplier) and CLOSE for all
+    positions of the symbol, pushes HEARTBEAT every heartbeat_sec and a
+    POSITIONS_CHANGED event per fill on the heartbeat socket.
+    """
+
+    TIMEFRAME_M1 = TIMEFRAME_M1
+    TIMEFRAME_M5 = TIMEFRAME_M5
+    TIMEFRAME_M15 = TIMEFRAME_M15
+    TIMEFRAME_M30 = TIMEFRAME_M30
+    TIMEFRAME_H1 = TIMEFRAME_H1
+    TIMEFRAME_H4 = TIMEFRAME_H4
+    TIMEFRAME_D1 = TIMEFRAME_D1
+    POSITION_TYPE_BUY = POSITION_TYPE_BUY
+    POSITION_TYPE_SELL = POSITION_TYPE_SELL
+
+    def __init__(
+        self,
+        *,
+        bars: List[_Bar],
+        base_tf_sec: int,
+        ticks: Optional[List[Tuple[float, float, float]]] = None,
+        point: float = 0.01,
+        digits: int = 2,
+        spread_points: float = 20.0,
+        tick_value: float = 1.0,
+        base_lot: float = 0.01,
+        magic: int = 0,
+        speed: float = 1.0,
+        warmup_bars: int = 300,
+        align_now: bool = True,
+    ) -> None:
+        if not bars:
+            raise ValueError("SimTerminal needs at least one bar")
+        self._base_sec = int(base_tf_sec)
+        self._point = float(point)
+        self._digits = int(digits)
+        self._spread_points = float(spread_points)
+        self._tick_value = float(tick_value)
+        self._base_lot = float(base_lot)
+        self._magic = int(magic)
+        self._speed = float(speed)
+
+        start = bars[min(len(bars) - 1, max(0, int(warmup_bars)))][0]
+        shift = int(time.time()) - int(start) if align_now else 0
+        self._bars = [(b[0] + shift,) + tuple(b[1:]) for b in bars]  # type: ignore[misc]
+        self._bar_times = [b[0] for b in self._bars]
+        self._ticks = [(t + shift, bid, ask) for t, bid, ask in (ticks or [])]
+        self._tick_times = [t[0] for t in self._ticks]
+        self._series: Dict[int, List[_Bar]] = {self._base_sec: self._bars}
+        self._series_times: Dict[int, List[int]] = {self._base_sec: self._bar_times}
+
+        self._clock_start = float(start + shift)
+        self._wall_start = time.time()
+        self._pinned: Optional[float] = None
+
+        self._lock = Lock()
+        self._positions: List[Dict[str, Any]] = []
+        self._ticket = 0
+        self._deal = 0
+        self._events: List[Dict[str, Any]] = []
+        self._ea_thread: Optional[Thread] = None
+        self._ea_stop = False
+        self._stats: Dict[str, Any] = {"orders": 0, "closes": 0, "holds": 0, "fills": 0, "ipc_calls": 0}
+
+    @classmethod
+    def from_env(cls, env: Mapping[str, str]) -> "SimTerminal":
+        """MT5_SIM_BARS=[TF=]path (e.g. M1=gold_m1.csv), MT5_SIM_TICKS=path, MT5_SIM_SPEED,
+        MT5_SIM_POINT, MT5_SIM_DIGITS, MT5_SIM_SPREAD_POINTS, MT5_SIM_TICK_VALUE,
+        MT5_SIM_BASE_LOT, MT5_SIM_WARMUP_BARS, MT5_SIM_ALIGN_NOW, MT5_SIM_SEED.
+        Without MT5_SIM_BARS a synthetic M1 random walk is used."""
+        spec = str(env.get("MT5_SIM_BARS", "") or "").strip()
+        if spec:
+            tf_name, _, path = spec.rpartition("=")
+            bars = load_bars_csv(path)
+            if tf_name:
+                base_sec = TIMEFRAME_SEC[_TF_BY_NAME[tf_name.strip().upper()]]
+            else:
+                diffs = sorted(b[0] - a[0] for a, b in zip(bars, bars[1:]) if b[0] > a[0])
+                base_sec = diffs[len(diffs) // 2] if diffs else 60
+        else:
+            base_sec = 60
+            now = int(time.time()) // 86400 * 86400
+            count = 60 * 24 * 45  # 45 days of M1 (enough for D1 warm-up)
+            bars = synthetic_bars(start=now - 40 * 86400, count=count, tf_sec=base_sec,
+                                  seed=int(env.get("MT5_SIM_SEED", "7") or 7))
+        ticks_path = str(env.get("MT5_SIM_TICKS", "") or "").strip()
+        warmup_default = "300" if spec else str(60 * 24 * 40)
+        return cls(
+            bars=bars,
+            base_tf_sec=base_sec,
+            ticks=load_ticks_csv(ticks_path) if ticks_path else None,
+            point=float(env.get("MT5_SIM_POINT", "0.01") or 0.01),
+            digits=int(env.get("MT5_SIM_DIGITS", "2") or 2),
+            spread_points=float(env.get("MT5_SIM_SPREAD_POINTS", "20") or 20),
+            tick_value=float(env.get("MT5_SIM_TICK_VALUE", "1.0") or 1.0),
+            base_lot=float(env.get("MT5_SIM_BASE_LOT", "0.01") or 0.01),
+            speed=float(env.get("MT5_SIM_SPEED", "1.0") or 1.0),
+            warmup_bars=int(env.get("MT5_SIM_WARMUP_BARS", warmup_default) or warmup_default),
+            align_now=str(env.get("MT5_SIM_ALIGN_NOW", "1")).strip().lower() in {"1", "true", "yes", "on"},
+        )
+
+    # --- clock ---
+    def now(self) -> float:
+        if self._pinned is not None:
+            return self._pinned
+        return self._clock_start + (time.time() - self._wall_start) * self._speed
+
+    def set_time(self, t: Optional[float]) -> None:
+        """Pin the sim clock (None resumes the replay clock)."""
+        self._pinned = None if t is None else float(t)
+
+    # --- terminal API ---
+    def initialize(self, *args: Any, **kwargs: Any) -> bool:
+        return True
+
+    def shutdown(self) -> None:
+        self.stop_ea()
+
+    def last_error(self) -> Tuple[int, str]:
+        return (1, "Success")
+
+    def symbol_select(self, symbol: str, enable: bool = True) -> bool:
+        return bool(symbol)
+
+    def _count_ipc(self) -> None:
+        with self._lock:
+            self._stats["ipc_calls"] += 1
+
+    def symbol_info(self, symbol: str) -> Any:
+        self._count_ipc()
+        return SimpleNamespace(
+            name=symbol, point=self._point, digits=self._digits, spread=int(self._spread_points),
+            trade_tick_size=self._point, trade_tick_value=self._tick_value, volume_min=0.01, volume_step=0.01,
+        )
+
+    def _quote(self, now: float) -> Tuple[float, float]:
+        if self._ticks:
+            i = bisect_right(self._tick_times, now) - 1
+            if i >= 0:
+                return self._ticks[i][1], self._ticks[i][2]
+        i = bisect_right(self._bar_times, now) - 1
+        bid = self._bars[max(0, i)][4]
+        return bid, bid + self._spread_points * self._point
+
+    def symbol_info_tick(self, symbol: str) -> Any:
+        self._count_ipc()
+        now = self.now()
+        bid, ask = self._quote(now)
+        return SimpleNamespace(time=int(now), time_msc=int(now * 1000), bid=bid, ask=ask, last=bid, volume=0)
+
+    def _series_for(self, tf_sec: int) -> Tuple[List[_Bar], List[int]]:
+        with self._lock:
+            if tf_sec not in self._series:
+                agg = _aggregate(self._bars, tf_sec)
+                self._series[tf_sec] = agg
+                self._series_times[tf_sec] = [b[0] for b in agg]
+            return self._series[tf_sec], self._series_times[tf_sec]
+
+    def copy_rates_from_pos(self, symbol: str, timeframe: int, start: int, count: int) -> Any:
+        self._count_ipc()
+        tf_sec = TIMEFRAME_SEC.get(int(timeframe))
+        if tf_sec is None or tf_sec < self._base_sec:
+            return None
+        now = self.now()
+        series, times = self._series_for(tf_sec)
+        end = bisect_right(times, now)  # bars[end-1] is the forming bar
+        if end <= 0:
+            return None
+        rows = list(series[max(0, end - int(start) - int(count)):max(0, end - int(start))])
+        if int(start) == 0 and rows and tf_sec > self._base_sec:
+            # Forming bar only up to the sim clock (no look-ahead inside the bar).
+            bt = rows[-1][0]
+            lo_i = bisect_right(self._bar_times, bt - 1)
+            hi_i = bisect_right(self._bar_times, now)
+            part = self._bars[lo_i:hi_i]
+            if part:
+                rows[-1] = _aggregate(part, tf_sec)[-1]
+        if not rows:
+            return None
+        if np is not None:
+            return np.array(rows, dtype=RATE_DTYPE)
+        return [dict(zip([n for n, _ in RATE_DTYPE], r)) for r in rows]
+
+    def positions_get(self, *, symbol: Optional[str] = None, **_: Any) -> Tuple[Any, ...]:
+        self._count_ipc()
+        now = self.now()
+        bid, ask = self._quote(now)
+        sym = (symbol or "").strip().upper()
+        with self._lock:
+            snap = [dict(p) for p in self._positions if (not sym or p["symbol"] == sym)]
+        out = []
+        for p in snap:
+            exit_px = bid if p["type"] == POSITION_TYPE_BUY else ask
+            move = (exit_px - p["price_open"]) * (1.0 if p["type"] == POSITION_TYPE_BUY else -1.0)
+            p["profit"] = round(move / self._point * self._tick_value * p["volume"], 2)
+            p["price_current"] = exit_px
+            out.append(SimpleNamespace(**p))
+        return tuple(out)
+
+    # --- EA side (fills) ---
+    def handle_bridge_message(self, payload: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Apply one ZMQ message from the bridge; returns the position events it caused."""
+        kind = str(payload.get("type") or "").upper()
+        sym = str(payload.get("symbol") or "").strip().upper()
+        now = self.now()
+        bid, ask = self._quote(now)
+        events: List[Dict[str, Any]] = []
+        with self._lock:
+            if kind == "ORDER":
+                self._stats["orders"] += 1
+                side = str(payload.get("action") or "").strip().upper()
+                if side not in {"BUY", "SELL"} or not sym:
+                    return events
+                try:
+                    mult = float(payload.get("multiplier") or 1.0)
+                except (TypeError, ValueError):
+                    mult = 1.0
+                vol = max(0.01, round(self._base_lot * max(0.0, mult), 2))
+                self._ticket += 1
+                self._positions.append({
+                    "ticket": self._ticket, "identifier": self._ticket, "symbol": sym, "magic": self._magic,
+                    "type": POSITION_TYPE_BUY if side == "BUY" else POSITION_TYPE_SELL,
+                    "volume": vol, "price_open": ask if side == "BUY" else bid,
+                    "time": int(now), "time_msc": int(now * 1000),
+                })
+                events.append(self._deal_event_locked(sym, self._ticket, "in", now))
+            elif kind == "CLOSE":
+                self._stats["closes"] += 1
+                keep = []
+                for p in self._positions:
+                    if sym and p["symbol"] != sym:
+                        keep.append(p)
+                        continue
+                    events.append(self._deal_event_locked(p["symbol"], p["ticket"], "out", now, removed=1))
+                self._positions = keep
+            elif kind == "HOLD":
+                self._stats["holds"] += 1
+            self._stats["fills"] += len(events)
+            self._events.extend(events)
+        return events
+
+    def _deal_event_locked(self, sym: str, ticket: int, entry: str, now: float, removed: int = 0) -> Dict[str, Any]:
+        self._deal += 1
+        return {
+            "type": "POSITIONS_CHANGED", "ts": int(now), "server_ts": int(now), "symbol": sym, "magic": self._magic,
+            "deal": self._deal, "position": ticket, "entry": entry, "positions": len(self._positions) - removed,
+        }
+
+    def _heartbeat(self) -> Dict[str, Any]:
+        now = self.now()
+        with self._lock:
+            n = len(self._positions)
+        return {"type": "HEARTBEAT", "ts": int(now), "server_ts": int(now), "gmt_ts": int(time.time()),
+                "symbol": "SIM", "login": 0, "positions": n, "halt": False, "magic": self._magic}
+
+    def start_ea(self, *, order_bind: str, heartbeat_bind: str = "", heartbeat_sec: float = 1.0) -> bool:
+        """Run the EA side in a thread: PULL from order_bind, PUSH heartbeats/events to heartbeat_bind."""
+        if zmq is None or self._ea_thread is not None:
+            return False
+        self._ea_stop = False
+
+        def _loop() -> None:
+            ctx = zmq.Context.instance()
+            pull = ctx.socket(zmq.PULL)
+            pull.connect(_connect_url(order_bind))
+            push = None
+            if heartbeat_bind:
+                push = ctx.socket(zmq.PUSH)
+                push.connect(_connect_url(heartbeat_bind))
+            poller = zmq.Poller()
+            poller.register(pull, zmq.POLLIN)
+            next_hb = 0.0
+            while not self._ea_stop:
+                if push is not None and time.monotonic() >= next_hb:
+                    next_hb = time.monotonic() + max(0.05, heartbeat_sec)
+                    push.send_string(json.dumps(self._heartbeat()))
+                if not dict(poller.poll(100)).get(pull):
+                    continue
+                try:
+                    payload = json.loads(pull.recv_string())
+                except Exception:
+                    continue
+                for ev in self.handle_bridge_message(payload if isinstance(payload, dict) else {}):
+                    if push is not None:
+                        push.send_string(json.dumps(ev))
+            pull.close(0)
+            if push is not None:
+                push.close(0)
+
+        self._ea_thread = Thread(target=_loop, name="mt5-sim-ea", daemon=True)
+        self._ea_thread.start()
+        return True
+
+    def stop_ea(self) -> None:
+        self._ea_stop = True
+        t = self._ea_thread
+        if t is not None:
+            t.join(1.0)
+        self._ea_thread = None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            out: Dict[str, Any] = dict(self._stats)
+            out["open_positions"] = len(self._positions)
+        out["sim_time"] = int(self.now())
+        out["ea_running"] = bool(self._ea_thread is not None and self._ea_thread.is_alive())
+        return out
+
+    def events(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return list(self._events)
+
@@ -1,6 +1,6 @@
 import json
 import os
-from typing import Any, Optional
+from typing import Any, Iterable, List, Optional
 
 
 def read_json_if_exists(path: str, *, default: Any = None, encoding: str = "utf-8") -> Any:
@@ -30,3 +30,53 @@ def atomic_write_json(path: str, data: Any, *, ensure_ascii: bool = False, encod
         return None
     except Exception as e:
         return str(e)
+
+
+def append_jsonl(path: str, rows: Iterable[Any], *, ensure_ascii: bool = False, encoding: str = "utf-8") -> Optional[str]:
+    """Append one JSON document per line (journal). Returns error string on failure, else None."""
+    if not path:
+        return "empty_path"
+    try:
+        lines = [json.dumps(r, ensure_ascii=ensure_ascii) for r in rows]
+        if not lines:
+            return None
+        with open(path, "a", encoding=encoding) as f:
+            f.write("\n".join(lines) + "\n")
+            f.flush()
+        return None
+    except Exception as e:
+        return str(e)
+
+
+def read_jsonl_if_exists(path: str, *, encoding: str = "utf-8") -> List[Any]:
+    """Read a JSON-lines journal; malformed lines (e.g. a torn last write) are skipped."""
+    if not path or not os.path.exists(path):
+        return []
+    out: List[Any] = []
+    try:
+        with open(path, "r", encoding=encoding) as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    out.append(json.loads(line))
+                except Exception:
+                    continue
+    except Exception:
+        return out
+    return out
+
+
+def truncate_file(path: str, *, encoding: str = "utf-8") -> Optional[str]:
+    """Atomically replace path with an empty file. Returns error string on failure, else None."""
+    if not path:
+        return "empty_path"
+    try:
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding=encoding):
+            pass
+        os.replace(tmp, path)
+        return None
+    except Exception as e:
+        return str(e)
@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import time
+from threading import Lock
+from typing import Any, Callable, Dict, Optional, Tuple
+
+# Fields compared when a reconcile refetch replaces a cached summary.
+_RECONCILE_KEYS = ("positions_open", "net_side", "net_volume")
+
+
+class _Entry:
+    __slots__ = ("summary", "fetched_at", "gen")
+
+    def __init__(self, summary: Dict[str, Any], fetched_at: float, gen: int) -> None:
+        self.summary = summary
+        self.fetched_at = fetched_at  # time.monotonic()
+        self.gen = gen
+
+
+class PositionsCache:
+    """Per-symbol cache of get_mt5_positions_summary, invalidated by EA events.
+
+    The EA pushes POSITIONS_CHANGED on every deal of its magic/symbol; the
+    bridge calls invalidate() for those and for its own ORDER/CLOSE sends.
+    Entries older than reconcile_sec are refetched anyway (safety net for a
+    lost event); a refetch that finds a different position state than the
+    cached one counts as a reconcile mismatch. max_holding_sec is advanced by
+    the entry age on read, so it stays current between fetches.
+
+    A fetch that races with an invalidation is returned to its caller but not
+    cached. Thread-safe; fetches run outside the lock.
+    """
+
+    def __init__(self, *, fetch: Callable[[str], Dict[str, Any]], reconcile_sec: float = 5.0) -> None:
+        self._fetch = fetch
+        self._reconcile_sec = float(reconcile_sec or 0.0)
+        self._lock = Lock()
+        self._entries: Dict[str, _Entry] = {}
+        self._gen: Dict[str, int] = {}
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "invalidations": 0,
+            "events": 0,
+            "reconciles": 0,
+            "reconcile_mismatches": 0,
+        }
+        self._last_event: Optional[Dict[str, Any]] = None
+
+    def invalidate(self, symbol: Optional[str] = None, *, event: Optional[Dict[str, Any]] = None) -> None:
+        """Drop the cached summary of `symbol` (all symbols when None)."""
+        sym = (symbol or "").strip().upper()
+        with self._lock:
+            self._stats["invalidations"] += 1
+            if event is not None:
+                self._stats["events"] += 1
+                self._last_event = {"at": time.time(), **event}
+            keys = [sym] if sym else list(set(self._entries) | set(self._gen))
+            for k in keys:
+                self._entries.pop(k, None)
+                self._gen[k] = self._gen.get(k, 0) + 1
+
+    def get(self, symbol: str) -> Dict[str, Any]:
+        sym = (symbol or "").strip().upper()
+        now = time.monotonic()
+        with self._lock:
+            ent = self._entries.get(sym)
+            if ent is not None and (self._reconcile_sec <= 0 or (now - ent.fetched_at) < self._reconcile_sec):
+                self._stats["hits"] += 1
+                return _aged(ent.summary, now - ent.fetched_at)
+            previous = ent.summary if ent is not None else None
+            if ent is not None:
+                self._stats["reconciles"] += 1
+            else:
+                self._stats["misses"] += 1
+            gen = self._gen.get(sym, 0)
+
+        summary = self._fetch(symbol)
+        fetched_at = time.monotonic()
+        with self._lock:
+            if previous is not None and _state(previous) != _state(summary):
+                self._stats["reconcile_mismatches"] += 1
+                print(f"[FXAI][POSCACHE] reconcile mismatch {sym}: cached={_state(previous)} mt5={_state(summary)}")
+            if self._gen.get(sym, 0) == gen:
+                self._entries[sym] = _Entry(summary, fetched_at, gen)
+        return dict(summary)
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        with self._lock:
+            out: Dict[str, Any] = dict(self._stats)
+            out["entry_age_sec"] = {k: round(now - e.fetched_at, 3) for k, e in self._entries.items()}
+            out["last_event"] = dict(self._last_event) if self._last_event else None
+        reads = int(out["hits"]) + int(out["misses"]) + int(out["reconciles"])
+        out["hit_rate"] = round(out["hits"] / reads, 4) if reads else None
+        out["reconcile_sec"] = self._reconcile_sec
+        return out
+
+
+def _state(summary: Dict[str, Any]) -> Tuple[Any, ...]:
+    return tuple((summary or {}).get(k) for k in _RECONCILE_KEYS)
+
+
+def _aged(summary: Dict[str, Any], age_sec: float) -> Dict[str, Any]:
+    out = dict(summary)
+    # Same rule as a fresh read: holding time only when a valid open time was found.
+    if int(out.get("max_holding_sec") or 0) > 0:
+        out["max_holding_sec"] = int(out["max_holding_sec"] + max(0.0, age_sec))
+    return out
@@ -0,0 +1,448 @@
+"""Local entry pre-filter: predicts whether the entry AI will score below threshold.
+
+A logistic regression over the features already stored in entry_metrics.json
+examples (_record_entry_outcome). Inference is a plain-Python dot product
+(microseconds); numpy is only needed for training.
+
+Training CLI:
+    python fxai_prefilter.py train entry_metrics.json [more.json ...] -o prefilter_model.json
+    python fxai_prefilter.py eval prefilter_model.json entry_metrics.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import os
+import sys
+import time
+from threading import Lock
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except Exception:  # only training needs numpy
+    np = None  # type: ignore
+
+MODEL_FORMAT = "fxai-prefilter/1"
+
+FEATURE_NAMES: Tuple[str, ...] = (
+    "is_buy",
+    "addon",
+    "delayed_entry",
+    "lr_retrigger",
+    "log_spread_points",
+    "log_atr_to_spread",
+    "atr_to_spread_missing",
+    "drift_atr",
+    "drift_missing",
+    "qtrend_missing",
+    "qtrend_aligned",
+    "qtrend_opposed",
+    "qtrend_strong",
+    "log_window_aligned",
+    "log_window_opposed",
+    "log_window_neutral",
+    "zones_confirmed_recent",
+    "trigger_sweep",
+    "trigger_zones",
+    "trigger_lorentzian",
+    "hour_sin",
+    "hour_cos",
+)
+
+
+def _f(v: Any) -> Optional[float]:
+    try:
+        x = float(v)
+    except (TypeError, ValueError):
+        return None
+    return x if math.isfinite(x) else None
+
+
+def example_features(ex: Dict[str, Any]) -> List[float]:
+    """Feature vector (FEATURE_NAMES order) of an entry_metrics example dict."""
+    trig = ex.get("trigger") if isinstance(ex.get("trigger"), dict) else {}
+    qt = ex.get("qtrend") if isinstance(ex.get("qtrend"), dict) else {}
+    counts = ex.get("window_counts") if isinstance(ex.get("window_counts"), dict) else {}
+    ctx = str(ex.get("attempt_context") or "")
+    side = str(trig.get("side") or ex.get("action") or "").strip().lower()
+    q_side = str(qt.get("side") or "").strip().lower()
+    src = str(trig.get("source") or "").lower()
+    evt = str(trig.get("event") or "").lower()
+
+    spread = _f(ex.get("spread_points"))
+    a2s = _f(ex.get("atr_to_spread"))
+    atr_pts = _f(ex.get("atr_points"))
+    drift = _f(ex.get("drift_points"))
+    drift_atr = None
+    if drift is not None and atr_pts:
+        drift_atr = max(-3.0, min(3.0, drift / atr_pts))
+
+    ts = _f(ex.get("ts")) or 0.0
+    hour = (ts % 86400.0) / 3600.0
+
+    def _cnt(k: str) -> float:
+        return math.log1p(max(0.0, _f(counts.get(k)) or 0.0))
+
+    return [
+        1.0 if side == "buy" else 0.0,
+        1.0 if ex.get("addon") else 0.0,
+        1.0 if ctx.startswith("DE:") else 0.0,
+        1.0 if ctx == "LR_RETRIG" else 0.0,
+        math.log1p(max(0.0, spread or 0.0)),
+        math.log1p(max(0.0, a2s)) if a2s is not None else 0.0,
+        1.0 if a2s is None else 0.0,
+        drift_atr if drift_atr is not None else 0.0,
+        1.0 if drift_atr is None else 0.0,
+        1.0 if q_side not in {"buy", "sell"} else 0.0,
+        1.0 if q_side in {"buy", "sell"} and q_side == side else 0.0,
+        1.0 if q_side in {"buy", "sell"} and side in {"buy", "sell"} and q_side != side else 0.0,
+        1.0 if str(qt.get("strength") or "").strip().lower() == "strong" else 0.0,
+        _cnt("aligned"),
+        _cnt("opposed"),
+        _cnt("neutral"),
+        min(5.0, max(0.0, _f(ex.get("zones_confirmed_recent")) or 0.0)),
+        1.0 if ("sweep" in src or "sweep" in evt) else 0.0,
+        1.0 if ("zone" in src or "zone" in evt) else 0.0,
+        1.0 if "lorentzian" in src else 0.0,
+        math.sin(2.0 * math.pi * hour / 24.0),
+        math.cos(2.0 * math.pi * hour / 24.0),
+    ]
+
+
+def example_label(ex: Dict[str, Any]) -> Optional[int]:
+    """1 when the AI scored below the required minimum, 0 when it passed, None if unlabeled."""
+    score = _f(ex.get("ai_score"))
+    need = _f(ex.get("min_required"))
+    if score is None or need is None:
+        return None
+    return 1 if score < need else 0
+
+
+def load_examples(paths: Iterable[str]) -> List[Dict[str, Any]]:
+    """Labeled, fresh-AI examples from entry_metrics.json files (by_day -> symbol -> examples)."""
+    out: List[Dict[str, Any]] = []
+    seen = set()
+    for path in paths:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception as e:
+            print(f"[FXAI][PREFILTER] skip {path}: {e}")
+            continue
+        by_day = data.get("by_day") if isinstance(data, dict) else None
+        for day in (by_day or {}).values():
+            if not isinstance(day, dict):
+                continue
+            for bucket in day.values():
+                for ex in (bucket or {}).get("examples") or []:
+                    if not isinstance(ex, dict) or ex.get("ai_cached") or example_label(ex) is None:
+                        continue
+                    key = (ex.get("ts"), ex.get("openai_response_id"))
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                    out.append(ex)
+    out.sort(key=lambda e: float(e.get("ts") or 0.0))
+    return out
+
+
+class PrefilterModel:
+    """Standardized logistic regression; predict() returns P(AI score < min_required)."""
+
+    __slots__ = ("features", "mean", "scale", "weights", "bias", "skip_prob", "meta")
+
+    def __init__(
+        self,
+        *,
+        features: Sequence[str],
+        mean: Sequence[float],
+        scale: Sequence[float],
+        weights: Sequence[float],
+        bias: float,
+        skip_prob: float,
+        meta: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        if tuple(features) != FEATURE_NAMES:
+            raise ValueError("prefilter model features do not match FEATURE_NAMES")
+        n = len(FEATURE_NAMES)
+        if not (len(mean) == len(scale) == len(weights) == n):
+            raise ValueError("prefilter model vector length mismatch")
+        self.features = tuple(features)
+        self.mean = [float(x) for x in mean]
+        self.scale = [float(x) if float(x) > 0 else 1.0 for x in scale]
+        self.weights = [float(x) for x in weights]
+        self.bias = float(bias)
+        self.skip_prob = float(skip_prob)
+        self.meta = dict(meta or {})
+
+    def predict(self, ex: Dict[str, Any]) -> float:
+        z = self.bias
+        for x, m, s, w in zip(example_features(ex), self.mean, self.scale, self.weights):
+            z += w * ((x - m) / s)
+        if z >= 0:
+            return 1.0 / (1.0 + math.exp(-z))
+        e = math.exp(z)
+        return e / (1.0 + e)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "format": MODEL_FORMAT,
+            "kind": "logistic",
+            "features": list(self.features),
+            "mean": self.mean,
+            "scale": self.scale,
+            "weights": self.weights,
+            "bias": self.bias,
+            "skip_prob": self.skip_prob,
+            "meta": self.meta,
+        }
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "PrefilterModel":
+        if not isinstance(d, dict) or d.get("format") != MODEL_FORMAT:
+            raise ValueError(f"unsupported prefilter model format: {d.get('format') if isinstance(d, dict) else None}")
+        return cls(
+            features=d.get("features") or (),
+            mean=d.get("mean") or (),
+            scale=d.get("scale") or (),
+            weights=d.get("weights") or (),
+            bias=float(d.get("bias") or 0.0),
+            skip_prob=float(d["skip_prob"]) if d.get("skip_prob") is not None else 1.0,
+            meta=d.get("meta"),
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "PrefilterModel":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls.from_dict(json.load(f))
+
+
+def _fit_logistic(X: Any, y: Any, *, l2: float, epochs: int, lr: float) -> Tuple[Any, float]:
+    w = np.zeros(X.shape[1])
+    b = 0.0
+    n = float(len(y))
+    for _ in range(max(1, int(epochs))):
+        p = 1.0 / (1.0 + np.exp(-np.clip(X @ w + b, -30.0, 30.0)))
+        g = p - y
+        w -= lr * ((X.T @ g) / n + l2 * w)
+        b -= lr * float(g.mean())
+    return w, b
+
+
+def _choose_skip_prob(p: Any, y: Any, *, target_precision: float, min_support: int) -> Tuple[float, Dict[str, Any]]:
+    """Lowest probability cut whose predicted rejects are >= target_precision real rejects."""
+    for cut in np.round(np.arange(0.50, 0.995, 0.01), 2):
+        sel = p >= cut
+        k = int(sel.sum())
+        if k < max(1, int(min_support)):
+            continue
+        prec = float(y[sel].mean())
+        if prec >= target_precision:
+            return float(cut), {"precision": round(prec, 4), "coverage": round(k / float(len(y)), 4), "support": k}
+    # No cut is precise enough: the model never skips.
+    return 1.01, {"precision": None, "coverage": 0.0, "support": 0}
+
+
+def train(
+    examples: Sequence[Dict[str, Any]],
+    *,
+    l2: float = 0.01,
+    epochs: int = 2000,
+    lr: float = 0.5,
+    holdout_frac: float = 0.25,
+    target_precision: float = 0.95,
+    min_support: int = 5,
+) -> PrefilterModel:
+    """Fit on the older examples, choose skip_prob on the newest holdout_frac (chronological split)."""
+    if np is None:
+        raise RuntimeError("numpy is required to train the prefilter")
+    labeled = [(example_features(ex), example_label(ex)) for ex in examples]
+    labeled = [(x, y) for x, y in labeled if y is not None]
+    if len(labeled) < 20:
+        raise ValueError(f"not enough labeled examples: {len(labeled)}")
+    X = np.asarray([x for x, _ in labeled], dtype=float)
+    y = np.asarray([y for _, y in labeled], dtype=float)
+    n_hold = int(len(y) * max(0.0, min(0.5, float(holdout_frac))))
+    n_fit = len(y) - n_hold
+
+    mean = X[:n_fit].mean(axis=0)
+    scale = X[:n_fit].std(axis=0)
+    scale[scale <= 1e-9] = 1.0
+    Z = (X - mean) / scale
+    w, b = _fit_logistic(Z[:n_fit], y[:n_fit], l2=l2, epochs=epochs, lr=lr)
+
+    eval_Z, eval_y = (Z[n_fit:], y[n_fit:]) if n_hold >= 10 else (Z, y)
+    p_eval = 1.0 / (1.0 + np.exp(-np.clip(eval_Z @ w + b, -30.0, 30.0)))
+    skip_prob, cut_stats = _choose_skip_prob(p_eval, eval_y, target_precision=target_precision, min_support=min_support)
+
+    # Refit on everything for the shipped weights; the cut stays the out-of-sample one.
+    mean = X.mean(axis=0)
+    scale = X.std(axis=0)
+    scale[scale <= 1e-9] = 1.0
+    w, b = _fit_logistic((X - mean) / scale, y, l2=l2, epochs=epochs, lr=lr)
+
+    meta = {
+        "trained_at": int(time.time()),
+        "examples": int(len(y)),
+        "reject_rate": round(float(y.mean()), 4),
+        "holdout_examples": int(n_hold) if n_hold >= 10 else 0,
+        "target_precision": float(target_precision),
+        "skip_cut": cut_stats,
+        "l2": float(l2),
+        "epochs": int(epochs),
+    }
+    return PrefilterModel(
+        features=FEATURE_NAMES,
+        mean=mean.tolist(),
+        scale=scale.tolist(),
+        weights=w.tolist(),
+        bias=float(b),
+        skip_prob=skip_prob,
+        meta=meta,
+    )
+
+
+def evaluate(model: PrefilterModel, examples: Sequence[Dict[str, Any]]) -> Dict[str, Any]:
+    tp = fp = tn = fn = 0
+    for ex in examples:
+        y = example_label(ex)
+        if y is None:
+            continue
+        skip = model.predict(ex) >= model.skip_prob
+        if skip and y == 1:
+            tp += 1
+        elif skip:
+            fp += 1
+        elif y == 1:
+            fn += 1
+        else:
+            tn += 1
+    n = tp + fp + tn + fn
+    return {
+        "examples": n,
+        "skip_prob": model.skip_prob,
+        "would_skip": tp + fp,
+        "calls_avoided_rate": round((tp + fp) / n, 4) if n else None,
+        "precision": round(tp / (tp + fp), 4) if (tp + fp) else None,
+        "false_skips": fp,
+        "reject_recall": round(tp / (tp + fn), 4) if (tp + fn) else None,
+    }
+
+
+class EntryPrefilter:
+    """Live gate around a PrefilterModel.
+
+    mode "shadow": predict and log agreement with the AI only.
+    mode "enforce": a confident reject (p >= skip_prob) skips the AI call.
+    Agreement is only known for attempts that reached the AI, so in enforce
+    mode it covers the non-skipped attempts.
+    """
+
+    def __init__(self, model: PrefilterModel, *, mode: str, skip_prob: Optional[float] = None) -> None:
+        self.model = model
+        self.mode = "enforce" if str(mode).strip().lower() == "enforce" else "shadow"
+        self.skip_prob = float(skip_prob) if skip_prob is not None else float(model.skip_prob)
+        self._lock = Lock()
+        self._stats = {
+            "evaluated": 0,
+            "predicted_reject": 0,
+            "calls_avoided": 0,
+            "agree": 0,
+            "disagree": 0,
+            "false_skip": 0,  # predicted reject, AI passed it
+            "missed_reject": 0,  # predicted pass, AI rejected it
+            "predict_us_total": 0,
+        }
+
+    @classmethod
+    def from_file(cls, path: str, *, mode: str, skip_prob: Optional[float] = None) -> "EntryPrefilter":
+        return cls(PrefilterModel.load(path), mode=mode, skip_prob=skip_prob)
+
+    def check(self, ex: Dict[str, Any], *, record: bool = True) -> Tuple[float, bool]:
+        """(p_reject, predicted_reject)."""
+        t0 = time.perf_counter()
+        p = self.model.predict(ex)
+        us = int((time.perf_counter() - t0) * 1_000_000)
+        reject = p >= self.skip_prob
+        if record:
+            with self._lock:
+                self._stats["evaluated"] += 1
+                self._stats["predicted_reject"] += int(reject)
+                self._stats["predict_us_total"] += us
+        return p, reject
+
+    def enforces(self, predicted_reject: bool) -> bool:
+        return bool(predicted_reject) and self.mode == "enforce"
+
+    def record_avoided(self) -> None:
+        with self._lock:
+            self._stats["calls_avoided"] += 1
+
+    def record_outcome(self, *, predicted_reject: bool, ai_rejected: bool) -> None:
+        with self._lock:
+            if bool(predicted_reject) == bool(ai_rejected):
+                self._stats["agree"] += 1
+            else:
+                self._stats["disagree"] += 1
+                self._stats["false_skip" if predicted_reject else "missed_reject"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            out: Dict[str, Any] = dict(self._stats)
+        judged = int(out["agree"]) + int(out["disagree"])
+        out["agreement_rate"] = round(out["agree"] / judged, 4) if judged else None
+        out["avg_predict_us"] = round(out.pop("predict_us_total") / out["evaluated"], 1) if out["evaluated"] else None
+        out["mode"] = self.mode
+        out["skip_prob"] = self.skip_prob
+        out["model"] = {k: self.model.meta.get(k) for k in ("trained_at", "examples", "reject_rate", "skip_cut")}
+        return out
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    p = argparse.ArgumentParser(description="Train / evaluate the local entry AI pre-filter from entry_metrics.json examples.")
+    sub = p.add_subparsers(dest="cmd", required=True)
+    t = sub.add_parser("train", help="fit a model and write it as JSON")
+    t.add_argument("metrics", nargs="+", help="entry_metrics.json file(s)")
+    t.add_argument("-o", "--out", default=os.getenv("AI_PREFILTER_MODEL_FILE", "prefilter_model.json"))
+    t.add_argument("--target-precision", type=float, default=0.95)
+    t.add_argument("--min-support", type=int, default=5)
+    t.add_argument("--holdout-frac", type=float, default=0.25)
+    t.add_argument("--l2", type=float, default=0.01)
+    t.add_argument("--epochs", type=int, default=2000)
+    e = sub.add_parser("eval", help="replay examples through a saved model")
+    e.add_argument("model")
+    e.add_argument("metrics", nargs="+")
+    args = p.parse_args(argv)
+
+    examples = load_examples(args.metrics)
+    if args.cmd == "train":
+        try:
+            model = train(
+                examples,
+                l2=args.l2,
+                epochs=args.epochs,
+                holdout_frac=args.holdout_frac,
+                target_precision=args.target_precision,
+                min_support=args.min_support,
+            )
+        except Exception as ex:
+            print(f"[FXAI][PREFILTER] train failed: {ex}")
+            return 1
+        tmp = f"{args.out}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(model.to_dict(), f, ensure_ascii=False, indent=1)
+        os.replace(tmp, args.out)
+        print(f"[FXAI][PREFILTER] wrote {args.out} {json.dumps(model.meta)}")
+        print(f"[FXAI][PREFILTER] in-sample {json.dumps(evaluate(model, examples))}")
+        return 0
+
+    model = PrefilterModel.load(args.model)
+    print(f"[FXAI][PREFILTER] {json.dumps(evaluate(model, examples))}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
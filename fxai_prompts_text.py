@@ -69,6 +69,7 @@ ENTRY_FILTER_PROMPT_PREFIX: str = (
     "Counter-trend is NOT enhanced by Q-Trend 'Strong'. Q-Trend only boosts aligned setups.\n\n"
     "=== STRUCTURE-FIRST FILTERING ===\n"
     "- M15 confirmed zones/FVG carry more weight than M5 touch noise.\n"
+    "- zones_context: {support_count, resistance_count} relative to current price; nearest_support_dist_atr / nearest_resistance_dist_atr (distance to the closest zone in ATR units) and zones_within_k_atr (zones within near_atr_mult x ATR).\n"
     "- If action faces strong nearby structural opposition, reduce score hard.\n"
     "- If opposition is mostly touch-level and trend/EV are healthy, allow entry with controlled size.\n\n"
     "=== SCORE CALIBRATION (ANTI-CLUSTERING) ===\n"
@@ -142,7 +143,7 @@ CLOSE_LOGIC_PROMPT_PREFIX: str = (
     "You MUST follow Phase Management rules below to avoid early whipsaws.\n\n"
     "IMPORTANT: ContextJSON.recent_signals contains multiple alerts collected within the settle window; use it to judge confluence and avoid reacting to a single latest_signal.\n\n"
     "NEW CONTEXT FIELDS (use for exit/hold decisions):\n"
-    "- zones_context: {support_count, resistance_count} relative to current price.\n"
+    "- zones_context: {support_count, resistance_count} relative to current price; nearest_support_dist_atr / nearest_resistance_dist_atr (distance to the closest zone in ATR units) and zones_within_k_atr (zones within near_atr_mult x ATR).\n"
     "- sma_context: {distance_points, slope, relationship, distance_atr_ratio}.\n"
     "- volatility_context: {volatility_ratio}.\n"
     "- spread_context: {spread_ratio}.\n\n"
@@ -7,7 +7,7 @@ from typing import Any, Callable, Dict, List, Optional
 def compute_qtrend_anchor_stats(
     *,
     target_symbol: str,
-    normalized: List[Dict[str, Any]],
+    normalized: List[Any],
     now: float,
     confluence_window_sec: Any,
     min_other_signals_for_entry: Any,
@@ -20,7 +20,7 @@ def compute_qtrend_anchor_stats(
     """Compute Q-Trend anchored confluence stats.
 
     This function is a behavior-preserving extraction from the main bridge.
-    It assumes signals are already normalized and freshness-filtered.
+    It assumes `normalized` holds freshness-filtered SignalRecords.
     """
 
     if not normalized:
@@ -35,12 +35,12 @@ def compute_qtrend_anchor_stats(
     # Q-Trend: Normal/Strong が混在する場合は Strong を優先
     q_candidates = []
     for s in normalized:
-        if s.get("source") in {"Q-Trend Strong", "Q-Trend", "Q-Trend-Strong", "Q-Trend-Normal"} and s.get("side") in {
+        if s.source in {"Q-Trend Strong", "Q-Trend", "Q-Trend-Strong", "Q-Trend-Normal"} and s.side in {
             "buy",
             "sell",
         }:
-            st = float(s.get("signal_time") or s.get("receive_time") or 0.0)
-            is_strong = (s.get("source") in {"Q-Trend Strong", "Q-Trend-Strong"}) or (s.get("strength") == "strong")
+            st = s.signal_ts
+            is_strong = (s.source in {"Q-Trend Strong", "Q-Trend-Strong"}) or (s.strength == "strong")
             q_candidates.append((st, 1 if is_strong else 0, s))
 
     latest_q = None
@@ -51,10 +51,10 @@ def compute_qtrend_anchor_stats(
     if not latest_q:
         return None
 
-    q_time = float(latest_q.get("signal_time") or latest_q.get("receive_time") or now)
-    q_side = (latest_q.get("side") or "").lower()
-    q_source = (latest_q.get("source") or "")
-    q_is_strong = (q_source in {"Q-Trend Strong", "Q-Trend-Strong"}) or (latest_q.get("strength") == "strong")
+    q_time = float(latest_q.signal_time or latest_q.receive_time or now)
+    q_side = (latest_q.side or "").lower()
+    q_source = (latest_q.source or "")
+    q_is_strong = (q_source in {"Q-Trend Strong", "Q-Trend-Strong"}) or (latest_q.strength == "strong")
     q_trigger_type = "Strong" if q_is_strong else "Normal"
     momentum_factor = 1.5 if q_is_strong else 1.0
     is_strong_momentum = bool(q_is_strong)
@@ -86,25 +86,25 @@ def compute_qtrend_anchor_stats(
     # Zones presence is meaningful even if it happened before Q-Trend.
     # Count recent zone confirmations (within ZONE_LOOKBACK_SEC by receive_time).
     for s in normalized:
-        if (s.get("source") == "Zones") and (s.get("signal_type") == "structure") and (s.get("event") == "new_zone_confirmed"):
-            rt = float(s.get("receive_time") or 0.0)
+        if (s.source == "Zones") and (s.signal_type == "structure") and (s.event == "new_zone_confirmed"):
+            rt = s.receive_ts()
             if rt > 0 and (now - rt) <= float(zone_lookback_sec):
                 zones_confirmed_recent += 1
 
     window = max(0, int(confluence_window_sec or 300))
     for s in normalized:
-        st = float(s.get("signal_time") or s.get("receive_time") or 0)
+        st = s.signal_ts
         # Source of Truth: Q-Trend ± 5 minutes
         if st < (q_time - window):
             if dbg_rows is not None:
                 dbg_rows.append(
                     {
                         "st": st,
-                        "src": s.get("source"),
-                        "side": s.get("side"),
-                        "evt": s.get("event"),
-                        "conf": s.get("confirmed"),
-                        "sig_type": s.get("signal_type"),
+                        "src": s.source,
+                        "side": s.side,
+                        "evt": s.event,
+                        "conf": s.confirmed,
+                        "sig_type": s.signal_type,
                         "counted": False,
                         "bucket": "SKIP",
                         "reason": "before_pre_window",
@@ -116,11 +116,11 @@ def compute_qtrend_anchor_stats(
                 dbg_rows.append(
                     {
                         "st": st,
-                        "src": s.get("source"),
-                        "side": s.get("side"),
-                        "evt": s.get("event"),
-                        "conf": s.get("confirmed"),
-                        "sig_type": s.get("signal_type"),
+                        "src": s.source,
+                        "side": s.side,
+                        "evt": s.event,
+                        "conf": s.confirmed,
+                        "sig_type": s.signal_type,
                         "counted": False,
                         "bucket": "SKIP",
                         "reason": "after_post_window",
@@ -128,11 +128,11 @@ def compute_qtrend_anchor_stats(
                 )
             continue
 
-        src = s.get("source")
-        side = s.get("side")
-        event = s.get("event")
-        sig_type = s.get("signal_type")
-        confirmed = s.get("confirmed")
+        src = s.source
+        side = s.side
+        event = s.event
+        sig_type = s.signal_type
+        confirmed = s.confirmed
 
         try:
             w = float(weight_confirmed(confirmed))
@@ -163,7 +163,7 @@ def compute_qtrend_anchor_stats(
                         "evt": event,
                         "conf": confirmed,
                         "sig_type": sig_type,
-                        "strength": s.get("strength"),
+                        "strength": s.strength,
                         "counted": False,
                         "bucket": "SKIP",
                         "reason": "source_not_allowed",
@@ -237,7 +237,7 @@ def compute_qtrend_anchor_stats(
         #   ただし「Zones/FVGのtouch系」は normal でも合流として数える（直近タッチ→反発→Qトリガーの再現）
         # - trend_filter は原則除外。ただし OSGFC は「1票」として合流に含める
         conf_l = (confirmed or "").lower()
-        strength_l = (s.get("strength") or "").lower()
+        strength_l = (s.strength or "").lower()
         is_touch_event = (event in {"fvg_touch", "zone_retrace_touch", "zone_touch"})
         is_zone_or_fvg_touch = (src in {"Zones", "FVG"}) and is_touch_event
         intrabar_ok = (conf_l == "intrabar") and (strength_l == "strong" or is_zone_or_fvg_touch)
@@ -256,7 +256,7 @@ def compute_qtrend_anchor_stats(
                 bucket = "CONFIRM"
                 reason = "counted"
             weighted_confirm_score += (w * event_weight)
-            if s.get("strength") == "strong":
+            if s.strength == "strong":
                 strong_after_q = True
             if dbg_rows is not None and (not counted):
                 if exclude_from_confluence_count:
@@ -293,7 +293,7 @@ def compute_qtrend_anchor_stats(
                     "evt": event,
                     "conf": confirmed,
                     "sig_type": sig_type,
-                    "strength": s.get("strength"),
+                    "strength": s.strength,
                     "counted": bool(counted),
                     "bucket": bucket,
                     "reason": reason,
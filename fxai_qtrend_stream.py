@@ -0,0 +1,638 @@
+from __future__ import annotations
+
+import argparse
+import heapq
+import json
+import os
+import sys
+from bisect import bisect_left, bisect_right, insort
+from threading import Lock
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+try:
+    import fxai_qtrend as _fxai_qtrend
+    import fxai_signal_cache as _fxai_signal_cache
+except Exception:
+    from tradingView import fxai_qtrend as _fxai_qtrend
+    from tradingView import fxai_signal_cache as _fxai_signal_cache
+
+
+# Must stay in sync with compute_qtrend_anchor_stats.
+_Q_SOURCES = {"Q-Trend Strong", "Q-Trend", "Q-Trend-Strong", "Q-Trend-Normal"}
+_Q_STRONG_SOURCES = {"Q-Trend Strong", "Q-Trend-Strong"}
+_ALLOWED_EVIDENCE_SOURCES = {"Zones", "FVG", "OSGFC", "ZonesDetector", "LuxAlgo_FVG"}
+_TOUCH_EVENTS = {"fvg_touch", "zone_retrace_touch", "zone_touch"}
+_SIDES = {"buy", "sell"}
+
+_EV_ENTER = 0
+_EV_LEAVE = 1
+
+
+def _is_zone_confirmation(s: Any) -> bool:
+    return (s.source == "Zones") and (s.signal_type == "structure") and (s.event == "new_zone_confirmed")
+
+
+class _SymbolState:
+    __slots__ = (
+        "now",
+        "alive",
+        "members",
+        "keys",
+        "items",
+        "q_keys",
+        "events",
+        "anchor",
+        "zones_recent",
+        "agg",
+    )
+
+    def __init__(self) -> None:
+        self.now = float("-inf")
+        # id -> seq for records currently in the store.
+        self.alive: Dict[int, int] = {}
+        # Fresh members, ordered by (signal_ts, seq) like SignalStore.fresh_candidates().
+        self.members: Dict[int, Tuple[float, int]] = {}
+        self.keys: List[Tuple[float, int]] = []
+        self.items: List[Any] = []
+        # Fresh Q-Trend candidates: (signal_ts, is_strong, seq, record).
+        self.q_keys: List[Tuple[float, int, int, Any]] = []
+        # Freshness transitions: (time, kind, seq, record).
+        self.events: List[Tuple[float, int, int, Any]] = []
+        self.anchor: Optional[Tuple[float, int, int, Any]] = None
+        self.zones_recent = 0
+        self.agg = _AnchorAggregate()
+
+
+class _AnchorAggregate:
+    """Counters for the signals inside the current anchor's confluence window."""
+
+    __slots__ = (
+        "q_strong_hits",
+        "strong_same",
+        "confirm_signals",
+        "opp_signals",
+        "confirm_sources",
+        "opp_sources",
+        "weighted_confirm",
+        "weighted_oppose",
+        "cancel_keys",
+        "osgfc_keys",
+        "fvg_same",
+        "fvg_opp",
+        "zones_touch_same",
+        "zones_touch_opp",
+        "zones_confirmed_after_q",
+    )
+
+    def __init__(self) -> None:
+        self.q_strong_hits = 0
+        self.strong_same = 0
+        self.confirm_signals = 0
+        self.opp_signals = 0
+        self.confirm_sources: Dict[str, int] = {}
+        self.opp_sources: Dict[str, int] = {}
+        # weight -> count; summed on read (few distinct weights).
+        self.weighted_confirm: Dict[float, int] = {}
+        self.weighted_oppose: Dict[float, int] = {}
+        # (signal_ts, seq, record), sorted.
+        self.cancel_keys: List[Tuple[float, int, Any]] = []
+        self.osgfc_keys: List[Tuple[float, int, Any]] = []
+        self.fvg_same = 0
+        self.fvg_opp = 0
+        self.zones_touch_same = 0
+        self.zones_touch_opp = 0
+        self.zones_confirmed_after_q = 0
+
+
+def _bump(counter: Dict[Any, int], key: Any, d: int) -> None:
+    n = counter.get(key, 0) + d
+    if n:
+        counter[key] = n
+    else:
+        counter.pop(key, None)
+
+
+def _sorted_toggle(lst: List[Tuple[float, int, Any]], item: Tuple[float, int, Any], d: int) -> None:
+    if d > 0:
+        insort(lst, item, key=lambda x: (x[0], x[1]))
+        return
+    i = bisect_left(lst, (item[0], item[1]), key=lambda x: (x[0], x[1]))
+    if i < len(lst) and lst[i][1] == item[1]:
+        del lst[i]
+
+
+class QTrendStream:
+    """Per-symbol streaming equivalent of compute_qtrend_anchor_stats.
+
+    Mirrors the signal store (add/remove on ingest/expiry) and tracks each
+    record's freshness interval (same rules as filter_fresh_signals_from_normalized)
+    with a deadline heap. Counters for the confluence window are updated per
+    transition; the window is rebuilt only when the latest Q-Trend anchor
+    changes. stats() is O(1) apart from due transitions.
+
+    Thread-safe via an internal lock. The clock is monotonic per symbol: an
+    earlier `now` is clamped to the last one seen.
+    """
+
+    def __init__(
+        self,
+        *,
+        confluence_window_sec: Any,
+        signal_max_age_sec: Any,
+        zone_lookback_sec: Any,
+        zone_touch_lookback_sec: Any,
+        fvg_lookback_sec: Any,
+        weight_confirmed: Callable[[Any], float],
+    ) -> None:
+        self._lock = Lock()
+        self._states: Dict[str, _SymbolState] = {}
+        self._seq = 0
+        self._window = max(0, int(confluence_window_sec or 300))
+        self._max_age = signal_max_age_sec
+        self._zone_lb = float(zone_lookback_sec)
+        self._touch_lb = float(zone_touch_lookback_sec)
+        self._fvg_lb = float(fvg_lookback_sec or _fxai_signal_cache.DEFAULT_FVG_LOOKBACK_SEC)
+        self._weight_confirmed = weight_confirmed
+
+    # --- freshness (filter_fresh_signals_from_normalized) ---
+
+    def _is_fresh(self, s: Any, now: float) -> bool:
+        if s.is_zone_presence:
+            rt = s.receive_ts()
+            return rt > 0 and (now - rt) <= self._zone_lb
+        if s.is_zone_touch:
+            rt = s.receive_ts()
+            return rt > 0 and (now - rt) <= self._touch_lb
+        try:
+            st = float(s.signal_time or 0.0)
+        except Exception:
+            return False
+        if st <= 0:
+            return False
+        age = now - st
+        if s.is_fvg:
+            return not (abs(age) > self._fvg_lb)
+        return not (abs(age) > self._max_age)
+
+    def _fresh_interval(self, s: Any) -> Optional[Tuple[Optional[float], float]]:
+        if s.is_zone_presence or s.is_zone_touch:
+            rt = s.receive_ts()
+            if rt <= 0:
+                return None
+            return None, rt + (self._zone_lb if s.is_zone_presence else self._touch_lb)
+        try:
+            st = float(s.signal_time or 0.0)
+        except Exception:
+            return None
+        if st <= 0:
+            return None
+        lb = self._fvg_lb if s.is_fvg else float(self._max_age)
+        return st - lb, st + lb
+
+    # --- writer side ---
+
+    def add(self, signal: Any, now: float) -> None:
+        sym = signal.symbol
+        if not sym:
+            return
+        with self._lock:
+            state = self._states.get(sym)
+            if state is None:
+                state = _SymbolState()
+                self._states[sym] = state
+            if id(signal) in state.alive:
+                return
+            self._seq += 1
+            seq = self._seq
+            state.alive[id(signal)] = seq
+            interval = self._fresh_interval(signal)
+            if interval is not None:
+                enter_at, leave_at = interval
+                if enter_at is not None:
+                    heapq.heappush(state.events, (enter_at, _EV_ENTER, seq, signal))
+                heapq.heappush(state.events, (leave_at, _EV_LEAVE, seq, signal))
+            self._advance_locked(state, now)
+            if id(signal) not in state.members and self._is_fresh(signal, state.now):
+                self._join_locked(state, signal)
+
+    def remove(self, signal: Any) -> None:
+        with self._lock:
+            state = self._states.get(signal.symbol)
+            if state is None or state.alive.pop(id(signal), None) is None:
+                return
+            if id(signal) in state.members:
+                self._drop_locked(state, signal)
+            # Heap entries of removed records become no-ops.
+
+    def clear(self) -> None:
+        with self._lock:
+            self._states.clear()
+
+    # --- reader side ---
+
+    def stats(self, symbol: str, now: float) -> Tuple[float, Optional[Dict[str, Any]]]:
+        """Return (effective_now, stats) with the same dict as compute_qtrend_anchor_stats."""
+        sym = (symbol or "").strip().upper()
+        with self._lock:
+            state = self._states.get(sym)
+            if state is None:
+                return float(now), None
+            self._advance_locked(state, now)
+            return state.now, self._result_locked(state)
+
+    # --- internals (caller holds self._lock) ---
+
+    def _advance_locked(self, state: _SymbolState, now: float) -> None:
+        n = max(float(now), state.now)
+        state.now = n
+        events = state.events
+        retry: List[Tuple[float, int, int, Any]] = []
+        while events and events[0][0] <= n:
+            ev = heapq.heappop(events)
+            _, kind, _, s = ev
+            if id(s) not in state.alive:
+                continue
+            fresh = self._is_fresh(s, n)
+            member = id(s) in state.members
+            if fresh and not member:
+                self._join_locked(state, s)
+            elif member and not fresh:
+                self._drop_locked(state, s)
+            elif kind == _EV_LEAVE and fresh:
+                # Float rounding at the boundary: not stale yet by the exact rule.
+                retry.append(ev)
+            elif kind == _EV_ENTER and not fresh:
+                interval = self._fresh_interval(s)
+                if interval is not None and n <= interval[1]:
+                    retry.append(ev)
+        for ev in retry:
+            heapq.heappush(events, ev)
+
+    def _join_locked(self, state: _SymbolState, s: Any) -> None:
+        seq = state.alive[id(s)]
+        key = (s.signal_ts, seq)
+        i = bisect_right(state.keys, key)
+        state.keys.insert(i, key)
+        state.items.insert(i, s)
+        state.members[id(s)] = key
+        if _is_zone_confirmation(s):
+            state.zones_recent += 1
+
+        if s.source in _Q_SOURCES and s.side in _SIDES:
+            strong = 1 if (s.source in _Q_STRONG_SOURCES or s.strength == "strong") else 0
+            qk = (s.signal_ts, strong, seq, s)
+            insort(state.q_keys, qk, key=lambda x: (x[0], x[1], x[2]))
+            if state.anchor is None or qk[:3] > state.anchor[:3]:
+                self._reanchor_locked(state)
+                return
+        if state.anchor is not None and self._in_window(state, s):
+            self._apply_locked(state, s, seq, +1)
+
+    def _drop_locked(self, state: _SymbolState, s: Any) -> None:
+        key = state.members.pop(id(s))
+        i = bisect_left(state.keys, key)
+        if i < len(state.keys) and state.keys[i] == key:
+            del state.keys[i]
+            del state.items[i]
+        if _is_zone_confirmation(s):
+            state.zones_recent -= 1
+
+        seq = key[1]
+        if s.source in _Q_SOURCES and s.side in _SIDES:
+            j = bisect_left(state.q_keys, (s.signal_ts,), key=lambda x: (x[0],))
+            while j < len(state.q_keys) and state.q_keys[j][0] == s.signal_ts:
+                if state.q_keys[j][2] == seq:
+                    del state.q_keys[j]
+                    break
+                j += 1
+            if state.anchor is not None and state.anchor[2] == seq:
+                self._reanchor_locked(state)
+                return
+        if state.anchor is not None and self._in_window(state, s):
+            self._apply_locked(state, s, seq, -1)
+
+    def _in_window(self, state: _SymbolState, s: Any) -> bool:
+        q_time = self._q_time(state)
+        st = s.signal_ts
+        return not (st < (q_time - self._window)) and not (st > (q_time + self._window))
+
+    @staticmethod
+    def _q_time(state: _SymbolState) -> float:
+        latest_q = state.anchor[3]
+        return float(latest_q.signal_time or latest_q.receive_time or state.now)
+
+    def _reanchor_locked(self, state: _SymbolState) -> None:
+        state.anchor = state.q_keys[-1] if state.q_keys else None
+        state.agg = _AnchorAggregate()
+        if state.anchor is None:
+            return
+        q_time = self._q_time(state)
+        lo = bisect_left(state.keys, (q_time - self._window, -1))
+        hi = bisect_right(state.keys, (q_time + self._window, float("inf")))
+        for key, s in zip(state.keys[lo:hi], state.items[lo:hi]):
+            if self._in_window(state, s):
+                self._apply_locked(state, s, key[1], +1)
+
+    def _apply_locked(self, state: _SymbolState, s: Any, seq: int, d: int) -> None:
+        agg = state.agg
+        latest_q = state.anchor[3]
+        q_time = self._q_time(state)
+        q_side = (latest_q.side or "").lower()
+
+        src = s.source
+        if src in _Q_SOURCES:
+            if src in _Q_STRONG_SOURCES:
+                agg.q_strong_hits += d
+            return
+        if src not in _ALLOWED_EVIDENCE_SOURCES:
+            return
+
+        st = s.signal_ts
+        side = s.side
+        event = s.event
+        sig_type = s.signal_type
+        confirmed = s.confirmed
+
+        if (
+            st >= q_time
+            and (confirmed or "").lower() == "bar_close"
+            and side in _SIDES
+            and side != q_side
+            and sig_type in {"entry_trigger", "structure"}
+        ):
+            _sorted_toggle(agg.cancel_keys, (st, seq, s), d)
+
+        if src == "OSGFC" and side in _SIDES:
+            _sorted_toggle(agg.osgfc_keys, (st, seq, s), d)
+
+        if src == "Zones" and sig_type == "structure" and event == "new_zone_confirmed":
+            agg.zones_confirmed_after_q += d
+
+        if src == "FVG" and event == "fvg_touch" and side in _SIDES:
+            if side == q_side:
+                agg.fvg_same += d
+            else:
+                agg.fvg_opp += d
+
+        if src == "Zones" and event == "zone_retrace_touch" and side in _SIDES:
+            if side == q_side:
+                agg.zones_touch_same += d
+            else:
+                agg.zones_touch_opp += d
+
+        try:
+            w = float(self._weight_confirmed(confirmed))
+        except Exception:
+            w = 0.0
+        event_weight = 0.7 if event in _TOUCH_EVENTS else 1.0
+
+        conf_l = (confirmed or "").lower()
+        strength_l = (s.strength or "").lower()
+        is_zone_or_fvg_touch = (src in {"Zones", "FVG"}) and (event in _TOUCH_EVENTS)
+        intrabar_ok = (conf_l == "intrabar") and (strength_l == "strong" or is_zone_or_fvg_touch)
+        confluence_ok = (conf_l == "bar_close") or intrabar_ok
+        exclude_from_confluence_count = (sig_type == "trend_filter") and (src != "OSGFC")
+        counts = confluence_ok and (not exclude_from_confluence_count)
+
+        if side == q_side:
+            if counts:
+                agg.confirm_signals += d
+                _bump(agg.confirm_sources, src, d)
+            _bump(agg.weighted_confirm, w * event_weight, d)
+            if s.strength == "strong":
+                agg.strong_same += d
+        elif side in _SIDES:
+            if counts:
+                agg.opp_signals += d
+                _bump(agg.opp_sources, src, d)
+            _bump(agg.weighted_oppose, w * event_weight, d)
+
+    def _result_locked(self, state: _SymbolState) -> Optional[Dict[str, Any]]:
+        if state.anchor is None or not state.members:
+            return None
+        agg = state.agg
+        latest_q = state.anchor[3]
+        q_time = self._q_time(state)
+        q_side = (latest_q.side or "").lower()
+        q_source = (latest_q.source or "")
+        q_is_strong = (q_source in _Q_STRONG_SOURCES) or (latest_q.strength == "strong")
+        momentum = q_is_strong or agg.q_strong_hits > 0
+
+        cancel_detail = None
+        if agg.cancel_keys:
+            st, _, c = agg.cancel_keys[0]
+            cancel_detail = {
+                "source": c.source,
+                "side": c.side,
+                "signal_type": c.signal_type,
+                "event": c.event,
+                "signal_time": st,
+            }
+        osgfc_latest_side = ""
+        osgfc_latest_time = None
+        if agg.osgfc_keys:
+            osgfc_latest_time, _, o = agg.osgfc_keys[-1]
+            osgfc_latest_side = o.side
+
+        return {
+            "q_time": q_time,
+            "q_side": q_side,
+            "q_source": q_source,
+            "q_is_strong": q_is_strong,
+            "q_trigger_type": "Strong" if momentum else "Normal",
+            "momentum_factor": 1.5 if momentum else 1.0,
+            "is_strong_momentum": bool(momentum),
+            "confirm_unique_sources": len(agg.confirm_sources),
+            "confirm_signals": agg.confirm_signals,
+            "opp_unique_sources": len(agg.opp_sources),
+            "opp_signals": agg.opp_signals,
+            "cancel_due_to_opposite_bar_close": cancel_detail is not None,
+            "cancel_detail": cancel_detail,
+            "strong_after_q": bool(q_is_strong or agg.q_strong_hits > 0 or agg.strong_same > 0),
+            "osgfc_latest_side": osgfc_latest_side,
+            "osgfc_latest_time": osgfc_latest_time,
+            "fvg_touch_same": agg.fvg_same,
+            "fvg_touch_opp": agg.fvg_opp,
+            "zones_touch_same": agg.zones_touch_same,
+            "zones_touch_opp": agg.zones_touch_opp,
+            "zones_confirmed_after_q": agg.zones_confirmed_after_q,
+            "zones_confirmed_recent": state.zones_recent,
+            "weighted_confirm_score": round(sum(w * n for w, n in agg.weighted_confirm.items()), 3),
+            "weighted_oppose_score": round(sum(w * n for w, n in agg.weighted_oppose.items()), 3),
+        }
+
+
+def stats_mismatch(a: Optional[Dict[str, Any]], b: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Fields that differ between two stats dicts ({} when identical)."""
+    if a is None or b is None:
+        return {} if a is b else {"_none": (a is None, b is None)}
+    return {k: (a.get(k), b.get(k)) for k in sorted(set(a) | set(b)) if a.get(k) != b.get(k)}
+
+
+def replay_parity(
+    signals: List[Any],
+    *,
+    confluence_window_sec: Any,
+    signal_max_age_sec: Any,
+    signal_lookback_sec: Any,
+    zone_lookback_sec: Any,
+    zone_touch_lookback_sec: Any,
+    fvg_lookback_sec: Any,
+    weight_confirmed: Callable[[Any], float],
+    step_sec: float = 15.0,
+) -> Dict[str, int]:
+    """Replay a recorded stream of SignalRecords through the full scan and QTrendStream.
+
+    Signals are ingested in receive_time order into a SignalStore with the
+    bridge's retention rules. Both implementations are compared for every
+    symbol after each ingest and every step_sec in between.
+    Raises AssertionError on the first mismatch.
+    """
+    try:
+        import fxai_signal_store as _fxai_signal_store
+    except Exception:
+        from tradingView import fxai_signal_store as _fxai_signal_store
+
+    def _retention(rec: Any) -> float:
+        return _fxai_signal_cache.retention_limit_sec(
+            rec.retention_class,
+            zone_lookback_sec=zone_lookback_sec,
+            zone_touch_lookback_sec=zone_touch_lookback_sec,
+            fvg_lookback_sec=fvg_lookback_sec,
+            signal_lookback_sec=signal_lookback_sec,
+        )
+
+    store = _fxai_signal_store.SignalStore(retention_sec=_retention)
+    stream = QTrendStream(
+        confluence_window_sec=confluence_window_sec,
+        signal_max_age_sec=signal_max_age_sec,
+        zone_lookback_sec=zone_lookback_sec,
+        zone_touch_lookback_sec=zone_touch_lookback_sec,
+        fvg_lookback_sec=fvg_lookback_sec,
+        weight_confirmed=weight_confirmed,
+    )
+    ordered = sorted((s for s in signals if s.receive_ts() > 0), key=lambda s: s.receive_ts())
+    counts = {"signals": 0, "checks": 0, "anchored": 0}
+
+    def _check(now: float) -> None:
+        for sym in store.symbols():
+            eff_now, got = stream.stats(sym, now)
+            fresh = _fxai_signal_cache.filter_fresh_signals_from_normalized(
+                normalized=store.fresh_candidates(
+                    sym,
+                    now=eff_now,
+                    signal_max_age_sec=float(signal_max_age_sec),
+                    fvg_lookback_sec=float(fvg_lookback_sec or _fxai_signal_cache.DEFAULT_FVG_LOOKBACK_SEC),
+                ),
+                now=eff_now,
+                signal_max_age_sec=signal_max_age_sec,
+                zone_lookback_sec=zone_lookback_sec,
+                zone_touch_lookback_sec=zone_touch_lookback_sec,
+                fvg_lookback_sec=fvg_lookback_sec,
+            )
+            want = None
+            if fresh:
+                want = _fxai_qtrend.compute_qtrend_anchor_stats(
+                    target_symbol=sym,
+                    normalized=fresh,
+                    now=eff_now,
+                    confluence_window_sec=confluence_window_sec,
+                    min_other_signals_for_entry=0,
+                    zone_lookback_sec=zone_lookback_sec,
+                    zone_touch_lookback_sec=zone_touch_lookback_sec,
+                    confluence_debug=False,
+                    confluence_debug_max_lines=0,
+                    weight_confirmed=weight_confirmed,
+                )
+            diff = stats_mismatch(want, got)
+            assert not diff, f"qtrend stream mismatch symbol={sym} now={eff_now}: {diff}"
+            counts["checks"] += 1
+            if want is not None:
+                counts["anchored"] += 1
+
+    last = None
+    for s in ordered:
+        now = s.receive_ts()
+        if last is not None and step_sec > 0:
+            t = last + step_sec
+            while t < now:
+                for e in store.expire(t):
+                    stream.remove(e)
+                _check(t)
+                t += step_sec
+        for e in store.expire(now):
+            stream.remove(e)
+        if store.add(s):
+            stream.add(s, now)
+            counts["signals"] += 1
+        _check(now)
+        last = now
+    return counts
+
+
+def load_recorded_signals(paths: List[str]) -> List[Any]:
+    try:
+        import fxai_persistence as _fxai_persist
+        import fxai_signal_record as _fxai_signal_record
+    except Exception:
+        from tradingView import fxai_persistence as _fxai_persist
+        from tradingView import fxai_signal_record as _fxai_signal_record
+
+    raws: List[Dict[str, Any]] = []
+    for path in paths:
+        if path.endswith(".journal") or path.endswith(".jsonl"):
+            for op in _fxai_persist.read_jsonl_if_exists(path):
+                if isinstance(op, dict) and op.get("op") == "add" and isinstance(op.get("signal"), dict):
+                    raws.append(op.get("signal"))
+        else:
+            data = _fxai_persist.read_json_if_exists(path, default=None)
+            raws.extend(raw for raw in (data if isinstance(data, list) else []) if isinstance(raw, dict))
+    return [_fxai_signal_record.SignalRecord.from_normalized(raw) for raw in raws if raw.get("symbol")]
+
+
+def _weight_confirmed_default(confirmed: Any) -> float:
+    # Same weights as the bridge's _weight_confirmed.
+    c = (confirmed or "").lower()
+    if c == "bar_close":
+        return 1.0
+    if c == "intrabar":
+        return 0.6
+    return 0.8
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Parity mode: python fxai_qtrend_stream.py signals_cache.json [signals_cache.json.journal]"""
+    signal_lookback = os.getenv("SIGNAL_LOOKBACK_SEC", "1200")
+    p = argparse.ArgumentParser(description="Replay recorded signals; assert QTrendStream == compute_qtrend_anchor_stats.")
+    p.add_argument("paths", nargs="+", help="cache snapshot (.json) and/or journal (.journal/.jsonl) files")
+    p.add_argument("--step-sec", type=float, default=15.0)
+    p.add_argument("--confluence-window-sec", type=int, default=int(os.getenv("CONFLUENCE_WINDOW_SEC", "600")))
+    p.add_argument("--signal-lookback-sec", type=int, default=int(signal_lookback))
+    p.add_argument("--signal-max-age-sec", type=int, default=int(os.getenv("SIGNAL_MAX_AGE_SEC", signal_lookback)))
+    p.add_argument("--zone-lookback-sec", type=int, default=int(os.getenv("ZONE_LOOKBACK_SEC", "1200")))
+    p.add_argument("--zone-touch-lookback-sec", type=int, default=int(os.getenv("ZONE_TOUCH_LOOKBACK_SEC", "1200")))
+    p.add_argument("--fvg-lookback-sec", type=int, default=int(os.getenv("FVG_LOOKBACK_SEC", "1200")))
+    args = p.parse_args(argv)
+
+    signals = load_recorded_signals(args.paths)
+    try:
+        counts = replay_parity(
+            signals,
+            confluence_window_sec=args.confluence_window_sec,
+            signal_max_age_sec=args.signal_max_age_sec,
+            signal_lookback_sec=args.signal_lookback_sec,
+            zone_lookback_sec=args.zone_lookback_sec,
+            zone_touch_lookback_sec=args.zone_touch_lookback_sec,
+            fvg_lookback_sec=args.fvg_lookback_sec,
+            weight_confirmed=_weight_confirmed_default,
+            step_sec=args.step_sec,
+        )
+    except AssertionError as e:
+        print(f"[FXAI][QTREND][PARITY] FAIL {e}")
+        return 1
+    print(f"[FXAI][QTREND][PARITY] OK {json.dumps(counts)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,14 +5,14 @@ from typing import Any, Dict, List, Optional
 
 def compute_recent_context_signals(
     *,
-    normalized: List[Dict[str, Any]],
+    normalized: List[Any],
     now: float,
     zone_lookback_sec: Any,
 ) -> Dict[str, Any]:
     """Compute compact recent Zones/FVG context.
 
     Behavior-preserving extraction from the main bridge.
-    `normalized` should already be normalized + freshness-filtered.
+    `normalized` should hold freshness-filtered SignalRecords.
     """
 
     zones_confirmed_recent = 0
@@ -24,16 +24,16 @@ def compute_recent_context_signals(
 
     for s in sorted(
         normalized,
-        key=lambda x: float(x.get("signal_time") or x.get("receive_time") or 0.0),
+        key=lambda x: x.signal_ts,
         reverse=True,
     ):
-        src = s.get("source")
-        evt = s.get("event")
-        side = s.get("side")
-        st = float(s.get("signal_time") or s.get("receive_time") or 0.0)
+        src = s.source
+        evt = s.event
+        side = s.side
+        st = s.signal_ts
 
-        if src == "Zones" and (s.get("signal_type") == "structure") and (evt == "new_zone_confirmed"):
-            rt = float(s.get("receive_time") or 0.0)
+        if src == "Zones" and (s.signal_type == "structure") and (evt == "new_zone_confirmed"):
+            rt = s.receive_ts()
             if rt > 0 and (now - rt) <= float(zone_lookback_sec):
                 zones_confirmed_recent += 1
 
@@ -43,8 +43,8 @@ def compute_recent_context_signals(
                     "side": side,
                     "event": evt,
                     "signal_time": st,
-                    "confirmed": s.get("confirmed"),
-                    "strength": s.get("strength"),
+                    "confirmed": s.confirmed,
+                    "strength": s.strength,
                 }
 
         if src == "FVG" and evt == "fvg_touch" and side in {"buy", "sell"}:
@@ -53,8 +53,8 @@ def compute_recent_context_signals(
                     "side": side,
                     "event": evt,
                     "signal_time": st,
-                    "confirmed": s.get("confirmed"),
-                    "strength": s.get("strength"),
+                    "confirmed": s.confirmed,
+                    "strength": s.strength,
                 }
 
         if len(recent_events) < 12:
@@ -65,9 +65,9 @@ def compute_recent_context_signals(
                         "event": evt,
                         "side": side,
                         "signal_time": st,
-                        "confirmed": s.get("confirmed"),
-                        "strength": s.get("strength"),
-                        "signal_type": s.get("signal_type"),
+                        "confirmed": s.confirmed,
+                        "strength": s.strength,
+                        "signal_type": s.signal_type,
                     }
                 )
 
@@ -0,0 +1,209 @@
+"""Single-thread deadline scheduler for delayed work.
+
+One timer thread owns a heap of (due_at, seq, key, version). schedule()
+upserts a key: it bumps the key's version and pushes a new heap entry, so
+moving a sliding deadline is O(log n); superseded entries are skipped when
+they surface. Due callbacks run on a bounded worker pool; task types
+listed in `dedicated_types` get their own single-worker pool each, so slow
+(AI-bound) callbacks on the shared pool cannot delay them. Deadlines are
+kept on time.monotonic(), so wall-clock jumps neither fire timers early nor
+hold them back. Lateness (start of the callback minus due time) and run
+time are tracked per task type.
+"""
+from __future__ import annotations
+
+import heapq
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from threading import Condition, Thread
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+_SAMPLES = 200
+
+
+class Scheduler:
+    """Keyed one-shot timers.
+
+    schedule() takes an epoch due time (converted to monotonic once, when
+    scheduled); schedule_in() takes a delay. A key holds at most one live
+    deadline. every() re-arms a key after each run (interval measured from
+    the end of the previous run). The timer thread is started on the first
+    schedule. Thread-safe.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_workers: int = 4,
+        dedicated_types: Iterable[str] = (),
+        name: str = "fxai-sched",
+    ) -> None:
+        self._cond = Condition()
+        self._heap: List[Tuple[float, int, str, int]] = []
+        self._live: Dict[str, Tuple[int, float, Callable[[], Any], str]] = {}  # key -> (version, due_mono, fn, task_type)
+        self._versions: Dict[str, int] = {}
+        self._seq = 0
+        self._name = name
+        self._max_workers = max(1, int(max_workers))
+        self._pool = ThreadPoolExecutor(max_workers=self._max_workers, thread_name_prefix=f"{name}-w")
+        self._dedicated: Dict[str, ThreadPoolExecutor] = {
+            str(t): ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"{name}-{t}") for t in dedicated_types
+        }
+        self._thread: Optional[Thread] = None
+        self._busy = 0
+        self._types: Dict[str, Dict[str, Any]] = {}
+
+    def _type_locked(self, task_type: str) -> Dict[str, Any]:
+        st = self._types.get(task_type)
+        if st is None:
+            st = {
+                "scheduled": 0,
+                "rescheduled": 0,
+                "cancelled": 0,
+                "fired": 0,
+                "errors": 0,
+                "late_ms_max": 0,
+                "late_ms": deque(maxlen=_SAMPLES),
+                "run_ms": deque(maxlen=_SAMPLES),
+            }
+            self._types[task_type] = st
+        return st
+
+    def _ensure_thread_locked(self) -> None:
+        if self._thread is None:
+            self._thread = Thread(target=self._run, name=self._name, daemon=True)
+            self._thread.start()
+
+    def schedule(self, key: str, due_at: float, fn: Callable[[], Any], *, task_type: str = "task") -> None:
+        """Run fn at due_at (epoch sec); replaces any pending deadline of key."""
+        self.schedule_in(key, float(due_at) - time.time(), fn, task_type=task_type)
+
+    def schedule_in(self, key: str, delay_sec: float, fn: Callable[[], Any], *, task_type: str = "task") -> None:
+        """Run fn delay_sec from now (monotonic); replaces any pending deadline of key."""
+        due = time.monotonic() + max(0.0, float(delay_sec))
+        k = str(key)
+        with self._cond:
+            ver = self._versions.get(k, 0) + 1
+            self._versions[k] = ver
+            st = self._type_locked(task_type)
+            st["rescheduled" if k in self._live else "scheduled"] += 1
+            self._live[k] = (ver, due, fn, task_type)
+            self._seq += 1
+            heapq.heappush(self._heap, (due, self._seq, k, ver))
+            self._ensure_thread_locked()
+            if self._heap[0][2] == k and self._heap[0][3] == ver:
+                self._cond.notify()
+
+    def every(self, key: str, interval_sec: float, fn: Callable[[], Any], *, task_type: str = "task") -> None:
+        """Run fn every interval_sec (first run one interval from now)."""
+        interval = max(0.01, float(interval_sec))
+
+        def _tick() -> None:
+            try:
+                fn()
+            finally:
+                self.schedule_in(key, interval, _tick, task_type=task_type)
+
+        self.schedule_in(key, interval, _tick, task_type=task_type)
+
+    def cancel(self, key: str) -> bool:
+        k = str(key)
+        with self._cond:
+            item = self._live.pop(k, None)
+            if item is None:
+                return False
+            self._type_locked(item[3])["cancelled"] += 1
+            return True
+
+    def due_at(self, key: str) -> Optional[float]:
+        """Pending due time of key as epoch sec (for display), None if not scheduled."""
+        with self._cond:
+            item = self._live.get(str(key))
+            return (time.time() + (item[1] - time.monotonic())) if item is not None else None
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while True:
+                    while self._heap:
+                        _, _, k, ver = self._heap[0]
+                        item = self._live.get(k)
+                        if item is not None and item[0] == ver:
+                            break
+                        heapq.heappop(self._heap)  # superseded or cancelled
+                    if not self._heap:
+                        self._cond.wait()
+                        continue
+                    wait = self._heap[0][0] - time.monotonic()
+                    if wait <= 0:
+                        break
+                    self._cond.wait(wait)
+                due, _, k, ver = heapq.heappop(self._heap)
+                _, _, fn, task_type = self._live.pop(k)
+                self._busy += 1
+            try:
+                self._dedicated.get(task_type, self._pool).submit(self._invoke, fn, task_type, due)
+            except Exception as e:
+                with self._cond:
+                    self._busy -= 1
+                    self._type_locked(task_type)["errors"] += 1
+                print(f"[FXAI][SCHED] submit failed for {k}: {e}")
+
+    def _invoke(self, fn: Callable[[], Any], task_type: str, due_at: float) -> None:
+        started = time.monotonic()
+        ok = True
+        try:
+            fn()
+        except Exception as e:
+            ok = False
+            print(f"[FXAI][SCHED] {task_type} task error: {e}")
+        run_ms = int((time.monotonic() - started) * 1000.0)
+        late_ms = int(max(0.0, started - due_at) * 1000.0)
+        with self._cond:
+            self._busy -= 1
+            st = self._type_locked(task_type)
+            st["fired"] += 1
+            st["errors"] += int(not ok)
+            st["late_ms"].append(late_ms)
+            st["late_ms_max"] = max(st["late_ms_max"], late_ms)
+            st["run_ms"].append(run_ms)
+
+    def stats(self) -> Dict[str, Any]:
+        def _pct(vals: List[int], q: float) -> Optional[int]:
+            return vals[min(len(vals) - 1, int(q * (len(vals) - 1) + 0.5))] if vals else None
+
+        with self._cond:
+            now = time.monotonic()
+            pending: Dict[str, int] = {}
+            next_due: Optional[float] = None
+            for _, due, _, task_type in self._live.values():
+                pending[task_type] = pending.get(task_type, 0) + 1
+                next_due = due if next_due is None else min(next_due, due)
+            types: Dict[str, Any] = {}
+            for t, st in self._types.items():
+                late = sorted(st["late_ms"])
+                run = sorted(st["run_ms"])
+                types[t] = {
+                    "scheduled": st["scheduled"],
+                    "rescheduled": st["rescheduled"],
+                    "cancelled": st["cancelled"],
+                    "fired": st["fired"],
+                    "errors": st["errors"],
+                    "pending": pending.get(t, 0),
+                    "late_ms_p50": _pct(late, 0.5),
+                    "late_ms_p90": _pct(late, 0.9),
+                    "late_ms_max": st["late_ms_max"],
+                    "run_ms_p50": _pct(run, 0.5),
+                    "run_ms_max": run[-1] if run else None,
+                }
+            return {
+                "running": bool(self._thread is not None and self._thread.is_alive()),
+                "workers": self._max_workers,
+                "dedicated_types": sorted(self._dedicated),
+                "busy": self._busy,
+                "pending": len(self._live),
+                "heap_size": len(self._heap),
+                "next_due_in_sec": round(next_due - now, 3) if next_due is not None else None,
+                "types": types,
+            }
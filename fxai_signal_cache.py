@@ -1,7 +1,8 @@
 from __future__ import annotations
 
 import time
-from typing import Any, Dict, List, Optional, Tuple
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
 
 
 def is_zone_presence_signal(s: Dict[str, Any]) -> bool:
@@ -50,132 +51,128 @@ def is_fvg_signal(s: Dict[str, Any]) -> bool:
 DEFAULT_FVG_LOOKBACK_SEC = 1200
 
 
-def prune_signals_cache(
-    *,
-    signals_cache: List[Dict[str, Any]],
-    now: float,
-    zone_lookback_sec: Any,
-    zone_touch_lookback_sec: Any,
-    fvg_lookback_sec: Any,
-    signal_lookback_sec: Any,
-) -> Tuple[List[Dict[str, Any]], bool]:
-    """Return (kept_signals, changed).
+# Zoneの「構造/存在」イベント（長期保持）
+_ZONE_PRESENCE_EVENTS = {
+    "new_zone_confirmed",
+    "zone_confirmed",
+    "new_zone",
+    "zone_created",
+    "zone_breakout",
+}
 
-    Behavior is intended to match the inlined logic in the main bridge file.
-    Caller is responsible for holding any locks and for updating indexes.
-    """
+# Zoneの「接触」イベント（短期保持）
+_ZONE_TOUCH_MARKERS = (
+    "zone_retrace_touch",
+    "zone_touch",
+    "touch",
+    "retrace",
+    "bounce",
+)
 
-    keep_list: List[Dict[str, Any]] = []
-
-    for s in signals_cache:
-        src_raw = (s.get("source") or "").strip().lower()
-        event = (s.get("event") or "").strip().lower()
-        sig_type = (s.get("signal_type") or "").strip().lower()
-
-        src_norm = src_raw.replace(" ", "").replace("_", "")
-        is_zones = (src_norm in {"zones", "zonesdetector"}) or ("zone" in src_norm)
-
-        # Zoneの「構造/存在」イベント（長期保持）
-        zone_presence_events = {
-            "new_zone_confirmed",
-            "zone_confirmed",
-            "new_zone",
-            "zone_created",
-            "zone_breakout",
-        }
-
-        # Zoneの「接触」イベント（短期保持）
-        zone_touch_markers = {
-            "zone_retrace_touch",
-            "zone_touch",
-            "touch",
-            "retrace",
-            "bounce",
-        }
-
-        rt = float(s.get("receive_time", now) or now)
-        age = now - rt
-
-        if is_zones:
-            if (sig_type in {"structure", "zones", "zone"} and event in zone_presence_events) or event in zone_presence_events:
-                limit_sec = zone_lookback_sec
-                if age < float(limit_sec or zone_lookback_sec):
-                    keep_list.append(s)
-                continue
-            if any(m in event for m in zone_touch_markers):
-                limit_sec = zone_touch_lookback_sec
-                if age < float(limit_sec or zone_touch_lookback_sec):
-                    keep_list.append(s)
-                continue
 
-            # Unknown Zones-like events: keep short to avoid false confluence.
-            limit_sec = signal_lookback_sec
-            if age < float(limit_sec or signal_lookback_sec):
-                keep_list.append(s)
-            continue
+RETENTION_ZONE_PRESENCE = "zone_presence"
+RETENTION_ZONE_TOUCH = "zone_touch"
+RETENTION_ZONE_OTHER = "zone_other"
+RETENTION_FVG = "fvg"
+RETENTION_SIGNAL = "signal"
+
+
+def retention_class(s: Dict[str, Any]) -> str:
+    """Cache retention class of a (normalized) signal dict."""
+    src_raw = (s.get("source") or "").strip().lower()
+    event = (s.get("event") or "").strip().lower()
+    sig_type = (s.get("signal_type") or "").strip().lower()
+
+    src_norm = src_raw.replace(" ", "").replace("_", "")
+    is_zones = (src_norm in {"zones", "zonesdetector"}) or ("zone" in src_norm)
 
-        # FVG: keep longer to cover 15-min candle context.
-        if is_fvg_signal(s):
-            limit_sec = float(fvg_lookback_sec or DEFAULT_FVG_LOOKBACK_SEC)
-        else:
-            # Non-Zones/FVG: simple time-based retention (no Q-Trend anchoring).
-            # We keep recent evidence so Lorentzian triggers can reference it.
-            limit_sec = float(signal_lookback_sec or 1200)
-        if age < limit_sec:
-            keep_list.append(s)
+    if is_zones:
+        if (sig_type in {"structure", "zones", "zone"} and event in _ZONE_PRESENCE_EVENTS) or event in _ZONE_PRESENCE_EVENTS:
+            return RETENTION_ZONE_PRESENCE
+        if any(m in event for m in _ZONE_TOUCH_MARKERS):
+            return RETENTION_ZONE_TOUCH
+        return RETENTION_ZONE_OTHER
 
-    changed = (len(keep_list) != len(signals_cache))
-    return keep_list, changed
+    if is_fvg_signal(s):
+        return RETENTION_FVG
+    return RETENTION_SIGNAL
+
+
+def retention_limit_sec(
+    cls: str,
+    *,
+    zone_lookback_sec: Any,
+    zone_touch_lookback_sec: Any,
+    fvg_lookback_sec: Any,
+    signal_lookback_sec: Any,
+) -> float:
+    """Cache retention (receive_time age) for a retention class; kept while age < limit."""
+    if cls == RETENTION_ZONE_PRESENCE:
+        return float(zone_lookback_sec)
+    if cls == RETENTION_ZONE_TOUCH:
+        return float(zone_touch_lookback_sec)
+    if cls == RETENTION_ZONE_OTHER:
+        # Unknown Zones-like events: keep short to avoid false confluence.
+        return float(signal_lookback_sec)
+    # FVG: keep longer to cover 15-min candle context.
+    if cls == RETENTION_FVG:
+        return float(fvg_lookback_sec or DEFAULT_FVG_LOOKBACK_SEC)
+    # Non-Zones/FVG: simple time-based retention (no Q-Trend anchoring).
+    # We keep recent evidence so Lorentzian triggers can reference it.
+    return float(signal_lookback_sec or 1200)
 
 
 def filter_fresh_signals_from_normalized(
     *,
-    normalized: List[Dict[str, Any]],
+    normalized: List[Any],
     now: float,
     signal_max_age_sec: Any,
     zone_lookback_sec: Any,
     zone_touch_lookback_sec: Any,
     fvg_lookback_sec: Any,
-) -> List[Dict[str, Any]]:
-    """Filter a normalized list by freshness.
+) -> List[Any]:
+    """Filter SignalRecords by freshness.
 
-    Caller is responsible for building the normalized list.
+    Caller is responsible for building the record list.
     """
 
-    fresh: List[Dict[str, Any]] = []
+    fresh: List[Any] = []
+    zone_lb = float(zone_lookback_sec)
+    touch_lb = float(zone_touch_lookback_sec)
+    fvg_lb = float(fvg_lookback_sec or DEFAULT_FVG_LOOKBACK_SEC)
     for s in normalized:
         # Zones presence signals are intentionally long-lived (structure context).
         # Use receive_time-based retention rather than signal_time freshness.
-        if is_zone_presence_signal(s):
-            rt = float(s.get("receive_time") or 0.0)
-            if rt > 0 and (now - rt) <= float(zone_lookback_sec):
+        if s.is_zone_presence:
+            rt = s.receive_ts()
+            if rt > 0 and (now - rt) <= zone_lb:
                 fresh.append(s)
             continue
 
         # Zones touch is a momentary event; keep it short-lived.
         # Prefer receive_time for zone touch (reliable for touch events).
-        if is_zone_touch_signal(s):
-            rt = float(s.get("receive_time") or 0.0)
+        if s.is_zone_touch:
+            rt = s.receive_ts()
             if rt > 0:  # receive_time available: use it exclusively
-                if (now - rt) <= float(zone_touch_lookback_sec):
+                if (now - rt) <= touch_lb:
                     fresh.append(s)
             # If receive_time missing/invalid: skip signal (zone touch requires receive_time)
             continue
 
-        st = float(s.get("signal_time") or 0.0)
+        st = float(s.signal_time or 0.0)
         if st <= 0:
             continue
         age = now - st
-        
+
         # FVG uses dedicated lookback (typically longer than other signals for 15-min TF).
-        if is_fvg_signal(s):
-            if abs(age) > float(fvg_lookback_sec or DEFAULT_FVG_LOOKBACK_SEC):
+        if s.is_fvg:
+            if abs(age) > fvg_lb:
                 continue
         # Non-FVG signals use standard max_age_sec.
         elif abs(age) > signal_max_age_sec:
             # future/old both drop（v2.6 DebugReplayCsv の代替はここでは省略）
             continue
-        
+
         fresh.append(s)
 
     return fresh
@@ -212,125 +209,87 @@ def signal_dedupe_key(s: Dict[str, Any]) -> str:
     return f"{symbol}|{source}|{event}|{sig_type}|{confirmed}|{side}|{t_rounded:.0f}"
 
 
-def signal_ts_for_index(s: Dict[str, Any]) -> float:
-    try:
-        return float(s.get("signal_time") or s.get("receive_time") or 0.0)
-    except Exception:
-        return 0.0
-
-
-def rebuild_signal_indexes(
-    *,
-    signals_cache: List[Dict[str, Any]],
-    bucket_sec: int,
-) -> Tuple[Dict[str, List[Dict[str, Any]]], Dict[str, Dict[int, List[Dict[str, Any]]]]]:
-    """Rebuild optional signal cache indexes.
+class SignalDedupeIndex:
+    """Hash index: dedupe key -> most recently appended SignalRecord with that key.
 
+    Entries older than the dedupe window can never produce a duplicate, so they
+    are expired from a FIFO (receive_time order) to keep memory bounded.
     Caller is responsible for holding any locks.
     """
 
-    by_symbol: Dict[str, List[Dict[str, Any]]] = {}
-    buckets_by_symbol: Dict[str, Dict[int, List[Dict[str, Any]]]] = {}
-
-    bs = int(bucket_sec or 60)
-    if bs <= 0:
-        bs = 60
-
-    for s in signals_cache:
-        if not isinstance(s, dict):
-            continue
-        sym = (s.get("symbol") or "").strip().upper()
-        if not sym:
-            continue
-
-        by_symbol.setdefault(sym, []).append(s)
-
-        st = signal_ts_for_index(s)
-        if st <= 0:
-            continue
-        b = int(st // float(bs))
-        sym_b = buckets_by_symbol.get(sym)
-        if sym_b is None:
-            sym_b = {}
-            buckets_by_symbol[sym] = sym_b
-        sym_b.setdefault(b, []).append(s)
-
-    return by_symbol, buckets_by_symbol
-
-
-def ensure_signal_indexes(
-    *,
-    signal_index_enabled: bool,
-    signals_cache: List[Dict[str, Any]],
-    signals_by_symbol: Dict[str, List[Dict[str, Any]]],
-    bucket_sec: int,
-) -> Optional[Tuple[Dict[str, List[Dict[str, Any]]], Dict[str, Dict[int, List[Dict[str, Any]]]]]]:
-    """Lazy build indexes if enabled and missing.
-
-    Returns rebuilt indexes if performed, else None.
-    """
-
-    if not signal_index_enabled:
-        return None
-    if signals_by_symbol:
-        return None
-    if not signals_cache:
-        return None
-    return rebuild_signal_indexes(signals_cache=signals_cache, bucket_sec=bucket_sec)
+    __slots__ = ("_last", "_fifo")
+
+    def __init__(self) -> None:
+        self._last: Dict[str, Any] = {}
+        self._fifo: Deque[Tuple[float, str, Any]] = deque()
+
+    def __len__(self) -> int:
+        return len(self._last)
+
+    def clear(self) -> None:
+        self._last.clear()
+        self._fifo.clear()
+
+    def get(self, key: str) -> Optional[Any]:
+        return self._last.get(key)
+
+    def record(self, signal: Any) -> None:
+        key = signal.dedupe_key
+        rt = signal.receive_ts()
+        if rt <= 0:
+            # A previous entry without receive_time never blocks a later one,
+            # which is the same as having no entry at all.
+            self._last.pop(key, None)
+            return
+        self._last[key] = signal
+        self._fifo.append((rt, key, signal))
+
+    def forget(self, signal: Any) -> None:
+        """Drop the entry if it still points at this (expired) record."""
+        key = signal.dedupe_key
+        if self._last.get(key) is signal:
+            del self._last[key]
+
+    def expire(self, now: float, ttl_sec: float) -> int:
+        ttl = float(ttl_sec or 0.0)
+        removed = 0
+        fifo = self._fifo
+        while fifo and (now - fifo[0][0]) > ttl:
+            _, key, sig = fifo.popleft()
+            if self._last.get(key) is sig:
+                del self._last[key]
+                removed += 1
+        return removed
 
 
 def append_signal_dedup(
     *,
-    signals_cache: List[Dict[str, Any]],
-    signal: Dict[str, Any],
+    signal: Any,
     dedupe_window_sec: float,
-    signal_index_enabled: bool,
-    bucket_sec: int,
-    signals_by_symbol: Dict[str, List[Dict[str, Any]]],
-    signals_buckets_by_symbol: Dict[str, Dict[int, List[Dict[str, Any]]]],
+    dedupe_index: SignalDedupeIndex,
+    signal_store: Any,
 ) -> bool:
-    """Append a signal into cache with de-duplication.
+    """Append a SignalRecord into the store with de-duplication.
 
-    Mutates signals_cache and (when enabled) the passed-in index maps.
+    A signal is a duplicate when the most recent record with the same dedupe
+    key arrived (receive_time) within dedupe_window_sec. O(1) via dedupe_index;
+    the caller must route expired records through dedupe_index.forget().
     """
 
-    if not isinstance(signal, dict):
+    if signal is None:
         return False
 
     now = time.time()
-    key = signal_dedupe_key(signal)
-
-    for prev in reversed(signals_cache):
-        try:
-            prev_key = signal_dedupe_key(prev)
-            if prev_key != key:
-                continue
-            # Same key found: check if within dedupe window
-            prt = float(prev.get("receive_time") or 0.0)
-            if prt > 0 and (now - prt) <= float(dedupe_window_sec or 0.0):
-                # Within window: duplicate
-                return False
-            # Outside window: allow as new signal (break to append)
-            break
-        except Exception:
-            continue
+    window = float(dedupe_window_sec or 0.0)
+    dedupe_index.expire(now, window)
 
-    signals_cache.append(signal)
-
-    if signal_index_enabled:
-        sym = (signal.get("symbol") or "").strip().upper()
-        if sym:
-            signals_by_symbol.setdefault(sym, []).append(signal)
-            st = signal_ts_for_index(signal)
-            if st > 0:
-                bs = int(bucket_sec or 60)
-                if bs <= 0:
-                    bs = 60
-                b = int(st // float(bs))
-                sym_b = signals_buckets_by_symbol.get(sym)
-                if sym_b is None:
-                    sym_b = {}
-                    signals_buckets_by_symbol[sym] = sym_b
-                sym_b.setdefault(b, []).append(signal)
+    prev = dedupe_index.get(signal.dedupe_key)
+    if prev is not None:
+        prt = prev.receive_ts()
+        if prt > 0 and (now - prt) <= window:
+            return False
 
+    if not signal_store.add(signal):
+        return False
+    dedupe_index.record(signal)
     return True
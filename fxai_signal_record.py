@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+import sys
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
+try:
+    from fxai_signal_cache import (
+        is_fvg_signal,
+        is_zone_presence_signal,
+        is_zone_touch_signal,
+        retention_class,
+        signal_dedupe_key,
+    )
+except Exception:
+    from tradingView.fxai_signal_cache import (
+        is_fvg_signal,
+        is_zone_presence_signal,
+        is_zone_touch_signal,
+        retention_class,
+        signal_dedupe_key,
+    )
+
+
+SIDE_NONE = 0
+SIDE_BUY = 1
+SIDE_SELL = -1
+
+# Persisted/JSON field order (matches the webhook signal dict + signal_time).
+# Any other key of the normalized dict (zone_low/zone_high/top/bottom/zone_price, ...)
+# is kept verbatim in SignalRecord.extra and written back by to_dict().
+RECORD_DICT_FIELDS = (
+    "symbol",
+    "source",
+    "side",
+    "tf",
+    "price",
+    "strength",
+    "signal_type",
+    "event",
+    "confirmed",
+    "time",
+    "receive_time",
+    "signal_time",
+)
+_RECORD_DICT_FIELD_SET = frozenset(RECORD_DICT_FIELDS)
+
+
+def is_qtrend_source(source: Any) -> bool:
+    src = str(source or "").strip().lower().replace("_", "")
+    if not src:
+        return False
+    # Covers the canonical names and all legacy variants (Q-Trend-Strong, qtrendnormalbuy, ...).
+    return ("qtrend" in src) or ("q-trend" in src)
+
+
+def extract_zone_level(signal: Dict[str, Any]) -> Optional[float]:
+    def _num(v: Any) -> Optional[float]:
+        try:
+            fv = float(v)
+            return fv if fv > 0 else None
+        except Exception:
+            return None
+
+    low = _num(signal.get("zone_low") or signal.get("low") or signal.get("bottom") or signal.get("lower"))
+    high = _num(signal.get("zone_high") or signal.get("high") or signal.get("top") or signal.get("upper"))
+    if low is not None and high is not None:
+        return (low + high) / 2.0
+
+    for k in ("zone_price", "zone_mid", "mid", "price", "close", "c"):
+        v = _num(signal.get(k))
+        if v is not None:
+            return v
+    return None
+
+
+def _intern(v: Any) -> Any:
+    return sys.intern(v) if isinstance(v, str) else v
+
+
+def _side_code(side: Any) -> int:
+    if side == "buy":
+        return SIDE_BUY
+    if side == "sell":
+        return SIDE_SELL
+    return SIDE_NONE
+
+
+class SignalRecord(NamedTuple):
+    """Immutable, normalized signal as held by the signal cache.
+
+    Built once on ingest from the normalized dict; classification flags,
+    signal_ts and the dedupe key are precomputed so readers never re-parse.
+    Keys outside RECORD_DICT_FIELDS are kept in `extra` so to_dict() returns
+    the full normalized dict. Use to_dict() only at JSON/prompt boundaries.
+    """
+
+    symbol: str
+    source: Any
+    side: Any
+    tf: Any
+    price: Any
+    strength: Any
+    signal_type: Any
+    event: Any
+    confirmed: Any
+    time: Any
+    receive_time: Any
+    signal_time: Any
+    # --- precomputed ---
+    signal_ts: float
+    side_code: int
+    is_zone_presence: bool
+    is_zone_touch: bool
+    is_fvg: bool
+    is_qtrend: bool
+    retention_class: str
+    zone_level: Optional[float]
+    dedupe_key: str
+    extra: Tuple[Tuple[str, Any], ...] = ()
+
+    @classmethod
+    def from_normalized(cls, s: Dict[str, Any]) -> "SignalRecord":
+        try:
+            ts = float(s.get("signal_time") or s.get("receive_time") or 0.0)
+        except Exception:
+            ts = 0.0
+        return cls(
+            symbol=_intern(str(s.get("symbol") or "").strip().upper()),
+            source=_intern(s.get("source")),
+            side=_intern(s.get("side")),
+            tf=_intern(s.get("tf")),
+            price=s.get("price"),
+            strength=_intern(s.get("strength")),
+            signal_type=_intern(s.get("signal_type")),
+            event=_intern(s.get("event")),
+            confirmed=_intern(s.get("confirmed")),
+            time=s.get("time"),
+            receive_time=s.get("receive_time"),
+            signal_time=s.get("signal_time"),
+            signal_ts=ts,
+            side_code=_side_code(s.get("side")),
+            is_zone_presence=is_zone_presence_signal(s),
+            is_zone_touch=is_zone_touch_signal(s),
+            is_fvg=is_fvg_signal(s),
+            is_qtrend=is_qtrend_source(s.get("source")),
+            retention_class=retention_class(s),
+            zone_level=extract_zone_level(s),
+            dedupe_key=_intern(signal_dedupe_key(s)),
+            extra=tuple((k, v) for k, v in s.items() if k not in _RECORD_DICT_FIELD_SET),
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        d = {k: getattr(self, k) for k in RECORD_DICT_FIELDS}
+        d.update(self.extra)
+        return d
+
+    def receive_ts(self) -> float:
+        try:
+            return float(self.receive_time or 0.0)
+        except Exception:
+            return 0.0
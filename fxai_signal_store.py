@@ -0,0 +1,384 @@
+from __future__ import annotations
+
+import heapq
+from bisect import bisect_left, bisect_right
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+# Sub-lists per signal class. Precedence matches filter_fresh_signals_from_normalized.
+CLASS_ZONE_PRESENCE = "zone_presence"
+CLASS_ZONE_TOUCH = "zone_touch"
+CLASS_FVG = "fvg"
+CLASS_OTHER = "other"
+SIGNAL_CLASSES: Tuple[str, ...] = (CLASS_ZONE_PRESENCE, CLASS_ZONE_TOUCH, CLASS_FVG, CLASS_OTHER)
+
+_Key = Tuple[float, int]
+
+
+def classify_signal(s: Any) -> str:
+    if s.is_zone_presence:
+        return CLASS_ZONE_PRESENCE
+    if s.is_zone_touch:
+        return CLASS_ZONE_TOUCH
+    if s.is_fvg:
+        return CLASS_FVG
+    return CLASS_OTHER
+
+
+# Chunk size of a class list: out-of-order inserts and non-prefix removals copy
+# one chunk (<= 2 * _CHUNK entries) plus the tuple of sealed chunk refs.
+_CHUNK = 256
+
+
+class _Chunk:
+    """Published slice [lo, hi) of append-only parallel lists ordered by (signal_ts, seq).
+
+    Chunks share backing lists with their predecessors; only the tip chunk
+    (hi == len(keys)) is ever appended to, so a published slice never changes.
+    """
+
+    __slots__ = ("keys", "items", "lo", "hi")
+
+    def __init__(self, keys: List[_Key], items: List[Any], lo: int = 0, hi: Optional[int] = None) -> None:
+        self.keys = keys
+        self.items = items
+        self.lo = lo
+        self.hi = len(keys) if hi is None else hi
+
+    def __len__(self) -> int:
+        return self.hi - self.lo
+
+    def first(self) -> _Key:
+        return self.keys[self.lo]
+
+    def last(self) -> _Key:
+        return self.keys[self.hi - 1]
+
+    def inserted(self, key: _Key, item: Any) -> "_Chunk":
+        keys, lo, hi = self.keys, self.lo, self.hi
+        if hi == lo:
+            return _Chunk([key], [item])
+        if hi == len(keys) and keys[hi - 1] <= key:
+            keys.append(key)
+            self.items.append(item)
+            return _Chunk(keys, self.items, lo, hi + 1)
+        new_keys = keys[lo:hi]
+        new_items = self.items[lo:hi]
+        i = bisect_right(new_keys, key)
+        new_keys.insert(i, key)
+        new_items.insert(i, item)
+        return _Chunk(new_keys, new_items)
+
+    def without(self, drop_set: Any, n: int) -> "_Chunk":
+        """Chunk minus its n keys in drop_set: advances lo when they are the oldest entries."""
+        keys, lo, hi = self.keys, self.lo, self.hi
+        if all(keys[i] in drop_set for i in range(lo, lo + n)):
+            lo += n
+            if lo > _CHUNK:
+                # Bound the dead prefix of the backing lists (at most one chunk copy).
+                return _Chunk(keys[lo:hi], self.items[lo:hi])
+            return _Chunk(keys, self.items, lo, hi)
+        kept = [(k, it) for k, it in zip(keys[lo:hi], self.items[lo:hi]) if k not in drop_set]
+        return _Chunk([k for k, _ in kept], [it for _, it in kept])
+
+    def split(self) -> Tuple["_Chunk", "_Chunk"]:
+        mid = self.lo + (self.hi - self.lo) // 2
+        return (
+            _Chunk(self.keys[self.lo:mid], self.items[self.lo:mid]),
+            _Chunk(self.keys[mid:self.hi], self.items[mid:self.hi]),
+        )
+
+    def keyed(self, lo: int, hi: int) -> List[Tuple[_Key, Any]]:
+        return list(zip(self.keys[lo:hi], self.items[lo:hi]))
+
+
+_EMPTY_CHUNK = _Chunk([], [])
+
+
+class _SortedSignals:
+    """Immutable class list ordered by (signal_ts, seq): sealed chunks + an open tail chunk.
+
+    In-order inserts append to the tail (O(1); sealing a full tail copies the
+    tuple of chunk refs once per _CHUNK inserts). An out-of-order insert
+    copies only the chunk it lands in (split above 2 * _CHUNK). Removals copy
+    only the touched chunks, and dropping a chunk's oldest entries (the usual
+    expiry) just advances its lo. Mutators return a new instance.
+    """
+
+    __slots__ = ("sealed", "sealed_max", "tail", "count")
+
+    def __init__(
+        self,
+        sealed: Tuple[_Chunk, ...] = (),
+        tail: _Chunk = _EMPTY_CHUNK,
+        sealed_max: Optional[Tuple[_Key, ...]] = None,
+    ) -> None:
+        self.sealed = sealed
+        self.sealed_max = sealed_max if sealed_max is not None else tuple(c.last() for c in sealed)
+        self.tail = tail
+        self.count = sum(len(c) for c in sealed) + len(tail)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _chunks(self) -> List[_Chunk]:
+        return [*self.sealed, self.tail] if len(self.tail) else list(self.sealed)
+
+    def inserted(self, key: _Key, item: Any) -> "_SortedSignals":
+        sealed = self.sealed
+        if not sealed or key > self.sealed_max[-1]:
+            # Common case: signals arrive in time order and land in the tail.
+            tail = self.tail.inserted(key, item)
+            if len(tail) < _CHUNK:
+                return _SortedSignals(sealed, tail, self.sealed_max)
+            return _SortedSignals(sealed + (tail,), _EMPTY_CHUNK, self.sealed_max + (tail.last(),))
+        i = bisect_left(self.sealed_max, key)
+        chunk = sealed[i].inserted(key, item)
+        repl: Tuple[_Chunk, ...] = chunk.split() if len(chunk) > 2 * _CHUNK else (chunk,)
+        new_sealed = sealed[:i] + repl + sealed[i + 1:]
+        new_max = self.sealed_max[:i] + tuple(c.last() for c in repl) + self.sealed_max[i + 1:]
+        return _SortedSignals(new_sealed, self.tail, new_max)
+
+    def without(self, drop: Iterable[_Key]) -> "_SortedSignals":
+        sealed, sealed_max = self.sealed, self.sealed_max
+        n_sealed = len(sealed)
+        per_chunk: Dict[int, List[_Key]] = {}
+        for k in drop:
+            i = bisect_left(sealed_max, k)
+            per_chunk.setdefault(i, []).append(k)  # i == n_sealed: the tail
+        tail = self.tail
+        touched = False
+        new_sealed = list(sealed)
+        for i, ks in per_chunk.items():
+            if i >= n_sealed:
+                tail = tail.without(set(ks), len(ks)) if len(ks) < len(tail) else _EMPTY_CHUNK
+            else:
+                c = sealed[i]
+                new_sealed[i] = c.without(set(ks), len(ks)) if len(ks) < len(c) else _EMPTY_CHUNK
+                touched = True
+        if not touched:
+            return _SortedSignals(sealed, tail, sealed_max)
+        kept = [c for c in new_sealed if len(c)]
+        return _SortedSignals(tuple(kept), tail)
+
+    def window_keyed(self, t0: float, t1: float) -> List[Tuple[_Key, Any]]:
+        k0 = (t0, -1)
+        k1 = (t1, float("inf"))
+        out: List[Tuple[_Key, Any]] = []
+        for c in self.sealed[bisect_left(self.sealed_max, k0):]:
+            if c.first() > k1:
+                return out
+            lo = bisect_left(c.keys, k0, c.lo, c.hi)
+            out.extend(c.keyed(lo, bisect_right(c.keys, k1, lo, c.hi)))
+        c = self.tail
+        if len(c) and c.first() <= k1:
+            lo = bisect_left(c.keys, k0, c.lo, c.hi)
+            out.extend(c.keyed(lo, bisect_right(c.keys, k1, lo, c.hi)))
+        return out
+
+    def all_keyed(self) -> List[Tuple[_Key, Any]]:
+        out: List[Tuple[_Key, Any]] = []
+        for c in self._chunks():
+            out.extend(c.keyed(c.lo, c.hi))
+        return out
+
+
+_EMPTY_SORTED = _SortedSignals()
+
+
+class SymbolView:
+    """Immutable snapshot of one symbol's signals, one _SortedSignals per class.
+
+    Readers grab a view once (SignalStore.view) and query it without locks;
+    the writer publishes a replacement view instead of mutating this one.
+    """
+
+    __slots__ = ("classes", "count")
+
+    def __init__(self, classes: Optional[Dict[str, _SortedSignals]] = None) -> None:
+        self.classes: Dict[str, _SortedSignals] = classes or {c: _EMPTY_SORTED for c in SIGNAL_CLASSES}
+        self.count = sum(len(v) for v in self.classes.values())
+
+    def replaced(self, cls: str, sub: _SortedSignals) -> "SymbolView":
+        classes = dict(self.classes)
+        classes[cls] = sub
+        return SymbolView(classes)
+
+    def window(self, t0: float, t1: float, classes: Optional[Iterable[str]] = None) -> List[Any]:
+        """Signals with t0 <= signal_ts <= t1, merged across classes in time order."""
+        parts = [self.classes[c].window_keyed(float(t0), float(t1)) for c in (classes or SIGNAL_CLASSES)]
+        return _merge(parts)
+
+    def signals(self, classes: Optional[Iterable[str]] = None) -> List[Any]:
+        return _merge([self.classes[c].all_keyed() for c in (classes or SIGNAL_CLASSES)])
+
+    def fresh_candidates(self, *, now: float, signal_max_age_sec: float, fvg_lookback_sec: float) -> List[Any]:
+        """Superset of the fresh signals for filter_fresh_signals_from_normalized.
+
+        Zone classes are retained by receive_time so they are returned whole;
+        FVG/other are narrowed to |now - signal_ts| <= lookback by bisect.
+        """
+        n = float(now)
+        fvg_w = float(fvg_lookback_sec)
+        other_w = float(signal_max_age_sec)
+        parts = [
+            self.classes[CLASS_ZONE_PRESENCE].all_keyed(),
+            self.classes[CLASS_ZONE_TOUCH].all_keyed(),
+            self.classes[CLASS_FVG].window_keyed(n - fvg_w, n + fvg_w),
+            self.classes[CLASS_OTHER].window_keyed(n - other_w, n + other_w),
+        ]
+        return _merge(parts)
+
+
+EMPTY_VIEW = SymbolView()
+
+
+class SignalStore:
+    """Per-symbol, time-ordered store of SignalRecords with one sub-list per signal class.
+
+    Window queries are bisect lookups on signal_ts (signal_time, else receive_time)
+    instead of scans over the whole cache. Results are returned in time order.
+
+    Copy-on-write: each mutation publishes a new chunk list for the touched class
+    (an O(1) tail append / prefix advance in the common case, see _SortedSignals)
+    and a new SymbolView with a single dict assignment. Readers
+    (view/window/signals/fresh_candidates/len) need no lock and always see a
+    consistent per-symbol snapshot. Writers (add/remove/expire/clear/rebuild)
+    must still be serialized by the caller.
+
+    When retention_sec is given, expire(now) drops signals whose receive_time age
+    reached their retention limit, popping a deadline heap (O(expired log n)).
+    """
+
+    __slots__ = ("_views", "_loc", "_seq", "_count", "_retention_sec", "_expiry")
+
+    def __init__(self, retention_sec: Optional[Callable[[Any], float]] = None) -> None:
+        self._views: Dict[str, SymbolView] = {}
+        # id(signal) -> (signal, symbol, class, key), in arrival order. Writer side only.
+        self._loc: Dict[int, Tuple[Any, str, str, _Key]] = {}
+        self._seq = 0
+        self._count = 0
+        self._retention_sec = retention_sec
+        # (receive_time + limit, seq, receive_time, limit, signal)
+        self._expiry: List[Tuple[float, int, float, float, Any]] = []
+
+    def __len__(self) -> int:
+        return self._count
+
+    def clear(self) -> None:
+        self._views = {}
+        self._loc.clear()
+        self._expiry.clear()
+        self._count = 0
+
+    def view(self, symbol: str) -> SymbolView:
+        return self._views.get((symbol or "").strip().upper(), EMPTY_VIEW)
+
+    def all_signals(self) -> List[Any]:
+        """All stored signals in arrival order (persistence boundary, writer side)."""
+        return [loc[0] for loc in self._loc.values()]
+
+    def symbols(self) -> List[str]:
+        return [sym for sym, v in list(self._views.items()) if v.count]
+
+    def add(self, signal: Any) -> bool:
+        sym = signal.symbol
+        if not sym or id(signal) in self._loc:
+            return False
+        cls = classify_signal(signal)
+        self._seq += 1
+        key = (signal.signal_ts, self._seq)
+        cur = self._views.get(sym, EMPTY_VIEW)
+        self._views[sym] = cur.replaced(cls, cur.classes[cls].inserted(key, signal))
+        self._loc[id(signal)] = (signal, sym, cls, key)
+        self._count = len(self._loc)
+
+        if self._retention_sec is not None:
+            try:
+                # Missing receive_time means "age 0" for retention, i.e. never expires.
+                rt = signal.receive_ts()
+                if rt > 0:
+                    limit = float(self._retention_sec(signal))
+                    heapq.heappush(self._expiry, (rt + limit, self._seq, rt, limit, signal))
+            except Exception:
+                pass
+        return True
+
+    def remove(self, signal: Any) -> bool:
+        return bool(self._remove_many([signal]))
+
+    def _remove_many(self, signals: Iterable[Any]) -> List[Any]:
+        # Group by (symbol, class) so each touched class is republished once.
+        drops: Dict[Tuple[str, str], List[_Key]] = {}
+        removed: List[Any] = []
+        for signal in signals:
+            loc = self._loc.pop(id(signal), None)
+            if loc is None:
+                continue
+            _, sym, cls, key = loc
+            drops.setdefault((sym, cls), []).append(key)
+            removed.append(signal)
+        for (sym, cls), keys in drops.items():
+            cur = self._views.get(sym, EMPTY_VIEW)
+            nxt = cur.replaced(cls, cur.classes[cls].without(keys))
+            if nxt.count:
+                self._views[sym] = nxt
+            else:
+                self._views.pop(sym, None)
+        self._count = len(self._loc)
+        return removed
+
+    def expire(self, now: float) -> List[Any]:
+        """Remove and return signals whose retention ran out (kept while age < limit)."""
+        due: List[Any] = []
+        heap = self._expiry
+        n = float(now)
+        while heap and heap[0][0] <= n + 1e-6:
+            _, _, rt, limit, signal = heap[0]
+            if (n - rt) < limit:
+                # Deadline rounding: not expired by the exact rule yet.
+                break
+            heapq.heappop(heap)
+            due.append(signal)
+        if not due:
+            return []
+        return self._remove_many(due)
+
+    def rebuild(self, signals: Iterable[Any]) -> None:
+        self.clear()
+        for s in signals:
+            self.add(s)
+
+    def window(
+        self,
+        symbol: str,
+        t0: float,
+        t1: float,
+        classes: Optional[Iterable[str]] = None,
+    ) -> List[Any]:
+        return self.view(symbol).window(t0, t1, classes)
+
+    def signals(self, symbol: str, classes: Optional[Iterable[str]] = None) -> List[Any]:
+        return self.view(symbol).signals(classes)
+
+    def fresh_candidates(
+        self,
+        symbol: str,
+        *,
+        now: float,
+        signal_max_age_sec: float,
+        fvg_lookback_sec: float,
+    ) -> List[Any]:
+        return self.view(symbol).fresh_candidates(
+            now=now,
+            signal_max_age_sec=signal_max_age_sec,
+            fvg_lookback_sec=fvg_lookback_sec,
+        )
+
+
+def _merge(parts: List[List[Tuple[_Key, Any]]]) -> List[Any]:
+    parts = [p for p in parts if p]
+    if not parts:
+        return []
+    if len(parts) == 1:
+        return [item for _, item in parts[0]]
+    return [item for _, item in heapq.merge(*parts, key=lambda kv: kv[0])]
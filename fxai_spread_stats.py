@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+from bisect import bisect_left, insort
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Sequence, Tuple
+
+# Running sum is re-summed from the window this often (float drift guard).
+_RESUM_EVERY = 4096
+
+
+class P2Quantile:
+    """P² streaming quantile estimate (Jain & Chlamtac), O(1) memory and update.
+
+    Covers every sample seen so far (not windowed); exact order statistics for
+    the current window come from RollingSpread.percentile().
+    """
+
+    __slots__ = ("p", "q", "n", "np", "dn", "count")
+
+    def __init__(self, p: float) -> None:
+        self.p = max(0.0, min(1.0, float(p)))
+        self.q: List[float] = []
+        self.n = [0, 1, 2, 3, 4]
+        self.np = [0.0, 2.0 * self.p, 4.0 * self.p, 2.0 + 2.0 * self.p, 4.0]
+        self.dn = [0.0, self.p / 2.0, self.p, (1.0 + self.p) / 2.0, 1.0]
+        self.count = 0
+
+    def add(self, x: float) -> None:
+        self.count += 1
+        q = self.q
+        if len(q) < 5:
+            insort(q, x)
+            return
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = 0
+            while k < 3 and x >= q[k + 1]:
+                k += 1
+        n = self.n
+        for i in range(k + 1, 5):
+            n[i] += 1
+        for i in range(5):
+            self.np[i] += self.dn[i]
+        for i in (1, 2, 3):
+            d = self.np[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                s = 1 if d > 0 else -1
+                qp = q[i] + s / (n[i + 1] - n[i - 1]) * (
+                    (n[i] - n[i - 1] + s) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+                    + (n[i + 1] - n[i] - s) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+                )
+                if not (q[i - 1] < qp < q[i + 1]):
+                    # Linear fallback when the parabolic step leaves the bracket.
+                    qp = q[i] + s * (q[i + s] - q[i]) / (n[i + s] - n[i])
+                q[i] = qp
+                n[i] += s
+
+    def value(self) -> Optional[float]:
+        q = self.q
+        if not q:
+            return None
+        if len(q) < 5:
+            pos = self.p * (len(q) - 1)
+            lo = int(pos)
+            hi = min(lo + 1, len(q) - 1)
+            return float(q[lo] + (q[hi] - q[lo]) * (pos - lo))
+        return float(q[2])
+
+
+class RollingSpread:
+    """Time-windowed spread samples of one symbol.
+
+    deque of (ts, spread) with a running sum for the mean, a sorted list
+    (bisect) for exact windowed median/percentiles, optional P² estimates
+    over the whole stream, and the Robbins-Monro median used by the LRR
+    spike guard. Samples older than window_sec (or beyond max_n) are evicted
+    on add(); the same pruning rules as the previous list-based history.
+    Not thread-safe: callers hold their own lock.
+    """
+
+    __slots__ = ("window_sec", "max_n", "samples", "sorted_vals", "total", "adds", "p2", "rm_median")
+
+    def __init__(self, *, window_sec: float, max_n: int, p2_quantiles: Sequence[float] = ()) -> None:
+        self.window_sec = float(window_sec or 0.0)
+        self.max_n = int(max_n or 0)
+        self.samples: Deque[Tuple[float, float]] = deque()
+        self.sorted_vals: List[float] = []
+        self.total = 0.0
+        self.adds = 0
+        self.p2: Dict[float, P2Quantile] = {float(p): P2Quantile(p) for p in p2_quantiles}
+        self.rm_median: Optional[float] = None
+
+    def __len__(self) -> int:
+        return len(self.samples)
+
+    def _evict_left(self) -> None:
+        _, v = self.samples.popleft()
+        self.total -= v
+        i = bisect_left(self.sorted_vals, v)
+        del self.sorted_vals[i]
+
+    def add(self, ts: float, spread: float) -> None:
+        v = float(spread)
+        self.samples.append((float(ts), v))
+        self.total += v
+        insort(self.sorted_vals, v)
+        for est in self.p2.values():
+            est.add(v)
+        if self.window_sec > 0:
+            cutoff = float(ts) - self.window_sec
+            while self.samples and self.samples[0][0] < cutoff:
+                self._evict_left()
+        if self.max_n > 0:
+            while len(self.samples) > self.max_n:
+                self._evict_left()
+        self.adds += 1
+        if self.adds % _RESUM_EVERY == 0:
+            self.total = float(sum(x for _, x in self.samples))
+
+    def mean(self) -> float:
+        return float(self.total / len(self.samples)) if self.samples else 0.0
+
+    def percentile(self, p: float) -> Optional[float]:
+        """Exact windowed percentile, linear interpolation between order statistics."""
+        vals = self.sorted_vals
+        if not vals:
+            return None
+        pos = max(0.0, min(1.0, float(p))) * (len(vals) - 1)
+        lo = int(pos)
+        hi = min(lo + 1, len(vals) - 1)
+        return float(vals[lo] + (vals[hi] - vals[lo]) * (pos - lo))
+
+    def median(self) -> Optional[float]:
+        return self.percentile(0.5)
+
+    def p2_value(self, p: float) -> Optional[float]:
+        est = self.p2.get(float(p))
+        return est.value() if est is not None else None
+
+    def rm_update(self, spread: float, lr: float) -> float:
+        """Robbins-Monro median step: med += lr * sign(x - med)."""
+        med = spread if self.rm_median is None else self.rm_median
+        diff = spread - med
+        med += lr * (1.0 if diff > 0 else (-1.0 if diff < 0 else 0.0))
+        self.rm_median = med
+        return med
+
+    def summary(self, percentiles: Sequence[float] = (0.5, 0.9)) -> Dict[str, Any]:
+        out: Dict[str, Any] = {"count": len(self.samples), "mean": round(self.mean(), 3)}
+        for p in percentiles:
+            v = self.percentile(p)
+            out[f"p{int(round(p * 100))}"] = round(v, 3) if v is not None else None
+        for p, est in self.p2.items():
+            v = est.value()
+            out[f"p2_p{int(round(p * 100))}"] = round(v, 3) if v is not None else None
+        out["rm_median"] = round(self.rm_median, 3) if self.rm_median is not None else None
+        return out
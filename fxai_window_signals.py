@@ -1,21 +1,21 @@
 from __future__ import annotations
 
-from typing import Any, Callable, Dict, List, Optional
+from typing import Any, Dict, List, Optional
 
 
 def build_window_signals_payload(
     *,
-    snapshot: List[Dict[str, Any]],
+    snapshot: List[Any],
     symbol: str,
     center_ts: float,
     trigger_side: str,
     window_sec: float,
-    is_qtrend_source: Callable[[Any], bool],
 ) -> Dict[str, Any]:
     """Build a compact ±window payload around a trigger time.
 
     This is a behavior-preserving extraction from the main bridge.
-    Caller is responsible for providing `snapshot` (a list of dict signals).
+    Caller is responsible for providing `snapshot` (a list of SignalRecords);
+    the returned payload is plain dicts for the prompt.
     """
 
     sym = (symbol or "").strip().upper()
@@ -42,16 +42,13 @@ def build_window_signals_payload(
 
     trig_side = (trigger_side or "").strip().lower()
 
-    def _sig_ts(s: Dict[str, Any]) -> float:
-        try:
-            return float(s.get("signal_time") or s.get("receive_time") or 0.0)
-        except Exception:
-            return 0.0
+    def _sig_ts(s: Any) -> float:
+        return s.signal_ts
 
-    window_raw: List[Dict[str, Any]] = []
+    window_raw: List[Any] = []
     for s in snapshot:
         try:
-            if (s.get("symbol") or "").strip().upper() != sym:
+            if (s.symbol or "").strip().upper() != sym:
                 continue
         except Exception:
             continue
@@ -81,9 +78,9 @@ def build_window_signals_payload(
     best_by_key: Dict[tuple, Dict[str, Any]] = {}
 
     for s in window_raw:
-        src = (s.get("source") or "")
-        evt = (s.get("event") or "")
-        side = (s.get("side") or "").strip().lower()
+        src = (s.source or "")
+        evt = (s.event or "")
+        side = (s.side or "").strip().lower()
         st = _sig_ts(s)
 
         if not src:
@@ -91,10 +88,10 @@ def build_window_signals_payload(
 
         # Normalize Q-Trend variants that might slip in.
         try:
-            if is_qtrend_source(src):
+            if s.is_qtrend:
                 src = (
                     "Q-Trend Strong"
-                    if (str(s.get("strength") or "").lower() == "strong" or "strong" in str(src).lower())
+                    if (str(s.strength or "").lower() == "strong" or "strong" in str(src).lower())
                     else "Q-Trend"
                 )
         except Exception:
@@ -116,9 +113,9 @@ def build_window_signals_payload(
             "source": src,
             "event": evt,
             "side": side or None,
-            "signal_type": s.get("signal_type"),
-            "strength": s.get("strength"),
-            "confirmed": s.get("confirmed"),
+            "signal_type": s.signal_type,
+            "strength": s.strength,
+            "confirmed": s.confirmed,
             "signal_time": st,
         }
 
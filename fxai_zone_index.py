@@ -0,0 +1,178 @@
+from __future__ import annotations
+
+import heapq
+from bisect import bisect_left, bisect_right, insort
+from threading import Lock
+from typing import Any, Dict, List, Optional, Tuple
+
+# Timeframes used for structural context ("" = tf not provided, also accepted).
+ZONE_CONTEXT_TFS: Tuple[str, ...] = ("m5", "m15", "h1")
+
+_Key = Tuple[float, int]
+
+
+def zone_tf_key(tf: Any) -> Optional[str]:
+    """Normalized tf for the zones context, or None when the tf is excluded (e.g. m1, h4)."""
+    t = (tf or "").strip().lower()
+    if t and t not in ZONE_CONTEXT_TFS:
+        return None
+    return t
+
+
+def empty_zones_context() -> Dict[str, Any]:
+    return {"total": 0, "support_count": 0, "resistance_count": 0}
+
+
+class _SymbolLevels:
+    __slots__ = ("all", "by_tf")
+
+    def __init__(self) -> None:
+        # (level, seq) sorted; one list across tfs plus one per tf.
+        self.all: List[_Key] = []
+        self.by_tf: Dict[str, List[_Key]] = {}
+
+
+def _remove_key(lst: List[_Key], key: _Key) -> None:
+    i = bisect_left(lst, key)
+    if i < len(lst) and lst[i] == key:
+        del lst[i]
+
+
+def _count_le(lst: List[_Key], price: float) -> int:
+    return bisect_right(lst, (price, float("inf")))
+
+
+class ZoneLevelIndex:
+    """Per-symbol sorted index of active zone levels, keyed by timeframe.
+
+    Holds zone presence signals (SignalRecord.is_zone_presence with a zone_level)
+    while they are fresh: receive_time age <= zone_lookback_sec, the same rule
+    as filter_fresh_signals_from_normalized. Kept in sync with the signal cache
+    via add()/remove(); freshness is enforced lazily with a deadline heap on
+    read. Support/resistance counts, nearest zones and "within k ATR" counts
+    are bisect lookups. Expiry is one-way: a later read with an earlier `now`
+    does not bring expired zones back.
+
+    Thread-safe via an internal lock.
+    """
+
+    def __init__(self, *, zone_lookback_sec: Any) -> None:
+        self._lock = Lock()
+        self._zone_lb = float(zone_lookback_sec)
+        self._symbols: Dict[str, _SymbolLevels] = {}
+        # id(signal) -> (symbol, tf, key)
+        self._loc: Dict[int, Tuple[str, str, _Key]] = {}
+        # (receive_time + lookback, seq, receive_time, signal)
+        self._expiry: List[Tuple[float, int, float, Any]] = []
+        self._seq = 0
+
+    def __len__(self) -> int:
+        return len(self._loc)
+
+    def add(self, signal: Any) -> bool:
+        if not signal.is_zone_presence or signal.zone_level is None or not signal.symbol:
+            return False
+        tf = zone_tf_key(signal.tf)
+        if tf is None:
+            return False
+        rt = signal.receive_ts()
+        if rt <= 0:
+            return False
+        with self._lock:
+            if id(signal) in self._loc:
+                return False
+            self._seq += 1
+            key = (float(signal.zone_level), self._seq)
+            levels = self._symbols.get(signal.symbol)
+            if levels is None:
+                levels = _SymbolLevels()
+                self._symbols[signal.symbol] = levels
+            insort(levels.all, key)
+            insort(levels.by_tf.setdefault(tf, []), key)
+            self._loc[id(signal)] = (signal.symbol, tf, key)
+            heapq.heappush(self._expiry, (rt + self._zone_lb, self._seq, rt, signal))
+        return True
+
+    def remove(self, signal: Any) -> bool:
+        with self._lock:
+            return self._remove_locked(signal)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._symbols.clear()
+            self._loc.clear()
+            self._expiry.clear()
+
+    def _remove_locked(self, signal: Any) -> bool:
+        loc = self._loc.pop(id(signal), None)
+        if loc is None:
+            return False
+        sym, tf, key = loc
+        levels = self._symbols.get(sym)
+        if levels is not None:
+            _remove_key(levels.all, key)
+            _remove_key(levels.by_tf.get(tf) or [], key)
+        return True
+
+    def _expire_locked(self, now: float) -> None:
+        heap = self._expiry
+        while heap and heap[0][0] <= now + 1e-6:
+            _, _, rt, signal = heap[0]
+            if (now - rt) <= self._zone_lb:
+                # Still fresh by the exact rule (deadline rounding).
+                break
+            heapq.heappop(heap)
+            self._remove_locked(signal)
+
+    def context(
+        self,
+        symbol: str,
+        *,
+        now: float,
+        price: float,
+        atr: float = 0.0,
+        near_atr_mult: float = 1.0,
+    ) -> Dict[str, Any]:
+        """zones_context for the prompt: counts plus ATR-normalized distance features.
+
+        Zones at the current price count as support (conservative for entry).
+        Distance features are None when ATR or a zone on that side is unavailable.
+        """
+        if price <= 0:
+            return empty_zones_context()
+        sym = (symbol or "").strip().upper()
+        k = float(near_atr_mult or 0.0)
+        with self._lock:
+            self._expire_locked(float(now))
+            levels = self._symbols.get(sym) or _SymbolLevels()
+            lvl_all = levels.all
+            total = len(lvl_all)
+            support = _count_le(lvl_all, price)
+            tf_counts: Dict[str, Dict[str, int]] = {}
+            for tf, lst in levels.by_tf.items():
+                if lst:
+                    s = _count_le(lst, price)
+                    tf_counts[tf or "unknown"] = {"support": int(s), "resistance": int(len(lst) - s)}
+            nearest_support = lvl_all[support - 1][0] if support > 0 else None
+            nearest_resistance = lvl_all[support][0] if support < total else None
+            within = None
+            if atr and atr > 0:
+                lo = bisect_left(lvl_all, (price - k * atr, -1))
+                hi = bisect_right(lvl_all, (price + k * atr, float("inf")))
+                within = int(max(0, hi - lo))
+
+        has_atr = bool(atr and atr > 0)
+        return {
+            "total": int(total),
+            "support_count": int(support),
+            "resistance_count": int(total - support),
+            "by_tf": tf_counts,
+            "nearest_support_dist_atr": (
+                round((price - nearest_support) / atr, 3) if (has_atr and nearest_support is not None) else None
+            ),
+            "nearest_resistance_dist_atr": (
+                round((nearest_resistance - price) / atr, 3) if (has_atr and nearest_resistance is not None) else None
+            ),
+            "zones_within_k_atr": within,
+            "near_atr_mult": k,
+        }
@@ -0,0 +1,145 @@
+# ローカル AI スタブサーバ: OpenAI 互換の POST /v1/chat/completions を、設定したレイテンシ分布で返す。
+# ブリッジ / HedgedAIClient を OPENAI_BASE_URL=http://127.0.0.1:<port>/v1 で向けてテールレイテンシを再現する。
+#   python test/ai_stub_server.py [port] [latency_spec] [fail_rate]
+# usage は OpenAI の自動プレフィックスキャッシュを真似る: 先頭メッセージ列（最後の user 以外）が
+# 既出かつ 1024 token 以上なら、128 token 単位で cached_tokens を返す（token ≒ 文字数/4）。
+# stream=true のリクエストには SSE (chat.completion.chunk) で返す: latency_spec が最初のトークンまでの時間、
+# 以降 4 文字ごとに token_sec 秒（非ストリームは生成時間ぶん待ってから一括で返す）。
+# latency_spec:
+#   fixed:S             常に S 秒
+#   uniform:A,B         A..B 秒の一様分布
+#   lognormal:MED,SIG   中央値 MED 秒の対数正規
+#   tail:S,P,T          確率 P で T 秒、それ以外 S 秒（重いテール）
+import hashlib
+import json
+import math
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def parse_latency(spec):
+    kind, _, args = (spec or "fixed:0.3").partition(":")
+    vals = [float(x) for x in args.split(",") if x.strip()]
+    if kind == "uniform":
+        return lambda rng: rng.uniform(vals[0], vals[1])
+    if kind == "lognormal":
+        return lambda rng: rng.lognormvariate(math.log(vals[0]), vals[1])
+    if kind == "tail":
+        return lambda rng: vals[2] if rng.random() < vals[1] else vals[0]
+    return lambda rng: vals[0]
+
+
+def make_server(port=0, latency="fixed:0.3", fail_rate=0.0, reply=None, seed=11, token_sec=0.02):
+    draw = parse_latency(latency)
+    rng = random.Random(seed)
+    rng_lock = threading.Lock()
+    body = reply or {"confluence_score": 80, "lot_multiplier": 1.0, "reason": "stub"}
+    counts = {"requests": 0, "failed": 0}
+    seen_prefixes = set()
+
+    def usage_for(req):
+        msgs = req.get("messages") or []
+        texts = [str(m.get("content") or "") for m in msgs]
+        prompt_tokens = sum(len(t) for t in texts) // 4
+        prefix = "\x00".join(texts[:-1])
+        prefix_tokens = len(prefix) // 4
+        key = hashlib.sha1(prefix.encode("utf-8")).hexdigest()
+        with rng_lock:
+            hit = key in seen_prefixes
+            seen_prefixes.add(key)
+        cached = (prefix_tokens // 128) * 128 if hit and prefix_tokens >= 1024 else 0
+        return {"prompt_tokens": prompt_tokens, "completion_tokens": 20, "total_tokens": prompt_tokens + 20,
+                "prompt_tokens_details": {"cached_tokens": cached}}
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            n = int(self.headers.get("Content-Length") or 0)
+            try:
+                req = json.loads(self.rfile.read(n) or b"{}")
+            except ValueError:
+                req = {}
+            with rng_lock:
+                delay = max(0.0, draw(rng))
+                fail = rng.random() < fail_rate
+                counts["requests"] += 1
+                counts["failed"] += int(fail)
+            time.sleep(delay)
+            if req.get("stream") and not fail:
+                self._stream(req)
+                return
+            if not fail:
+                time.sleep(token_sec * math.ceil(len(json.dumps(body)) / 4))
+            if fail:
+                out = json.dumps({"error": {"message": "stub failure", "type": "server_error"}}).encode()
+                self.send_response(500)
+            else:
+                out = json.dumps({
+                    "id": f"chatcmpl-stub-{counts['requests']}",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": "stub",
+                    "choices": [{"index": 0, "finish_reason": "stop",
+                                 "message": {"role": "assistant", "content": json.dumps(body)}}],
+                    "usage": usage_for(req),
+                }).encode()
+                self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(out)))
+            self.end_headers()
+            try:
+                self.wfile.write(out)
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # client timed out / abandoned a hedged loser
+
+        def _chunk(self, obj):
+            data = f"data: {obj if isinstance(obj, str) else json.dumps(obj)}\n\n".encode()
+            self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+            self.wfile.flush()
+
+        def _stream(self, req):
+            rid = f"chatcmpl-stub-{counts['requests']}"
+            content = json.dumps(body)
+
+            def chunk(delta, finish=None):
+                return {"id": rid, "object": "chat.completion.chunk", "created": int(time.time()), "model": "stub",
+                        "choices": [{"index": 0, "delta": delta, "finish_reason": finish}]}
+
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            try:
+                self._chunk(chunk({"role": "assistant", "content": ""}))
+                for i in range(0, len(content), 4):
+                    self._chunk(chunk({"content": content[i:i + 4]}))
+                    time.sleep(token_sec)
+                self._chunk(chunk({}, "stop"))
+                if (req.get("stream_options") or {}).get("include_usage"):
+                    self._chunk({"id": rid, "object": "chat.completion.chunk", "created": int(time.time()),
+                                 "model": "stub", "choices": [], "usage": usage_for(req)})
+                self._chunk("[DONE]")
+                self.wfile.write(b"0\r\n\r\n")
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # client closed the stream
+
+    srv = ThreadingHTTPServer(("127.0.0.1", int(port)), Handler)
+    srv.daemon_threads = True
+    srv.counts = counts
+    return srv
+
+
+if __name__ == "__main__":
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8765
+    latency = sys.argv[2] if len(sys.argv) > 2 else "tail:0.4,0.1,6"
+    fail_rate = float(sys.argv[3]) if len(sys.argv) > 3 else 0.0
+    srv = make_server(port, latency, fail_rate)
+    print(f"AI stub on http://127.0.0.1:{srv.server_address[1]}/v1 latency={latency} fail_rate={fail_rate}")
+    srv.serve_forever()
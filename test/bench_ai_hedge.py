@@ -0,0 +1,66 @@
+# 手動ベンチ: 逐次リトライ (call_openai_json_with_retry) と HedgedAIClient のレイテンシ比較
+# ローカルスタブ (test/ai_stub_server.py) を重いテール分布で立て、同じ呼び出し回数で p50/p90/p99 を出す。
+#   python test/bench_ai_hedge.py [calls] [latency_spec] [deadline_sec]
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from openai import OpenAI  # noqa: E402
+
+import fxai_ai_client as ai  # noqa: E402
+from ai_stub_server import make_server  # noqa: E402
+
+CALLS = int(sys.argv[1]) if len(sys.argv) > 1 else 60
+LATENCY = sys.argv[2] if len(sys.argv) > 2 else "tail:0.3,0.1,4"
+DEADLINE = float(sys.argv[3]) if len(sys.argv) > 3 else 6.0
+TIMEOUT, RETRIES, RETRY_WAIT = 3.0, 3, 0.5
+
+
+def pctl(vals, q):
+    s = sorted(vals)
+    return s[min(len(s) - 1, int(q * (len(s) - 1)))]
+
+
+def report(name, lat, ok):
+    print(f"{name:>10}: ok={ok}/{len(lat)} p50={pctl(lat, .5):.2f}s p90={pctl(lat, .9):.2f}s "
+          f"p99={pctl(lat, .99):.2f}s max={max(lat):.2f}s")
+
+
+def main():
+    srv = make_server(0, LATENCY)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{srv.server_address[1]}/v1"
+    http_client = ai.pooled_http_client(max_connections=8)
+    kw = {"http_client": http_client} if http_client is not None else {}
+    client = OpenAI(api_key="stub", base_url=base, max_retries=0, **kw)
+
+    lat, ok = [], 0
+    for _ in range(CALLS):
+        t0 = time.perf_counter()
+        data, *_ = ai.call_openai_json_with_retry(client=client, model="stub", prompt="{}", timeout_sec=TIMEOUT,
+                                                  retry_count=RETRIES, retry_wait_sec=RETRY_WAIT)
+        lat.append(time.perf_counter() - t0)
+        ok += int(isinstance(data, dict))
+    report("sequential", lat, ok)
+
+    hedged = ai.HedgedAIClient(client=client, model="stub", hedge_min_samples=10, hedge_default_sec=1.0)
+    lat, ok = [], 0
+    for _ in range(CALLS):
+        t0 = time.perf_counter()
+        data, *_ = hedged.call_json("{}", kind="entry_score", deadline_sec=DEADLINE, timeout_sec=TIMEOUT,
+                                    retry_count=RETRIES, retry_wait_sec=RETRY_WAIT)
+        lat.append(time.perf_counter() - t0)
+        ok += int(isinstance(data, dict))
+    report("hedged", lat, ok)
+    print("client stats:", hedged.stats())
+    print("latency:", hedged.latency.stats()["entry_score"])
+    print("stub requests:", srv.counts)
+    srv.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+# 手動ベンチ: ストリーミング早期抽出 (early=) と通常呼び出しのレイテンシ比較
+# スタブを長い reason で立て、confluence_score / lot_multiplier が揃った時点 (first usable) と
+# 完了 (full) までの時間を比べる。
+#   python test/bench_ai_stream.py [calls] [latency_spec] [token_sec]
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from openai import OpenAI  # noqa: E402
+
+import fxai_ai_client as ai  # noqa: E402
+from ai_stub_server import make_server  # noqa: E402
+
+CALLS = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+LATENCY = sys.argv[2] if len(sys.argv) > 2 else "fixed:0.3"
+TOKEN_SEC = float(sys.argv[3]) if len(sys.argv) > 3 else 0.01
+REPLY = {
+    "confluence_score": 72,
+    "lot_multiplier": 1.0,
+    "reason": "Trend aligned with M15, confluence from two sources, spread normal. " * 8,
+}
+
+
+def ready(fields):
+    return isinstance(fields.get("confluence_score"), (int, float)) and isinstance(
+        fields.get("lot_multiplier"), (int, float)
+    )
+
+
+def pctl(vals, q):
+    s = sorted(vals)
+    return s[min(len(s) - 1, int(q * (len(s) - 1)))]
+
+
+def report(name, lat):
+    print(f"{name:>12}: n={len(lat)} p50={pctl(lat, .5) * 1000:.0f}ms p90={pctl(lat, .9) * 1000:.0f}ms")
+
+
+def main():
+    srv = make_server(0, LATENCY, reply=REPLY, token_sec=TOKEN_SEC)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{srv.server_address[1]}/v1"
+    http_client = ai.pooled_http_client(max_connections=8)
+    kw = {"http_client": http_client} if http_client is not None else {}
+    client = OpenAI(api_key="stub", base_url=base, max_retries=0, **kw)
+
+    plain = []
+    for _ in range(CALLS):
+        t0 = time.perf_counter()
+        data, *_ = ai.call_openai_json_with_retry(client=client, model="stub", prompt="{}", timeout_sec=10.0,
+                                                  retry_count=1, retry_wait_sec=0.0)
+        plain.append(time.perf_counter() - t0)
+    report("non-stream", plain)
+
+    first, full = [], []
+    for _ in range(CALLS):
+        t0 = time.perf_counter()
+        data, *_ = ai.call_openai_json_with_retry(client=client, model="stub", prompt="{}", timeout_sec=10.0,
+                                                  retry_count=1, retry_wait_sec=0.0, early=ready)
+        first.append(time.perf_counter() - t0)
+        fut = data.get("_ai_stream_full") if isinstance(data, dict) else None
+        if fut is not None:
+            done = fut.result(timeout=10.0)
+            full.append(float(done.get("_ai_latency_ms") or 0.0) / 1000.0)
+        else:
+            full.append(first[-1])
+    report("first usable", first)
+    report("stream full", full)
+    print("stub requests:", srv.counts)
+    srv.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+# 手動ベンチ: get_mt5_market_data 用 BarCache の IPC 削減量と一致性チェック
+# 仮想 MT5 (時刻とともに M15/M5 バーが増える) に対して、判断 1 回あたりの
+# copy_rates_from_pos 呼び出し数を非キャッシュ (3 回) と比較し、
+# キャッシュが返す確定バーが毎回のフル取得と一致することを確認する。
+#   python test/bench_bar_cache.py [decisions] [interval_sec]
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from fxai_bar_cache import BarCache  # noqa: E402
+
+DECISIONS = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+INTERVAL_SEC = float(sys.argv[2]) if len(sys.argv) > 2 else 20.0  # seconds between decisions
+TF_M15, TF_M5 = 15, 5
+TF_SEC = {TF_M15: 900, TF_M5: 300}
+RATE_DTYPE = [("time", "<i8"), ("open", "<f8"), ("high", "<f8"), ("low", "<f8"), ("close", "<f8")]
+
+
+class FakeTerminal:
+    def __init__(self, start):
+        self.now = start
+        self.calls = 0
+
+    def bar(self, tf, t, forming):
+        base = 2000.0 + (t // TF_SEC[tf]) % 97
+        # The forming bar's values move with the clock; closed bars are final.
+        drift = (self.now - t) % 7 if forming else 3
+        return (t, base, base + 1.0 + drift * 0.1, base - 1.0, base + 0.5)
+
+    def copy_rates_from_pos(self, symbol, tf, start, count):
+        self.calls += 1
+        sec = TF_SEC[tf]
+        cur = int(self.now // sec) * sec
+        rows = [self.bar(tf, cur - i * sec, i == 0) for i in range(start + count - 1, start - 1, -1)]
+        return np.array(rows, dtype=RATE_DTYPE)
+
+
+def main():
+    term = FakeTerminal(start=1_700_000_000)
+    cache = BarCache(copy_rates_from_pos=term.copy_rates_from_pos, full_refresh_sec=0)
+    mismatches = 0
+    for _ in range(DECISIONS):
+        for tf, count in ((TF_M15, 30), (TF_M5, 62), (TF_M5, 60)):
+            got = cache.rates("GOLD", tf, count, tf_sec=TF_SEC[tf], server_now=term.now)
+            calls = term.calls
+            want = term.copy_rates_from_pos("GOLD", tf, 0, count)
+            term.calls = calls
+            # Indicators only read closed bars (everything but the last row).
+            if not np.array_equal(got[:-1], want[:-1]) or got[-1]["time"] != want[-1]["time"]:
+                mismatches += 1
+        term.now += INTERVAL_SEC
+
+    st = cache.stats()
+    # get_mt5_market_data now asks for M5 x 62 once and slices 60 from it.
+    per_decision = term.calls / DECISIONS
+    print(f"decisions={DECISIONS} interval={INTERVAL_SEC}s mismatches={mismatches}")
+    print(f"ipc/decision: uncached=3 cached={per_decision:.3f} ({(1 - per_decision / 3) * 100:.1f}% fewer)")
+    print(
+        f"hits={st['hits']} incremental={st['incremental']} full={st['full']} "
+        f"hit_rate={st['hit_rate']} fetched_bars={st['fetched_bars']} (uncached={DECISIONS * 152})"
+    )
+    assert mismatches == 0
+
+
+if __name__ == "__main__":
+    main()
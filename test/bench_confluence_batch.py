@@ -0,0 +1,124 @@
+# 手動ベンチ/パリティ: NumPy バッチ合流エンジン vs スカラー関数 (fxai_qtrend / fxai_window_signals)
+#   python test/bench_confluence_batch.py [signals] [anchors] [seed]
+#   python test/bench_confluence_batch.py --cache signals_cache.json [anchors]
+# 不一致があれば AssertionError で停止する（--cache の実録データ向け）。境界ケースのパリティは test/test_confluence_batch.py。
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import fxai_confluence_batch as cb  # noqa: E402
+from fxai_signal_record import SignalRecord  # noqa: E402
+
+SYMBOL = "XAUUSD"
+CFG = dict(
+    confluence_window_sec=600,
+    signal_max_age_sec=1200,
+    zone_lookback_sec=1200,
+    zone_touch_lookback_sec=1200,
+    fvg_lookback_sec=1200,
+)
+WINDOW_SEC = 300.0
+
+
+def weight_confirmed(confirmed):
+    c = (confirmed or "").lower()
+    if c == "bar_close":
+        return 1.0
+    if c == "intrabar":
+        return 0.6
+    return 0.8
+
+
+KINDS = [
+    ("Zones", "structure", "new_zone_confirmed"),
+    ("Zones", "structure", "zone_retrace_touch"),
+    ("Zones", "structure", "zone_touch"),
+    ("FVG", "structure", "fvg_touch"),
+    ("Q-Trend", "entry_trigger", "trend_start"),
+    ("Q-Trend Strong", "entry_trigger", "trend_start"),
+    ("Q-Trend-Normal", "entry_trigger", ""),
+    ("OSGFC", "trend_filter", ""),
+    ("OSGFC", "entry_trigger", ""),
+    ("Lorentzian", "entry_trigger", "prediction"),
+    ("ZonesDetector", "structure", "zone_confirmed"),
+]
+
+
+def synthetic(n, seed):
+    rnd = random.Random(seed)
+    now = 1_700_000_000.0
+    out = []
+    for _ in range(n):
+        now += rnd.choice([0, 1, 5, 30, 120, 400]) * rnd.random()
+        src, sig_type, evt = rnd.choice(KINDS)
+        st = rnd.choice([now, now - rnd.random() * 1500, now + rnd.random() * 30, None])
+        out.append(
+            SignalRecord.from_normalized(
+                {
+                    "symbol": SYMBOL,
+                    "source": src,
+                    "signal_type": sig_type,
+                    "event": evt,
+                    "side": rnd.choice(["buy", "sell", ""]),
+                    "strength": rnd.choice(["normal", "strong", None]),
+                    "confirmed": rnd.choice(["bar_close", "intrabar", None]),
+                    "signal_time": st,
+                    "receive_time": now,
+                }
+            )
+        )
+    return out
+
+
+def from_cache(path):
+    import fxai_qtrend_stream
+
+    return fxai_qtrend_stream.load_recorded_signals([path])
+
+
+if len(sys.argv) > 2 and sys.argv[1] == "--cache":
+    records = from_cache(sys.argv[2])
+    n_anchors = int(sys.argv[3]) if len(sys.argv) > 3 else 2000
+    seed = 0
+    if records:
+        SYMBOL = records[0].symbol
+else:
+    n_signals = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    n_anchors = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    seed = int(sys.argv[3]) if len(sys.argv) > 3 else 1
+    records = synthetic(n_signals, seed)
+
+rnd = random.Random(seed)
+t_lo = min(s.receive_ts() for s in records)
+t_hi = max(s.receive_ts() for s in records)
+nows = [rnd.uniform(t_lo, t_hi) for _ in range(n_anchors)]
+# Include exact receive times (freshness/arrival boundaries).
+nows[: n_anchors // 4] = [rnd.choice(records).receive_ts() for _ in range(n_anchors // 4)]
+trigger_sides = [rnd.choice(["buy", "sell", ""]) for _ in nows]
+
+t0 = time.perf_counter()
+cols = cb.SignalColumns.from_records(records, SYMBOL)
+batch_q = cb.qtrend_anchor_stats_batch(cols, nows, weight_confirmed=weight_confirmed, **CFG)
+batch_w = cb.window_signals_batch(cols, nows, trigger_sides, window_sec=WINDOW_SEC)
+t_batch = time.perf_counter() - t0
+
+t0 = time.perf_counter()
+scalar_q = [
+    cb.scalar_qtrend_anchor_stats(records, t, symbol=SYMBOL, weight_confirmed=weight_confirmed, **CFG) for t in nows
+]
+scalar_w = [
+    cb.scalar_window_signals(records, t, side, symbol=SYMBOL, window_sec=WINDOW_SEC) for t, side in zip(nows, trigger_sides)
+]
+t_scalar = time.perf_counter() - t0
+
+for t, a, b in zip(nows, scalar_q, batch_q):
+    assert a == b, f"qtrend mismatch at t={t}:\nscalar={a}\nbatch ={b}"
+for t, a, b in zip(nows, scalar_w, batch_w):
+    assert a == b, f"window mismatch at t={t}:\nscalar={a}\nbatch ={b}"
+
+anchored = sum(1 for x in batch_q if x is not None)
+print(f"signals={len(records)} anchors={len(nows)} anchored={anchored} parity=OK")
+print(f"scalar={t_scalar:.3f}s batch={t_batch:.3f}s speedup={t_scalar / max(t_batch, 1e-9):.1f}x")
@@ -0,0 +1,60 @@
+# 手動ベンチ: get_mt5_market_data のインジケータ計算 (行ごとの dict パス vs NumPy 構造化配列パス)
+# ATR_AVG_BARS=60 / 288 で 1 回あたりの計算時間を比較し、両パスの結果一致を確認する。
+#   python test/bench_indicators.py [iterations]
+import math
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import fxai_indicators as fi  # noqa: E402
+
+ITERATIONS = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+RATE_DTYPE = [
+    ("time", "<i8"), ("open", "<f8"), ("high", "<f8"), ("low", "<f8"), ("close", "<f8"),
+    ("tick_volume", "<u8"), ("spread", "<i4"), ("real_volume", "<u8"),
+]
+
+
+def make_rates(n, seed):
+    rng = random.Random(seed)
+    rows = []
+    p = 2000.0
+    for i in range(n):
+        o = p
+        c = p + rng.gauss(0, 1)
+        rows.append((i * 300, o, max(o, c) + abs(rng.gauss(0, 0.5)), min(o, c) - abs(rng.gauss(0, 0.5)), c, 1, 20, 0))
+        p = c
+    return np.array(rows, dtype=RATE_DTYPE)
+
+
+def as_dicts(rates):
+    return [dict(zip(rates.dtype.names, map(float, row))) for row in rates]
+
+
+def timed(fn):
+    t0 = time.perf_counter()
+    for _ in range(ITERATIONS):
+        out = fn()
+    return (time.perf_counter() - t0) / ITERATIONS * 1e6, out
+
+
+def main():
+    r15 = make_rates(30, 1)
+    for bars in (60, 288):
+        r5_avg = make_rates(bars + 2, 2)
+        r5 = r5_avg[-60:]
+        d15, d5, d5_avg = as_dicts(r15), as_dicts(r5), as_dicts(r5_avg)
+        us_rows, a = timed(lambda: fi.market_indicators(d15, d5, d5_avg, atr_avg_bars=bars))
+        us_np, b = timed(lambda: fi.market_indicators(r15, r5, r5_avg, atr_avg_bars=bars))
+        for k, v in a.items():
+            assert v == b[k] if isinstance(v, str) else math.isclose(v, b[k], rel_tol=1e-9), (k, v, b[k])
+        print(f"ATR_AVG_BARS={bars:>3}: rows={us_rows:8.1f}us numpy={us_np:7.1f}us speedup={us_rows / us_np:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
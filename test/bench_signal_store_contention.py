@@ -0,0 +1,121 @@
+# 手動ベンチ: シグナルキャッシュの読み取り競合 (ロック読み vs コピーオンライト)
+# 多数の reader スレッド + バーストする writer で reader レイテンシを比較する。
+#   python test/bench_signal_store_contention.py [readers] [seconds]
+# cow の wall p99 はロックで直列化されない reader 同士の GIL タイムスライスを含む（cpu_p99 が 1 回の読み取りの実コスト）。
+import os
+import sys
+import threading
+import time
+from threading import Lock
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from fxai_signal_record import SignalRecord  # noqa: E402
+from fxai_signal_store import SignalStore  # noqa: E402
+
+READERS = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+SECONDS = float(sys.argv[2]) if len(sys.argv) > 2 else 3.0
+BURST = 50  # writer: signals per burst
+BURST_PAUSE_SEC = 0.05
+RETENTION_SEC = 2.0  # keeps the store near a steady ~2000 signals
+
+
+def make_record(i, now):
+    kinds = [
+        {"source": "Q-Trend", "signal_type": "entry_trigger", "event": "trend_start"},
+        {"source": "Zones", "signal_type": "structure", "event": "new_zone_confirmed", "zone_low": 2000, "zone_high": 2002},
+        {"source": "FVG", "signal_type": "structure", "event": "fvg_touch"},
+        {"source": "Lorentzian", "signal_type": "entry_trigger", "event": "prediction"},
+    ]
+    d = dict(kinds[i % len(kinds)])
+    d.update(
+        {
+            "symbol": "GOLD",
+            "side": "buy" if i % 2 else "sell",
+            "tf": "5",
+            "price": 2000.0 + (i % 100) * 0.1,
+            "strength": "normal",
+            "confirmed": "bar_close",
+            "time": None,
+            "receive_time": now,
+            "signal_time": now - (i % 50),
+        }
+    )
+    return SignalRecord.from_normalized(d)
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    v = sorted(values)
+    return v[min(len(v) - 1, int(q * (len(v) - 1)))]
+
+
+def run(mode):
+    store = SignalStore(retention_sec=lambda s: RETENTION_SEC)
+    lock = Lock()
+    now = time.time()
+    for i in range(2000):
+        store.add(make_record(i, now))
+
+    stop = threading.Event()
+    latencies = [[] for _ in range(READERS)]
+    cpu = [[] for _ in range(READERS)]
+    bursts = []
+
+    def reader(idx):
+        out = latencies[idx]
+        out_cpu = cpu[idx]
+        while not stop.is_set():
+            t0 = time.perf_counter()
+            c0 = time.thread_time()
+            n = time.time()
+            if mode == "locked":
+                with lock:
+                    store.fresh_candidates("GOLD", now=n, signal_max_age_sec=600.0, fvg_lookback_sec=1200.0)
+                    store.window("GOLD", n - 300, n + 300)
+            else:
+                view = store.view("GOLD")
+                view.fresh_candidates(now=n, signal_max_age_sec=600.0, fvg_lookback_sec=1200.0)
+                view.window(n - 300, n + 300)
+            out.append(time.perf_counter() - t0)
+            out_cpu.append(time.thread_time() - c0)
+
+    def writer():
+        i = 2000
+        while not stop.is_set():
+            n = time.time()
+            c0 = time.thread_time()
+            with lock:
+                for _ in range(BURST):
+                    store.add(make_record(i, n))
+                    i += 1
+                store.expire(n)
+            bursts.append(time.thread_time() - c0)
+            time.sleep(BURST_PAUSE_SEC)
+
+    threads = [threading.Thread(target=reader, args=(k,), daemon=True) for k in range(READERS)]
+    threads.append(threading.Thread(target=writer, daemon=True))
+    for t in threads:
+        t.start()
+    time.sleep(SECONDS)
+    stop.set()
+    for t in threads:
+        t.join()
+
+    allv = [x for lst in latencies for x in lst]
+    allc = [x for lst in cpu for x in lst]
+    # Wall latency includes GIL time slicing between runnable readers; cpu is the read's own work.
+    print(
+        f"{mode:>6}: reads={len(allv)} "
+        f"p50={percentile(allv, 0.50) * 1e3:.3f}ms "
+        f"p99={percentile(allv, 0.99) * 1e3:.3f}ms "
+        f"max={max(allv or [0.0]) * 1e3:.3f}ms "
+        f"cpu_p99={percentile(allc, 0.99) * 1e3:.3f}ms "
+        f"writer_burst_cpu_p99={percentile(bursts, 0.99) * 1e3:.3f}ms"
+    )
+
+
+print(f"readers={READERS} seconds={SECONDS} burst={BURST}")
+run("locked")
+run("cow")
@@ -0,0 +1,73 @@
+# 手動ベンチ: MT5_ADAPTER=sim でブリッジを Linux 上で動かす再現ランナー
+# 記録データ (MT5_SIM_BARS / MT5_SIM_TICKS、無ければ合成 M1) を SimTerminal が再生し、
+# EA 役のスレッドが ZMQ で ORDER/CLOSE を約定して HEARTBEAT / POSITIONS_CHANGED を返す。
+# 判断経路 (市場データ + ポジション要約) のレイテンシと ORDER→ポジション反映の往復時間を測る。
+#   MT5_SIM_BARS=M1=gold_m1.csv python test/bench_sim_terminal.py [decisions] [orders]
+import importlib.machinery
+import importlib.util
+import os
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+DECISIONS = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+ORDERS = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+SYMBOL = os.getenv("SYMBOL", "GOLD")
+
+os.environ["MT5_ADAPTER"] = "sim"
+os.environ.setdefault("ZMQ_BIND", "tcp://127.0.0.1:15555")
+os.environ.setdefault("ZMQ_HEARTBEAT_BIND", "tcp://127.0.0.1:15556")
+os.environ.setdefault("OPENAI_API_KEY", "")
+
+loader = importlib.machinery.SourceFileLoader("bridge", os.path.join(ROOT, "brain_bridge_fxai_v26.pyw"))
+spec = importlib.util.spec_from_loader("bridge", loader)
+bridge = importlib.util.module_from_spec(spec)
+loader.exec_module(bridge)
+
+
+def pctl(vals, q):
+    s = sorted(vals)
+    return s[min(len(s) - 1, int(q * (len(s) - 1)))] if s else None
+
+
+def main():
+    if not bridge.init_runtime():
+        print("init_runtime failed:", bridge._runtime_init_error)
+        return 1
+    sim = bridge.mt5
+    time.sleep(0.3)  # EA loop connect + first heartbeat
+
+    lat = []
+    for _ in range(DECISIONS):
+        t0 = time.perf_counter()
+        bridge.get_mt5_market_data(SYMBOL)
+        bridge.get_mt5_positions_summary(SYMBOL, log=False)
+        lat.append((time.perf_counter() - t0) * 1000.0)
+    print(f"decision read ms: p50={pctl(lat, 0.5):.3f} p95={pctl(lat, 0.95):.3f} max={max(lat):.3f}")
+
+    rtt = []
+    for i in range(ORDERS):
+        kind = "ORDER" if i % 2 == 0 else "CLOSE"
+        want = 1 if kind == "ORDER" else 0
+        payload = {"type": kind, "symbol": SYMBOL, "reason": "bench"}
+        if kind == "ORDER":
+            payload.update({"action": "BUY" if i % 4 == 0 else "SELL", "multiplier": 1.0, "atr": 1.0})
+        t0 = time.perf_counter()
+        bridge._zmq_send_json_with_metrics(payload, symbol=SYMBOL, kind=kind.lower())
+        while len(sim.positions_get(symbol=SYMBOL)) != want and time.perf_counter() - t0 < 2.0:
+            time.sleep(0.0005)
+        rtt.append((time.perf_counter() - t0) * 1000.0)
+    print(f"order->position ms: p50={pctl(rtt, 0.5):.3f} p95={pctl(rtt, 0.95):.3f} max={max(rtt):.3f}")
+
+    time.sleep(1.2)
+    print("heartbeat fresh:", bridge._heartbeat_is_fresh())
+    print("sim stats:", sim.stats())
+    print("positions summary:", bridge.get_mt5_positions_summary(SYMBOL, log=False))
+    sim.stop_ea()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,139 @@
+# AICallGovernor: 優先度順の払い出し、到着時/キュー溢れ時のシェディング、種別ごとの上限とトークンバケット。
+#   python -m pytest -q test/test_ai_governor.py
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from fxai_ai_governor import AICallGovernor, KindLimit  # noqa: E402
+
+
+def _wait_for(pred, timeout=2.0):
+    end = time.monotonic() + timeout
+    while time.monotonic() < end:
+        if pred():
+            return True
+        time.sleep(0.005)
+    return pred()
+
+
+def _waiter(gov, kind, cls, results, *, hold=None):
+    """Acquire on a thread; record (cls, state) in grant order and release (after `hold` is set, if given)."""
+
+    def run():
+        ticket, state = gov.acquire(kind, cls, timeout_sec=5.0)
+        results.append((cls, state))
+        if hold is not None:
+            hold.wait(5.0)
+        gov.release(ticket)
+
+    th = threading.Thread(target=run, daemon=True)
+    th.start()
+    return th
+
+
+def _queued(gov, n):
+    assert _wait_for(lambda: gov.stats()["queue_depth"] == n), gov.stats()
+
+
+def test_waiters_are_served_in_priority_then_arrival_order():
+    gov = AICallGovernor(max_concurrency=1, limits={}, queue_limit=16, shed_from="speculative")
+    held, state = gov.acquire("entry_score", "entry")
+    assert state == "ok"
+    results = []
+    threads = []
+    for cls in ("hold", "reeval", "close", "entry", "close"):
+        threads.append(_waiter(gov, "entry_score", cls, results))
+        _queued(gov, len(threads))
+    gov.release(held)
+    for th in threads:
+        th.join(5.0)
+    assert [c for c, _ in results] == ["entry", "close", "close", "reeval", "hold"]
+    assert all(s == "ok" for _, s in results)
+    st = gov.stats()
+    assert (st["in_flight"], st["queue_depth"], st["max_queue_depth"]) == (0, 0, 5)
+    assert st["classes"]["close"]["admitted"] == 2
+
+
+def test_low_priority_is_shed_on_arrival_behind_important_waiters():
+    gov = AICallGovernor(max_concurrency=1, limits={}, queue_limit=16, shed_from="reeval")
+    held, _ = gov.acquire("entry_score", "entry")
+    results = []
+    th = _waiter(gov, "entry_score", "entry", results)
+    _queued(gov, 1)
+    assert gov.acquire("close_hold", "reeval", timeout_sec=1.0) == (None, "shed")
+    assert gov.acquire("close_hold", "speculative", timeout_sec=1.0) == (None, "shed")
+    # Classes above shed_from still queue.
+    th2 = _waiter(gov, "close_hold", "close", results)
+    _queued(gov, 2)
+    gov.release(held)
+    th.join(5.0)
+    th2.join(5.0)
+    assert results == [("entry", "ok"), ("close", "ok")]
+    st = gov.stats()
+    assert st["classes"]["reeval"]["shed"] == 1
+    assert st["kinds"]["close_hold"]["shed"] == 2
+
+
+def test_queue_overflow_sheds_newest_lowest_priority_waiter():
+    gov = AICallGovernor(max_concurrency=1, limits={}, queue_limit=1, shed_from="reeval")
+    held, _ = gov.acquire("entry_score", "entry")
+    results = []
+    first_hold = _waiter(gov, "close_hold", "hold", results)
+    _queued(gov, 1)
+    # Over the limit with only sheddable waiters: the newest of the lowest class goes (the arrival itself).
+    assert gov.acquire("close_hold", "hold", timeout_sec=1.0) == (None, "shed")
+    # A more important arrival pushes out the queued hold.
+    close = _waiter(gov, "close_hold", "close", results)
+    first_hold.join(5.0)
+    assert results == [("hold", "shed")]
+    gov.release(held)
+    close.join(5.0)
+    assert results == [("hold", "shed"), ("close", "ok")]
+    assert gov.stats()["classes"]["hold"]["shed"] == 2
+
+
+def test_kind_concurrency_cap_does_not_block_other_kinds():
+    gov = AICallGovernor(
+        max_concurrency=2, limits={"entry_score": KindLimit(rate_per_min=0, burst=0, max_concurrency=1)}, queue_limit=8
+    )
+    held, _ = gov.acquire("entry_score", "entry")
+    results = []
+    th = _waiter(gov, "entry_score", "entry", results)
+    _queued(gov, 1)
+    ticket, state = gov.acquire("close_hold", "hold", timeout_sec=1.0)
+    assert state == "ok"  # lower priority, but only blocked entry_score waits
+    gov.release(ticket)
+    assert results == []
+    gov.release(held)
+    th.join(5.0)
+    assert results == [("entry", "ok")]
+
+
+def test_token_bucket_limits_rate_and_refills():
+    gov = AICallGovernor(max_concurrency=4, limits={"entry_score": KindLimit(rate_per_min=6000, burst=1, max_concurrency=0)})
+    t1, s1 = gov.acquire("entry_score", "entry")
+    gov.release(t1)
+    assert s1 == "ok"
+    assert gov.acquire("entry_score", "entry", timeout_sec=0.0) == (None, "timeout")
+    t0 = time.monotonic()
+    t2, s2 = gov.acquire("entry_score", "entry", timeout_sec=2.0)  # 100 tokens/s
+    assert s2 == "ok"
+    assert time.monotonic() - t0 < 1.0
+    gov.release(t2)
+    assert gov.stats()["kinds"]["entry_score"]["timeouts"] == 1
+
+
+def test_timeout_and_release_are_safe():
+    gov = AICallGovernor(max_concurrency=1, limits={}, max_wait_sec=0.05)
+    held, _ = gov.acquire("entry_score", "entry")
+    t0 = time.monotonic()
+    assert gov.acquire("entry_score", "entry", timeout_sec=10.0) == (None, "timeout")  # capped by max_wait_sec
+    assert time.monotonic() - t0 < 1.0
+    gov.release(held)
+    gov.release(held)  # double release does not free a second slot
+    gov.release(None)
+    assert gov.stats()["in_flight"] == 0
+    assert gov.stats()["classes"]["entry"]["timeouts"] == 1
@@ -0,0 +1,168 @@
+# HedgedAIClient.call_json: ヘッジ送信 / 勝者の採用と敗者の放棄 / デッドライン / リトライの集計。
+# OpenAI クライアントはスクリプト化したフェイク（ブロックは Event で解放するので sleep に依存しない）。
+#   python -m pytest -q test/test_ai_hedge.py
+import json
+import os
+import sys
+import threading
+import time
+from types import SimpleNamespace as NS
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from fxai_ai_client import HedgedAIClient  # noqa: E402
+
+
+class FakeCompletions:
+    """create() plays one scripted step per request: a dict (answer), an Exception (raise) or an Event (block until set)."""
+
+    def __init__(self, *steps):
+        self._steps = list(steps)
+        self._lock = threading.Lock()
+        self.calls = []
+
+    def create(self, **kwargs):
+        with self._lock:
+            self.calls.append(kwargs)
+            step = self._steps.pop(0) if self._steps else {"ok": True}
+        if isinstance(step, threading.Event):
+            step.wait(5.0)
+            step = {"late": True}
+        if isinstance(step, Exception):
+            raise step
+        return NS(id=f"resp-{len(self.calls)}", choices=[NS(message=NS(content=json.dumps(step)))], usage=None)
+
+
+def _client(completions, **kw):
+    opts = dict(max_workers=4, hedge_default_sec=0.05, hedge_min_sec=0.01, hedge_min_samples=1000)
+    opts.update(kw)
+    return HedgedAIClient(client=NS(chat=NS(completions=completions)), model="m", **opts)
+
+
+def _call(hc, **kw):
+    opts = dict(kind="entry", deadline_sec=2.0, timeout_sec=2.0, retry_count=1, retry_wait_sec=0.0)
+    opts.update(kw)
+    return hc.call_json("prompt", **opts)
+
+
+def _wait_for(pred, timeout=2.0):
+    end = time.monotonic() + timeout
+    while time.monotonic() < end:
+        if pred():
+            return True
+        time.sleep(0.005)
+    return pred()
+
+
+def test_fast_answer_sends_no_hedge():
+    hc = _client(FakeCompletions({"action": "ENTRY"}))
+    data, errs, timeouts, attempts, err = _call(hc)
+    assert data["action"] == "ENTRY"
+    assert data["_openai_response_id"] == "resp-1"
+    assert (errs, timeouts, attempts, err) == ({}, 0, 1, None)
+    st = hc.stats()
+    assert (st["calls"], st["requests"], st["hedges"], st["abandoned"]) == (1, 1, 0, 0)
+
+
+def test_hedge_wins_and_loser_is_abandoned():
+    gate = threading.Event()
+    fake = FakeCompletions(gate, {"action": "HEDGED"})
+    hc = _client(fake)
+    try:
+        data, errs, timeouts, attempts, err = _call(hc)
+        assert data["action"] == "HEDGED"
+        assert (errs, timeouts, attempts, err) == ({}, 0, 2, None)
+        st = hc.stats()
+        assert (st["requests"], st["hedges"], st["hedge_wins"]) == (2, 1, 1)
+        assert st["abandoned"] == 1
+        assert st["abandoned_inflight"] == 1
+    finally:
+        gate.set()
+    # The abandoned request is tracked until it actually finishes.
+    assert _wait_for(lambda: hc.stats()["abandoned_inflight"] == 0)
+
+
+def test_hedge_delay_follows_observed_quantile():
+    hc = _client(FakeCompletions(), hedge_min_samples=5, hedge_quantile=0.9)
+    assert hc.hedge_delay_sec("entry") == 0.05  # hedge_default_sec until enough samples
+    for ms in (100, 200, 300, 400, 1000):
+        hc.latency.record_result("entry", {"ok": True}, ms)
+    assert hc.hedge_delay_sec("entry") == 0.4
+    hc = _client(FakeCompletions(), hedge_min_samples=1, hedge_min_sec=0.5)
+    hc.latency.record_result("entry", {"ok": True}, 10)
+    assert hc.hedge_delay_sec("entry") == 0.5  # floored at hedge_min_sec
+
+
+def test_deadline_returns_timeout_and_abandons_pending():
+    gate = threading.Event()
+    hc = _client(FakeCompletions(gate), hedge_enabled=False)
+    try:
+        t0 = time.monotonic()
+        data, errs, timeouts, attempts, err = _call(hc, deadline_sec=0.2, retry_count=3, retry_wait_sec=0.0)
+        elapsed = time.monotonic() - t0
+        assert data is None
+        assert isinstance(err, TimeoutError)
+        assert (timeouts, attempts) == (1, 1)
+        assert elapsed < 1.0
+        st = hc.stats()
+        assert (st["deadline_exceeded"], st["abandoned"], st["hedges"]) == (1, 1, 0)
+    finally:
+        gate.set()
+
+
+def test_request_timeout_is_capped_by_remaining_deadline():
+    fake = FakeCompletions({"ok": True})
+    hc = _client(fake, hedge_enabled=False)
+    _call(hc, deadline_sec=0.5, timeout_sec=30.0)
+    assert 0.05 <= fake.calls[0]["timeout"] <= 0.5
+
+
+def test_errors_are_counted_and_retried():
+    fake = FakeCompletions(ValueError("bad"), TimeoutError("slow"), {"action": "OK"})
+    hc = _client(fake, hedge_enabled=False)
+    data, errs, timeouts, attempts, err = _call(hc, retry_count=3)
+    assert data["action"] == "OK"
+    assert errs == {"ValueError": 1, "TimeoutError": 1}
+    assert (timeouts, attempts, err) == (1, 3, None)
+
+    fake = FakeCompletions(ValueError("bad"), ValueError("worse"))
+    hc = _client(fake, hedge_enabled=False)
+    data, errs, timeouts, attempts, err = _call(hc, retry_count=2)
+    assert data is None
+    assert errs == {"ValueError": 2}
+    assert attempts == 2
+    assert str(err) == "worse"
+    assert hc.latency.stats()["entry"]["failures"] == 2
+
+
+def test_no_hedge_while_abandoned_requests_are_at_the_cap():
+    gates = [threading.Event() for _ in range(3)]
+    fake = FakeCompletions(gates[0], {"first": True}, gates[1], gates[2])
+    hc = _client(fake, max_abandoned=1)
+    try:
+        data = _call(hc)[0]
+        assert data["first"] is True
+        assert hc.stats()["abandoned_inflight"] == 1
+        # The cap is reached: the next slow request is not hedged and runs into the deadline.
+        data, _errs, _timeouts, attempts, err = _call(hc, deadline_sec=0.3)
+        assert data is None and isinstance(err, TimeoutError)
+        assert attempts == 1
+        st = hc.stats()
+        assert st["hedges"] == 1
+        assert st["hedges_skipped_abandoned"] == 1
+        assert st["max_abandoned"] == 1
+    finally:
+        for g in gates:
+            g.set()
+
+
+def test_no_client_makes_no_call():
+    hc = HedgedAIClient(client=None, model="m")
+    assert hc.call_json("p", kind="entry", deadline_sec=1.0, timeout_sec=1.0, retry_count=2, retry_wait_sec=0.0) == (
+        None,
+        {},
+        0,
+        0,
+        None,
+    )
+    assert hc.stats()["calls"] == 0
@@ -0,0 +1,118 @@
+# CircuitBreakers.allow() / record() の状態遷移（closed -> open -> half_open プローブ -> closed/open）。
+# モジュールの time を差し替えた手動クロックで open_sec / window_sec を進める。
+#   python -m pytest -q test/test_circuit_breaker.py
+import os
+import sys
+import time
+from types import SimpleNamespace as NS
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import fxai_ai_client as ai  # noqa: E402
+
+
+class Clock:
+    def __init__(self):
+        self.t = 1000.0
+
+    def monotonic(self):
+        return self.t
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    c = Clock()
+    monkeypatch.setattr(ai, "time", NS(monotonic=c.monotonic, time=time.time, perf_counter=time.perf_counter))
+    return c
+
+
+def _breakers(**kw):
+    opts = dict(failure_rate=0.5, min_calls=4, window_sec=60.0, open_sec=30.0, half_open_probes=1)
+    opts.update(kw)
+    return ai.CircuitBreakers(**opts)
+
+
+def _trip(cb, kind="entry"):
+    for ok in (True, False, False, False):
+        cb.record(kind, ok)
+    assert cb.state(kind) == "open"
+
+
+def test_opens_at_failure_rate_once_min_calls_seen(clock):
+    cb = _breakers()
+    for _ in range(3):
+        cb.record("entry", False)
+    assert cb.state("entry") == "closed"  # below min_calls
+    cb.record("entry", True)
+    assert cb.state("entry") == "open"  # 3/4 failures
+    assert cb.allow("entry") == (False, False)
+    st = cb.stats()["entry"]
+    assert (st["opens"], st["rejected"]) == (1, 1)
+    assert cb.state("exit") == "closed"  # kinds are independent
+    assert cb.allow("exit") == (True, False)
+
+
+def test_old_outcomes_leave_the_window(clock):
+    cb = _breakers()
+    for _ in range(3):
+        cb.record("entry", False)
+    clock.t += 61
+    cb.record("entry", False)
+    assert cb.state("entry") == "closed"  # the three old failures expired
+    assert cb.stats()["entry"]["window_calls"] == 1
+
+
+def test_half_open_admits_one_probe_and_success_closes(clock):
+    cb = _breakers()
+    _trip(cb)
+    clock.t += 29.9
+    assert cb.allow("entry") == (False, False)
+    clock.t += 0.1
+    assert cb.state("entry") == "half_open"
+    assert cb.allow("entry") == (True, True)
+    assert cb.allow("entry") == (False, False)  # only half_open_probes in flight
+    cb.record("entry", True, probe=True)
+    assert cb.state("entry") == "closed"
+    assert cb.allow("entry") == (True, False)
+    assert cb.stats()["entry"]["window_calls"] == 0  # closing clears old outcomes
+
+
+def test_probe_failure_reopens(clock):
+    cb = _breakers()
+    _trip(cb)
+    clock.t += 30
+    assert cb.allow("entry") == (True, True)
+    cb.record("entry", False, probe=True)
+    assert cb.state("entry") == "open"
+    assert cb.stats()["entry"]["opens"] == 2
+    assert cb.allow("entry") == (False, False)
+    clock.t += 30
+    assert cb.allow("entry") == (True, True)
+
+
+def test_half_open_ignores_late_non_probe_outcomes(clock):
+    cb = _breakers(half_open_probes=2)
+    _trip(cb)
+    clock.t += 30
+    assert cb.allow("entry") == (True, True)
+    # Calls admitted before the breaker opened report late: they neither close nor reopen it.
+    cb.record("entry", True)
+    cb.record("entry", False)
+    assert cb.stats()["entry"]["state"] == "half_open"
+    assert cb.allow("entry") == (True, True)
+    assert cb.allow("entry") == (False, False)
+    cb.record("entry", True, probe=True)
+    assert cb.state("entry") == "closed"
+
+
+def test_open_ignores_outcomes_and_keeps_timer(clock):
+    cb = _breakers()
+    _trip(cb)
+    clock.t += 20
+    cb.record("entry", True)
+    cb.record("entry", False)
+    assert cb.stats()["entry"]["open_remaining_sec"] == 10.0
+    clock.t += 10
+    assert cb.allow("entry") == (True, True)
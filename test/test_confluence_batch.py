@@ -0,0 +1,207 @@
+# NumPy バッチ合流エンジン (fxai_confluence_batch) とスカラー参照実装のパリティ。
+# ランダム合成ストリームに加え、signal_time の同着 / 同一バーの Strong・Normal Q / 反対側 bar_close キャンセル /
+# FVG・ゾーンタッチの重みを個別に確認する。速度比較は test/bench_confluence_batch.py。
+#   python -m pytest -q test/test_confluence_batch.py
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+pytest.importorskip("numpy")
+
+import fxai_confluence_batch as cb  # noqa: E402
+from fxai_signal_record import SignalRecord  # noqa: E402
+
+SYMBOL = "XAUUSD"
+BASE = 1_700_000_000.0
+CFG = dict(
+    confluence_window_sec=600,
+    signal_max_age_sec=1200,
+    zone_lookback_sec=1200,
+    zone_touch_lookback_sec=1200,
+    fvg_lookback_sec=1200,
+)
+WINDOW_SEC = 300.0
+
+KINDS = [
+    ("Zones", "structure", "new_zone_confirmed"),
+    ("Zones", "structure", "zone_retrace_touch"),
+    ("Zones", "structure", "zone_touch"),
+    ("FVG", "structure", "fvg_touch"),
+    ("Q-Trend", "entry_trigger", "trend_start"),
+    ("Q-Trend Strong", "entry_trigger", "trend_start"),
+    ("Q-Trend-Normal", "entry_trigger", ""),
+    ("OSGFC", "trend_filter", ""),
+    ("OSGFC", "entry_trigger", ""),
+    ("Lorentzian", "entry_trigger", "prediction"),
+    ("ZonesDetector", "structure", "zone_confirmed"),
+]
+
+
+def weight_confirmed(confirmed):
+    c = (confirmed or "").lower()
+    if c == "bar_close":
+        return 1.0
+    if c == "intrabar":
+        return 0.6
+    return 0.8
+
+
+def _rec(source, signal_type, event, side, signal_time, receive_time=None, *, confirmed="bar_close", strength="normal"):
+    return SignalRecord.from_normalized(
+        {
+            "symbol": SYMBOL,
+            "source": source,
+            "signal_type": signal_type,
+            "event": event,
+            "side": side,
+            "strength": strength,
+            "confirmed": confirmed,
+            "signal_time": signal_time,
+            "receive_time": signal_time if receive_time is None else receive_time,
+        }
+    )
+
+
+def _synthetic(n, seed):
+    rnd = random.Random(seed)
+    now = BASE
+    out = []
+    for _ in range(n):
+        now += rnd.choice([0, 1, 5, 30, 120, 400]) * rnd.random()
+        src, sig_type, evt = rnd.choice(KINDS)
+        st = rnd.choice([now, now - rnd.random() * 1500, now + rnd.random() * 30, None])
+        out.append(
+            SignalRecord.from_normalized(
+                {
+                    "symbol": SYMBOL,
+                    "source": src,
+                    "signal_type": sig_type,
+                    "event": evt,
+                    "side": rnd.choice(["buy", "sell", ""]),
+                    "strength": rnd.choice(["normal", "strong", None]),
+                    "confirmed": rnd.choice(["bar_close", "intrabar", None]),
+                    "signal_time": st,
+                    "receive_time": now,
+                }
+            )
+        )
+    return out
+
+
+def _assert_parity(records, nows, sides=None):
+    """Batch results must equal the scalar references at every anchor; returns the batch Q stats."""
+    sides = sides or ["buy"] * len(nows)
+    cols = cb.SignalColumns.from_records(records, SYMBOL)
+    batch_q = cb.qtrend_anchor_stats_batch(cols, nows, weight_confirmed=weight_confirmed, **CFG)
+    batch_w = cb.window_signals_batch(cols, nows, sides, window_sec=WINDOW_SEC)
+    for t, b in zip(nows, batch_q):
+        a = cb.scalar_qtrend_anchor_stats(records, t, symbol=SYMBOL, weight_confirmed=weight_confirmed, **CFG)
+        assert a == b, f"qtrend mismatch at t={t}:\nscalar={a}\nbatch ={b}"
+    for t, side, b in zip(nows, sides, batch_w):
+        a = cb.scalar_window_signals(records, t, side, symbol=SYMBOL, window_sec=WINDOW_SEC)
+        assert a == b, f"window mismatch at t={t}:\nscalar={a}\nbatch ={b}"
+    return batch_q
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_random_stream_parity(seed):
+    records = _synthetic(600, seed)
+    rnd = random.Random(seed)
+    t_lo = min(s.receive_ts() for s in records)
+    t_hi = max(s.receive_ts() for s in records)
+    nows = [rnd.uniform(t_lo, t_hi) for _ in range(150)]
+    # Exact receive times hit the freshness/arrival boundaries.
+    nows += [rnd.choice(records).receive_ts() for _ in range(50)]
+    sides = [rnd.choice(["buy", "sell", ""]) for _ in nows]
+    batch_q = _assert_parity(records, nows, sides)
+    assert any(x is not None for x in batch_q)
+
+
+def test_ties_on_signal_time():
+    t = BASE + 100
+    records = [
+        _rec("Q-Trend", "entry_trigger", "trend_start", "buy", t, t + 1),
+        _rec("Q-Trend", "entry_trigger", "trend_start", "sell", t, t + 2),
+        _rec("FVG", "structure", "fvg_touch", "buy", t, t + 3),
+        _rec("Zones", "structure", "zone_retrace_touch", "sell", t, t + 3),
+        _rec("OSGFC", "entry_trigger", "", "buy", t, t + 4),
+        _rec("OSGFC", "entry_trigger", "", "sell", t, t + 4),
+    ]
+    nows = [t + 1, t + 2, t + 3, t + 4, t + 60]
+    batch_q = _assert_parity(records, nows, ["buy", "sell", "", "buy", "sell"])
+    # Equal-time normals: the later arrival wins the anchor.
+    assert batch_q[0]["q_side"] == "buy"
+    assert batch_q[1]["q_side"] == "sell"
+
+
+def test_strong_and_normal_q_on_same_bar():
+    t = BASE + 100
+    normal_first = [
+        _rec("Q-Trend", "entry_trigger", "trend_start", "buy", t, t),
+        _rec("Q-Trend Strong", "entry_trigger", "trend_start", "sell", t, t + 1),
+    ]
+    strong_first = [
+        _rec("Q-Trend Strong", "entry_trigger", "trend_start", "sell", t, t),
+        _rec("Q-Trend-Normal", "entry_trigger", "", "buy", t, t + 1),
+    ]
+    for records in (normal_first, strong_first):
+        q = _assert_parity(records, [t + 1, t + 30])
+        # Strong outranks Normal at the same signal_time regardless of arrival order.
+        assert q[1]["q_side"] == "sell"
+        assert q[1]["q_trigger_type"] == "Strong"
+        assert q[1]["momentum_factor"] == 1.5
+
+    # A Strong on the same side later in the window upgrades a Normal anchor.
+    records = [
+        _rec("Q-Trend", "entry_trigger", "trend_start", "buy", t),
+        _rec("Q-Trend Strong", "entry_trigger", "trend_start", "buy", t - 10, t + 5),
+    ]
+    q = _assert_parity(records, [t + 1, t + 10])
+    assert q[0]["q_trigger_type"] == "Normal"
+    assert q[1]["q_source"] == "Q-Trend"
+    assert q[1]["q_trigger_type"] == "Strong"
+
+
+def test_opposite_bar_close_cancels():
+    t = BASE + 100
+    records = [
+        _rec("Q-Trend", "entry_trigger", "trend_start", "buy", t),
+        # Before the anchor: never cancels.
+        _rec("Zones", "structure", "new_zone_confirmed", "sell", t - 5, t + 1),
+        # Intrabar opposite: no cancel.
+        _rec("OSGFC", "entry_trigger", "", "sell", t + 10, confirmed="intrabar"),
+        # Trend filter: not a cancelling signal type.
+        _rec("OSGFC", "trend_filter", "", "sell", t + 20),
+        # First qualifying opposite bar_close cancels; the second must not overwrite the detail.
+        _rec("FVG", "structure", "fvg_touch", "sell", t + 30),
+        _rec("OSGFC", "entry_trigger", "", "sell", t + 40),
+    ]
+    nows = [t + 2, t + 11, t + 21, t + 31, t + 41]
+    q = _assert_parity(records, nows)
+    assert [x["cancel_due_to_opposite_bar_close"] for x in q] == [False, False, False, True, True]
+    assert q[-1]["cancel_detail"]["source"] == "FVG"
+    assert q[-1]["cancel_detail"]["signal_time"] == t + 30
+
+
+def test_fvg_and_zone_touch_weights():
+    t = BASE + 100
+    records = [
+        _rec("Q-Trend", "entry_trigger", "trend_start", "buy", t),
+        _rec("FVG", "structure", "fvg_touch", "buy", t + 1),
+        _rec("Zones", "structure", "zone_retrace_touch", "buy", t + 2, confirmed="intrabar"),
+        _rec("Zones", "structure", "zone_touch", "sell", t + 3, confirmed="intrabar"),
+        _rec("LuxAlgo_FVG", "structure", "fvg_touch", "sell", t + 4, confirmed=None),
+        _rec("Zones", "structure", "new_zone_confirmed", "buy", t + 5),
+    ]
+    q = _assert_parity(records, [t + 10])[0]
+    # Touch events count at 0.7 of their confirmation weight; the zone confirmation counts in full.
+    assert q["weighted_confirm_score"] == round(1.0 * 0.7 + 0.6 * 0.7 + 1.0, 3)
+    assert q["weighted_oppose_score"] == round(0.6 * 0.7 + 0.8 * 0.7, 3)
+    assert q["fvg_touch_same"] == 1
+    assert q["zones_touch_same"] == 1
+    assert q["zones_touch_opp"] == 0
+    assert q["zones_confirmed_after_q"] == 1
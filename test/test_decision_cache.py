@@ -0,0 +1,111 @@
+# DecisionCache の TTL / LRU 追い出しと、エントリー指紋 (entry_fingerprint) の量子化。
+#   python -m pytest -q test/test_decision_cache.py
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from fxai_decision_cache import DecisionCache, SpeculativeSlots, entry_fingerprint  # noqa: E402
+
+T0 = 1_760_000_000.0
+
+
+def test_hit_within_ttl_and_expiry_after():
+    c = DecisionCache(ttl_sec=60)
+    c.put("k", {"action": "ENTRY", "_ai_latency_ms": 1200}, now=T0)
+    decision, age = c.get("k", now=T0 + 30)
+    assert decision["action"] == "ENTRY"
+    assert age == 30
+    assert c.get("k", now=T0 + 60) is not None  # the TTL boundary is inclusive
+    assert c.get("k", now=T0 + 60.5) is None
+    assert c.get("k", now=T0 + 1) is None  # an expired entry is dropped on read
+    st = c.stats()
+    assert (st["hits"], st["misses"], st["expired"], st["size"]) == (2, 2, 1, 0)
+    assert st["saved_ms"] == 2400
+    assert st["saved_calls"] == 2
+    assert st["hit_rate"] == 0.5
+
+
+def test_zero_ttl_only_hits_at_the_same_instant():
+    c = DecisionCache(ttl_sec=0)
+    c.put("k", {"action": "SKIP"}, now=T0)
+    assert c.get("k", now=T0) is not None
+    assert c.get("k", now=T0 + 0.001) is None
+
+
+def test_lru_evicts_least_recently_used():
+    c = DecisionCache(ttl_sec=600, max_entries=2)
+    c.put("a", {"v": 1}, now=T0)
+    c.put("b", {"v": 2}, now=T0)
+    assert c.get("a", now=T0 + 1) is not None  # a becomes most recent
+    c.put("c", {"v": 3}, now=T0 + 2)
+    assert c.get("b", now=T0 + 3) is None
+    assert c.get("a", now=T0 + 3)[0] == {"v": 1}
+    assert c.get("c", now=T0 + 3)[0] == {"v": 3}
+    st = c.stats()
+    assert (st["evictions"], st["size"], st["max_entries"]) == (1, 2, 2)
+
+
+def test_put_refreshes_timestamp_and_recency():
+    c = DecisionCache(ttl_sec=10, max_entries=2)
+    c.put("a", {"v": 1}, now=T0)
+    c.put("b", {"v": 2}, now=T0)
+    c.put("a", {"v": 11}, now=T0 + 8)
+    c.put("c", {"v": 3}, now=T0 + 8)
+    assert c.get("b", now=T0 + 9) is None
+    decision, age = c.get("a", now=T0 + 15)
+    assert decision == {"v": 11} and age == 7
+
+
+def test_stored_and_returned_decisions_are_copies():
+    c = DecisionCache(ttl_sec=60)
+    src = {"action": "ENTRY"}
+    c.put("k", src, now=T0)
+    src["action"] = "SKIP"
+    got, _ = c.get("k", now=T0)
+    got["action"] = "CLOSE"
+    assert c.get("k", now=T0)[0]["action"] == "ENTRY"
+
+
+def test_clear_empties_cache():
+    c = DecisionCache(ttl_sec=60)
+    c.put("k", {}, now=T0)
+    c.clear()
+    assert c.get("k", now=T0) is None
+    assert c.stats()["size"] == 0
+
+
+def _payload(**market):
+    mkt = {"atr_points_approx": 300.0, "spread_points": 20.0, "atr_to_spread_approx": 15.0, "m15_trend": "up"}
+    mkt.update(market)
+    return {
+        "symbol": "XAUUSD",
+        "proposed_action": "BUY",
+        "trigger": {"source": "Q-Trend", "signal_type": "entry_trigger"},
+        "market": mkt,
+        "price_drift": {"drift_points": 10.0},
+        "signals_window": {"counts": {"sell": 1, "buy": 2}},
+    }
+
+
+def test_fingerprint_buckets_nearby_market_values():
+    base = entry_fingerprint(_payload())
+    assert entry_fingerprint(_payload(spread_points=20.5, atr_points_approx=305.0)) == base
+    assert entry_fingerprint(_payload(spread_points=40.0)) != base
+    assert entry_fingerprint(_payload(m15_trend="down")) != base
+    p = _payload()
+    p["signals_window"]["counts"] = {"buy": 2, "sell": 1}  # key order does not matter
+    assert entry_fingerprint(p) == base
+
+
+def test_speculative_slot_take_requires_matching_fingerprint():
+    slots = SpeculativeSlots()
+    fut = slots.begin("xauusd", "fp1")
+    assert fut is not None
+    assert slots.begin("XAUUSD", "fp1") is None  # deduped
+    assert slots.take("XAUUSD", "fp2", max_age_sec=60) is None
+    assert slots.take("XAUUSD", "fp1", max_age_sec=60) is None  # take() pops the slot
+    fut = slots.begin("XAUUSD", "fp1")
+    assert slots.take("XAUUSD", "fp1", max_age_sec=60) is fut
+    st = slots.stats()
+    assert (st["started"], st["deduped"], st["misses"], st["no_slot"], st["hits"]) == (2, 1, 1, 1, 1)
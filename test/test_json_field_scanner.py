@@ -0,0 +1,117 @@
+# JSONFieldScanner: エスケープ / ネスト値 / ```json フェンス付き出力と、任意位置でのチャンク分割。
+#   python -m pytest -q test/test_json_field_scanner.py
+import json
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from fxai_ai_client import JSONFieldScanner  # noqa: E402
+
+
+def _scan(*chunks):
+    sc = JSONFieldScanner()
+    for c in chunks:
+        sc.feed(c)
+    return sc.fields
+
+
+def _scalars(obj):
+    return {k: v for k, v in obj.items() if not isinstance(v, (dict, list))}
+
+
+def _all_splits(text):
+    """Fields after feeding text whole, char by char and split at every position."""
+    yield _scan(text)
+    yield _scan(*text)
+    for i in range(len(text) + 1):
+        yield _scan(text[:i], text[i:])
+
+
+def test_scalars_of_every_type():
+    text = '{"action": "ENTRY", "score": 72, "ratio": -1.5e-2, "ok": true, "skip": false, "note": null}'
+    for fields in _all_splits(text):
+        assert fields == json.loads(text)
+
+
+def test_escapes_in_keys_and_values():
+    obj = {
+        "reason": 'quote " backslash \\ slash / tab\t nl\n',
+        "uni": "café ☃ 😀",
+        'k"ey\\': "v",
+        "brace": "{not nested} [nor this], \"x\": 1",
+    }
+    for text in (json.dumps(obj), json.dumps(obj, ensure_ascii=False)):
+        for fields in _all_splits(text):
+            assert fields == obj
+
+
+def test_nested_values_are_skipped():
+    obj = {
+        "a": 1,
+        "ctx": {"score": 99, "inner": {"action": "CLOSE"}, "list": [1, {"x": "}"}]},
+        "tags": ["x", "y", {"z": 3}],
+        "empty": {},
+        "b": "after",
+    }
+    for fields in _all_splits(json.dumps(obj)):
+        assert fields == {"a": 1, "b": "after"}
+
+
+def test_incomplete_values_are_not_reported():
+    sc = JSONFieldScanner()
+    sc.feed('{"action": "EN')
+    assert sc.fields == {}
+    sc.feed('TRY", "score": 7')
+    assert sc.fields == {"action": "ENTRY"}  # 7 may still grow
+    sc.feed("2")
+    assert "score" not in sc.fields
+    sc.feed("}")
+    assert sc.fields == {"action": "ENTRY", "score": 72}
+
+
+@pytest.mark.parametrize(
+    "wrap",
+    [
+        "```json\n{body}\n```",
+        "```\n{body}\n```",
+        "Here is the decision:\n```json\n{body}\n```\nDone.",
+        "  \n{body}",
+    ],
+)
+def test_fenced_output(wrap):
+    body = json.dumps({"action": "SKIP", "score": 10, "why": "```json inside```"})
+    text = wrap.replace("{body}", body)
+    for fields in _all_splits(text):
+        assert fields == {"action": "SKIP", "score": 10, "why": "```json inside```"}
+
+
+def test_random_objects_match_json_loads():
+    rnd = random.Random(3)
+
+    def value(depth):
+        r = rnd.random()
+        if depth < 2 and r < 0.15:
+            return {f"n{i}": value(depth + 1) for i in range(rnd.randint(0, 3))}
+        if depth < 2 and r < 0.3:
+            return [value(depth + 1) for _ in range(rnd.randint(0, 3))]
+        return rnd.choice(
+            [
+                rnd.randint(-1000, 1000),
+                rnd.uniform(-1e6, 1e6),
+                True,
+                False,
+                None,
+                "".join(rnd.choice('ab"\\/{}[],: \né') for _ in range(rnd.randint(0, 8))),
+            ]
+        )
+
+    for _ in range(200):
+        obj = {f"k{i}": value(0) for i in range(rnd.randint(1, 6))}
+        text = json.dumps(obj, indent=rnd.choice([None, 1]), ensure_ascii=rnd.random() < 0.5)
+        cuts = sorted(rnd.sample(range(len(text) + 1), min(4, len(text) + 1)))
+        chunks = [text[a:b] for a, b in zip([0] + cuts, cuts + [len(text)])]
+        assert _scan(*chunks) == _scalars(obj)
@@ -0,0 +1,112 @@
+# PrefilterModel の to_dict() / from_dict() ラウンドトリップ（JSON ファイル経由を含む）と不正モデルの拒否。
+#   python -m pytest -q test/test_prefilter.py
+import json
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import fxai_prefilter as pf  # noqa: E402
+
+N = len(pf.FEATURE_NAMES)
+
+
+def _model(**kw):
+    rnd = random.Random(7)
+    opts = dict(
+        features=pf.FEATURE_NAMES,
+        mean=[rnd.uniform(-1, 1) for _ in range(N)],
+        scale=[rnd.uniform(0.1, 2.0) for _ in range(N)],
+        weights=[rnd.uniform(-3, 3) for _ in range(N)],
+        bias=-0.25,
+        skip_prob=0.87,
+        meta={"examples": 120, "skip_cut": {"precision": 0.96, "coverage": 0.2, "support": 24}},
+    )
+    opts.update(kw)
+    return pf.PrefilterModel(**opts)
+
+
+def _example(seed):
+    rnd = random.Random(seed)
+    return {
+        "ts": 1_760_000_000 + rnd.randint(0, 86400),
+        "action": rnd.choice(["buy", "sell"]),
+        "trigger": {"side": rnd.choice(["buy", "sell"]), "source": rnd.choice(["Q-Trend", "Zones", "Lorentzian"])},
+        "qtrend": {"side": rnd.choice(["buy", "sell", ""]), "strength": rnd.choice(["strong", "normal"])},
+        "window_counts": {"aligned": rnd.randint(0, 5), "opposed": rnd.randint(0, 5), "neutral": rnd.randint(0, 3)},
+        "spread_points": rnd.uniform(5, 60),
+        "atr_to_spread": rnd.choice([None, rnd.uniform(2, 40)]),
+        "atr_points": rnd.uniform(100, 800),
+        "drift_points": rnd.choice([None, rnd.uniform(-200, 200)]),
+        "zones_confirmed_recent": rnd.randint(0, 7),
+        "attempt_context": rnd.choice(["", "DE:1", "LR_RETRIG"]),
+        "ai_score": rnd.randint(0, 100),
+        "min_required": 60,
+    }
+
+
+def _json_round_trip(model):
+    return pf.PrefilterModel.from_dict(json.loads(json.dumps(model.to_dict())))
+
+
+def test_round_trip_preserves_model_and_predictions():
+    m = _model()
+    back = _json_round_trip(m)
+    assert back.to_dict() == m.to_dict()
+    assert back.to_dict()["format"] == pf.MODEL_FORMAT
+    for seed in range(50):
+        ex = _example(seed)
+        assert back.predict(ex) == m.predict(ex)
+
+
+def test_round_trip_keeps_edge_values():
+    # skip_prob 0.0 (always skip) and 1.01 (never skip) must survive; zero scale is normalized once.
+    for skip_prob in (0.0, 1.01):
+        m = _model(skip_prob=skip_prob, bias=0.0, scale=[0.0] * N, meta=None)
+        back = _json_round_trip(m)
+        assert back.skip_prob == skip_prob
+        assert back.bias == 0.0
+        assert back.scale == [1.0] * N
+        assert back.meta == {}
+
+
+def test_missing_skip_prob_defaults_to_never_skip():
+    d = _model().to_dict()
+    del d["skip_prob"]
+    assert pf.PrefilterModel.from_dict(d).skip_prob == 1.0
+
+
+def test_load_and_entry_prefilter_from_file(tmp_path):
+    m = _model()
+    path = tmp_path / "prefilter_model.json"
+    path.write_text(json.dumps(m.to_dict()), encoding="utf-8")
+    assert pf.PrefilterModel.load(str(path)).to_dict() == m.to_dict()
+    gate = pf.EntryPrefilter.from_file(str(path), mode="enforce")
+    assert gate.skip_prob == m.skip_prob
+    p, reject = gate.check(_example(1))
+    assert p == m.predict(_example(1))
+    assert reject == (p >= m.skip_prob)
+
+
+def test_from_dict_rejects_bad_models():
+    d = _model().to_dict()
+    with pytest.raises(ValueError):
+        pf.PrefilterModel.from_dict(dict(d, format="fxai-prefilter/0"))
+    with pytest.raises(ValueError):
+        pf.PrefilterModel.from_dict(None)
+    with pytest.raises(ValueError):
+        pf.PrefilterModel.from_dict(dict(d, features=list(reversed(d["features"]))))
+    with pytest.raises(ValueError):
+        pf.PrefilterModel.from_dict(dict(d, weights=d["weights"][:-1]))
+
+
+def test_trained_model_round_trips():
+    pytest.importorskip("numpy")
+    examples = [_example(seed) for seed in range(80)]
+    m = pf.train(examples, epochs=200)
+    back = _json_round_trip(m)
+    assert back.to_dict() == m.to_dict()
+    assert pf.evaluate(back, examples) == pf.evaluate(m, examples)
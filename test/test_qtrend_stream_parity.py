@@ -0,0 +1,108 @@
+# QTrendStream (インクリメンタル集計) と compute_qtrend_anchor_stats (全走査) のパリティ。
+# ジッター付き到着 / 順序逆転、Q-Trend の再アンカー (Normal/Strong・売買反転)、リテンション切れを含む合成ストリームを replay_parity に流す。
+#   python -m pytest -q test/test_qtrend_stream_parity.py
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import fxai_qtrend as _fxai_qtrend  # noqa: E402
+import fxai_qtrend_stream as qs  # noqa: E402
+from fxai_signal_record import SignalRecord  # noqa: E402
+
+SYMBOLS = ("XAUUSD", "EURUSD")
+KINDS = [
+    ("Zones", "structure", "new_zone_confirmed"),
+    ("Zones", "structure", "zone_retrace_touch"),
+    ("Zones", "structure", "zone_touch"),
+    ("FVG", "structure", "fvg_touch"),
+    ("LuxAlgo_FVG", "structure", "fvg_touch"),
+    ("ZonesDetector", "structure", "zone_confirmed"),
+    ("OSGFC", "trend_filter", ""),
+    ("OSGFC", "entry_trigger", ""),
+    ("Lorentzian", "entry_trigger", "prediction"),
+]
+Q_KINDS = [
+    ("Q-Trend", "entry_trigger", "trend_start"),
+    ("Q-Trend Strong", "entry_trigger", "trend_start"),
+    ("Q-Trend-Normal", "entry_trigger", ""),
+    ("Q-Trend-Strong", "entry_trigger", ""),
+]
+# Short lookbacks so signals expire (and anchors fall out) within each replay.
+CFG = dict(
+    confluence_window_sec=300,
+    signal_max_age_sec=600,
+    signal_lookback_sec=600,
+    zone_lookback_sec=900,
+    zone_touch_lookback_sec=450,
+    fvg_lookback_sec=500,
+)
+
+
+def _stream(n, seed):
+    rnd = random.Random(seed)
+    now = 1_700_000_000.0
+    out = []
+    for _ in range(n):
+        now += rnd.choice([0, 0.5, 3, 20, 90, 400]) * rnd.random()
+        q = rnd.random() < 0.2
+        src, sig_type, evt = rnd.choice(Q_KINDS if q else KINDS)
+        # Jittered arrival: signal_time usually a little before receipt, sometimes far back,
+        # slightly ahead (clock skew) or missing (falls back to receive_time).
+        st = rnd.choice([now - rnd.random() * 5, now - rnd.random() * 5, now - rnd.random() * 700, now + rnd.random() * 20, None])
+        out.append(
+            SignalRecord.from_normalized(
+                {
+                    "symbol": rnd.choice(SYMBOLS),
+                    "source": src,
+                    "signal_type": sig_type,
+                    "event": evt,
+                    "side": rnd.choice(["buy", "sell", "buy", "sell", ""]),
+                    "strength": rnd.choice(["normal", "strong", None]),
+                    "confirmed": rnd.choice(["bar_close", "intrabar", None]),
+                    "signal_time": st,
+                    "receive_time": now,
+                }
+            )
+        )
+    return out
+
+
+@pytest.mark.parametrize("seed", range(6))
+def test_replay_parity_on_jittered_stream(seed):
+    counts = qs.replay_parity(
+        _stream(250, seed), weight_confirmed=qs._weight_confirmed_default, step_sec=60.0, **CFG
+    )
+    assert counts["signals"] > 0
+    assert counts["anchored"] > 0
+
+
+def test_replay_parity_same_bar_normal_and_strong_q():
+    base = 1_700_000_000.0
+    raws = [
+        {"source": "Zones", "signal_type": "structure", "event": "new_zone_confirmed", "side": "buy", "signal_time": base - 30},
+        {"source": "Q-Trend", "signal_type": "entry_trigger", "event": "trend_start", "side": "buy", "signal_time": base},
+        {"source": "Q-Trend Strong", "signal_type": "entry_trigger", "event": "trend_start", "side": "buy", "signal_time": base},
+        {"source": "FVG", "signal_type": "structure", "event": "fvg_touch", "side": "sell", "signal_time": base + 10},
+        # Re-anchor to the opposite side, then let everything expire.
+        {"source": "Q-Trend", "signal_type": "entry_trigger", "event": "trend_start", "side": "sell", "signal_time": base + 200},
+        {"source": "OSGFC", "signal_type": "trend_filter", "event": "", "side": "sell", "signal_time": base + 2000},
+    ]
+    records = []
+    for i, raw in enumerate(raws):
+        raw = dict(raw, symbol="XAUUSD", confirmed="bar_close", strength="normal", receive_time=raw["signal_time"] + 1 + i)
+        records.append(SignalRecord.from_normalized(raw))
+    counts = qs.replay_parity(records, weight_confirmed=qs._weight_confirmed_default, step_sec=30.0, **CFG)
+    assert counts["anchored"] > 0
+
+
+def test_stream_constants_match_scalar_source():
+    # fxai_qtrend_stream hand-copies these sets from compute_qtrend_anchor_stats.
+    import inspect
+
+    src = inspect.getsource(_fxai_qtrend.compute_qtrend_anchor_stats)
+    for name in sorted(qs._Q_SOURCES | qs._ALLOWED_EVIDENCE_SOURCES | qs._TOUCH_EVENTS):
+        assert f'"{name}"' in src, name
@@ -0,0 +1,145 @@
+# Scheduler: キーごとのバージョン管理（再スケジュールで古い期限を無効化 / cancel / 再登録）と専用プール。
+#   python -m pytest -q test/test_scheduler.py
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from fxai_scheduler import Scheduler  # noqa: E402
+
+
+def _wait_for(pred, timeout=2.0):
+    end = time.monotonic() + timeout
+    while time.monotonic() < end:
+        if pred():
+            return True
+        time.sleep(0.005)
+    return pred()
+
+
+def _recorder():
+    runs = []
+    lock = threading.Lock()
+
+    def make(tag):
+        def fn():
+            with lock:
+                runs.append(tag)
+
+        return fn
+
+    return runs, make
+
+
+def test_fires_once_after_delay():
+    s = Scheduler(max_workers=2)
+    runs, make = _recorder()
+    t0 = time.monotonic()
+    s.schedule_in("k", 0.05, make("a"))
+    assert s.stats()["pending"] == 1
+    assert _wait_for(lambda: runs == ["a"])
+    assert time.monotonic() - t0 >= 0.05
+    time.sleep(0.05)
+    assert runs == ["a"]
+    st = s.stats()
+    assert st["pending"] == 0
+    assert st["types"]["task"]["fired"] == 1
+    assert st["types"]["task"]["scheduled"] == 1
+
+
+def test_reschedule_replaces_pending_deadline_and_callback():
+    s = Scheduler()
+    runs, make = _recorder()
+    s.schedule_in("k", 0.03, make("old"), task_type="entry")
+    s.schedule_in("k", 0.08, make("new"), task_type="entry")
+    time.sleep(0.05)
+    assert runs == []  # the superseded earlier entry was skipped
+    assert _wait_for(lambda: runs == ["new"])
+    time.sleep(0.03)
+    assert runs == ["new"]
+    st = s.stats()["types"]["entry"]
+    assert (st["scheduled"], st["rescheduled"], st["fired"]) == (1, 1, 1)
+    assert _wait_for(lambda: s.stats()["heap_size"] == 0)
+
+
+def test_reschedule_earlier_wakes_the_timer():
+    s = Scheduler()
+    runs, make = _recorder()
+    s.schedule_in("k", 30.0, make("late"))
+    time.sleep(0.02)  # the timer thread is now sleeping until the 30 s deadline
+    t0 = time.monotonic()
+    s.schedule_in("k", 0.01, make("early"))
+    assert _wait_for(lambda: runs == ["early"], timeout=1.0)
+    assert time.monotonic() - t0 < 1.0
+    assert s.due_at("k") is None
+
+
+def test_cancel_drops_deadline_and_reschedule_after_cancel_runs():
+    s = Scheduler()
+    runs, make = _recorder()
+    s.schedule_in("k", 0.03, make("cancelled"))
+    assert s.due_at("k") is not None
+    assert s.cancel("k") is True
+    assert s.cancel("k") is False
+    assert s.due_at("k") is None
+    time.sleep(0.06)
+    assert runs == []
+    s.schedule_in("k", 0.01, make("again"))
+    assert _wait_for(lambda: runs == ["again"])
+    st = s.stats()["types"]["task"]
+    # After a cancel the next schedule counts as a fresh one, not a reschedule.
+    assert (st["scheduled"], st["rescheduled"], st["cancelled"], st["fired"]) == (2, 0, 1, 1)
+    assert s.cancel("k") is False  # already fired
+
+
+def test_keys_are_independent():
+    s = Scheduler()
+    runs, make = _recorder()
+    s.schedule_in("a", 0.02, make("a"))
+    s.schedule_in("b", 0.04, make("b"))
+    s.schedule_in("a", 0.06, make("a2"))
+    s.cancel("b")
+    assert _wait_for(lambda: runs == ["a2"])
+    time.sleep(0.03)
+    assert runs == ["a2"]
+
+
+def test_due_at_is_epoch_time():
+    s = Scheduler()
+    due = time.time() + 5.0
+    s.schedule("k", due, lambda: None)
+    assert abs(s.due_at("k") - due) < 0.05
+    assert 4.5 < s.stats()["next_due_in_sec"] <= 5.0
+    s.cancel("k")
+
+
+def test_dedicated_type_is_not_blocked_by_busy_shared_pool():
+    s = Scheduler(max_workers=1, dedicated_types=["exit"])
+    gate = threading.Event()
+    runs, make = _recorder()
+    s.schedule_in("slow", 0.0, lambda: gate.wait(5.0), task_type="ai")
+    assert _wait_for(lambda: s.stats()["busy"] == 1)
+    s.schedule_in("shared", 0.0, make("shared"), task_type="ai")
+    s.schedule_in("exit", 0.0, make("exit"), task_type="exit")
+    try:
+        assert _wait_for(lambda: runs == ["exit"])
+    finally:
+        gate.set()
+    assert _wait_for(lambda: runs == ["exit", "shared"])
+    assert s.stats()["dedicated_types"] == ["exit"]
+
+
+def test_callback_error_is_counted_and_timer_keeps_running():
+    s = Scheduler()
+    runs, make = _recorder()
+
+    def boom():
+        raise RuntimeError("boom")
+
+    s.schedule_in("bad", 0.0, boom, task_type="t")
+    assert _wait_for(lambda: s.stats()["types"]["t"]["errors"] == 1)
+    s.schedule_in("good", 0.0, make("ok"), task_type="t")
+    assert _wait_for(lambda: runs == ["ok"])
+    assert s.stats()["types"]["t"]["fired"] == 2
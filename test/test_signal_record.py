@@ -0,0 +1,55 @@
+# SignalRecord の永続化ラウンドトリップ (to_dict -> from_normalized) でゾーン情報が失われないこと。
+#   python -m pytest -q test/test_signal_record.py
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from fxai_signal_record import SignalRecord  # noqa: E402
+
+
+def _zone_signal(**zone_fields):
+    s = {
+        "symbol": "GOLD",
+        "source": "Zones",
+        "side": "buy",
+        "tf": "5",
+        "price": "2010.0",
+        "strength": "normal",
+        "signal_type": "structure",
+        "event": "new_zone_confirmed",
+        "confirmed": "bar_close",
+        "time": "2026-10-16T00:00:00Z",
+        "receive_time": 1760000000.0,
+        "signal_time": 1760000000.0,
+    }
+    s.update(zone_fields)
+    return s
+
+
+def _round_trip(rec):
+    return SignalRecord.from_normalized(rec.to_dict())
+
+
+def test_zone_low_high_survive_round_trip():
+    rec = SignalRecord.from_normalized(_zone_signal(zone_low=2000.0, zone_high=2002.0))
+    assert rec.zone_level == 2001.0
+    back = _round_trip(rec)
+    assert back.zone_level == rec.zone_level
+    assert back.to_dict()["zone_low"] == 2000.0
+    assert back.to_dict()["zone_high"] == 2002.0
+
+
+def test_top_bottom_and_zone_price_survive_round_trip():
+    rec = SignalRecord.from_normalized(_zone_signal(top=2004.0, bottom=2000.0))
+    assert rec.zone_level == 2002.0
+    assert _round_trip(rec).zone_level == 2002.0
+
+    rec = SignalRecord.from_normalized(_zone_signal(zone_price=2001.5))
+    assert rec.zone_level == 2001.5
+    assert _round_trip(rec).zone_level == 2001.5
+
+
+def test_round_trip_keeps_record_equal():
+    rec = SignalRecord.from_normalized(_zone_signal(zone_low=2000.0, zone_high=2002.0, comment="x"))
+    assert _round_trip(rec) == rec